@@ -0,0 +1,132 @@
+"""lg-rez / benchmarks / Calcul des scores de recherche approchée
+
+Compare les temps de recherche (:meth:`.bdd.fuzzy.SlugIndex.search`)
+selon le calcul des scores utilisé, sur des tables de déclencheurs
+d'IA (:class:`.bdd.Trigger`) générées aléatoirement :
+
+    - ``difflib`` : ratio de :class:`difflib.SequenceMatcher` (défaut) ;
+    - ``difflib-batch`` : idem, via :class:`.fuzzy.SequenceMatcherScorer` ;
+    - ``lcs-compat`` : :class:`.fuzzy.LCSScorer` en mode compatibilité
+      (mêmes résultats que ``difflib``) ;
+    - ``lcs`` : :class:`.fuzzy.LCSScorer` (score LCS).
+
+Pour chaque calcul, affiche le temps moyen par recherche et la
+proportion de recherches donnant le même meilleur résultat que
+``difflib``.
+
+Usage :
+
+    python benchmarks/fuzzy_scorers.py [--sizes 200 2000] [--queries 200]
+
+"""
+
+import argparse
+import random
+import time
+
+from lgrez.bdd import base, fuzzy
+
+
+# Vocabulaire typique des déclencheurs / messages des joueurs
+WORDS = [
+    "bonjour", "salut", "coucou", "bonne", "nuit", "merci", "beaucoup",
+    "loup", "garou", "loups-garous", "village", "villageois", "voyante",
+    "sorcière", "chasseur", "maire", "vote", "voter", "condamné", "mort",
+    "vivant", "partie", "jeu", "règles", "action", "pouvoir", "cible",
+    "ce", "soir", "demain", "matin", "qui", "est", "le", "la", "les", "un",
+    "une", "je", "tu", "il", "on", "nous", "vous", "pas", "plus", "bien",
+    "mal", "trop", "encore", "pourquoi", "comment", "quand", "bot", "MJ",
+    "aide", "help", "ta", "gueule", "ça", "va", "oui", "non", "peut-être",
+    "jamais", "toujours", "ami", "ennemi", "traître", "innocent", "fais",
+    "moi", "confiance", "élimination", "haro", "candidature", "chambre",
+    "quarante-deux", "pizza", "café", "dodo", "rez", "espci", "PC",
+]
+
+
+def random_phrase(rng, n_min, n_max):
+    """Phrase aléatoire de n_min à n_max mots du vocabulaire"""
+    return " ".join(rng.choice(WORDS)
+                    for _ in range(rng.randint(n_min, n_max)))
+
+
+def typo(rng, text):
+    """Ajoute une faute de frappe (suppression / remplacement) à text"""
+    if len(text) < 2:
+        return text
+    i = rng.randrange(len(text))
+    if rng.random() < 0.5:
+        return text[:i] + text[i + 1:]
+    return text[:i] + rng.choice("aeiourst") + text[i + 1:]
+
+
+def make_table(rng, size):
+    """Table de déclencheurs : expressions de 1 à 5 mots"""
+    return [random_phrase(rng, 1, 5) for _ in range(size)]
+
+
+def make_queries(rng, triggers, n):
+    """Recherches : déclencheurs avec fautes, mots seuls et messages"""
+    queries = []
+    for _ in range(n):
+        kind = rng.random()
+        if kind < 0.4:
+            queries.append(typo(rng, rng.choice(triggers)))
+        elif kind < 0.7:
+            queries.append(rng.choice(WORDS))
+        else:
+            queries.append(random_phrase(rng, 4, 15))
+    return [base._slugify(query) for query in queries]
+
+
+SCORERS = {
+    "difflib": None,
+    "difflib-batch": fuzzy.SequenceMatcherScorer(),
+    "lcs-compat": fuzzy.LCSScorer(compat=True),
+    "lcs": fuzzy.LCSScorer(),
+}
+
+
+def run(size, n_queries, sensis, seed):
+    """Mesure et affiche les résultats pour une taille de table"""
+    rng = random.Random(seed)
+    triggers = make_table(rng, size)
+    queries = make_queries(rng, triggers, n_queries)
+    index = fuzzy.SlugIndex()
+    for key, trigger in enumerate(triggers):
+        index.add(key, base._slugify(trigger))
+
+    print(f"\n{size} déclencheurs, {n_queries} recherches")
+    print(f"{'sensi':>6} {'calcul':>14} {'ms / recherche':>15} "
+          f"{'même meilleur':>14}")
+    for sensi in sensis:
+        reference = None
+        for name, scorer in SCORERS.items():
+            start = time.perf_counter()
+            results = [index.search(query, sensi=sensi, scorer=scorer,
+                                    solo_si_parfait=False, limit=10)
+                       for query in queries]
+            elapsed = time.perf_counter() - start
+            bests = [res[0][0] if res else None for res in results]
+            if reference is None:
+                reference = bests
+            same = sum(a == b for a, b in zip(bests, reference)) / len(bests)
+            print(f"{sensi:>6} {name:>14} "
+                  f"{1000 * elapsed / n_queries:>15.3f} {same:>14.1%}")
+
+
+def main():
+    """Point d'entrée (voir --help)"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[200, 2000, 10000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--sensis", type=float, nargs="+",
+                        default=[0.5, 0.7, 0.8, 0.9])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.queries, args.sensis, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""lg-rez / benchmarks / Charge des requêtes aux API Google
+
+Mesure le comportement de l'ordonnanceur des requêtes aux API Google
+(:func:`.gsheets.request`) sous charge, sans accès réseau, grâce à
+l'émulateur local (:mod:`.gsheets_emulator`) :
+
+    - un Tableau de bord de ``--players`` joueurs est généré dans un
+      dossier temporaire ;
+    - à chaque tour, une synchronisation (lecture du TDB puis écriture
+      de modifications, priorité ``sync``) est lancée en même temps que
+      ``--exports`` ajouts de votes / actions (priorité ``export``) ;
+    - l'émulateur ajoute une latence (``--latency``) et des erreurs de
+      quota, aléatoires (``--error-rate``) ou au-delà de ``--emulated-
+      quota`` requêtes par minute.
+
+Affiche la durée des synchronisations et des ajouts (moyenne et
+maximum), les statistiques de :func:`.gsheets.api_stats` et le nombre
+d'erreurs renvoyées par l'émulateur.
+
+Usage :
+
+    python benchmarks/google_api_load.py [--rounds 10] [--exports 20]
+
+"""
+
+import argparse
+import asyncio
+import csv
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from lgrez import config
+from lgrez.blocs import gsheets
+
+
+KEY = "benchmark"
+TDB = "Tableau de bord"
+VOTES = "Données brutes"
+
+
+def make_tdb(root, n_players, rng):
+    """Génère le classeur émulé (TDB de n_players joueurs, votes)"""
+    folder = os.path.join(root, "sheets", KEY)
+    os.makedirs(folder)
+    with open(os.path.join(folder, f"{TDB}.csv"), "w", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(["ID", "Nom", "Chambre", "Statut", "Rôle", "Camp"])
+        for i in range(n_players):
+            writer.writerow([10**17 + i, f"Joueur {i}", f"{100 + i}",
+                             rng.choice(["vivant", "mort", "MV"]),
+                             rng.choice(["villageois", "loup", "sorcière"]),
+                             rng.choice(["village", "loups"])])
+    with open(os.path.join(folder, f"{VOTES}.csv"), "w", newline="") as fh:
+        csv.writer(fh).writerow(["Date", "Joueur", "Vote"])
+
+
+async def timed(coro, durations):
+    """Exécute coro et ajoute sa durée à durations (erreurs définitives
+    ignorées, comptées par :func:`.gsheets.api_stats`)"""
+    start = time.perf_counter()
+    try:
+        await coro
+    except Exception:
+        pass
+    durations.append(time.perf_counter() - start)
+
+
+async def sync(n_players, rng):
+    """Synchronisation : lecture du TDB et modifications"""
+    sheet = await gsheets.get_worksheet(KEY, TDB)
+    await gsheets.request(sheet.batch_get, ["A2:A", "B2:F"])
+    modifs = [gsheets.Modif(rng.randrange(1, n_players + 1),
+                            rng.randrange(1, 6), f"modif {i}")
+              for i in range(rng.randint(1, 10))]
+    await gsheets.update(sheet, *modifs)
+
+
+async def export(i):
+    """Ajout d'un vote / d'une action"""
+    sheet = await gsheets.get_worksheet(KEY, VOTES)
+    await gsheets.request(sheet.append_rows, [[time.time(), i, "vote"]],
+                          value_input_option="USER_ENTERED",
+                          priority=gsheets.Priority.export)
+
+
+async def run(args):
+    """Lance les tours et renvoie les durées (sync, exports)"""
+    rng = random.Random(args.seed)
+    syncs, exports = [], []
+    for _ in range(args.rounds):
+        await asyncio.gather(
+            timed(sync(args.players, rng), syncs),
+            *(timed(export(i), exports) for i in range(args.exports)),
+        )
+    return syncs, exports
+
+
+def describe(label, durations):
+    """Affiche la durée moyenne et maximale"""
+    print(f"{label:<8} {len(durations):>6} requêtes, durée moyenne "
+          f"{statistics.mean(durations):.3f} s, "
+          f"maximale {max(durations):.3f} s")
+
+
+def main():
+    """Point d'entrée (voir --help)"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--players", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--exports", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--emulated-quota", type=int, default=0)
+    parser.add_argument("--quota", type=int,
+                        default=config.google_api_quota)
+    parser.add_argument("--burst", type=int,
+                        default=config.google_api_burst)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config.google_emulator_latency = args.latency
+    config.google_emulator_error_rate = args.error_rate
+    config.google_emulator_quota = args.emulated_quota
+    config.google_api_quota = args.quota
+    config.google_api_burst = args.burst
+
+    with tempfile.TemporaryDirectory() as root:
+        make_tdb(root, args.players, random.Random(args.seed))
+        os.environ[gsheets.EMULATOR_ENV_VAR] = root
+        start = time.perf_counter()
+        syncs, exports = asyncio.run(run(args))
+        total = time.perf_counter() - start
+        emulator = gsheets.get_emulator()
+
+    print(f"Durée totale : {total:.2f} s")
+    describe("sync", syncs)
+    describe("export", exports)
+    stats = gsheets.api_stats()
+    print(f"Requêtes : {stats.requests}, nouvels essais : {stats.retries}, "
+          f"échecs : {stats.failures}")
+    print(f"Attente moyenne du quota : {stats.mean_wait:.3f} s "
+          f"({gsheets.API_STATS_WINDOW} dernières requêtes)")
+    print(f"Émulateur : {emulator.requests} requêtes, "
+          f"{emulator.errors} erreurs de quota")
+
+
+if __name__ == "__main__":
+    main()
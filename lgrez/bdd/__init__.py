@@ -6,7 +6,7 @@ Déclaration de toutes les tables, colonnes, méthodes, et connection à la BDD
 
 import sqlalchemy
 
-from lgrez.bdd import base
+from lgrez.bdd import base, query_stats
 from lgrez.bdd.enums import *
 from lgrez.bdd.model_joueurs import *
 from lgrez.bdd.model_jeu import *
@@ -23,6 +23,8 @@ tables = base.tables
 
 connect = base.connect
 
+unit_of_work = base.unit_of_work
+
 SQLAlchemyError = sqlalchemy.exc.SQLAlchemyError
 
 DriverOperationalError = sqlalchemy.exc.OperationalError
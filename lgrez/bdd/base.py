@@ -4,8 +4,14 @@ Métaclasse et classe de base des tables de données, fonction de connection
 
 """
 
+import asyncio
+import collections
+import concurrent.futures
+import contextlib
+import contextvars
+import itertools
 import re
-import difflib
+import warnings
 
 import sqlalchemy
 from sqlalchemy import orm
@@ -13,6 +19,7 @@ import unidecode
 
 from lgrez import config
 from lgrez.blocs import env
+from lgrez.bdd import entity_cache, fuzzy, query_stats
 
 
 def _remove_accents(text):
@@ -24,6 +31,11 @@ def _remove_accents(text):
     return p.sub(lambda m: unidecode.unidecode(m.group()), text)
 
 
+def _slugify(text):
+    """Renvoie la chaîne normalisée (non accentuée et en minuscules)"""
+    return _remove_accents(text).lower()
+
+
 # ---- Objets de base des classes de données
 
 class TableMeta(sqlalchemy.orm.DeclarativeMeta):
@@ -50,6 +62,11 @@ class TableMeta(sqlalchemy.orm.DeclarativeMeta):
         dic["registry"] = cls.registry      # un peu de magie noire...
         super().__init__(name, bases, dic, comment=comment, **kwargs)
 
+        # Caches de recherche approchée : nom de colonne -> SlugCache
+        cls._slug_caches = {}
+        # Cache des entrées par clé primaire (créé si besoin)
+        cls._entity_cache = None
+
         cls._attrs = {n: k for n, k in dic.items() if isinstance(k, (
             sqlalchemy.Column,
             sqlalchemy.orm.relationships.RelationshipProperty,
@@ -69,7 +86,7 @@ class TableMeta(sqlalchemy.orm.DeclarativeMeta):
 
     @property
     def query(cls):
-        """sqlalchemy.orm.query.Query: Raccourci pour
+        """.bdd.base.Query: Raccourci pour
         ``.config.session.query(Table)``.
 
         Raises:
@@ -78,6 +95,18 @@ class TableMeta(sqlalchemy.orm.DeclarativeMeta):
         """
         return config.session.query(cls)
 
+    @property
+    def aquery(cls):
+        """.bdd.base.AsyncQuery: Équivalent de :attr:`query` dont les
+        requêtes ne bloquent pas la boucle asyncio (si
+        :attr:`.config.async_db`).
+
+        Examples::
+
+            joueur = await Joueur.aquery.get(member.id)
+        """
+        return AsyncQuery(cls)
+
     @property
     def columns(cls):
         """sqlalchemy.sql.base.ImmutableColumnCollection: Raccourci pour
@@ -124,7 +153,7 @@ class TableMeta(sqlalchemy.orm.DeclarativeMeta):
 
     def find_nearest(cls, chaine, col=None, sensi=0.25, filtre=None,
                      solo_si_parfait=True, parfaits_only=True,
-                     match_first_word=False):
+                     match_first_word=False, limit=None, scorer=None):
         """Recherche les plus proches résultats d'une chaîne donnée.
 
         Args:
@@ -149,6 +178,13 @@ class TableMeta(sqlalchemy.orm.DeclarativeMeta):
                 ``chaine`` vis à vis du premier *mot* (caractères
                 précédentla première espace) de chaque entrée, et
                 conserve ce score si il est supérieur.
+            limit (int): si précisé, ne renvoie que les ``limit``
+                meilleurs résultats (mêmes résultats que
+                ``find_nearest(...)[:limit]``, mais les entrées ne
+                pouvant pas en faire partie ne sont pas comparées).
+            scorer (.fuzzy.Scorer): calcul des scores\* à utiliser
+                (défaut : :attr:`.config.fuzzy_scorer`, ou ratio de
+                :class:`difflib.SequenceMatcher` si non défini).
 
         Returns:
             :class:`list`\[\(:class:`TableBase`, :class:`float`\)\]: Les
@@ -162,11 +198,59 @@ class TableMeta(sqlalchemy.orm.DeclarativeMeta):
                 (:attr:`.lgrez.config.session` vaut ``None``)
 
         *\*score* = ratio de :class:`difflib.SequenceMatcher`, i.e.
-        proportion de caractères communs aux deux chaînes.
+        proportion de caractères communs aux deux chaînes (ou score
+        calculé par ``scorer``, voir :class:`.fuzzy.LCSScorer`).
 
         Note:
             Les chaînes sont comparées sans tenir compte de
             l'accentuation ni de la casse.
+
+            Les valeurs de la colonne sont indexées par trigrammes
+            (:class:`.fuzzy.SlugIndex`, conservé d'un appel à l'autre) :
+            seules les entrées pouvant atteindre ``sensi`` sont
+            effectivement comparées.
+
+            Si :attr:`.config.fuzzy_sql_prefilter` vaut ``True``, que
+            la base est PostgreSQL et que la colonne est indexée par
+            trigrammes (voir :func:`connect`), seules les entrées les plus
+            similaires au sens de ``pg_trgm`` (au plus
+            :attr:`.config.fuzzy_sql_candidates`) sont récupérées et
+            comparées : les entrées trop différentes de ``chaine``
+            peuvent alors être ignorées même si leur score\* atteint
+            ``sensi``.
+        """
+        return cls.find_nearest_many(
+            [chaine], col=col, sensi=sensi, filtre=filtre,
+            solo_si_parfait=solo_si_parfait, parfaits_only=parfaits_only,
+            match_first_word=match_first_word, limit=limit, scorer=scorer,
+        )[0]
+
+    def find_nearest_many(cls, chaines, col=None, sensi=0.25, filtre=None,
+                          solo_si_parfait=True, parfaits_only=True,
+                          match_first_word=False, limit=None, scorer=None):
+        """Recherche les plus proches résultats de plusieurs chaînes.
+
+        Équivalent à appeler :meth:`find_nearest` pour chaque chaîne,
+        mais l'index des valeurs de la colonne, le filtre éventuel et
+        le chargement des entrées trouvées ne sont traités qu'une
+        fois pour toutes les chaînes (une seule passe de comparaison,
+        voir :meth:`.fuzzy.SlugIndex.search_many`).
+
+        Args:
+            chaines (list[str]): motifs à rechercher
+            col, sensi, filtre, solo_si_parfait, parfaits_only,
+                match_first_word, limit, scorer: voir
+                :meth:`find_nearest`.
+
+        Returns:
+            :class:`list`\[:class:`list`\[\(:class:`TableBase`,
+            :class:`float`\)\]\]: Les résultats de :meth:`find_nearest`
+            pour chaque chaîne de ``chaines``, dans le même ordre.
+
+        Raises:
+            ValueError: ``col`` inexistante ou pas de type textuel
+            ~ready_check.NotReadyError: session non initialisée
+                (:attr:`.lgrez.config.session` vaut ``None``)
         """
         if not col:
             col = cls.primary_col
@@ -182,49 +266,327 @@ class TableMeta(sqlalchemy.orm.DeclarativeMeta):
             raise ValueError(f"{cls.__name__}.find_nearest: "
                              f"Colonne {col.key} pas de type textuel")
 
-        query = cls.query
+        chaines = list(chaines)
+        if not chaines:
+            return []
+
+        session = config.session
+        if session.autoflush:
+            # Comme avant une requête : modifications en attente en base
+            session.flush()
+
+        if scorer is None:
+            scorer = config.fuzzy_scorer
+
+        slugs = [_slugify(chaine) for chaine in chaines]
+        if _pg_trgm_ready(cls, col):
+            # Présélection des candidats en SQL, puis calcul habituel
+            founds = [
+                cls._sql_candidates(col, slug, filtre, match_first_word)
+                .search(slug, sensi=sensi, solo_si_parfait=solo_si_parfait,
+                        parfaits_only=parfaits_only,
+                        match_first_word=match_first_word, limit=limit,
+                        scorer=scorer)
+                for slug in slugs
+            ]
+            entries = cls._get_by_keys({key for found in founds
+                                        for key, _ in found})
+            return [[(entries[key], score) for key, score in found
+                     if key in entries] for found in founds]
+
+        pk = cls.primary_col
+        cache = cls._slug_cache(col)
+
+        def load():
+            # Chargé dans la transaction en cours : à oublier si rollback
+            session.info.setdefault("_touched_slug_caches", set()).add(cache)
+            return session.query(pk, col).all()
+
+        index = cache.get_index(load)
+
+        keys = None
+        if filtre is not None:
+            # Filtre SQL : on ne récupère que les clés primaires
+            keys = {key for (key,) in
+                    cls.query.filter(filtre).with_entities(pk)}
+
+        founds = index.search_many(slugs, sensi=sensi,
+                                   solo_si_parfait=solo_si_parfait,
+                                   parfaits_only=parfaits_only,
+                                   match_first_word=match_first_word,
+                                   keys=keys, limit=limit, scorer=scorer)
+
+        # Une seule requête pour toutes les entrées trouvées
+        entries = cls._get_by_keys({key for found in founds
+                                    for key, _ in found})
+        return [[(entries[key], score) for key, score in found
+                 if key in entries] for found in founds]
+
+    def _sql_candidates(cls, col, slug, filtre, match_first_word):
+        """Index des entrées présélectionnées en SQL (pg_trgm) pour ``slug``
+
+        Entrées les plus similaires au sens de ``pg_trgm`` (au plus
+        :attr:`.config.fuzzy_sql_candidates`), indexées par clé primaire.
+        """
+        pk = cls.primary_col
+        slug_col = sqlalchemy.func.lgrez_slug(col)
+        cond = slug_col.op("%")(slug)           # similarity >= seuil
+        if match_first_word:
+            # Chaîne proche d'un des mots de l'entrée
+            cond = cond | sqlalchemy.literal(slug).op("<%")(slug_col)
+        query = config.session.query(pk, col).filter(cond)
         if filtre is not None:
             query = query.filter(filtre)
+        query = query.order_by(
+            sqlalchemy.func.similarity(slug_col, slug).desc(), pk
+        ).limit(config.fuzzy_sql_candidates)
+
+        index = fuzzy.SlugIndex()
+        for key, value in sorted(query.all()):
+            if value is not None:
+                index.add(key, _slugify(value))
+        return index
+
+    def _slug_cache(cls, col):
+        """Cache des valeurs normalisées de ``col`` (créé si besoin)"""
+        try:
+            return cls._slug_caches[col.key]
+        except KeyError:
+            cache = fuzzy.SlugCache(_slugify)
+            cls._slug_caches[col.key] = cache
+            return cache
+
+    def _get_by_keys(cls, keys):
+        """Renvoie ``{clé primaire: entrée}`` pour les clés données"""
+        pk = cls.primary_col
+        keys = list(keys)
+        entries = {}
+        for i in range(0, len(keys), 500):      # Limite SQL du nb de params
+            for entry in cls.query.filter(pk.in_(keys[i:i + 500])):
+                entries[getattr(entry, pk.key)] = entry
+        return entries
+
+    def slug_cache_info(cls, col=None):
+        """Statistiques du cache de :meth:`find_nearest` pour une colonne.
+
+        Args:
+            col (:class:`sqlalchemy.schema.Column` | :class:`str`):
+                colonne concernée (défaut : colonne primaire).
+
+        Returns:
+            :class:`.fuzzy.CacheInfo`: Nombre de recherches servies par
+            le cache / ayant nécessité son chargement, nombre total de
+            valeurs normalisées et nombre de valeurs en cache.
+        """
+        if not col:
+            col = cls.primary_col
+        key = col if isinstance(col, str) else col.key
+        cache = cls._slug_caches.get(key)
+        if cache is None:
+            return fuzzy.CacheInfo(0, 0, 0, 0)
+        return cache.info()
+
+    def invalidate_slug_cache(cls):
+        """Vide les caches de :meth:`find_nearest` de cette table.
+
+        Ils sont tenus à jour automatiquement lors des ``flush``,
+        ``commit``, ``rollback`` et suppressions / modifications en
+        masse (:meth:`Query.delete() <sqlalchemy.orm.query.Query.delete>`,
+        :meth:`Query.update() <sqlalchemy.orm.query.Query.update>`)
+        de la session : n'appeler cette méthode qu'en cas de
+        modification de la table par un autre moyen (SQL brut...).
+        """
+        for cache in cls._slug_caches.values():
+            cache.invalidate()
+
+    def get_cached(cls, key):
+        """Récupère une entrée par sa clé primaire, sans requête si possible.
+
+        Équivalent à ``Table.query.get(key)``, mais les valeurs des
+        entrées lues récemment sont conservées d'une transaction à
+        l'autre (voir :attr:`.config.entity_cache_size` et
+        :attr:`.config.entity_cache_ttl`) : une entrée en cache est
+        renvoyée sans interroger la base.
+
+        Le cache est tenu à jour lors des ``flush``, ``rollback`` et
+        suppressions / modifications en masse de la session (comme
+        celui de :meth:`find_nearest`).
+
+        Args:
+            key: clé primaire de l'entrée recherchée.
+
+        Returns:
+            :class:`.bdd.base.TableBase` | ``None``: L'entrée
+            correspondante (``None`` si elle n'existe pas).
+        """
+        entry = cls._from_entity_cache(key)
+        if entry is None:
+            entry = cls.query.get(key)
+            cls._to_entity_cache(entry)
+        return entry
+
+    def _get_entity_cache(cls):
+        """Cache des entrées de la table (``None`` si désactivé)"""
+        if cls._entity_cache is None:
+            if config.entity_cache_size <= 0 or config.entity_cache_ttl <= 0:
+                return None
+            cls._entity_cache = entity_cache.EntityCache(
+                config.entity_cache_size, config.entity_cache_ttl
+            )
+        return cls._entity_cache
+
+    def _from_entity_cache(cls, key):
+        """Entrée de clé ``key`` si accessible sans requête, sinon None"""
+        session = config.session
+        entry = session.identity_map.get(orm.util.identity_key(cls, key))
+        if entry is not None and not sqlalchemy.inspect(entry).expired:
+            return entry            # Déjà chargée dans la session
+
+        cache = cls._get_entity_cache()
+        values = cache.get(key) if cache is not None else None
+        if values is None:
+            return None
+
+        if entry is None:
+            # Reconstitution de l'entrée à partir des valeurs en cache
+            entry = cls.__mapper__.class_manager.new_instance()
+            for attr, value in values.items():
+                orm.attributes.set_committed_value(entry, attr, value)
+            orm.make_transient_to_detached(entry)
+            session.add(entry)
+        else:
+            # Entrée expirée (commit) : on restaure les valeurs
+            state = sqlalchemy.inspect(entry)
+            for attr, value in values.items():
+                if attr in state.expired_attributes:
+                    orm.attributes.set_committed_value(entry, attr, value)
+        return entry
+
+    def _to_entity_cache(cls, entry):
+        """Enregistre les valeurs d'une entrée chargée dans le cache"""
+        cache = cls._get_entity_cache()
+        if entry is None or cache is None:
+            return
+        state = sqlalchemy.inspect(entry)
+        if state.modified or not state.identity:
+            return                  # Pas le reflet de la base
+        keys = [prop.key for prop in cls.__mapper__.column_attrs]
+        if any(key not in state.dict for key in keys):
+            return                  # Chargement partiel
+        cache.put(state.identity[0], {key: state.dict[key] for key in keys})
+
+    def entity_cache_info(cls):
+        """Statistiques du cache de :meth:`get_cached` pour cette table.
+
+        Returns:
+            :class:`.entity_cache.EntityCacheInfo`: Nombre de recherches
+            servies par le cache / non trouvées en cache, nombre
+            maximal et nombre actuel d'entrées en cache.
+        """
+        if cls._entity_cache is None:
+            return entity_cache.EntityCacheInfo(0, 0, 0, 0)
+        return cls._entity_cache.info()
+
+    def invalidate_entity_cache(cls):
+        """Vide le cache de :meth:`get_cached` de cette table.
+
+        Comme :meth:`invalidate_slug_cache`, n'appeler cette méthode
+        qu'en cas de modification de la table par un autre moyen que
+        la session (SQL brut...). Le cache sera recréé selon les
+        paramètres actuels de :mod:`.config`.
+        """
+        cls._entity_cache = None
+
+    def load_options(cls, profile):
+        """Options de chargement des relations correspondant à un profil.
+
+        Les profils de chargement d'une table sont définis par son
+        attribut de classe ``_load_profiles`` (dictionnaire nom du
+        profil -> chemins de relations, *e.g.* ``"actions.base"``) ;
+        voir :meth:`.bdd.base.Query.with_profile`.
+
+        Args:
+            profile (str): nom du profil.
 
-        results = query.all()
+        Returns:
+            :class:`list`\[:class:`sqlalchemy.orm.Load`\]: Une option
+            par chemin : :func:`~sqlalchemy.orm.selectinload` pour les
+            relations vers plusieurs entrées,
+            :func:`~sqlalchemy.orm.joinedload` pour les autres.
 
-        SM = difflib.SequenceMatcher()
-        # Première chaîne à comparer : cible, en minuscule et sans accents
-        slug1 = _remove_accents(chaine).lower()
-        SM.set_seq1(slug1)
+        Raises:
+            ValueError: profil non défini pour cette table.
+        """
+        try:
+            paths = cls._load_profiles[profile]
+        except (AttributeError, KeyError):
+            raise ValueError(f"Profil de chargement '{profile}' non défini "
+                             f"pour {cls.__name__}") from None
+        return [_loader_chain(cls, path) for path in paths]
 
-        scores = []
-        for entry in results:
-            slug2 = _remove_accents(getattr(entry, col.key)).lower()
+    def check_consistency(cls, fix=True):
+        """Vérifie les données dénormalisées de cette table.
 
-            # On compare chaque élément à la cible (en non accentué)
-            SM.set_seq2(slug2)
-            score = SM.ratio()          # Taux de ressemblance
+        Appelée pour chaque table à la connexion à la base
+        (:func:`.bdd.connect`) ; sans effet par défaut, redéfinie par
+        les tables maintenant des références calculables à partir
+        d'autres données (voir :meth:`.bdd.Action.check_consistency`).
 
-            if match_first_word:
-                # On compare aussi avec le premier mot, si demandé
-                first_word = slug2.split(maxsplit=1)[0]
-                SM.set_seq2(first_word)
-                score_fw = SM.ratio()
-                score = max(score, score_fw)
+        Args:
+            fix (bool): si ``True`` (défaut), reconstruit (et commit)
+                les données incohérentes.
+
+        Returns:
+            :class:`list`\[:class:`.bdd.base.TableBase`\]: Les entrées
+            dont les données étaient incohérentes.
+        """
+        return []
 
-            if score == 1:
-                # Cas particulier : élément demandé correspond exactement
-                # à un élément existant
-                if solo_si_parfait:
-                    # Si demandé, on le renvoie direct
-                    return [(entry, score)]
-                elif parfaits_only:
-                    # Si demandé, on ne renverra que les éléments de score 1
-                    sensi = 1
 
-            scores.append((entry, score))
+def _loader_chain(table, path):
+    """Option de chargement d'un chemin de relations (``"a.b.c"``)"""
+    option = orm
+    for key in path.split("."):
+        prop = table.__mapper__.relationships[key]
+        method = "selectinload" if prop.uselist else "joinedload"
+        option = getattr(option, method)(getattr(table, key))
+        table = prop.mapper.class_
+    return option
 
-        # On ne garde que les résultats >= sensi, dans l'ordre ;
-        # si élément parfait trouvé et parfaits_only, sensi = 1 donc
-        # ne renvoie que les parfaits
-        bests = [(e, score) for (e, score) in scores if score >= sensi]
-        return sorted(bests, key=lambda x: x[1], reverse=True)
+
+class Query(orm.Query):
+    """Requête des tables de données (:attr:`.TableMeta.query`).
+
+    Sous-classe de :class:`sqlalchemy.orm.query.Query` (utilisée par
+    :obj:`.config.session`) ajoutant :meth:`with_profile`.
+    """
+    def with_profile(self, *profiles):
+        """Charge les relations parcourues ensuite, en quelques requêtes.
+
+        Applique les options de chargement des profils demandés
+        (:meth:`.TableMeta.load_options`), au lieu d'une requête par
+        entrée et par relation lors de leur parcours.
+
+        Args:
+            \*profiles (str): noms des profils de chargement, définis
+                pour la table (première entité) de la requête.
+
+        Returns:
+            :class:`.bdd.base.Query`
+
+        Raises:
+            ValueError: profil non défini pour cette table.
+
+        Examples::
+
+            joueurs = Joueur.query.with_profile("actions").all()
+            [ac for jr in joueurs for ac in jr.actions if ac.is_open]
+            # 3 requêtes au lieu de 1 + n_joueurs + n_actions
+        """
+        table = self.column_descriptions[0]["entity"]
+        return self.options(*itertools.chain.from_iterable(
+            table.load_options(profile) for profile in profiles
+        ))
 
 
 # Dictionnaire {nom de la base -> table}, automatiquement rempli par
@@ -260,12 +622,16 @@ class TableBase:
         Toutes les modifications, y compris des autres instances,
         seront enregistrées.
 
+        Dans un bloc :func:`.bdd.base.unit_of_work`, ne fait rien : les
+        modifications seront commitées à la fin du bloc.
+
         Globlament équivalent à::
 
             config.session.commit()
 
         """
-        config.session.commit()
+        if _unit_of_work.get() is None:
+            config.session.commit()
 
     def add(self, *other):
         """Enregistre l'instance dans la base de donnée et commit.
@@ -325,6 +691,783 @@ class TableBase:
         self.update()
 
 
+# ---- Mise à jour des caches de recherche approchée
+
+def _loaded_slug_caches(obj):
+    """Caches chargés de la table de ``obj`` (nom de colonne -> cache)"""
+    caches = getattr(type(obj), "_slug_caches", {})
+    return {key: cache for key, cache in caches.items() if cache.loaded}
+
+
+@sqlalchemy.event.listens_for(orm.Session, "after_flush")
+def _update_slug_caches(session, flush_context):
+    """Répercute les entrées ajoutées / modifiées / supprimées"""
+    touched = session.info.setdefault("_touched_slug_caches", set())
+    for obj in session.deleted:
+        caches = _loaded_slug_caches(obj)
+        touched.update(caches.values())
+        for cache in caches.values():
+            cache.remove(sqlalchemy.inspect(obj).identity[0])
+
+    for obj in itertools.chain(session.new, session.dirty):
+        caches = _loaded_slug_caches(obj)
+        if not caches:
+            continue
+        touched.update(caches.values())
+        state = sqlalchemy.inspect(obj)
+        pk_key = type(obj).primary_col.key
+        if state.attrs[pk_key].history.deleted:
+            # Clé primaire modifiée : on repart de zéro
+            for cache in caches.values():
+                cache.invalidate()
+            continue
+
+        key = state.dict.get(pk_key)
+        for col_key, cache in caches.items():
+            if col_key in state.dict:       # Sinon, non chargé donc inchangé
+                cache.update(key, state.dict[col_key])
+
+
+@sqlalchemy.event.listens_for(orm.Session, "after_commit")
+def _commit_slug_caches(session):
+    """Les modifications répercutées sont désormais définitives"""
+    session.info.pop("_touched_slug_caches", None)
+
+
+@sqlalchemy.event.listens_for(orm.Session, "after_rollback")
+def _rollback_slug_caches(session):
+    """Les modifications répercutées depuis le dernier commit sont annulées"""
+    for cache in session.info.pop("_touched_slug_caches", ()):
+        cache.invalidate()
+
+
+@sqlalchemy.event.listens_for(orm.Session, "after_bulk_update")
+@sqlalchemy.event.listens_for(orm.Session, "after_bulk_delete")
+def _invalidate_table_caches(context):
+    """Modification en masse : entrées concernées inconnues"""
+    table = context.mapper.class_
+    if isinstance(table, TableMeta):
+        table.invalidate_slug_cache()
+        table.invalidate_entity_cache()
+
+
+# ---- Mise à jour des caches d'entrées
+
+@sqlalchemy.event.listens_for(orm.Session, "after_flush")
+def _update_entity_caches(session, flush_context):
+    """Enregistre les entrées modifiées / supprimées
+
+    (répercutées au commit : les caches sont communs à toutes les
+    sessions, qui ne doivent pas voir des valeurs non commitées).
+    """
+    pending = session.info.setdefault("_pending_entity_caches", [])
+    for obj in session.deleted:
+        cache = getattr(type(obj), "_entity_cache", None)
+        if cache is not None:
+            pending.append((cache, cache.remove,
+                            (sqlalchemy.inspect(obj).identity[0],)))
+
+    # Nouvelles entrées : pas en cache (ajoutées lors de leur lecture)
+    for obj in session.dirty:
+        cache = getattr(type(obj), "_entity_cache", None)
+        if cache is None:
+            continue
+        state = sqlalchemy.inspect(obj)
+        pk_key = type(obj).primary_col.key
+        if state.attrs[pk_key].history.deleted:
+            # Clé primaire modifiée : on repart de zéro
+            pending.append((cache, cache.invalidate, ()))
+            continue
+
+        keys = [prop.key for prop in type(obj).__mapper__.column_attrs]
+        pending.append((cache, cache.update, (
+            state.dict.get(pk_key),
+            {key: state.dict[key] for key in keys if key in state.dict},
+        )))
+
+
+@sqlalchemy.event.listens_for(orm.Session, "after_commit")
+def _commit_entity_caches(session):
+    """Les modifications enregistrées sont désormais définitives"""
+    for _, method, args in session.info.pop("_pending_entity_caches", ()):
+        method(*args)
+
+
+@sqlalchemy.event.listens_for(orm.Session, "after_rollback")
+def _rollback_entity_caches(session):
+    """Les modifications enregistrées depuis le dernier commit sont annulées
+
+    (les caches concernés ont pu être remplis avec des valeurs lues
+    dans la transaction, donc non commitées : on repart de zéro).
+    """
+    pending = session.info.pop("_pending_entity_caches", ())
+    for cache in {cache for cache, _, _ in pending}:
+        cache.invalidate()
+
+
+# ---- Préfiltrage SQL des recherches approchées (PostgreSQL)
+
+# Installation de pg_trgm et de la fonction SQL de normalisation
+# (minuscules, sans accents), déclarée IMMUTABLE pour être indexable
+_PG_TRGM_SETUP = """
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+CREATE OR REPLACE FUNCTION lgrez_slug(text) RETURNS text
+    LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+    AS $$ SELECT lower(unaccent('unaccent', $1)) $$;
+"""
+
+# État du préfiltrage pour la connexion en cours (réinitialisé par
+# connect) : "ready" -> extensions installées, "indexes" -> noms des
+# index trigrammes créés
+_pg_trgm = {}
+
+
+def _trgm_index_name(table, col):
+    """Nom de l'index trigrammes d'une colonne"""
+    return f"ix_trgm_{table.__tablename__}_{col.name}"
+
+
+def _trgm_columns():
+    """Colonnes à indexer par trigrammes
+
+    (clés primaires textuelles et colonnes déclarées avec
+    ``info={"fuzzy_index": True}``), par table.
+    """
+    for table in tables.values():
+        if not isinstance(table, TableMeta):
+            continue
+        for col in table.__table__.columns:
+            if not isinstance(col.type, sqlalchemy.String):
+                continue
+            if col is table.primary_col or col.info.get("fuzzy_index"):
+                yield table, col
+
+
+def _setup_pg_trgm():
+    """Installe les extensions et index nécessaires au préfiltrage SQL
+
+    Appelée par :func:`connect` : les index trigrammes ne sont jamais
+    créés pendant une recherche (voir :func:`_pg_trgm_ready`).
+    """
+    try:
+        with config.engine.begin() as conn:
+            conn.execute(sqlalchemy.text(_PG_TRGM_SETUP))
+    except sqlalchemy.exc.SQLAlchemyError as exc:
+        warnings.warn("find_nearest : préfiltrage SQL indisponible, "
+                      f"recherche sur toute la table ({exc})")
+        _pg_trgm["ready"] = False
+        return
+
+    _pg_trgm["ready"] = True
+    _pg_trgm["indexes"] = set()
+    preparer = config.engine.dialect.identifier_preparer
+    for table, col in _trgm_columns():
+        name = _trgm_index_name(table, col)
+        try:
+            with config.engine.begin() as conn:
+                conn.execute(sqlalchemy.text(
+                    f"CREATE INDEX IF NOT EXISTS {preparer.quote(name)} "
+                    f"ON {preparer.format_table(table.__table__)} USING gin "
+                    f"(lgrez_slug({preparer.quote(col.name)}) gin_trgm_ops)"
+                ))
+        except sqlalchemy.exc.SQLAlchemyError as exc:
+            warnings.warn(f"find_nearest : index {name} non créé, "
+                          f"recherche sur toute la table ({exc})")
+        else:
+            _pg_trgm["indexes"].add(name)
+
+
+def _pg_trgm_ready(table, col):
+    """Le préfiltrage SQL est-il utilisable pour cette colonne ?
+
+    Vrai si les extensions sont installées et que l'index trigrammes
+    de la colonne a été créé par :func:`_setup_pg_trgm` (aucune
+    requête).
+    """
+    if not config.fuzzy_sql_prefilter or not _pg_trgm.get("ready"):
+        return False
+    return _trgm_index_name(table, col) in _pg_trgm["indexes"]
+
+
+# ---- Accès asynchrone à la base (thread dédié)
+
+# État de l'accès asynchrone pour la connexion en cours (réinitialisé
+# par connect) : "executor" -> exécuteur à un seul thread, "Session" ->
+# fabrique des sessions utilisées dans ce thread
+_db_thread = {}
+
+
+class AsyncQuery:
+    """Requête exécutée sans bloquer la boucle asyncio.
+
+    Construite par :attr:`TableMeta.aquery`, s'utilise comme une
+    :class:`~sqlalchemy.orm.query.Query` dont les méthodes renvoyant
+    des résultats sont des coroutines::
+
+        joueurs = await Joueur.aquery.filter_by(statut=Statut.vivant).all()
+
+    Si :attr:`.config.async_db` vaut ``True``, la requête est exécutée
+    dans le thread dédié à la base, dans une session séparée ; les
+    instances obtenues sont ensuite rattachées à :obj:`.config.session`
+    (:meth:`~sqlalchemy.orm.Session.merge` sans nouvelle requête).
+
+    Elle est exécutée directement dans :obj:`.config.session` (de
+    manière bloquante, comme :attr:`TableMeta.query`) sinon, ou si la
+    session contient des modifications non enregistrées (invisibles
+    depuis une autre session).
+
+    Note:
+        Les relations non chargées par la requête (voir
+        :meth:`~sqlalchemy.orm.query.Query.options`) le seront à la
+        première utilisation, de manière bloquante.
+
+        Les critères ne doivent pas dépendre d'instances dont les
+        attributs ne sont pas chargés (préférer les clés primaires) :
+        leur rafraîchissement serait fait dans le thread dédié, par
+        :obj:`.config.session`. Les instances passées à
+        :meth:`~sqlalchemy.orm.query.Query.filter_by` (relations
+        plusieurs-à-un de l'entité principale) sont remplacées par
+        leur clé primaire à la construction de la requête ; les autres
+        sont refusées (:exc:`ValueError`).
+    """
+    def __init__(self, *entities, _calls=()):
+        self._entities = entities
+        self._calls = _calls
+
+    def __getattr__(self, name):
+        """Méthodes générant une nouvelle requête (``filter``...)"""
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def generative(*args, **kwargs):
+            calls = self._calls
+            if name == "filter_by":
+                criteria, kwargs = self._resolve_instances(kwargs)
+                if criteria:
+                    calls += (("filter", tuple(criteria), {}),)
+            calls += ((name, args, kwargs),)
+            return AsyncQuery(*self._entities, _calls=calls)
+
+        return generative
+
+    def _resolve_instances(self, kwargs):
+        """Remplace les instances des critères de ``filter_by``
+
+        Renvoie les critères sur les clés étrangères équivalents
+        (clés primaires lues dans le thread de la boucle) et les
+        autres arguments.
+        """
+        criteria = []
+        others = {}
+        for key, value in kwargs.items():
+            if not isinstance(value, TableBase):
+                others[key] = value
+                continue
+            mapper = sqlalchemy.inspect(self._entities[0])
+            rel = mapper.relationships.get(key)
+            identity = sqlalchemy.inspect(value).identity
+            if (any(call[0] == "join" for call in self._calls)
+                    or rel is None or identity is None
+                    or rel.direction is not orm.interfaces.MANYTOONE):
+                raise ValueError(
+                    f"AsyncQuery.filter_by : critère {key}={value!r} non "
+                    "convertible en clé primaire, utiliser les colonnes"
+                )
+            pk_cols = list(rel.mapper.primary_key)
+            for local, remote in rel.local_remote_pairs:
+                criteria.append(local == identity[pk_cols.index(remote)])
+        return criteria, others
+
+    def _query(self, session):
+        """Construit la requête synchrone équivalente"""
+        query = session.query(*self._entities)
+        for name, args, kwargs in self._calls:
+            query = getattr(query, name)(*args, **kwargs)
+        return query
+
+    async def _execute(self, method, *args):
+        """Exécute la requête et appelle sa méthode ``method``"""
+        session = config.session
+        if not _db_thread or _has_pending_changes(session):
+            return getattr(self._query(session), method)(*args)
+
+        if method == "get":
+            # Comme Query.get : instance déjà chargée => pas de requête
+            key = orm.util.identity_key(self._entities[0], args[0])
+            inst = session.identity_map.get(key)
+            if inst and not sqlalchemy.inspect(inst).expired:
+                return inst
+
+        result = await run_in_db_thread(
+            lambda sess: getattr(self._query(sess), method)(*args)
+        )
+        return _merge_result(session, result)
+
+    async def all(self):
+        """Coroutine : :meth:`Query.all()
+        <sqlalchemy.orm.query.Query.all>` sans bloquer."""
+        return await self._execute("all")
+
+    async def first(self):
+        """Coroutine : :meth:`Query.first()
+        <sqlalchemy.orm.query.Query.first>` sans bloquer."""
+        return await self._execute("first")
+
+    async def one(self):
+        """Coroutine : :meth:`Query.one()
+        <sqlalchemy.orm.query.Query.one>` sans bloquer."""
+        return await self._execute("one")
+
+    async def one_or_none(self):
+        """Coroutine : :meth:`Query.one_or_none()
+        <sqlalchemy.orm.query.Query.one_or_none>` sans bloquer."""
+        return await self._execute("one_or_none")
+
+    async def scalar(self):
+        """Coroutine : :meth:`Query.scalar()
+        <sqlalchemy.orm.query.Query.scalar>` sans bloquer."""
+        return await self._execute("scalar")
+
+    async def count(self):
+        """Coroutine : :meth:`Query.count()
+        <sqlalchemy.orm.query.Query.count>` sans bloquer."""
+        return await self._execute("count")
+
+    async def get(self, ident):
+        """Coroutine : :meth:`Query.get()
+        <sqlalchemy.orm.query.Query.get>` sans bloquer.
+
+        Comme :meth:`Query.get() <sqlalchemy.orm.query.Query.get>`,
+        n'exécute aucune requête si l'instance est déjà chargée dans
+        :obj:`.config.session`.
+        """
+        return await self._execute("get", ident)
+
+
+async def run_in_db_thread(func):
+    """Exécute une fonction dans le thread dédié à la base de données.
+
+    Args:
+        func (Callable[[sqlalchemy.orm.Session], Any]): fonction à
+            exécuter, appellée avec une session propre au thread dédié
+            (fermée ensuite : les instances renvoyées sont détachées).
+
+    Returns:
+        La valeur renvoyée par ``func``.
+
+    Si l'accès asynchrone n'est pas activé (:attr:`.config.async_db`),
+    ``func`` est appelée directement avec :obj:`.config.session`.
+
+    ``func`` est exécutée dans une copie du contexte actuel : ses
+    requêtes sont attribuées à la commande en cours (voir
+    :mod:`.query_stats`).
+    """
+    if not _db_thread:
+        return func(config.session)
+
+    def job():
+        with _db_thread["Session"]() as session:
+            return func(session)
+
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_db_thread["executor"],
+                                      context.run, job)
+
+
+def _has_pending_changes(session):
+    """La session contient-elle des modifications non enregistrées ?"""
+    return bool(session.new or session.dirty or session.deleted
+                or session.info.get("_flushed"))
+
+
+def _merge_result(session, result):
+    """Rattache à ``session`` les instances d'un résultat de requête"""
+    if isinstance(result, TableBase):
+        return session.merge(result, load=False)
+    if isinstance(result, list):
+        return [_merge_result(session, item) for item in result]
+    if isinstance(result, sqlalchemy.engine.Row):
+        return tuple(_merge_result(session, item) for item in result)
+    return result
+
+
+@sqlalchemy.event.listens_for(orm.Session, "after_flush")
+def _mark_flushed(session, flush_context):
+    """Modifications envoyées mais non commitées"""
+    session.info["_flushed"] = True
+
+
+@sqlalchemy.event.listens_for(orm.Session, "after_commit")
+@sqlalchemy.event.listens_for(orm.Session, "after_rollback")
+def _clear_flushed(session):
+    """Fin de transaction : plus de modifications en attente"""
+    session.info.pop("_flushed", None)
+
+
+def _start_db_thread():
+    """Démarre le thread dédié à la base (si possible)"""
+    url = config.engine.url
+    if url.get_backend_name() == "sqlite" and url.database in (
+            None, "", ":memory:"):
+        # Une base en mémoire par connexion : invisible depuis le thread
+        warnings.warn("async_db : sans effet avec une base SQLite en "
+                      "mémoire, requêtes exécutées de manière bloquante")
+        return
+
+    _db_thread["executor"] = concurrent.futures.ThreadPoolExecutor(
+        max_workers=1, thread_name_prefix="lgrez-db"
+    )
+    _db_thread["Session"] = orm.sessionmaker(bind=config.engine,
+                                             query_cls=Query)
+
+
+def _stop_db_thread():
+    """Arrête le thread dédié à la base, le cas échéant"""
+    if _db_thread:
+        _db_thread.pop("executor").shutdown(wait=False)
+        _db_thread.clear()
+
+
+# ---- Sessions par commande
+
+# Commande exécutée dans le contexte asyncio courant (hérité par les
+# tâches et callbacks créés pendant la commande)
+_command_scope = contextvars.ContextVar("lgrez_command_scope", default=None)
+
+# Commandes dont la session est ouverte
+_command_sessions = set()
+
+
+def _session_scope():
+    """Clé de la session à utiliser (``scopefunc`` de :obj:`.config.session`)
+
+    Commande en cours si sa session est ouverte, ``None`` (session
+    commune) sinon, notamment pour les tâches lancées par une commande
+    qui se poursuivent après elle.
+    """
+    ctx = _command_scope.get()
+    return ctx if ctx in _command_sessions else None
+
+
+def open_command_session(ctx):
+    """Ouvre une session propre à une commande.
+
+    Si :attr:`.config.db_session_per_command` était activé lors de la
+    connexion, :obj:`.config.session` désigne, pour la commande en
+    cours d'exécution (tâche asyncio courante), une nouvelle session
+    jusqu'à l'appel de :func:`close_command_session`. Sans effet sinon,
+    ou si une session de commande est déjà ouverte dans ce contexte
+    (commande appelée par une autre commande).
+
+    Appelée avant chaque commande par :func:`.one_command.before_invoke`.
+
+    Args:
+        ctx (discord.ext.commands.Context): contexte d'invocation de
+            la commande.
+
+    Returns:
+        :class:`bool` -- Si une session a été ouverte.
+    """
+    if (not isinstance(config.session, orm.scoped_session)
+            or _session_scope() is not None):
+        return False
+
+    _command_scope.set(ctx)
+    _command_sessions.add(ctx)
+    return True
+
+
+def close_command_session(ctx):
+    """Ferme la session ouverte par :func:`open_command_session`.
+
+    Les modifications non commitées sont annulées, et les instances
+    obtenues pendant la commande détachées. Sans effet si aucune
+    session n'a été ouverte pour cette commande.
+
+    Appelée après chaque commande par :func:`.one_command.after_invoke`.
+
+    Args:
+        ctx (discord.ext.commands.Context): contexte d'invocation de
+            la commande.
+    """
+    if ctx not in _command_sessions or _command_scope.get() is not ctx:
+        return
+
+    try:
+        config.session.remove()
+    finally:
+        _command_sessions.discard(ctx)
+
+
+# ---- Unités de travail
+
+# Fonctions à appeler après le commit de l'unité de travail en cours dans
+# le contexte asyncio courant (hérité par les tâches créées), ou None
+_unit_of_work = contextvars.ContextVar("lgrez_unit_of_work", default=None)
+
+
+@contextlib.contextmanager
+def unit_of_work():
+    """Regroupe les enregistrements en base en un seul commit.
+
+    Dans le bloc ``with``, :meth:`.TableBase.update` (et donc
+    :meth:`~.TableBase.add` / :meth:`~.TableBase.delete`) ne commit
+    pas : les modifications sont envoyées par lots (une requête
+    ``executemany`` par table et type d'opération) au prochain flush,
+    et commitées en une fois à la sortie du bloc (annulées si une
+    exception est levée). Les fonctions enregistrées par
+    :func:`on_commit` sont appelées après ce commit.
+
+    Le bloc ne doit contenir que des opérations en base, sans appels
+    à Discord (ni autres ``await``) : sauf si
+    :attr:`.config.db_session_per_command`, la session est commune à
+    toutes les commandes, et le commit ou l'annulation en fin de bloc
+    porte aussi sur les modifications en attente des commandes
+    exécutées entre-temps (qui peuvent elles-mêmes commiter celles du
+    bloc). Enregistrer les modifications puis envoyer les messages.
+    Les blocs imbriqués sont sans effet (commit à la sortie du bloc
+    le plus externe).
+
+    Les identifiants des nouvelles instances ne sont définis qu'au
+    flush (``config.session.flush()``, ou automatiquement avant toute
+    requête).
+
+    Examples::
+
+        with bdd.base.unit_of_work():
+            for joueur in joueurs:
+                for vote in bdd.Vote:
+                    bdd.Action(joueur=joueur, vote=vote).add()
+        # Un seul commit
+    """
+    if _unit_of_work.get() is not None:
+        yield                       # Bloc imbriqué
+        return
+
+    callbacks = []
+    token = _unit_of_work.set(callbacks)
+    try:
+        yield
+    except BaseException:
+        config.session.rollback()
+        raise
+    else:
+        session = config.session
+        if isinstance(session, orm.scoped_session):
+            session = session()
+        # Pas d'expiration au commit : instances lisibles sans requête
+        # par les callbacks, expirées ensuite (comme après un commit)
+        expire_on_commit = session.expire_on_commit
+        session.expire_on_commit = False
+        try:
+            session.commit()
+        finally:
+            session.expire_on_commit = expire_on_commit
+        try:
+            for callback in callbacks:
+                callback()
+        finally:
+            if expire_on_commit:
+                session.expire_all()
+    finally:
+        _unit_of_work.reset(token)
+
+
+def on_commit(callback):
+    """Appelle une fonction après le commit de l'unité de travail.
+
+    Appelle ``callback`` à la sortie du bloc :func:`unit_of_work` en
+    cours, après le commit (pas appelée en cas d'exception), ou
+    immédiatement hors unité de travail.
+
+    Args:
+        callback (Callable[[], Any]): fonction à appeler (sans
+            arguments).
+    """
+    callbacks = _unit_of_work.get()
+    if callbacks is None:
+        callback()
+    else:
+        callbacks.append(callback)
+
+
+# ---- Migrations
+
+def _column_references(col, dialect):
+    """Contraintes de clé étrangère d'une colonne, pour ADD COLUMN
+
+    (``[CONSTRAINT nom] REFERENCES table (colonne) [ON DELETE ...]``,
+    clés étrangères portant sur cette seule colonne).
+    """
+    preparer = dialect.identifier_preparer
+    ddl = dialect.ddl_compiler(dialect, None)
+    sql = ""
+    for fk in sorted(col.foreign_keys, key=lambda fk: fk.target_fullname):
+        constraint = fk.constraint
+        if len(constraint.elements) > 1:
+            warnings.warn(f"connect : clé étrangère composite sur "
+                          f"{col.table.name}.{col.name}, à ajouter "
+                          "manuellement")
+            continue
+        if constraint.name:
+            sql += f" CONSTRAINT {preparer.format_constraint(constraint)}"
+        sql += (f" REFERENCES {preparer.format_table(fk.column.table)} "
+                f"({preparer.format_column(fk.column)})"
+                f"{ddl.define_constraint_cascades(constraint)}")
+    return sql
+
+
+def _add_missing_columns():
+    """Ajoute aux tables existantes les colonnes déclarées manquantes
+
+    (colonnes ajoutées au modèle depuis la création des tables,
+    forcément facultatives, avec leurs clés étrangères). Renvoie les
+    colonnes ajoutées.
+    """
+    inspector = sqlalchemy.inspect(config.engine)
+    preparer = config.engine.dialect.identifier_preparer
+    added = []
+    with config.engine.begin() as conn:
+        for table in TableBase.metadata.sorted_tables:
+            existing = {col["name"] for col in inspector.get_columns(
+                table.name)}
+            for col in table.columns:
+                if col.name in existing:
+                    continue
+                if not col.nullable:
+                    warnings.warn(f"connect : colonne obligatoire "
+                                  f"{table.name}.{col.name} manquante, "
+                                  "à ajouter manuellement")
+                    continue
+                conn.execute(sqlalchemy.text(
+                    f"ALTER TABLE {preparer.format_table(table)} "
+                    f"ADD COLUMN {preparer.format_column(col)} "
+                    f"{col.type.compile(dialect=conn.dialect)}"
+                    f"{_column_references(col, conn.dialect)}"
+                ))
+                added.append(col)
+    return added
+
+
+def _add_missing_indexes():
+    """Crée les index déclarés absents des tables existantes
+
+    (index ajoutés au modèle depuis la création des tables, que
+    ``create_all`` ne crée pas). Renvoie les index créés.
+    """
+    inspector = sqlalchemy.inspect(config.engine)
+    created = []
+    with config.engine.begin() as conn:
+        for table in TableBase.metadata.sorted_tables:
+            existing = {index["name"] for index in inspector.get_indexes(
+                table.name)}
+            for index in sorted(table.indexes, key=lambda ix: ix.name):
+                if index.name not in existing:
+                    index.create(conn)
+                    created.append(index)
+    return created
+
+
+def migrate():
+    """Met à jour le schéma d'une base existante, sans perte de données.
+
+    Ajoute aux tables existantes les colonnes (facultatives) et les
+    index déclarés dans le modèle depuis leur création. Appelée par
+    :func:`connect` (après création des tables manquantes).
+
+    Returns:
+        :class:`list`\[:class:`str`\]: Description des opérations
+        effectuées (vide si la base était à jour).
+    """
+    operations = [f"Colonne ajoutée : {col.table.name}.{col.name}"
+                  for col in _add_missing_columns()]
+    operations.extend(f"Index créé : {index.name} ({index.table.name})"
+                      for index in _add_missing_indexes())
+    return operations
+
+
+#: Utilisation d'un index (voir :func:`index_usage`) : table, nom de
+#: l'index, colonnes, nombre de parcours de l'index et taille (en octets)
+#: (``None`` si statistiques indisponibles, *i.e.* hors PostgreSQL).
+IndexUsage = collections.namedtuple(
+    "IndexUsage", ["table", "name", "columns", "scans", "size"]
+)
+
+_PG_INDEX_STATS = """
+SELECT indexrelname AS name, idx_scan AS scans,
+       pg_relation_size(indexrelid) AS size
+FROM pg_stat_user_indexes
+"""
+
+_PG_TABLE_STATS = """
+SELECT relname, seq_scan, seq_tup_read, idx_scan, n_live_tup
+FROM pg_stat_user_tables
+"""
+
+# Nombre de lignes à partir duquel les parcours séquentiels d'une table
+# sont signalés par index_usage
+_SEQ_SCAN_MIN_ROWS = 1000
+
+
+def index_usage():
+    """Statistiques d'utilisation des index et index manquants potentiels.
+
+    Index candidats : index déclarés dans le modèle mais absents de la
+    base (voir :func:`migrate`), clés étrangères sans index (colonne en
+    tête d'aucun index), et (PostgreSQL) tables d'au moins 1000 lignes
+    plus souvent parcourues séquentiellement que par index.
+
+    Returns:
+        :class:`tuple`\[:class:`list`\[:class:`IndexUsage`\],
+        :class:`list`\[:class:`tuple`\[:class:`str`,
+        :class:`tuple`\[:class:`str`\], :class:`str`\]\]\]: Les index
+        existants et les index candidats (table, colonnes, raison).
+    """
+    inspector = sqlalchemy.inspect(config.engine)
+    index_stats = {}
+    table_stats = {}
+    if config.engine.dialect.name == "postgresql":
+        with config.engine.connect() as conn:
+            for row in conn.execute(sqlalchemy.text(_PG_INDEX_STATS)):
+                index_stats[row.name] = (row.scans, row.size)
+            for row in conn.execute(sqlalchemy.text(_PG_TABLE_STATS)):
+                table_stats[row.relname] = row
+
+    usage = []
+    candidates = []
+    for table in TableBase.metadata.sorted_tables:
+        indexes = inspector.get_indexes(table.name)
+        pk = inspector.get_pk_constraint(table.name)["constrained_columns"]
+        leading = {index["column_names"][0] for index in indexes}
+        leading.update(pk[:1])
+        for index in indexes:
+            scans, size = index_stats.get(index["name"], (None, None))
+            usage.append(IndexUsage(table.name, index["name"],
+                                    tuple(index["column_names"]),
+                                    scans, size))
+
+        names = {index["name"] for index in indexes}
+        for index in sorted(table.indexes, key=lambda ix: ix.name):
+            if index.name not in names:
+                candidates.append((table.name,
+                                   tuple(col.name for col in index.columns),
+                                   "index déclaré absent de la base"))
+        for col in table.columns:
+            if col.foreign_keys and col.name not in leading:
+                candidates.append((table.name, (col.name,),
+                                   "clé étrangère non indexée"))
+        stats = table_stats.get(table.name)
+        if (stats and stats.n_live_tup >= _SEQ_SCAN_MIN_ROWS
+                and stats.seq_scan > (stats.idx_scan or 0)):
+            candidates.append((table.name, (),
+                               f"{stats.seq_scan} parcours séquentiels "
+                               f"({stats.seq_tup_read} lignes lues)"))
+
+    return usage, candidates
+
+
 # ---- Autodoc objects
 
 def autodoc_Column(*args, doc="", comment=None, **kwargs):
@@ -363,7 +1506,8 @@ def autodoc_Column(*args, doc="", comment=None, **kwargs):
                else "")
     nullable = "" if (col.nullable or autoinc) else " (NOT NULL)"
     default = f" (défaut ``{col.default.arg!r}``)" if col.default else ""
-    col.doc = (f"{doc}{primary}{autoinc}{nullable}{default}\n\n"
+    index = " (indexée)" if col.index else ""
+    col.doc = (f"{doc}{primary}{autoinc}{nullable}{default}{index}\n\n"
                f"Type SQLAlchemy : {sa_type} / Type SQL : ``{col.type}``\n\n"
                f":type: :class:`{py_type_str}`{or_none}")
     return col
@@ -498,17 +1642,69 @@ def connect():
     """Se connecte à la base de données et prépare les objets connectés.
 
     - Utilise la variable d'environment ``LGREZ_DATABASE_URI``
-    - Crée les tables si nécessaire
-    - Prépare :obj:`.config.engine` et :obj:`.config.session`
+    - Crée les tables si nécessaire, ainsi que les colonnes
+      (facultatives) et index ajoutés depuis leur création (voir
+      :func:`migrate`)
+    - Prépare :obj:`.config.engine` (selon les paramètres
+      :attr:`.config.db_pool_size`, :attr:`~.config.db_max_overflow`,
+      :attr:`~.config.db_pool_recycle` et :attr:`~.config.db_pool_pre_ping`)
+      et :obj:`.config.session` (voir
+      :attr:`.config.db_session_per_command`)
+    - Mesure les requêtes exécutées (voir :func:`.query_stats.install`)
+    - Installe le préfiltrage SQL des recherches approchées et crée
+      les index trigrammes (si :attr:`.config.fuzzy_sql_prefilter`)
+    - Vérifie les données dénormalisées des tables
+      (voir :meth:`.TableMeta.check_consistency`)
+    - Démarre le thread dédié aux requêtes asynchrones
+      (si :attr:`.config.async_db`, voir :attr:`.TableMeta.aquery`)
     """
     LGREZ_DATABASE_URI = env.load("LGREZ_DATABASE_URI")
     # Moteur SQL : connexion avec le serveur
-    config.engine = sqlalchemy.create_engine(LGREZ_DATABASE_URI,
-                                             pool_pre_ping=True)
+    pool_args = {
+        "pool_pre_ping": config.db_pool_pre_ping,
+        "pool_recycle": config.db_pool_recycle,
+    }
+    url = sqlalchemy.engine.make_url(LGREZ_DATABASE_URI)
+    if issubclass(url.get_dialect().get_pool_class(url),
+                  sqlalchemy.pool.QueuePool):
+        # Taille paramétrable (pas avec SQLite notamment)
+        pool_args["pool_size"] = config.db_pool_size
+        pool_args["max_overflow"] = config.db_max_overflow
+    config.engine = sqlalchemy.create_engine(LGREZ_DATABASE_URI, **pool_args)
+    # Mesure des requêtes exécutées par chaque commande
+    query_stats.install(config.engine)
 
     # Création des tables si elles n'existent pas déjà
     TableBase.metadata.create_all(config.engine)
+    # Colonnes et index ajoutés au modèle depuis la création des tables
+    migrate()
+
+    # Nouvelle base : caches de recherche approchée et d'entrées obsolètes
+    for table in tables.values():
+        if isinstance(table, TableMeta):
+            table.invalidate_slug_cache()
+            table.invalidate_entity_cache()
+
+    # Préfiltrage SQL des recherches approchées si possible
+    _pg_trgm.clear()
+    if (config.fuzzy_sql_prefilter
+            and config.engine.dialect.name == "postgresql"):
+        _setup_pg_trgm()
+
+    # Ouverture de la session (commune, ou une par commande)
+    Session = sqlalchemy.orm.sessionmaker(bind=config.engine, query_cls=Query)
+    _command_sessions.clear()
+    if config.db_session_per_command:
+        config.session = orm.scoped_session(Session, scopefunc=_session_scope)
+    else:
+        config.session = Session()
+
+    # Données dénormalisées (reconstruites si besoin)
+    for table in tables.values():
+        if isinstance(table, TableMeta):
+            table.check_consistency()
 
-    # Ouverture de la session
-    Session = sqlalchemy.orm.sessionmaker(bind=config.engine)
-    config.session = Session()
+    # Thread dédié aux requêtes asynchrones
+    _stop_db_thread()
+    if config.async_db:
+        _start_db_thread()
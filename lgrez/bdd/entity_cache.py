@@ -0,0 +1,115 @@
+"""lg-rez / bdd / Cache des entrées
+
+Valeurs des entrées récemment lues par clé primaire, utilisées par
+:meth:`.bdd.base.TableMeta.get_cached`
+
+"""
+
+import collections
+import time
+
+
+#: Statistiques d'un :class:`EntityCache` : nombre de recherches
+#: servies par le cache (``hits``) / non trouvées ou expirées
+#: (``misses``), nombre maximal d'entrées (``maxsize``) et nombre
+#: d'entrées en cache (``currsize``).
+EntityCacheInfo = collections.namedtuple(
+    "EntityCacheInfo", ["hits", "misses", "maxsize", "currsize"]
+)
+
+
+class EntityCache:
+    """Valeurs des colonnes des entrées d'une table, par clé primaire.
+
+    Cache de taille bornée (les entrées les moins récemment utilisées
+    sont oubliées en premier) et de durée de vie limitée : une entrée
+    n'est plus servie ``ttl`` secondes après avoir été enregistrée
+    (:meth:`put`), même si elle a été mise à jour (:meth:`update`)
+    entre-temps.
+
+    Args:
+        maxsize (int): nombre maximal d'entrées conservées.
+        ttl (float): durée de validité (en secondes) des entrées.
+        clock (Callable[[], float]): horloge utilisée (défaut :
+            :func:`time.monotonic`).
+    """
+    def __init__(self, maxsize, ttl, clock=time.monotonic):
+        """Initializes self."""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = collections.OrderedDict()   # key -> (fin, valeurs)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Renvoie les valeurs en cache d'une entrée.
+
+        Args:
+            key: clé primaire de l'entrée.
+
+        Returns:
+            :class:`dict`\[:class:`str`, Any\] | ``None``: Valeurs des
+            colonnes (nom -> valeur), ou ``None`` si l'entrée n'est pas
+            en cache ou a expiré.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= self.clock():
+            del self._entries[key]          # Expirée
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, values):
+        """Enregistre (ou remplace) les valeurs d'une entrée.
+
+        Args:
+            key: clé primaire de l'entrée.
+            values (Mapping[str, Any]): valeurs de toutes les colonnes
+                de l'entrée (nom -> valeur).
+        """
+        self._entries[key] = (self.clock() + self.ttl, dict(values))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def update(self, key, values):
+        """Met à jour certaines valeurs d'une entrée (si en cache).
+
+        Args:
+            key: clé primaire de l'entrée.
+            values (Mapping[str, Any]): nouvelles valeurs des colonnes
+                modifiées (nom -> valeur).
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry[1].update(values)
+
+    def remove(self, key):
+        """Retire une entrée (pas d'effet si absente).
+
+        Args:
+            key: clé primaire de l'entrée.
+        """
+        self._entries.pop(key, None)
+
+    def invalidate(self):
+        """Vide le cache."""
+        self._entries.clear()
+
+    def info(self):
+        """Renvoie les statistiques d'utilisation du cache.
+
+        Returns:
+            :class:`EntityCacheInfo`
+        """
+        return EntityCacheInfo(self.hits, self.misses, self.maxsize,
+                               len(self._entries))
@@ -0,0 +1,681 @@
+"""lg-rez / bdd / Recherche approchée
+
+Index trigrammes et calcul des scores utilisés par
+:meth:`.bdd.base.TableMeta.find_nearest`
+
+"""
+
+import collections
+import difflib
+import heapq
+import itertools
+
+import numpy
+
+
+def trigrams(slug):
+    """Renvoie l'ensemble des trigrammes d'une chaîne normalisée.
+
+    La chaîne est bornée par deux espaces au début et une à la fin
+    (comme ``pg_trgm``), pour que les chaînes de moins de trois
+    caractères aient tout de même des trigrammes.
+
+    Args:
+        slug (str): chaîne (déjà normalisée : minuscules, sans accents).
+
+    Returns:
+        :class:`set`\[:class:`str`\]
+    """
+    padded = f"  {slug} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _first_word(slug):
+    """Premier mot d'une chaîne (elle-même si vide / que des espaces)"""
+    words = slug.split(maxsplit=1)
+    return words[0] if words else slug
+
+
+def _ratio(matches, length):
+    """Même calcul que :func:`difflib._calculate_ratio` (même flottant)"""
+    if length:
+        return 2.0 * matches / length
+    return 1.0
+
+
+def length_bound(la, lb):
+    """Majorant de :meth:`difflib.SequenceMatcher.ratio` selon les longueurs.
+
+    Identique à :meth:`~difflib.SequenceMatcher.real_quick_ratio`.
+
+    Args:
+        la, lb (int): longueurs des deux chaînes comparées.
+
+    Returns:
+        :class:`float`
+    """
+    return _ratio(min(la, lb), la + lb)
+
+
+def counts_bound(counts_a, la, counts_b, lb):
+    """Majorant de :meth:`difflib.SequenceMatcher.ratio` selon les caractères.
+
+    Identique à :meth:`~difflib.SequenceMatcher.quick_ratio`, mais à
+    partir de comptages de caractères précalculés.
+
+    Args:
+        counts_a, counts_b (collections.Counter): nombre d'occurrences
+            de chaque caractère dans les deux chaînes comparées.
+        la, lb (int): longueurs des deux chaînes comparées.
+
+    Returns:
+        :class:`float`
+    """
+    if len(counts_a) > len(counts_b):
+        counts_a, counts_b = counts_b, counts_a
+    matches = sum(min(n, counts_b[char])
+                  for char, n in counts_a.items() if char in counts_b)
+    return _ratio(matches, la + lb)
+
+
+# Nombre de bits à 1 de chaque octet
+_POPCOUNT = numpy.array([bin(i).count("1") for i in range(256)],
+                        dtype=numpy.uint8)
+
+
+def _codepoints(text):
+    """Points de code Unicode d'une chaîne (tableau NumPy)"""
+    return numpy.frombuffer(text.encode("utf-32-le"), dtype=numpy.uint32)
+
+
+def lcs_lengths(slug, targets):
+    """Longueurs des plus longues sous-séquences communes (LCS).
+
+    Calcul « bit-parallèle » (algorithme de Hyyrö) : les positions
+    de ``slug`` sont représentées par les bits de mots de 64 bits, et
+    chaque caractère des chaînes cibles est traité pour toutes les
+    cibles à la fois (opérations vectorisées NumPy).
+
+    Args:
+        slug (str): chaîne de référence.
+        targets (list[str]): chaînes à comparer à ``slug``.
+
+    Returns:
+        :class:`numpy.ndarray`\[:class:`int`\]: La longueur de la LCS
+        de ``slug`` et de chaque chaîne de ``targets``.
+    """
+    n, m = len(targets), len(slug)
+    if not n or not m:
+        return numpy.zeros(n, dtype=numpy.int64)
+
+    # Caractères de slug : identifiants 1, 2... (0 = absent de slug)
+    slug_codes = _codepoints(slug)
+    chars = numpy.unique(slug_codes)
+    codes = _codepoints("".join(targets))
+    pos = numpy.minimum(numpy.searchsorted(chars, codes), len(chars) - 1)
+    ids = numpy.where(chars[pos] == codes, pos + 1, 0)
+
+    # Masques de positions de chaque caractère dans slug (mots de 64 bits)
+    n_words = (m + 63) // 64
+    masks = numpy.zeros((n_words, len(chars) + 1), dtype=numpy.uint64)
+    for i, char_id in enumerate(numpy.searchsorted(chars, slug_codes) + 1):
+        masks[i // 64, char_id] |= numpy.uint64(1) << numpy.uint64(i % 64)
+
+    # Cibles triées par longueur décroissante : à l'étape j, seules les
+    # active[j] premières cibles ont encore des caractères
+    lengths = numpy.fromiter(map(len, targets), dtype=numpy.int64, count=n)
+    order = numpy.argsort(-lengths, kind="stable")
+    sorted_lengths = lengths[order]
+    max_length = int(sorted_lengths[0])
+    starts = numpy.concatenate(([0], numpy.cumsum(lengths)[:-1]))
+    rows = numpy.repeat(numpy.arange(n), sorted_lengths)
+    offsets = numpy.arange(len(codes)) - numpy.repeat(
+        numpy.concatenate(([0], numpy.cumsum(sorted_lengths)[:-1])),
+        sorted_lengths
+    )
+    chars_at = numpy.zeros((max_length, n), dtype=ids.dtype)
+    chars_at[offsets, rows] = ids[numpy.repeat(starts[order], sorted_lengths)
+                                  + offsets]
+    active = n - numpy.cumsum(numpy.bincount(sorted_lengths,
+                                             minlength=max_length))
+
+    # V : bits à 0 = positions de slug dans la LCS courante
+    V = numpy.full((n_words, n), numpy.iinfo(numpy.uint64).max,
+                   dtype=numpy.uint64)
+    one = numpy.uint64(1)
+    for j in range(max_length):
+        n_active = active[j]
+        char_ids = chars_at[j, :n_active]
+        carry = None
+        for w in range(n_words):
+            v = V[w, :n_active]
+            u = v & masks[w][char_ids]
+            total = v + u                   # Modulo 2^64
+            if carry is None:
+                next_carry = total < v
+            else:
+                with_carry = total + carry
+                next_carry = (total < v) | (with_carry < total)
+                total = with_carry
+            V[w, :n_active] = total | (v & ~u)
+            carry = next_carry.astype(numpy.uint64) & one
+
+    # LCS = nombre de bits à 0 parmi les m premiers
+    if m % 64:
+        V[-1] &= (one << numpy.uint64(m % 64)) - one
+    ones = _POPCOUNT[V.view(numpy.uint8)].reshape(n_words, n, 8)
+    lcs = m - ones.sum(axis=(0, 2), dtype=numpy.int64)
+    result = numpy.empty(n, dtype=numpy.int64)
+    result[order] = lcs
+    return result
+
+
+class Scorer:
+    """Calcul des scores de similarité entre chaînes (interface).
+
+    Les scores calculés doivent être compris entre 0 et 1, valoir
+    1 uniquement pour deux chaînes identiques, et être majorés par
+    :func:`length_bound` (utilisé par :class:`SlugIndex` pour écarter
+    d'emblée les entrées ne pouvant atteindre le score minimal).
+    """
+    def scores(self, slug, targets, sensi):
+        """Calcule les scores d'une chaîne vis-à-vis de chaînes cibles.
+
+        Args:
+            slug (str): chaîne recherchée (déjà normalisée).
+            targets (list[str]): chaînes à comparer (déjà normalisées).
+            sensi (float): score minimal recherché : les scores
+                inférieurs peuvent être approximés (par ``0``...).
+
+        Returns:
+            :class:`list`\[:class:`float`\]: Le score de ``slug``
+            vis-à-vis de chaque chaîne de ``targets``.
+        """
+        raise NotImplementedError
+
+
+class SequenceMatcherScorer(Scorer):
+    """Ratio de :class:`difflib.SequenceMatcher`, cible par cible.
+
+    Mêmes scores que le calcul par défaut de :class:`SlugIndex`
+    (sans ses optimisations) : sert de référence.
+    """
+    def scores(self, slug, targets, sensi):
+        """Calcule les scores d'une chaîne vis-à-vis de chaînes cibles.
+
+        Voir :meth:`Scorer.scores`.
+        """
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq1(slug)
+        scores = []
+        for target in targets:
+            matcher.set_seq2(target)
+            scores.append(matcher.ratio())
+        return scores
+
+
+class LCSScorer(Scorer):
+    """Similarité selon la plus longue sous-séquence commune (NumPy).
+
+    Score = ``2 * LCS / (la + lb)`` (``1`` moins la distance
+    d'insertion / suppression normalisée), calculé pour toutes les
+    cibles à la fois par :func:`lcs_lengths`.
+
+    Les blocs communs trouvés par :class:`difflib.SequenceMatcher`
+    formant une sous-séquence commune, ce score est toujours supérieur
+    ou égal au ratio de :class:`~difflib.SequenceMatcher` (il est
+    égal dans la plupart des cas, mais peut être nettement supérieur
+    pour des chaînes aux caractères communs très dispersés).
+
+    Args:
+        compat (bool): si ``True``, renvoie les scores de
+            :class:`difflib.SequenceMatcher` (les seuils ``sensi``
+            utilisés gardent exactement leur sens) : le score LCS ne
+            sert que de majorant, le ratio exact n'étant calculé que
+            pour les cibles pouvant atteindre ``sensi``.
+    """
+    def __init__(self, compat=False):
+        """Initializes self."""
+        self.compat = compat
+
+    def __repr__(self):
+        """Returns repr(self)"""
+        return f"LCSScorer(compat={self.compat})"
+
+    def scores(self, slug, targets, sensi):
+        """Calcule les scores d'une chaîne vis-à-vis de chaînes cibles.
+
+        Voir :meth:`Scorer.scores`.
+        """
+        if not targets:
+            return []
+        lengths = numpy.fromiter(map(len, targets), dtype=numpy.int64,
+                                 count=len(targets))
+        totals = len(slug) + lengths
+        lcs = lcs_lengths(slug, targets)
+        # Même calcul que _ratio (mêmes flottants)
+        scores = numpy.where(totals > 0,
+                             2.0 * lcs / numpy.maximum(totals, 1), 1.0)
+        scores = scores.tolist()
+        if not self.compat:
+            return scores
+
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq1(slug)
+        for i, bound in enumerate(scores):
+            if bound >= sensi:
+                matcher.set_seq2(targets[i])
+                scores[i] = matcher.ratio()
+            else:
+                scores[i] = 0.0         # Ne peut atteindre sensi
+        return scores
+
+
+class _Target:
+    """Chaîne indexée (entrée ou premier mot d'une entrée)"""
+    __slots__ = ("slug", "counts")
+
+    def __init__(self, slug):
+        self.slug = slug
+        self.counts = collections.Counter(slug)
+
+
+class _Entry:
+    """Entrée de l'index : clé, rang d'insertion et chaînes à comparer"""
+    __slots__ = ("key", "order", "full", "first", "trigrams")
+
+    def __init__(self, key, order, slug):
+        self.key = key
+        self.order = order
+        self.full = _Target(slug)
+        first_word = _first_word(slug)
+        self.first = (self.full if first_word == slug
+                      else _Target(first_word))
+        self.trigrams = trigrams(slug)
+
+
+class SlugIndex:
+    """Index trigrammes des valeurs normalisées d'une colonne textuelle.
+
+    Chaque entrée est identifiée par une clé quelconque (hashable) et
+    associée à sa chaîne normalisée (minuscules, sans accents).
+    L'index maintient :
+
+        - un dictionnaire des chaînes exactes (et de leur premier mot),
+          pour détecter directement les correspondances parfaites ;
+        - les entrées regroupées par longueur, pour écarter d'emblée
+          celles qui ne peuvent atteindre le score minimal ;
+        - un index inversé trigramme -> entrées, donnant un petit
+          ensemble de candidats probables évalués en priorité ;
+
+    et n'évalue le ratio exact de :class:`difflib.SequenceMatcher`
+    que pour les entrées dont le score peut atteindre le seuil
+    (majorants de :meth:`~difflib.SequenceMatcher.real_quick_ratio`
+    et :meth:`~difflib.SequenceMatcher.quick_ratio`) : les résultats
+    de :meth:`search` sont ainsi identiques à une comparaison de la
+    chaîne recherchée avec chaque entrée.
+    """
+    def __init__(self):
+        """Initializes self."""
+        self._entries = {}                                  # key -> _Entry
+        self._exact = collections.defaultdict(dict)         # slug -> entries
+        self._exact_first = collections.defaultdict(dict)   # 1st word -> ...
+        self._by_length = collections.defaultdict(dict)     # len -> entries
+        self._by_length_first = collections.defaultdict(dict)
+        self._postings = collections.defaultdict(set)       # trigram -> keys
+        self._counter = itertools.count()
+
+    def __len__(self):
+        """Returns len(self)"""
+        return len(self._entries)
+
+    def __contains__(self, key):
+        """Returns key in self"""
+        return key in self._entries
+
+    def add(self, key, slug):
+        """Ajoute (ou remplace) une entrée de l'index.
+
+        Args:
+            key: identifiant de l'entrée (hashable).
+            slug (str): valeur normalisée associée.
+        """
+        if key in self._entries:
+            self.remove(key)
+        entry = _Entry(key, next(self._counter), slug)
+        self._entries[key] = entry
+        self._exact[entry.full.slug][key] = entry
+        self._exact_first[entry.first.slug][key] = entry
+        self._by_length[len(entry.full.slug)][key] = entry
+        self._by_length_first[len(entry.first.slug)][key] = entry
+        for trigram in entry.trigrams:
+            self._postings[trigram].add(key)
+
+    def remove(self, key):
+        """Retire une entrée de l'index (pas d'effet si absente).
+
+        Args:
+            key: identifiant de l'entrée.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for mapping, subkey in (
+            (self._exact, entry.full.slug),
+            (self._exact_first, entry.first.slug),
+            (self._by_length, len(entry.full.slug)),
+            (self._by_length_first, len(entry.first.slug)),
+        ):
+            del mapping[subkey][key]
+            if not mapping[subkey]:
+                del mapping[subkey]
+        for trigram in entry.trigrams:
+            self._postings[trigram].discard(key)
+            if not self._postings[trigram]:
+                del self._postings[trigram]
+
+    def _perfect_matches(self, slug, match_first_word, keys):
+        """Entrées de score 1, dans l'ordre d'insertion"""
+        perfects = dict(self._exact.get(slug, {}))
+        if match_first_word:
+            perfects.update(self._exact_first.get(slug, {}))
+        return sorted((entry for key, entry in perfects.items()
+                       if keys is None or key in keys),
+                      key=lambda entry: entry.order)
+
+    def _in_length_window(self, by_length, la, sensi):
+        """Clés des entrées dont la longueur permet d'atteindre sensi"""
+        return {key for lb, entries in by_length.items()
+                if length_bound(la, lb) >= sensi
+                for key in entries}
+
+    def search(self, slug, sensi=0.25, solo_si_parfait=True,
+               parfaits_only=True, match_first_word=False, keys=None,
+               limit=None, scorer=None):
+        """Recherche les entrées les plus proches d'une chaîne.
+
+        Args:
+            slug (str): chaîne recherchée (déjà normalisée).
+            sensi, solo_si_parfait, parfaits_only, match_first_word,
+                limit: voir :meth:`.bdd.base.TableMeta.find_nearest`.
+            keys (set): si précisé, ne considère que les entrées dont
+                la clé appartient à cet ensemble.
+            scorer (Scorer): si précisé, calcul des scores à utiliser
+                à la place de :class:`difflib.SequenceMatcher`.
+
+        Returns:
+            :class:`list`\[\(:class:`object`, :class:`float`\)\]: Les
+            clés des entrées retenues, avec leur score, triées par
+            score décroissant puis par ordre d'insertion.
+        """
+        return self.search_many([slug], sensi=sensi,
+                                solo_si_parfait=solo_si_parfait,
+                                parfaits_only=parfaits_only,
+                                match_first_word=match_first_word,
+                                keys=keys, limit=limit, scorer=scorer)[0]
+
+    def search_many(self, slugs, sensi=0.25, solo_si_parfait=True,
+                    parfaits_only=True, match_first_word=False, keys=None,
+                    limit=None, scorer=None):
+        """Recherche les entrées les plus proches de plusieurs chaînes.
+
+        Équivalent à appeler :meth:`search` pour chaque chaîne, mais
+        en un seul passage sur les entrées candidates : chaque entrée
+        n'est préparée qu'une fois pour toutes les chaînes à lui
+        comparer (et les chaînes en double ne sont traitées qu'une
+        fois).
+
+        Si ``limit`` est précisé, seules les ``limit`` meilleures
+        entrées sont conservées (tas de taille ``limit``) : dès que
+        ``limit`` entrées ont été trouvées, celles dont les majorants
+        du score ne permettent pas de battre la moins bonne d'entre
+        elles ne sont pas évaluées. Les entrées ayant des trigrammes
+        en commun avec la chaîne recherchée sont évaluées en premier,
+        pour que ce seuil monte au plus vite.
+
+        Si ``scorer`` est précisé, chaque chaîne est comparée en un
+        appel à :meth:`Scorer.scores` à toutes les entrées dont la
+        longueur permet d'atteindre ``sensi``.
+
+        Args:
+            slugs (list[str]): chaînes recherchées (déjà normalisées).
+            sensi, solo_si_parfait, parfaits_only, match_first_word,
+                keys, limit, scorer: voir :meth:`search`.
+
+        Returns:
+            :class:`list`\[:class:`list`\[\(:class:`object`,
+            :class:`float`\)\]\]: Les résultats de :meth:`search`
+            pour chaque chaîne de ``slugs``, dans le même ordre.
+        """
+        results = {}            # slug -> [(key, score)]
+        queries = {}            # slug -> (_Target, candidats probables)
+        found = {}              # slug -> [(score, -rang, entry)] (tas)
+        windows = {}            # slug -> entrées pouvant atteindre sensi
+        todo = collections.defaultdict(list)    # key -> slugs à comparer
+        all_likely = set()
+        for slug in slugs:
+            if slug in results or slug in queries:
+                continue
+            perfects = self._perfect_matches(slug, match_first_word, keys)
+            if perfects:
+                if solo_si_parfait:
+                    # Premier élément de score 1 rencontré
+                    perfects = perfects[:1]
+                if solo_si_parfait or parfaits_only:
+                    results[slug] = [(entry.key, 1.0)
+                                     for entry in perfects[:limit]]
+                    continue
+
+            la = len(slug)
+            # Entrées pouvant atteindre sensi au vu de leur longueur
+            window = self._in_length_window(self._by_length, la, sensi)
+            if match_first_word:
+                window |= self._in_length_window(self._by_length_first,
+                                                 la, sensi)
+            if keys is not None:
+                window &= keys
+
+            # Candidats probables : au moins un trigramme en commun
+            likely = set()
+            for trigram in trigrams(slug):
+                likely.update(self._postings.get(trigram, ()))
+
+            queries[slug] = (_Target(slug), likely)
+            found[slug] = []
+            windows[slug] = window
+            all_likely |= likely & window
+            for key in window:
+                todo[key].append(slug)
+
+        def keep(slug, entry, score):
+            # Ajoute une entrée aux résultats (au tas si limit)
+            item = (score, -entry.order, entry)
+            heap = found[slug]
+            if limit is None:
+                heap.append(item)
+            elif len(heap) < limit:
+                heapq.heappush(heap, item)
+            elif heap and item[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, item)
+
+        if scorer is not None:
+            # Une chaîne contre toutes les entrées candidates à la fois
+            for slug, window in windows.items():
+                entries = [self._entries[key] for key in window]
+                scores = scorer.scores(
+                    slug, [entry.full.slug for entry in entries], sensi
+                )
+                if match_first_word:
+                    firsts = [i for i, entry in enumerate(entries)
+                              if entry.first is not entry.full]
+                    first_scores = scorer.scores(
+                        slug, [entries[i].first.slug for i in firsts], sensi
+                    )
+                    for i, score in zip(firsts, first_scores):
+                        scores[i] = max(scores[i], score)
+                for entry, score in zip(entries, scores):
+                    if score >= sensi:
+                        keep(slug, entry, score)
+            todo = {}
+
+        def full(slug):
+            # Les limit meilleures entrées ont-elles été trouvées ?
+            return limit is not None and len(found[slug]) >= limit
+
+        def can_enter(slug, bound, order):
+            # Une entrée de rang order et de score <= bound peut-elle
+            # être retenue ?
+            if bound < sensi:
+                return False
+            if not full(slug):
+                return True
+            heap = found[slug]
+            return bool(heap) and (bound, -order) > heap[0][:2]
+
+        matcher = difflib.SequenceMatcher()
+
+        def score_target(target, entry, queued, scores):
+            lb = len(target.slug)
+            seq2_set = False
+            for slug in queued:
+                query, likely = queries[slug]
+                la = len(slug)
+                if (entry.key not in likely or full(slug)) and not (
+                    can_enter(slug, length_bound(la, lb), entry.order)
+                    and can_enter(slug, counts_bound(query.counts, la,
+                                                     target.counts, lb),
+                                  entry.order)
+                ):
+                    continue        # Ne peut atteindre sensi / le tas
+                if not seq2_set:
+                    # Préparation (coûteuse) de l'entrée : une seule fois
+                    matcher.set_seq2(target.slug)
+                    seq2_set = True
+                matcher.set_seq1(slug)
+                scores[slug] = max(scores[slug], matcher.ratio())
+
+        # Candidats probables d'abord (seuil du tas plus vite élevé)
+        ordered = sorted(todo, key=lambda key: key not in all_likely)
+        for key in ordered:
+            queued = todo[key]
+            entry = self._entries[key]
+            scores = dict.fromkeys(queued, 0.0)
+            score_target(entry.full, entry, queued, scores)
+            if match_first_word and entry.first is not entry.full:
+                score_target(entry.first, entry, queued, scores)
+            for slug, score in scores.items():
+                if score >= sensi:
+                    keep(slug, entry, score)
+
+        for slug, heap in found.items():
+            # Score décroissant puis ordre d'insertion croissant
+            heap.sort(key=lambda item: item[:2], reverse=True)
+            results[slug] = [(entry.key, score) for score, _, entry in heap]
+        return [list(results[slug]) for slug in slugs]
+
+
+#: Statistiques d'un :class:`SlugCache` (voir :meth:`SlugCache.info`) :
+#: nombre de recherches servies par le cache (``hits``) ou ayant
+#: nécessité son chargement (``misses``), nombre total de valeurs
+#: normalisées (``normalized``) et nombre de valeurs en cache
+#: (``currsize``).
+CacheInfo = collections.namedtuple(
+    "CacheInfo", ["hits", "misses", "normalized", "currsize"]
+)
+
+
+class SlugCache:
+    """Valeurs normalisées d'une colonne, indexées et tenues à jour.
+
+    Le cache est chargé en une fois (:meth:`get_index`), puis maintenu
+    entrée par entrée (:meth:`update`, :meth:`remove`) : une valeur
+    n'est normalisée que lors de son chargement ou si elle a changé.
+    :meth:`invalidate` le vide complètement (il sera rechargé à la
+    prochaine recherche).
+
+    Args:
+        normalize (Callable[[str], str]): fonction de normalisation
+            des valeurs (minuscules, sans accents...).
+    """
+    def __init__(self, normalize):
+        """Initializes self."""
+        self.normalize = normalize
+        self.index = None
+        self._values = {}           # key -> valeur brute
+        self.hits = 0
+        self.misses = 0
+        self.normalized = 0
+
+    @property
+    def loaded(self):
+        """bool: Le cache est-il chargé ?"""
+        return self.index is not None
+
+    def _store(self, key, value):
+        self._values[key] = value
+        if value is None:       # Valeur non renseignée : pas recherchable
+            self.index.remove(key)
+            return
+        self.index.add(key, self.normalize(value))
+        self.normalized += 1
+
+    def get_index(self, loader):
+        """Renvoie l'index des valeurs, en le chargeant si nécessaire.
+
+        Args:
+            loader (Callable[[], Iterable[tuple[Any, str]]]): fonction
+                renvoyant toutes les paires ``(clé, valeur brute)``,
+                appelée uniquement si le cache n'est pas chargé.
+
+        Returns:
+            :class:`SlugIndex`
+        """
+        if self.index is None:
+            self.misses += 1
+            self.index = SlugIndex()
+            self._values = {}
+            for key, value in loader():
+                self._store(key, value)
+        else:
+            self.hits += 1
+        return self.index
+
+    def update(self, key, value):
+        """Met à jour une entrée (si le cache est chargé).
+
+        La valeur n'est normalisée que si elle a changé.
+
+        Args:
+            key: identifiant de l'entrée.
+            value (str): nouvelle valeur brute.
+        """
+        if self.index is None:
+            return
+        if key in self._values and self._values[key] == value:
+            return
+        self._store(key, value)
+
+    def remove(self, key):
+        """Retire une entrée (pas d'effet si absente).
+
+        Args:
+            key: identifiant de l'entrée.
+        """
+        if self.index is None:
+            return
+        self._values.pop(key, None)
+        self.index.remove(key)
+
+    def invalidate(self):
+        """Vide le cache (sera rechargé à la prochaine recherche)."""
+        self.index = None
+        self._values = {}
+
+    def info(self):
+        """Renvoie les statistiques d'utilisation du cache.
+
+        Returns:
+            :class:`CacheInfo`
+        """
+        return CacheInfo(self.hits, self.misses, self.normalized,
+                         len(self._values))
@@ -31,19 +31,21 @@ class Action(base.TableBase):
         doc="Identifiant unique de l'action, sans signification")
 
     _joueur_id = sqlalchemy.Column(sqlalchemy.ForeignKey("joueurs.discord_id"),
-        nullable=False)
+        nullable=False, index=True)
     joueur = autodoc_ManyToOne("Joueur", back_populates="actions",
         doc="Joueur concerné")
 
-    _base_slug = sqlalchemy.Column(sqlalchemy.ForeignKey("baseactions.slug"))
+    _base_slug = sqlalchemy.Column(sqlalchemy.ForeignKey("baseactions.slug"),
+        index=True)
     base = autodoc_ManyToOne("BaseAction", back_populates="actions",
         nullable=True,
         doc="Action de base (``None`` si action de vote)")
 
-    vote = autodoc_Column(sqlalchemy.Enum(Vote),
+    vote = autodoc_Column(sqlalchemy.Enum(Vote), index=True,
         doc="Si action de vote, vote concerné")
 
     active = autodoc_Column(sqlalchemy.Boolean(), nullable=False, default=True,
+        index=True,
         doc="Si l'action est actuellement utilisable (False = archives)")
 
     cooldown = autodoc_Column(sqlalchemy.Integer(), nullable=False, default=0,
@@ -56,9 +58,22 @@ class Action(base.TableBase):
         doc="Tâches liées à cette action")
 
     utilisations = autodoc_DynamicOneToMany("Utilisation",
-        back_populates="action",
+        back_populates="action", foreign_keys="Utilisation._action_id",
         doc="Utilisations de cette action")
 
+    # Dernière utilisation (la plus récemment ouverte), maintenue par
+    # Utilisation.open / vérifiée par Action.check_consistency
+    _derniere_utilisation_id = sqlalchemy.Column(sqlalchemy.ForeignKey(
+        "utilisations.id", use_alter=True, ondelete="SET NULL",
+        name="fk_actions_derniere_utilisation"))
+    _derniere_utilisation = sqlalchemy.orm.relationship("Utilisation",
+        foreign_keys=_derniere_utilisation_id, post_update=True)
+
+    # Profils de chargement (voir :meth:`.bdd.base.Query.with_profile`)
+    _load_profiles = {
+        "actions": ["joueur", "base", "_derniere_utilisation"],
+    }
+
     def __init__(self, *args, **kwargs):
         """Initialize self."""
         n_args = (("base" in kwargs) + ("_base_slug" in kwargs)
@@ -80,54 +95,46 @@ class Action(base.TableBase):
         """:class:`~bdd.Utilisation` | ``None``: Utilisation de l'action
         actuellement ouverte.
 
-        Vaut ``None`` si aucune action n'a actuellement l'état
+        Vaut ``None`` si la :attr:`dernière utilisation
+        <.derniere_utilisation>` de l'action n'a pas l'état
         :attr:`~bdd.UtilEtat.ouverte` ou :attr:`~bdd.UtilEtat.remplie`.
 
-        Raises:
-            RuntimeError: plus d'une action a actuellement l'état
-            :attr:`~bdd.UtilEtat.ouverte` ou :attr:`~bdd.UtilEtat.remplie`.
+        N'émet pas de requête si la dernière utilisation est déjà
+        chargée (profil de chargement ``"actions"``, voir
+        :meth:`.bdd.base.Query.with_profile`).
         """
-        filtre = Utilisation.etat.in_({UtilEtat.ouverte, UtilEtat.remplie})
-        try:
-            return self.utilisations.filter(filtre).one_or_none()
-        except sqlalchemy.orm.exc.MultipleResultsFound:
-            raise ValueError(
-                f"Plusieurs utilisations ouvertes pour `{self}` !"
-            )
+        derniere = self.derniere_utilisation
+        if derniere is not None and derniere.is_open:
+            return derniere
+        return None
 
     @property
     def derniere_utilisation(self):
         """:class:`~bdd.Utilisation` | ``None``:: Dernière utilisation de
         cette action (temporellement).
 
-        Considère l'utilisation ouverte le cas échéant, sinon la
-        dernière utilisation par timestamp de fermeture descendant
-        (quelque soit son état, y comprs :attr:`~.bdd.UtilEtat.contree`).
+        Utilisation la plus récemment ouverte (quelque soit son état,
+        y comprs :attr:`~.bdd.UtilEtat.contree`) : l'utilisation ouverte
+        le cas échéant, sinon la dernière utilisation clôturée.
 
-        Vaut ``None`` si l'action n'a jamais été utilisée.
+        Référence maintenue à la création des utilisations et par
+        :meth:`.Utilisation.open` (et reconstruite si besoin par
+        :meth:`.check_consistency`).
 
-        Raises:
-            RuntimeError: plus d'une action a actuellement l'état
-            :attr:`~bdd.UtilEtat.ouverte` ou :attr:`~bdd.UtilEtat.remplie`.
+        Vaut ``None`` si l'action n'a jamais été utilisée.
         """
-        return (
-            self.utilisation_ouverte
-            or self.utilisations.order_by(Utilisation.ts_close.desc()).first()
-        )
+        return self._derniere_utilisation
 
     @property
     def decision(self):
         """str: Description de la décision de la dernière utilisation.
 
-        Considère l'utilisation ouverte le cas échéant, sinon la
-        dernière utilisation par timestamp de fermeture descendant.
+        Considère la :attr:`.derniere_utilisation` : l'utilisation
+        ouverte le cas échéant, sinon la dernière utilisation ouverte
+        (identifiant le plus élevé).
 
         Vaut :attr:`.Utilisation.decision`, ou ``"<N/A>"`` si il n'y a
         aucune utilisation de cette action.
-
-        Raises:
-            RuntimeError: plus d'une action a actuellement l'état
-            :attr:`~bdd.UtilEtat.ouverte` ou :attr:`~bdd.UtilEtat.remplie`.
         """
         util = self.derniere_utilisation
         if util:
@@ -141,8 +148,10 @@ class Action(base.TableBase):
         / :class:`sqlalchemy.sql.selectable.Exists` (classe):
         L'action est ouverte (l'utilisateur peut interagir) ?
 
-        *I.e.* l'action a au moins une utilisation
-        :attr:`~.bdd.UtilEtat.ouverte` ou :attr:`~.bdd.UtilEtat.remplie`.
+        *I.e.* la :attr:`.derniere_utilisation` de l'action est
+        :attr:`~.bdd.UtilEtat.ouverte` ou :attr:`~.bdd.UtilEtat.remplie`
+        (les utilisations sont ouvertes une à une, voir
+        :meth:`.check_consistency`).
 
         Propriété hybride (:class:`sqlalchemy.ext.hybrid.hybrid_property`) :
 
@@ -154,12 +163,15 @@ class Action(base.TableBase):
 
             action.is_open          # bool
             Joueur.query.filter(Joueur.actions.any(Action.is_open)).all()
+
+        Sur l'instance, pas de requête si la dernière utilisation est
+        déjà chargée (voir :attr:`.utilisation_ouverte`).
         """
-        return bool(self.utilisations.filter(Utilisation.is_open).all())
+        return self.utilisation_ouverte is not None
 
     @is_open.expression
     def is_open(cls):
-        return cls.utilisations.any(Utilisation.is_open)
+        return cls._derniere_utilisation.has(Utilisation.is_open)
 
     @hybrid_property
     def is_waiting(self):
@@ -167,16 +179,55 @@ class Action(base.TableBase):
         / :class:`sqlalchemy.sql.selectable.Exists` (classe):
         L'action est ouverte et aucune décision n'a été prise ?
 
-        *I.e.* la clause a au moins une utilisation
+        *I.e.* la :attr:`.derniere_utilisation` de l'action est
         :attr:`~.bdd.UtilEtat.ouverte`.
 
         Propriété hybride (voir :attr:`.is_open` pour plus d'infos)
         """
-        return bool(self.utilisations.filter(Utilisation.is_waiting).all())
+        derniere = self.derniere_utilisation
+        return derniere is not None and derniere.is_waiting
 
     @is_waiting.expression
     def is_waiting(cls):
-        return cls.utilisations.any(Utilisation.is_waiting)
+        return cls._derniere_utilisation.has(Utilisation.is_waiting)
+
+    @classmethod
+    def check_consistency(cls, fix=True):
+        """Vérifie les références aux dernières utilisations des actions.
+
+        Compare :attr:`.derniere_utilisation` de chaque action à sa
+        dernière utilisation enregistrée (identifiant le plus élevé),
+        en une seule requête ; appelé à la connexion à la base
+        (:func:`.bdd.connect`).
+
+        Args:
+            fix (bool): si ``True`` (défaut), reconstruit (et commit)
+                les références incohérentes.
+
+        Returns:
+            :class:`list`\[:class:`.bdd.Action`\]: Les actions dont la
+            référence était incohérente.
+        """
+        dernieres = (
+            sqlalchemy.select(Utilisation._action_id,
+                              sqlalchemy.func.max(Utilisation.id).label("id"))
+            .group_by(Utilisation._action_id).subquery()
+        )
+        incoherentes = (
+            config.session.query(cls, dernieres.c.id)
+            .outerjoin(dernieres, dernieres.c._action_id == cls.id)
+            .filter(cls._derniere_utilisation_id.is_distinct_from(
+                dernieres.c.id))
+            .all()
+        )
+        if fix and incoherentes:
+            for action, util_id in incoherentes:
+                action._derniere_utilisation = (
+                    Utilisation.query.get(util_id) if util_id else None
+                )
+            config.session.commit()
+
+        return [action for action, _ in incoherentes]
 
 
 class Utilisation(base.TableBase):
@@ -186,29 +237,41 @@ class Utilisation(base.TableBase):
     <.open_close.OpenClose.OpenClose.open.callback>` ;
     elles n'ont pas vocation à être supprimées.
     """
+    # Utilisations d'une action dans un état donné (Action.is_open...)
+    __table_args__ = (
+        sqlalchemy.Index("ix_utilisations_action_etat", "_action_id", "etat"),
+    )
+
     id = autodoc_Column(sqlalchemy.BigInteger(), primary_key=True,
         doc="Identifiant unique de l'utilisation, sans signification")
 
     _action_id = sqlalchemy.Column(sqlalchemy.ForeignKey("actions.id"),
         nullable=False)
     action = autodoc_ManyToOne("Action", back_populates="utilisations",
+        foreign_keys=_action_id,
         doc="Action utilisée")
 
     etat = autodoc_Column(sqlalchemy.Enum(UtilEtat), nullable=False,
-        default=UtilEtat.ouverte,
+        default=UtilEtat.ouverte, index=True,
         doc="État de l'utilisation")
 
     ts_open = autodoc_Column(sqlalchemy.DateTime(),
         doc="Timestamp d'ouverture de l'utilisation")
     ts_close = autodoc_Column(sqlalchemy.DateTime(),
         doc="Timestamp de fermeture de l'utilisation")
-    ts_decision = autodoc_Column(sqlalchemy.DateTime(),
+    ts_decision = autodoc_Column(sqlalchemy.DateTime(), index=True,
         doc="Timestamp du dernier remplissage de l'utilisation")
 
     # One-to-manys
     ciblages = autodoc_OneToMany("Ciblage", back_populates="utilisation",
         doc="Cibles désignées dans cette utilisation")
 
+    def __init__(self, *args, **kwargs):
+        """Initialize self."""
+        # État dès la création (et pas au flush), pour Action.is_open
+        kwargs.setdefault("etat", UtilEtat.ouverte)
+        super().__init__(*args, **kwargs)
+
     def __repr__(self):
         """Return repr(self)."""
         return f"<Utilisation #{self.id} ({self.action}/{self.etat})>"
@@ -217,17 +280,20 @@ class Utilisation(base.TableBase):
         """Ouvre cette utilisation.
 
         Modifie son :attr:`etat`, définit :attr:`ts_open` au temps
-        actuel, et update.
+        actuel, en fait la :attr:`~.Action.derniere_utilisation` de
+        son action, et update.
         """
         self.etat = UtilEtat.ouverte
         self.ts_open = datetime.datetime.now()
+        self.action._derniere_utilisation = self
         self.update()
 
     def close(self):
         """Clôture cette utilisation.
 
         Modifie son :attr:`etat`, définit :attr:`ts_close` au temps
-        actuel, et update.
+        actuel, et update. Elle reste la
+        :attr:`~.Action.derniere_utilisation` de son action.
         """
         if self.etat == UtilEtat.remplie:
             self.etat = UtilEtat.validee
@@ -368,6 +434,18 @@ class Utilisation(base.TableBase):
                              UtilEtat.contree})
 
 
+@sqlalchemy.event.listens_for(Utilisation.action, "set")
+def _update_derniere_utilisation(util, action, old_action, initiator):
+    """Nouvelle utilisation : dernière utilisation de son action"""
+    if not isinstance(action, Action):
+        return
+    derniere = sqlalchemy.inspect(action).dict.get("_derniere_utilisation")
+    if (derniere is not None and util.id is not None
+            and derniere.id is not None and util.id < derniere.id):
+        return                  # Utilisation plus ancienne
+    action._derniere_utilisation = util
+
+
 class Ciblage(base.TableBase):
     """Table de données des cibles désignées dans les utilisations d'actions.
 
@@ -486,6 +564,7 @@ class Tache(base.TableBase):
     id = autodoc_Column(sqlalchemy.Integer(), primary_key=True,
         doc="Identifiant unique de la tâche, sans signification")
     timestamp = autodoc_Column(sqlalchemy.DateTime(), nullable=False,
+        index=True,
         doc="Moment où exécuter la tâche")
     commande = autodoc_Column(sqlalchemy.String(2000), nullable=False,
         doc="Texte à envoyer via le webhook (généralement une commande)")
@@ -597,8 +676,9 @@ class Tache(base.TableBase):
         """Enregistre la tâche sur le bot et en base.
 
         Globalement équivalent à un appel à :meth:`.register` (pour
-        chaque élément le cas échéant) avant l'ajout en base habituel
-        (:meth:`TableBase.add <.bdd.base.TableBase.add>`).
+        chaque élément le cas échéant) après l'ajout en base habituel
+        (:meth:`TableBase.add <.bdd.base.TableBase.add>`) ; dans un bloc
+        :func:`.bdd.base.unit_of_work`, après le commit à la fin du bloc.
 
         Args:
             \*other: autres instances à ajouter dans le même commit,
@@ -606,9 +686,12 @@ class Tache(base.TableBase):
         """
         super().add(*other)             # Enregistre tout en base
 
-        self.register()                 # Enregistre sur le bot
-        for item in other:              # Les autres aussi
-            item.register()
+        def register_all():
+            self.register()             # Enregistre sur le bot
+            for item in other:          # Les autres aussi
+                item.register()
+
+        base.on_commit(register_all)    # Après le commit (identifiants)
 
 
     def delete(self, *other):
@@ -616,14 +699,41 @@ class Tache(base.TableBase):
 
         Globalement équivalent à un appel à :meth:`.cancel` (pour
         chaque élément le cas échéant) avant la suppression en base
-        habituelle (:meth:`TableBase.add <.bdd.base.TableBase.add>`).
+        habituelle (:meth:`TableBase.delete <.bdd.base.TableBase.delete>`) ;
+        dans un bloc :func:`.bdd.base.unit_of_work`, après le commit à
+        la fin du bloc (tâches toujours programmées si annulé).
 
         Args:
             \*other: autres instances à supprimer dans le même commit,
                 éventuellement.
         """
-        self.cancel()                   # Annule la tâche
-        for item in other:              # Les autres aussi
-            item.cancel()
+        def cancel_all():
+            self.cancel()               # Annule la tâche
+            for item in other:          # Les autres aussi
+                item.cancel()
 
+        base.on_commit(cancel_all)      # Après le commit (annulable)
         super().delete(*other)          # Supprime tout en base
+
+
+class EcritureGSheet(base.TableBase):
+    """Table de données des lignes en attente d'ajout à un GSheet.
+
+    Les instances sont enregistrées via :func:`.gsheets.append_later`
+    et supprimées une fois la ligne ajoutée à la feuille
+    (:func:`.gsheets.flush_appends`).
+    """
+    id = autodoc_Column(sqlalchemy.Integer(), primary_key=True,
+        doc="Identifiant unique de l'écriture (ordre de mise en attente)")
+    timestamp = autodoc_Column(sqlalchemy.DateTime(), nullable=False,
+        doc="Moment de la mise en attente")
+    classeur = autodoc_Column(sqlalchemy.String(100), nullable=False,
+        doc="ID du classeur GSheets concerné")
+    feuille = autodoc_Column(sqlalchemy.String(200), nullable=False,
+        doc="Nom de la feuille concernée")
+    valeurs = autodoc_Column(sqlalchemy.JSON(), nullable=False,
+        doc="Valeurs de la ligne à ajouter (liste)")
+
+    def __repr__(self):
+        """Return repr(self)."""
+        return f"<EcritureGSheet #{self.id} ({self.feuille})>"
@@ -48,6 +48,7 @@ class Trigger(base.TableBase):
     id = autodoc_Column(sqlalchemy.Integer(), primary_key=True,
         doc="Identifiant unique du déclencheur, sans signification")
     trigger = autodoc_Column(sqlalchemy.String(500), nullable=False,
+        info={"fuzzy_index": True},
         doc="Mots-clés / expressions")
 
     _reac_id = sqlalchemy.Column(sqlalchemy.ForeignKey("reactions.id"),
@@ -41,6 +41,7 @@ class Role(base.TableBase):
     prefixe = autodoc_Column(sqlalchemy.String(8), nullable=False, default="",
         doc="Article du nom du rôle (``\"Le \"``, ``\"La \"``, ``\"L'\"``...)")
     nom = autodoc_Column(sqlalchemy.String(32), nullable=False,
+        info={"fuzzy_index": True},
         doc="Nom (avec casse et accents) du rôle")
 
     _camp_slug = sqlalchemy.Column(sqlalchemy.ForeignKey("camps.slug"),
@@ -112,7 +113,7 @@ class Role(base.TableBase):
                 (:obj:`.config.session` vaut ``None``)
         """
         slug = config.default_role_slug
-        role = cls.query.get(slug)
+        role = cls.get_cached(slug)
         if not role:
             raise ValueError(
                 "Rôle par défaut (de slug "
@@ -134,6 +135,7 @@ class Camp(base.TableBase):
         doc="Identifiant unique du camp")
 
     nom = autodoc_Column(sqlalchemy.String(32), nullable=False,
+        info={"fuzzy_index": True},
         doc="Nom (affiché) du camp")
     description = autodoc_Column(sqlalchemy.String(1000), nullable=False,
         default="",
@@ -222,7 +224,7 @@ class Camp(base.TableBase):
                 (:obj:`.config.session` vaut ``None``)
         """
         slug = config.default_camp_slug
-        camp = cls.query.get(slug)
+        camp = cls.get_cached(slug)
         if not camp:
             raise ValueError(
                 "Camp par défaut (de slug "
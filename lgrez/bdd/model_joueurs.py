@@ -32,11 +32,12 @@ class Joueur(base.TableBase):
             "que ce champ n'est pas synchnisé avec le Tableau de bord)*")
 
     nom = autodoc_Column(sqlalchemy.String(32), nullable=False,
+        info={"fuzzy_index": True},
         doc="Nom du joueur (demandé à l'inscription)")
     chambre = autodoc_Column(sqlalchemy.String(200),
         doc="Emplacement du joueur (demandé à l'inscription)")
     statut = autodoc_Column(sqlalchemy.Enum(Statut), nullable=False,
-        default=Statut.vivant, doc="Statut RP")
+        default=Statut.vivant, index=True, doc="Statut RP")
 
     _role_slug = sqlalchemy.Column(sqlalchemy.ForeignKey("roles.slug"),
         nullable=False, default=lambda: config.default_role_slug)
@@ -65,6 +66,11 @@ class Joueur(base.TableBase):
     ciblages = autodoc_DynamicOneToMany("Ciblage", back_populates="joueur",
         doc="Ciblages prenant ce joueur pour cible")
 
+    # Profils de chargement (voir :meth:`.bdd.base.Query.with_profile`)
+    _load_profiles = {
+        "actions": ["actions.base", "actions._derniere_utilisation"],
+    }
+
     def __repr__(self):
         """Return repr(self)."""
         return f"<Joueur #{self.discord_id} ({self.nom})>"
@@ -148,11 +154,14 @@ class Joueur(base.TableBase):
         return (self.statut == Statut.mort)
 
     @classmethod
-    def from_member(cls, member):
+    def from_member(cls, member, profile=None):
         """Récupère le Joueur (instance de BDD) lié à un membre Discord.
 
         Args:
             member (discord.Member): le membre concerné
+            profile (str): si précisé, profil de chargement des relations
+                du joueur (voir :meth:`.bdd.base.Query.with_profile`),
+                *e.g.* ``"actions"`` pour parcourir ses actions.
 
         Returns:
             Joueur: Le joueur correspondant.
@@ -161,8 +170,39 @@ class Joueur(base.TableBase):
             ValueError: membre introuvable en base
             ~ready_check.NotReadyError: session non initialisée
                 (:obj:`.config.session` vaut ``None``)
+
+        Sauf si ``profile`` est précisé, le joueur est cherché dans le
+        cache des entrées (voir :meth:`.bdd.base.TableMeta.get_cached`)
+        avant d'interroger la base.
+        """
+        if profile:
+            joueur = cls.query.with_profile(profile).filter(
+                cls.discord_id == member.id).one_or_none()
+            cls._to_entity_cache(joueur)
+        else:
+            joueur = cls.get_cached(member.id)
+        if not joueur:
+            raise ValueError("Joueur.from_member : "
+                             f"pas de joueur en base pour `{member}` !")
+
+        return joueur
+
+    @classmethod
+    async def from_member_async(cls, member, profile=None):
+        """Coroutine : :meth:`from_member` sans bloquer la boucle asyncio.
+
+        Voir :attr:`.bdd.base.TableMeta.aquery` (même comportement,
+        cache compris, et exceptions que :meth:`from_member`).
         """
-        joueur = cls.query.get(member.id)
+        if profile:
+            joueur = await cls.aquery.with_profile(profile).filter(
+                cls.discord_id == member.id).one_or_none()
+            cls._to_entity_cache(joueur)
+        else:
+            joueur = cls._from_entity_cache(member.id)
+            if joueur is None:
+                joueur = await cls.aquery.get(member.id)
+                cls._to_entity_cache(joueur)
         if not joueur:
             raise ValueError("Joueur.from_member : "
                              f"pas de joueur en base pour `{member}` !")
@@ -209,6 +249,7 @@ class CandidHaro(base.TableBase):
         doc="Joueur concerné (candidat ou haroté)")
 
     type = autodoc_Column(sqlalchemy.Enum(CandidHaroType), nullable=False,
+        index=True,
         doc="Haro ou candidature ?")
 
     def __repr__(self):
@@ -0,0 +1,357 @@
+"""lg-rez / bdd / Statistiques des requêtes SQL
+
+Nombre, durée et forme des requêtes exécutées par chaque commande,
+mesurés par les évènements du moteur SQL (voir :func:`install`)
+
+"""
+
+import collections
+import contextvars
+import heapq
+import re
+import time
+
+import sqlalchemy
+
+from lgrez import config
+
+
+#: Nombre d'exécutions de commandes conservées en détail
+#: (:data:`recent`).
+HISTORY_SIZE = 50
+
+#: Longueur maximale des formes de requêtes conservées.
+SHAPE_MAX_LENGTH = 300
+
+
+# Commande en cours dans le contexte asyncio courant
+_current = contextvars.ContextVar("lgrez_query_stats", default=None)
+
+# Contexte d'invocation -> jeton de restauration de _current
+_tokens = {}
+
+#: collections.deque[CommandStats]: Dernières exécutions de commandes
+#: terminées (de la plus ancienne à la plus récente).
+recent = collections.deque(maxlen=HISTORY_SIZE)
+
+# Nom de commande (None : hors commande) -> CommandTotals, depuis le
+# démarrage / dernière remise à zéro (_totals) ou le dernier résumé
+# périodique (_period)
+_totals = {}
+_period = {}
+
+
+# Formes des requêtes : valeurs littérales et paramètres remplacés
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PARAMS = re.compile(r"%\(\w+\)s|%s|(?<!:):\w+|\$\d+")
+_PARAM_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def shape(statement):
+    """Renvoie la forme d'une requête SQL.
+
+    Les valeurs littérales et les paramètres (quel que soit leur
+    format) sont remplacés par ``?``, les listes de paramètres
+    (``IN (?, ?, ?)``) réduites à ``(?)`` et les espaces normalisés :
+    deux requêtes ne différant que par leurs valeurs ont la même
+    forme.
+
+    Args:
+        statement (str): requête SQL.
+
+    Returns:
+        :class:`str`
+    """
+    statement = _LITERALS.sub("?", statement)
+    statement = _PARAMS.sub("?", statement)
+    statement = _PARAM_LISTS.sub("(?)", statement)
+    statement = _SPACES.sub(" ", statement).strip()
+    return statement[:SHAPE_MAX_LENGTH]
+
+
+class CommandStats:
+    """Requêtes exécutées au cours d'une exécution de commande.
+
+    Args:
+        name (str): nom de la commande.
+
+    Attributes:
+        name (str): nom de la commande.
+        started (float): moment du début de la commande
+            (:func:`time.time`).
+        queries (int): nombre de requêtes exécutées.
+        duration (float): durée totale (en secondes) des requêtes.
+        slowest (list[tuple[float, str]]): requêtes les plus lentes
+            (durée, forme), de la plus lente à la plus rapide
+            (au plus :attr:`.config.sql_stats_slowest`).
+        shapes (collections.Counter): nombre d'exécutions de chaque
+            forme de requête (voir :func:`shape`).
+    """
+    def __init__(self, name):
+        """Initializes self."""
+        self.name = name
+        self.started = time.time()
+        self.queries = 0
+        self.duration = 0.0
+        self.slowest = []
+        self.shapes = collections.Counter()
+
+    def __repr__(self):
+        return (f"<CommandStats '{self.name}': {self.queries} requêtes, "
+                f"{self.duration:.3f} s>")
+
+    def record(self, statement, duration):
+        """Enregistre une requête exécutée.
+
+        Args:
+            statement (str): requête SQL.
+            duration (float): durée d'exécution (en secondes).
+        """
+        form = shape(statement)
+        self.queries += 1
+        self.duration += duration
+        self.shapes[form] += 1
+        self.slowest = heapq.nlargest(config.sql_stats_slowest,
+                                      self.slowest + [(duration, form)])
+
+    def n_plus_one(self):
+        """Renvoie les formes de requêtes anormalement répétées.
+
+        Une forme est signalée si elle a été exécutée au moins
+        :attr:`.config.sql_stats_n_plus_one` fois au cours de la
+        commande (typiquement, une requête par élément d'une liste
+        obtenue par une requête précédente : problème « N+1 »).
+
+        Returns:
+            list[tuple[str, int]]: Formes signalées et nombre
+            d'exécutions, de la plus à la moins répétée.
+        """
+        return [(form, count) for form, count in self.shapes.most_common()
+                if count >= config.sql_stats_n_plus_one]
+
+
+class CommandTotals:
+    """Cumul des requêtes exécutées par une commande.
+
+    Attributes:
+        invocations (int): nombre d'exécutions de la commande.
+        queries (int): nombre total de requêtes exécutées.
+        duration (float): durée totale (en secondes) des requêtes.
+        max_queries (int): nombre maximal de requêtes exécutées au
+            cours d'une seule exécution.
+        n_plus_one (int): nombre d'exécutions avec au moins une forme
+            de requête signalée (voir :meth:`CommandStats.n_plus_one`).
+    """
+    def __init__(self):
+        """Initializes self."""
+        self.invocations = 0
+        self.queries = 0
+        self.duration = 0.0
+        self.max_queries = 0
+        self.n_plus_one = 0
+
+    def add(self, stats):
+        """Ajoute une exécution de la commande.
+
+        Args:
+            stats (.CommandStats): requêtes exécutées par la commande.
+        """
+        self.invocations += 1
+        self.queries += stats.queries
+        self.duration += stats.duration
+        self.max_queries = max(self.max_queries, stats.queries)
+        if stats.n_plus_one():
+            self.n_plus_one += 1
+
+
+def _add_query(name, duration):
+    """Ajoute une requête aux cumuls, hors exécution de commande"""
+    for totals in (_totals, _period):
+        command = totals.setdefault(name, CommandTotals())
+        command.queries += 1
+        command.duration += duration
+
+
+def start(ctx):
+    """Commence à mesurer les requêtes d'une commande.
+
+    Les requêtes exécutées dans le contexte asyncio courant (et par
+    les tâches créées depuis) sont attribuées à la commande jusqu'à
+    l'appel de :func:`finish`. Si une commande est appelée par une
+    autre, ses requêtes ne sont attribuées qu'à elle-même.
+
+    Appelée avant chaque commande par :func:`.one_command.before_invoke`.
+
+    Args:
+        ctx (discord.ext.commands.Context): contexte d'invocation de
+            la commande.
+    """
+    stats = CommandStats(ctx.command.qualified_name)
+    _tokens[ctx] = _current.set(stats)
+
+
+def finish(ctx):
+    """Termine la mesure des requêtes d'une commande.
+
+    Ajoute l'exécution aux cumuls par commande (voir :func:`totals`)
+    et aux exécutions récentes (:data:`recent`).
+
+    Appelée après chaque commande par :func:`.one_command.after_invoke`.
+
+    Args:
+        ctx (discord.ext.commands.Context): contexte d'invocation de
+            la commande.
+
+    Returns:
+        :class:`.CommandStats` | ``None``: Requêtes exécutées par la
+        commande (``None`` si :func:`start` n'a pas été appelée pour
+        cette commande dans ce contexte).
+    """
+    token = _tokens.pop(ctx, None)
+    if token is None:
+        return None
+    stats = _current.get()
+    try:
+        _current.reset(token)
+    except ValueError:          # Jeton créé dans un autre contexte
+        return None
+
+    for totals in (_totals, _period):
+        totals.setdefault(stats.name, CommandTotals()).add(stats)
+    recent.append(stats)
+    return stats
+
+
+def totals():
+    """Renvoie les cumuls par commande depuis le démarrage.
+
+    Remis à zéro par :func:`reset`.
+
+    Returns:
+        dict[str | None, .CommandTotals]: Cumuls par nom de commande
+        (``None`` : requêtes exécutées hors commande).
+    """
+    return dict(_totals)
+
+
+def take_period():
+    """Renvoie les cumuls par commande depuis le dernier appel.
+
+    Utilisée pour le résumé périodique (:meth:`.LGBot.log_sql_stats`).
+
+    Returns:
+        dict[str | None, .CommandTotals]: Cumuls par nom de commande
+        (``None`` : requêtes exécutées hors commande), vide si aucune
+        requête depuis le dernier appel.
+    """
+    period = dict(_period)
+    _period.clear()
+    return period
+
+
+def reset():
+    """Remet à zéro les cumuls et les exécutions récentes."""
+    _totals.clear()
+    _period.clear()
+    recent.clear()
+
+
+def format_totals(totals):
+    """Met en forme des cumuls par commande.
+
+    Args:
+        totals (dict[str | None, .CommandTotals]): cumuls, tels que
+            renvoyés par :func:`totals` ou :func:`take_period`.
+
+    Returns:
+        :class:`str` -- Une ligne par commande, de celle dont les
+        requêtes ont pris le plus de temps à celle en ayant pris le
+        moins.
+    """
+    lines = []
+    for name, command in sorted(totals.items(),
+                                key=lambda item: -item[1].duration):
+        if name is None:
+            line = f"(hors commande) : {command.queries} requêtes"
+        else:
+            line = (f"!{name} : {command.invocations} exécutions, "
+                    f"{command.queries} requêtes "
+                    f"(max. {command.max_queries})")
+        line += f", {command.duration * 1000:.0f} ms"
+        if command.n_plus_one:
+            line += f", {command.n_plus_one} N+1 suspects"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def format_stats(stats):
+    """Met en forme les requêtes d'une exécution de commande.
+
+    Args:
+        stats (.CommandStats): requêtes exécutées par la commande.
+
+    Returns:
+        :class:`str`
+    """
+    started = time.strftime("%d/%m %H:%M:%S", time.localtime(stats.started))
+    r = (f"!{stats.name} ({started}) : {stats.queries} requêtes, "
+         f"{stats.duration * 1000:.0f} ms\n")
+    for duration, form in stats.slowest:
+        r += f"   - {duration * 1000:.1f} ms : {form}\n"
+    for form, count in stats.n_plus_one():
+        r += f"   N+1 suspect ({count} fois) : {form}\n"
+    return r
+
+
+# ---- Évènements du moteur SQL
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    """Début d'une requête : enregistre le moment"""
+    conn.info.setdefault("lgrez_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    """Fin d'une requête : ajoute sa durée à la commande en cours"""
+    starts = conn.info.get("lgrez_query_start")
+    if not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    stats = _current.get()
+    if stats is None:
+        _add_query(None, duration)
+    else:
+        stats.record(statement, duration)
+
+
+def _handle_error(exception_context):
+    """Requête en erreur : oublie son moment de début"""
+    conn = exception_context.connection
+    starts = conn.info.get("lgrez_query_start") if conn else None
+    if starts:
+        starts.pop()
+
+
+def install(engine):
+    """Mesure les requêtes exécutées par un moteur SQL.
+
+    Enregistre les évènements ``before_cursor_execute`` et
+    ``after_cursor_execute`` de ``engine`` : chaque requête est
+    attribuée à la commande en cours (voir :func:`start`), ou
+    comptée hors commande (tâches planifiées, évènements, requêtes
+    exécutées par le thread dédié à la base...).
+
+    Appelée par :func:`.bdd.connect`.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): moteur à instrumenter.
+    """
+    for name, listener in (
+        ("before_cursor_execute", _before_cursor_execute),
+        ("after_cursor_execute", _after_cursor_execute),
+        ("handle_error", _handle_error),
+    ):
+        if not sqlalchemy.event.contains(engine, name, listener):
+            sqlalchemy.event.listen(engine, name, listener)
@@ -1,25 +1,61 @@
 """lg-rez / blocs / Interfaçage Google Sheets
 
-Connection, récupération de classeurs, modifications
+Connection, récupération de classeurs, modifications, ajouts différés
 (implémentation de https://pypi.org/project/gspread)
 """
 
+import asyncio
+import collections
+import contextlib
+import datetime
 import enum
 import functools
+import hashlib
+import heapq
+import itertools
 import json
+import os
+import random
+import time
 
+import google.auth.exceptions
 import gspread
 import gspread_asyncio
 import requests
 from oauth2client import service_account
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 
-from lgrez import bdd
-from lgrez.blocs import env
+from lgrez import config, bdd
+from lgrez.blocs import env, gsheets_emulator, tools
 
 
 WorksheetNotFound = gspread.exceptions.WorksheetNotFound
 ConnectionError = requests.exceptions.ConnectionError
+RefreshError = google.auth.exceptions.RefreshError
+
+#: Statistiques du cache des classeurs et feuilles (voir
+#: :func:`cache_info`) : nombre de classeurs / feuilles servis par le
+#: cache (``hits``) / chargés depuis l'API (``misses``), nombre de
+#: vidages du cache (``invalidations``) et nombre de classeurs et
+#: feuilles en cache (``currsize``).
+GSheetsCacheInfo = collections.namedtuple(
+    "GSheetsCacheInfo", ["hits", "misses", "invalidations", "currsize"]
+)
+
+_SHEETS_SCOPE = 'https://spreadsheets.google.com/feeds'
+
+#: Variable d'environnement activant l'émulateur local des API Google
+#: (dossier racine, voir :mod:`.gsheets_emulator`).
+EMULATOR_ENV_VAR = "LGREZ_GOOGLE_EMULATOR"
+
+#: Nombre de requêtes aux API Google dont l'attente et la durée sont
+#: conservées (voir :func:`api_stats`).
+API_STATS_WINDOW = 100
+
+#: Nombre de documents Google Docs conservés en cache (voir
+#: :func:`fetch_doc_content`).
+DOCS_CACHE_SIZE = 16
 
 
 class Modif():
@@ -61,36 +97,434 @@ def _get_creds(*scopes: str) -> service_account.ServiceAccountCredentials:
     )
 
 
+# Client commun à tout le processus et classeurs / feuilles déjà ouverts
+_manager = None
+_workbooks = {}             # ID classeur -> classeur
+_worksheets = {}            # (ID classeur, nom feuille) -> feuille
+_cache_stats = collections.Counter()
+_documents = collections.OrderedDict()  # ID doc -> (révision, contenu)
+_emulator = None
+
+
+def get_emulator():
+    """Renvoie l'émulateur local des API Google, s'il est activé.
+
+    L'émulateur (voir :mod:`.gsheets_emulator`) est activé en
+    définissant la variable d'environnement ``LGREZ_GOOGLE_EMULATOR``
+    (dossier racine de l'émulateur) ; il remplace alors les API Google
+    Sheets, Docs et Drive pour toutes les fonctions de ce module.
+
+    Returns:
+        :class:`.gsheets_emulator.Emulator` | ``None``
+    """
+    global _emulator
+    root = os.getenv(EMULATOR_ENV_VAR)
+    if not root:
+        return None
+    if _emulator is None or _emulator.root != root:
+        _emulator = gsheets_emulator.Emulator(root)
+    return _emulator
+
+
+async def _authorize():
+    """Client Google Sheets : émulateur s'il est activé, client commun
+    (autorisé si nécessaire) sinon"""
+    emulator = get_emulator()
+    if emulator:
+        return emulator
+    return await _get_manager().authorize()
+
+
+class _ClientManager(gspread_asyncio.AsyncioGspreadClientManager):
+    """Gestionnaire de client sans limitation ni nouvels essais propres
+
+    Par défaut, ``gspread_asyncio`` espace les appels d'au moins
+    ``gspread_delay`` secondes et renvoie indéfiniment les requêtes
+    en erreur (quota dépassé, erreur serveur ou réseau) : ici, les
+    erreurs sont levées immédiatement, le quota et les nouvels essais
+    étant gérés par :func:`request`.
+    """
+    async def delay(self):
+        """Pas d'attente entre deux appels (voir :func:`request`)"""
+
+    async def handle_gspread_error(self, e, method, args, kwargs):
+        """Lève l'erreur (pas de nouvel essai ici)"""
+        raise e
+
+    async def handle_requests_error(self, e, method, args, kwargs):
+        """Lève l'erreur (pas de nouvel essai ici)"""
+        raise e
+
+
+def _get_manager():
+    """Gestionnaire de client commun (créé au premier appel)"""
+    global _manager
+    if _manager is None:
+        _manager = _ClientManager(
+            functools.partial(_get_creds, _SHEETS_SCOPE), gspread_delay=0
+        )
+    return _manager
+
+
+def _is_auth_error(exc):
+    """Erreur d'authentification (jeton expiré ou révoqué...)"""
+    if isinstance(exc, RefreshError):
+        return True
+    response = getattr(exc, "response", None)
+    return (isinstance(exc, gspread.exceptions.APIError)
+            and getattr(response, "status_code", None) == 401)
+
+
+@contextlib.contextmanager
+def _invalidate_on_auth_error():
+    """Vide le cache en cas d'erreur d'authentification (re-levée)"""
+    try:
+        yield
+    except Exception as exc:
+        if _is_auth_error(exc):
+            invalidate()
+        raise
+
+
+def invalidate():
+    """Vide le cache des classeurs et feuilles et oublie le client.
+
+    Les prochains appels à :func:`connect` / :func:`get_worksheet`
+    rechargeront les credentials, ré-autoriseront un client et
+    rouvriront les classeurs. Appelée automatiquement en cas d'erreur
+    d'authentification dans les fonctions de ce module ; à appeler
+    après une telle erreur obtenue en utilisant directement un
+    classeur ou une feuille.
+    """
+    global _manager
+    _manager = None
+    _get_creds.cache_clear()
+    _workbooks.clear()
+    _worksheets.clear()
+    _cache_stats["invalidations"] += 1
+
+
+def cache_info():
+    """Renvoie les statistiques du cache des classeurs et feuilles.
+
+    Returns:
+        :class:`GSheetsCacheInfo`
+    """
+    return GSheetsCacheInfo(
+        _cache_stats["hits"], _cache_stats["misses"],
+        _cache_stats["invalidations"], len(_workbooks) + len(_worksheets)
+    )
+
+
+class Priority(enum.IntEnum):
+    """Priorité d'une requête aux API Google (voir :func:`request`).
+
+    Lorsque le quota est atteint, les requêtes en attente sont envoyées
+    par priorité (plus la valeur est faible, plus la requête est
+    prioritaire), puis par ordre d'arrivée.
+    """
+    sync = 0            #: Synchronisation (TDB, rôles) et validation
+    inscription = 1     #: Inscription des joueurs
+    export = 2          #: Ajout des votes et actions (données brutes)
+    lore = 3            #: Documents et fichiers (``!lore``, ``!setup``)
+
+
+#: Statistiques des requêtes aux API Google (voir :func:`api_stats`) :
+#: requêtes en attente de quota par priorité (``queued``), requêtes
+#: envoyées (``requests``), nouvels essais (``retries``), échecs
+#: définitifs (``failures``), jetons disponibles (``tokens``), attente
+#: moyenne du quota, durée moyenne et maximale des requêtes (en
+#: secondes, sur les :data:`API_STATS_WINDOW` dernières requêtes).
+GoogleAPIStats = collections.namedtuple(
+    "GoogleAPIStats",
+    ["queued", "requests", "retries", "failures", "tokens",
+     "mean_wait", "mean_latency", "max_latency"]
+)
+
+
+# Seau de jetons commun à toutes les requêtes (quota du projet) :
+# jetons disponibles (négatif : dette des requêtes bloquantes), moment
+# de la dernière mise à jour, requêtes en attente (tas de (priorité,
+# numéro d'arrivée, future)) et distribution programmée
+_bucket = {"tokens": None, "updated": None, "handle": None}
+_waiting = []
+_arrivals = itertools.count()
+_api_counts = collections.Counter()
+_waits = collections.deque(maxlen=API_STATS_WINDOW)
+_latencies = collections.deque(maxlen=API_STATS_WINDOW)
+
+
+def _refill():
+    """Met à jour les jetons disponibles (au plus google_api_burst)"""
+    now = time.monotonic()
+    if _bucket["tokens"] is None:
+        _bucket["tokens"] = float(config.google_api_burst)
+    else:
+        rate = config.google_api_quota / 60
+        _bucket["tokens"] = min(
+            float(config.google_api_burst),
+            _bucket["tokens"] + (now - _bucket["updated"]) * rate
+        )
+    _bucket["updated"] = now
+
+
+def _dispatch():
+    """Distribue les jetons disponibles aux requêtes en attente"""
+    _bucket["handle"] = None
+    _refill()
+    while _waiting and _bucket["tokens"] >= 1:
+        *_, future = heapq.heappop(_waiting)
+        if not future.done():           # Requête annulée entre-temps
+            _bucket["tokens"] -= 1
+            future.set_result(None)
+    if _waiting:
+        delay = (1 - _bucket["tokens"]) / (config.google_api_quota / 60)
+        _bucket["handle"] = asyncio.get_running_loop().call_later(
+            delay, _dispatch
+        )
+
+
+async def _acquire(priority):
+    """Attend un jeton du seau, par ordre de priorité"""
+    _refill()
+    if not _waiting and _bucket["tokens"] >= 1:
+        _bucket["tokens"] -= 1
+        return
+
+    future = asyncio.get_running_loop().create_future()
+    heapq.heappush(_waiting, (priority, next(_arrivals), future))
+    if _bucket["handle"] is None:
+        _dispatch()
+    await future
+
+
+def _status(exc):
+    """Code HTTP d'une erreur d'API Google (None si non applicable)"""
+    if isinstance(exc, HttpError):                  # googleapiclient
+        status = exc.resp.status
+    else:                                           # gspread
+        status = getattr(getattr(exc, "response", None), "status_code",
+                         None)
+    try:
+        return int(status)
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_retryable(exc):
+    """Erreur temporaire (quota dépassé, erreur serveur, réseau...)"""
+    if isinstance(exc, (ConnectionError, requests.exceptions.Timeout)):
+        return True
+    if isinstance(exc, (gspread.exceptions.APIError, HttpError)):
+        status = _status(exc)
+        return status is not None and (status == 429 or status >= 500)
+    return False
+
+
+def _backoff(attempt):
+    """Délai avant le nouvel essai n° attempt + 1 (attente exponentielle
+    plafonnée, avec gigue complète)"""
+    return random.uniform(0, min(config.google_api_backoff_max,
+                                 config.google_api_backoff * 2**attempt))
+
+
+async def request(func, *args, priority=Priority.sync, **kwargs):
+    """Envoie une requête à une API Google, dans le respect du quota.
+
+    Toutes les requêtes aux API Google (Sheets, Docs, Drive) doivent
+    passer par cette fonction (ou :func:`request_blocking`) : elles
+    consomment chacune un jeton d'un seau commun de
+    :attr:`.config.google_api_burst` jetons, remplis au rythme de
+    :attr:`.config.google_api_quota` par minute. Si aucun jeton n'est
+    disponible, la requête attend son tour, par ``priority`` puis
+    ordre d'arrivée.
+
+    En cas d'erreur temporaire (quota dépassé, code HTTP 429 ou 5xx,
+    erreur réseau), la requête est renvoyée (avec un nouveau jeton)
+    après une attente exponentielle avec gigue (voir
+    :attr:`.config.google_api_backoff`), jusqu'à
+    :attr:`.config.google_api_max_retries` fois. Le client Google
+    Sheets commun ne fait lui-même ni attente ni nouvel essai.
+
+    Args:
+        func (Callable): fonction effectuant la requête (coroutine ou
+            fonction renvoyant un awaitable, par exemple une méthode
+            d'une feuille ``gspread_asyncio``).
+        \*args, \*\*kwargs: arguments passés à ``func``.
+        priority (.Priority): priorité de la requête.
+
+    Returns:
+        Le résultat de ``func``.
+
+    Raises:
+        Exception: erreur définitive levée par ``func``.
+    """
+    for attempt in itertools.count():
+        queued = time.monotonic()
+        await _acquire(priority)
+        start = time.monotonic()
+        _waits.append(start - queued)
+        _api_counts["requests"] += 1
+        try:
+            return await func(*args, **kwargs)
+        except Exception as exc:
+            if (not _is_retryable(exc)
+                    or attempt >= config.google_api_max_retries):
+                _api_counts["failures"] += 1
+                raise
+            _api_counts["retries"] += 1
+        finally:
+            _latencies.append(time.monotonic() - start)
+
+        await asyncio.sleep(_backoff(attempt))
+
+
+def request_blocking(func, *args, priority=Priority.lore, **kwargs):
+    """Envoie une requête bloquante à une API Google.
+
+    Comme :func:`request`, pour les clients synchrones (Docs, Drive) :
+    la requête consomme un jeton du seau commun, mais n'attend pas le
+    quota (elle ne peut pas laisser passer les autres requêtes) ; les
+    jetons manquants sont une dette, qui retarde les requêtes
+    suivantes. Les erreurs temporaires sont gérées comme par
+    :func:`request` (attente bloquante).
+
+    Args:
+        func (Callable): fonction effectuant la requête.
+        \*args, \*\*kwargs: arguments passés à ``func``.
+        priority (.Priority): priorité de la requête (statistiques).
+
+    Returns:
+        Le résultat de ``func``.
+    """
+    for attempt in itertools.count():
+        _refill()
+        _bucket["tokens"] -= 1
+        _waits.append(0.0)
+        _api_counts["requests"] += 1
+        start = time.monotonic()
+        try:
+            return func(*args, **kwargs)
+        except Exception as exc:
+            if (not _is_retryable(exc)
+                    or attempt >= config.google_api_max_retries):
+                _api_counts["failures"] += 1
+                raise
+            _api_counts["retries"] += 1
+        finally:
+            _latencies.append(time.monotonic() - start)
+
+        time.sleep(_backoff(attempt))
+
+
+def api_stats():
+    """Renvoie les statistiques des requêtes aux API Google.
+
+    Returns:
+        :class:`GoogleAPIStats`
+    """
+    queued = collections.Counter(
+        Priority(priority) for priority, _, future in _waiting
+        if not future.done()
+    )
+    if _bucket["tokens"] is not None:
+        _refill()
+    return GoogleAPIStats(
+        queued={priority: queued[priority] for priority in Priority},
+        requests=_api_counts["requests"],
+        retries=_api_counts["retries"],
+        failures=_api_counts["failures"],
+        tokens=_bucket["tokens"],
+        mean_wait=sum(_waits) / len(_waits) if _waits else 0.0,
+        mean_latency=(sum(_latencies) / len(_latencies)
+                      if _latencies else 0.0),
+        max_latency=max(_latencies, default=0.0),
+    )
+
+
 async def connect(key):
     """Charge les credentials GSheets et renvoie le classeur demandé.
 
-    Nécessite la variable d'environment ``LGREZ_GCP_CREDENTIALS``.
+    Nécessite la variable d'environment ``LGREZ_GCP_CREDENTIALS``
+    (sauf si l'émulateur local est activé, voir :func:`get_emulator`).
+
+    Le client (et son jeton d'accès) est commun à tout le processus,
+    et les classeurs déjà ouverts sont servis par un cache (voir
+    :func:`cache_info` et :func:`invalidate`). En cas d'erreur
+    d'authentification, le cache est vidé et l'ouverture retentée
+    une fois.
 
     Args:
         key (str): ID du classeur à charger (25 caractères)
 
     Returns:
-        :class:`gspread_asyncio.AsyncioGspreadWorksheet`
+        :class:`gspread_asyncio.AsyncioGspreadSpreadsheet`
     """
-    scope = 'https://spreadsheets.google.com/feeds'
-    manager = gspread_asyncio.AsyncioGspreadClientManager(
-        lambda: _get_creds(scope)
-    )
-    client = await manager.authorize()
+    workbook = _workbooks.get(key)
+    if workbook is not None:
+        _cache_stats["hits"] += 1
+        return workbook
 
-    # Open the workbook
-    workbook = await client.open_by_key(key)
+    _cache_stats["misses"] += 1
+    try:
+        client = await _authorize()
+        workbook = await request(client.open_by_key, key)
+    except Exception as exc:
+        if not _is_auth_error(exc):
+            raise
+        invalidate()
+        client = await _authorize()
+        workbook = await request(client.open_by_key, key)
 
+    _workbooks[key] = workbook
     return workbook
 
 
-async def update(sheet, *modifs):
+async def get_worksheet(key, name):
+    """Renvoie une feuille d'un classeur GSheets.
+
+    Comme :func:`connect`, les feuilles déjà ouvertes sont servies par
+    un cache (voir :func:`cache_info` et :func:`invalidate`).
+
+    Args:
+        key (str): ID du classeur (25 caractères)
+        name (str): nom de la feuille
+
+    Returns:
+        :class:`gspread_asyncio.AsyncioGspreadWorksheet`
+
+    Raises:
+        gspread.exceptions.WorksheetNotFound: feuille inexistante.
+    """
+    sheet = _worksheets.get((key, name))
+    if sheet is not None:
+        _cache_stats["hits"] += 1
+        return sheet
+
+    workbook = await connect(key)
+    _cache_stats["misses"] += 1
+    try:
+        sheet = await request(workbook.worksheet, name)
+    except Exception as exc:
+        if not _is_auth_error(exc):
+            raise
+        invalidate()
+        workbook = await connect(key)
+        sheet = await request(workbook.worksheet, name)
+
+    _worksheets[key, name] = sheet
+    return sheet
+
+
+async def update(sheet, *modifs, priority=Priority.sync):
     """Met à jour une feuille GSheets avec les modifications demandées.
 
     Args:
         sheet (gspread_asyncio.AsyncioGspreadWorksheet): La feuille à
             modifier
         *modifs (list[.Modif]): Modification(s) à apporter
+        priority (.Priority): priorité de la requête (voir
+            :func:`request`).
 
     Le type de la nouvelle valeur sera interpreté par ``gspread`` pour
     donner le type GSheets adéquat à la cellule (texte, numérique,
@@ -100,45 +534,212 @@ async def update(sheet, *modifs):
     (IDs des joueurs par exemple) sont convertis en :class:`str`. Les
     ``None`` sont convertis en ``''``. Les membres d':class:`~enum.Enum`
     sont stockés par leur **nom**.
+
+    La feuille n'est pas lue : les cellules modifiées sont regroupées
+    en rectangles (voir :func:`_rectangles`), envoyés en une seule
+    requête ``values.batchUpdate`` (voir :func:`request`). Si
+    plusieurs modifications portent sur la même cellule, seule la
+    dernière est appliquée.
     """
-    # Bordures de la zone à modifier
-    lm = max([modif.row for modif in modifs])
-    cm = max([modif.column for modif in modifs])
-
-    # Récupère toutes les valeurs sous forme de cellules gspread
-    cells = await sheet.range(1, 1, lm + 1, cm + 1)
-    # gspread indexe à partir de 1 (comme les gsheets)
-
-    cells_to_update = []
-    for modif in modifs:
-        # On récupère l'objet Cell correspondant aux coords à modifier
-        cell = next(cell for cell in cells
-                    if cell.col == modif.column + 1
-                    and cell.row == modif.row + 1)
-
-        val = modif.val
-
-        # Transformation objets complexes
-        if isinstance(val, enum.Enum):
-            # Enums : stocker le nom
-            val = val.name
-        elif isinstance(modif.val, bdd.base.TableBase):
-            # Instances : stocker la clé primaire
-            val = val.primary_key
-
-        # Adaptation types de base
-        if isinstance(val, int) and val > 10**14:
-            # Entiers trop grands pour être stockés sans perte de
-            # précision (IDs des joueurs par ex.): passage en str
-            cell.value = str(val)
-        elif val is None:
-            cell.value = ""
+    if not modifs:
+        return
+
+    # (ligne, colonne) -> valeur, dernière modification prioritaire
+    cells = {(modif.row, modif.column): _cell_value(modif.val)
+             for modif in modifs}
+
+    data = []
+    for row, column, values in _rectangles(cells):
+        # gspread indexe à partir de 1 (comme les gsheets)
+        first = gspread.utils.rowcol_to_a1(row + 1, column + 1)
+        last = gspread.utils.rowcol_to_a1(row + len(values),
+                                          column + len(values[0]))
+        data.append({"range": f"{first}:{last}", "values": values})
+
+    with _invalidate_on_auth_error():
+        await request(sheet.batch_update, data, value_input_option="RAW",
+                      priority=priority)
+
+
+def _cell_value(val):
+    """Valeur à stocker dans une cellule GSheets pour ``val``"""
+    # Transformation objets complexes
+    if isinstance(val, enum.Enum):
+        # Enums : stocker le nom
+        val = val.name
+    elif isinstance(val, bdd.base.TableBase):
+        # Instances : stocker la clé primaire
+        val = val.primary_key
+
+    # Adaptation types de base
+    if isinstance(val, int) and val > 10**14:
+        # Entiers trop grands pour être stockés sans perte de
+        # précision (IDs des joueurs par ex.): passage en str
+        return str(val)
+    elif val is None:
+        return ""
+    else:
+        return val
+
+
+def _rectangles(cells):
+    """Regroupe des cellules en rectangles de cellules contiguës.
+
+    Les cellules contiguës d'une même ligne sont regroupées en
+    segments, puis les segments couvrant les mêmes colonnes sur des
+    lignes consécutives en rectangles.
+
+    Args:
+        cells (dict[tuple[int, int], Any]): valeurs des cellules,
+            par coordonnées (ligne, colonne) (indexées à partir de 0).
+
+    Returns:
+        list[tuple[int, int, list[list[Any]]]]: Pour chaque rectangle,
+        coordonnées de la cellule en haut à gauche et valeurs (liste
+        des lignes).
+    """
+    # Segments de chaque ligne : (première colonne, valeurs)
+    rows = collections.defaultdict(list)
+    for row, column in sorted(cells):
+        segments = rows[row]
+        if segments and segments[-1][0] + len(segments[-1][1]) == column:
+            segments[-1][1].append(cells[row, column])     # Contiguë
         else:
-            cell.value = val
+            segments.append((column, [cells[row, column]]))
+
+    # Fusion des segments identiques sur des lignes consécutives
+    rectangles = []
+    current = {}            # (première colonne, largeur) -> rectangle
+    for row in sorted(rows):
+        for column, values in rows[row]:
+            rect = current.get((column, len(values)))
+            if rect and rect[0] + len(rect[2]) == row:
+                rect[2].append(values)
+            else:
+                rect = (row, column, [values])
+                current[column, len(values)] = rect
+                rectangles.append(rect)
+
+    return rectangles
+
+
+# File d'attente des ajouts de lignes (voir append_later) : nombre de
+# lignes ajoutées depuis le dernier envoi, envoi programmé et verrou
+# (un seul envoi à la fois)
+_appends = {"pending": 0, "handle": None, "lock": None}
+
+
+def append_later(key, name, values):
+    """Ajoute une ligne à la fin d'une feuille GSheets, en différé.
+
+    La ligne est enregistrée en base (:class:`.bdd.EcritureGSheet`,
+    aucune perte en cas de redémarrage) puis envoyée par
+    :func:`flush_appends`, au plus tard :attr:`.config.gsheets_append_delay`
+    secondes après, ou dès que :attr:`.config.gsheets_append_batch`
+    lignes sont en attente. N'attend aucune requête à l'API Google.
+
+    Les valeurs sont converties comme par :func:`update`, puis
+    interprétées par GSheets comme si elles étaient saisies dans la
+    feuille (``USER_ENTERED``).
+
+    Args:
+        key (str): ID du classeur (25 caractères)
+        name (str): nom de la feuille
+        values (list): valeurs de la ligne à ajouter
+    """
+    bdd.EcritureGSheet(
+        timestamp=datetime.datetime.now(), classeur=key, feuille=name,
+        valeurs=[_cell_value(val) for val in values],
+    ).add()
+    _appends["pending"] += 1
+    if _appends["pending"] >= config.gsheets_append_batch:
+        delay = 0
+    else:
+        delay = config.gsheets_append_delay
+    # Dans une unité de travail, après le commit (ligne enregistrée)
+    bdd.base.on_commit(lambda: schedule_flush(delay))
+
+
+def schedule_flush(delay):
+    """Programme l'envoi des lignes en attente (voir :func:`append_later`).
+
+    Sans effet si un envoi est déjà programmé plus tôt.
+
+    Args:
+        delay (float): délai avant l'envoi (en secondes).
+    """
+    handle = _appends["handle"]
+    when = config.loop.time() + delay
+    if handle is not None:
+        if handle.when() <= when:
+            return
+        handle.cancel()
+    _appends["handle"] = config.loop.call_later(delay, _start_flush)
+
+
+def _start_flush():
+    """Envoi programmé des lignes en attente"""
+    _appends["handle"] = None
+    config.loop.create_task(_background_flush())
+
+
+async def _background_flush():
+    """Envoi des lignes en attente, erreurs signalées dans les logs"""
+    try:
+        await flush_appends()
+    except Exception as exc:
+        await tools.log(
+            f"Impossible d'ajouter les lignes en attente aux GSheets "
+            f"(`{type(exc).__name__}: {exc}`), nouvel essai dans "
+            f"{config.gsheets_append_retry} secondes."
+        )
+
+
+async def flush_appends():
+    """Envoie les lignes en attente d'ajout aux GSheets.
+
+    Les lignes en attente (:class:`.bdd.EcritureGSheet`) sont envoyées
+    dans l'ordre de leur mise en attente (:func:`append_later`), en une
+    requête ``values.append`` par feuille, puis supprimées de la base.
+
+    À appeler avant toute lecture des feuilles concernées. En cas
+    d'erreur, les lignes non envoyées restent en attente et un nouvel
+    envoi est programmé :attr:`.config.gsheets_append_retry` secondes
+    après.
+
+    Returns:
+        int: Le nombre de lignes ajoutées.
+    """
+    if _appends["lock"] is None:
+        _appends["lock"] = asyncio.Lock()
 
-        cells_to_update.append(cell)
+    async with _appends["lock"]:
+        _appends["pending"] = 0
+        groups = {}         # (ID classeur, nom feuille) -> écritures
+        for ecriture in bdd.EcritureGSheet.query.order_by(
+            bdd.EcritureGSheet.id
+        ):
+            groups.setdefault((ecriture.classeur, ecriture.feuille),
+                              []).append(ecriture)
 
-    await sheet.update_cells(cells_to_update)
+        done = 0
+        try:
+            for (key, name), ecritures in groups.items():
+                sheet = await get_worksheet(key, name)
+                with _invalidate_on_auth_error():
+                    await request(
+                        sheet.append_rows,
+                        [ecriture.valeurs for ecriture in ecritures],
+                        value_input_option="USER_ENTERED",
+                        priority=Priority.export,
+                    )
+                bdd.EcritureGSheet.delete(*ecritures)
+                done += len(ecritures)
+        except Exception:
+            schedule_flush(config.gsheets_append_retry)
+            raise
+
+    return done
 
 
 def a_to_index(column):
@@ -182,12 +783,76 @@ def get_doc_content(doc_id):
         googleapiclient.errors.HttpError: ID incorrect ou document non
             accessible.
     """
+    document = request_blocking(_get_document, doc_id)
+    return _document_content(document)
+
+
+async def fetch_doc_content(doc_id):
+    """Récupère le contenu d'un document Google Docs, sans bloquer.
+
+    Comme :func:`get_doc_content`, mais la requête est envoyée dans un
+    thread (via :func:`request`, priorité ``lore``) : la boucle
+    d'évènements n'est pas bloquée pendant la requête.
+
+    Les :data:`DOCS_CACHE_SIZE` derniers documents récupérés sont
+    conservés en cache avec leur numéro de révision : pour un document
+    en cache, seul ce numéro est demandé, et le document n'est
+    téléchargé à nouveau que s'il a été modifié depuis.
+
+    Args:
+        doc_id (str): ID du document à récupérer (doit être public
+            ou dans le Drive partagé avec le compte de service).
+
+    Returns:
+        list[tuple(str, dict)]: Voir :func:`get_doc_content`.
+
+    Raises:
+        googleapiclient.errors.HttpError: ID incorrect ou document non
+            accessible.
+    """
+    loop = asyncio.get_running_loop()
+
+    async def get(fields=None):
+        return await request(
+            loop.run_in_executor, None,
+            functools.partial(_get_document, doc_id, fields),
+            priority=Priority.lore,
+        )
+
+    cached = _documents.get(doc_id)
+    if cached:
+        document = await get(fields="revisionId")
+        if document.get("revisionId") == cached[0]:
+            _documents.move_to_end(doc_id)
+            return list(cached[1])
+
+    document = await get()
+    content = _document_content(document)
+    revision = document.get("revisionId")
+    if revision:
+        _documents[doc_id] = (revision, content)
+        _documents.move_to_end(doc_id)
+        while len(_documents) > DOCS_CACHE_SIZE:
+            _documents.popitem(last=False)
+    return list(content)
+
+
+def _get_document(doc_id, fields=None):
+    """Ressource Document de l'API Docs (requête bloquante, sans
+    quota : à envoyer via :func:`request` / :func:`request_blocking`)"""
+    emulator = get_emulator()
+    if emulator:
+        return emulator.get_document(doc_id, fields=fields)
+
     scope = 'https://www.googleapis.com/auth/documents.readonly'
     service = build('docs', 'v1', credentials=_get_creds(scope))
-
+    kwargs = {"fields": fields} if fields else {}
     # Retrieve the documents contents from the Docs service.
-    document = service.documents().get(documentId=doc_id).execute()
+    return service.documents().get(documentId=doc_id, **kwargs).execute()
+
 
+def _document_content(document):
+    """Fragments de texte et mise en forme d'une ressource Document"""
     content = []
     blocs = document["body"]["content"]
     for bloc in blocs:
@@ -217,20 +882,54 @@ def get_files_in_folder(folder_id: str) -> list[dict[str, str]]:
 
     Returns:
         A list of, for each file, a directory with ``"file_id"``,
-        ``name`` (with extension) and ``extension`` (without dot) data.
+        ``name`` (with extension), ``extension`` (without dot) and
+        ``modified`` (last modification time, RFC 3339) data.
 
     Raises:
         googleapiclient.errors.HttpError: ID incorrect ou dossier non
             accessible.
         RuntimeError: Autre erreur.
     """
+    data = request_blocking(_list_files, folder_id)
+    return _folder_files(folder_id, data)
+
+
+async def get_files_in_folder_async(folder_id: str) -> list[dict[str, str]]:
+    """Version asynchrone de :func:`get_files_in_folder`.
+
+    La requête est envoyée dans un thread via :func:`request`
+    (priorité ``lore``, comme :func:`download_files`).
+
+    Args:
+        folder_id: ID du dossier à lister.
+
+    Returns:
+        Voir :func:`get_files_in_folder`.
+    """
+    loop = asyncio.get_running_loop()
+    data = await request(loop.run_in_executor, None, _list_files, folder_id,
+                         priority=Priority.lore)
+    return _folder_files(folder_id, data)
+
+
+def _list_files(folder_id):
+    """Contenu d'un dossier Drive (requête bloquante, sans quota :
+    à envoyer via :func:`request` / :func:`request_blocking`)"""
+    emulator = get_emulator()
+    if emulator:
+        return emulator.list_files(folder_id)
+
     scope = "https://www.googleapis.com/auth/drive.readonly"
     service = build("drive", "v3", credentials=_get_creds(scope))
-    data = service.files().list(
+    return service.files().list(
         corpora="user",
         q=f"'{folder_id}' in parents",
-        fields="files(id, fileExtension, name)",
+        fields="files(id, fileExtension, name, modifiedTime)",
     ).execute()
+
+
+def _folder_files(folder_id, data):
+    """Fichiers d'un dossier Drive (voir :func:`get_files_in_folder`)"""
     if not data:
         raise RuntimeError(f"Unable to get Drive folder info '{folder_id}'")
     files = [
@@ -238,6 +937,7 @@ def get_files_in_folder(folder_id: str) -> list[dict[str, str]]:
             "file_id": file_data.get("id", ""),
             "name": file_data.get("name", ""),
             "extension": file_data.get("fileExtension", ""),
+            "modified": file_data.get("modifiedTime", ""),
         }
         for file_data in data.get("files", [])
     ]
@@ -259,9 +959,175 @@ def download_file(file_id: str) -> bytes:
             accessible.
         RuntimeError: Autre erreur.
     """
-    scope = "https://www.googleapis.com/auth/drive.readonly"
-    service = build("drive", "v3", credentials=_get_creds(scope))
-    data = service.files().get_media(fileId=file_id).execute()
+    data = request_blocking(_get_media, file_id)
     if not data:
         raise RuntimeError(f"Unable to download Drive file '{file_id}'")
     return data
+
+
+def _get_media(file_id):
+    """Contenu d'un fichier Drive (requête bloquante, sans quota :
+    à envoyer via :func:`request` / :func:`request_blocking`)"""
+    emulator = get_emulator()
+    if emulator:
+        return emulator.get_media(file_id)
+
+    scope = "https://www.googleapis.com/auth/drive.readonly"
+    service = build("drive", "v3", credentials=_get_creds(scope))
+    return service.files().get_media(fileId=file_id).execute()
+
+
+def _get_modified_time(file_id):
+    """Date de dernière modification d'un fichier Drive (requête
+    bloquante, sans quota)"""
+    emulator = get_emulator()
+    if emulator:
+        return emulator.get_file(file_id).get("modifiedTime", "")
+
+    scope = "https://www.googleapis.com/auth/drive.readonly"
+    service = build("drive", "v3", credentials=_get_creds(scope))
+    data = service.files().get(fileId=file_id,
+                               fields="modifiedTime").execute()
+    return data.get("modifiedTime", "")
+
+
+class DriveCache():
+    """Cache local des fichiers Google Drive, adressé par contenu.
+
+    Le contenu de chaque fichier est stocké une seule fois, sous son
+    empreinte SHA-256 (``objects/<empreinte>``) ; chaque version d'un
+    fichier (ID et date de modification) référence ce contenu
+    (``refs/<empreinte de la version>``). Un fichier modifié sur le
+    Drive change de version, et est donc téléchargé à nouveau.
+
+    Les écritures sont atomiques : un téléchargement interrompu ne
+    laisse pas de fichier incomplet dans le cache.
+
+    Args:
+        root (str): dossier du cache (créé si nécessaire).
+
+    Attributes:
+        root (str): dossier du cache.
+    """
+    def __init__(self, root):
+        """Initializes self."""
+        self.root = root
+
+    def __repr__(self):
+        """Returns repr(self)"""
+        return f"<gsheets.DriveCache '{self.root}'>"
+
+    @staticmethod
+    def _digest(data):
+        return hashlib.sha256(data).hexdigest()
+
+    def _ref_path(self, file_id, modified):
+        ref = self._digest(f"{file_id}\n{modified}".encode())
+        return os.path.join(self.root, "refs", ref)
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, "objects", digest)
+
+    def _write(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{id(data)}.tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+
+    def get(self, file_id, modified):
+        """Renvoie le contenu en cache d'une version d'un fichier.
+
+        Args:
+            file_id (str): ID du fichier.
+            modified (str): date de dernière modification du fichier.
+
+        Returns:
+            :class:`bytes` | ``None`` (version absente du cache ou
+            contenu corrompu)
+        """
+        try:
+            with open(self._ref_path(file_id, modified)) as fh:
+                digest = fh.read().strip()
+            with open(self._object_path(digest), "rb") as fh:
+                data = fh.read()
+        except OSError:
+            return None
+        if self._digest(data) != digest:
+            return None
+        return data
+
+    def put(self, file_id, modified, data):
+        """Ajoute le contenu d'une version d'un fichier au cache.
+
+        Args:
+            file_id (str): ID du fichier.
+            modified (str): date de dernière modification du fichier.
+            data (bytes): contenu du fichier.
+        """
+        digest = self._digest(data)
+        path = self._object_path(digest)
+        if not os.path.isfile(path):
+            self._write(path, data)
+        self._write(self._ref_path(file_id, modified), digest.encode())
+
+
+async def download_files(files):
+    """Télécharge des fichiers Google Drive, en parallèle, avec cache.
+
+    Les téléchargements sont envoyés dans des threads (via
+    :func:`request`, priorité ``lore``), au plus
+    :attr:`.config.drive_download_concurrency` à la fois. Les fichiers
+    déjà téléchargés (même ID et même date de modification) sont lus
+    depuis le cache local :attr:`.config.drive_cache_dir` (voir
+    :class:`DriveCache`), où sont ajoutés les nouveaux
+    téléchargements : en cas d'erreur, les fichiers téléchargés avec
+    succès ne le seront pas à nouveau au prochain appel.
+
+    Args:
+        files (list[dict]): fichiers à télécharger, avec au moins
+            ``"file_id"`` et si possible ``"modified"`` (voir
+            :func:`get_files_in_folder` ; demandée sinon).
+
+    Returns:
+        list[bytes]: Le contenu binaire des fichiers, dans l'ordre.
+
+    Raises:
+        googleapiclient.errors.HttpError: ID incorrect ou fichier non
+            accessible (après la fin des autres téléchargements).
+        RuntimeError: Autre erreur.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(config.drive_download_concurrency)
+    cache = None
+    if config.drive_cache_dir:
+        cache = DriveCache(config.drive_cache_dir)
+
+    async def blocking(func, *args):
+        async with semaphore:
+            return await request(loop.run_in_executor, None, func, *args,
+                                 priority=Priority.lore)
+
+    async def download(file):
+        file_id = file["file_id"]
+        modified = file.get("modified")
+        if cache and modified is None:
+            modified = await blocking(_get_modified_time, file_id)
+        if cache and modified:
+            data = cache.get(file_id, modified)
+            if data is not None:
+                return data
+
+        data = await blocking(_get_media, file_id)
+        if not data:
+            raise RuntimeError(f"Unable to download Drive file '{file_id}'")
+        if cache and modified:
+            cache.put(file_id, modified, data)
+        return data
+
+    results = await asyncio.gather(*(download(file) for file in files),
+                                   return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
@@ -0,0 +1,486 @@
+"""lg-rez / blocs / Émulateur local des API Google
+
+Implémentation locale (fichiers) des classeurs Google Sheets, documents
+Google Docs et dossiers Google Drive utilisés par :mod:`.gsheets`,
+pour les tests de charge et mesures de performance hors ligne.
+
+Activé en définissant la variable d'environnement
+``LGREZ_GOOGLE_EMULATOR`` (dossier racine de l'émulateur), organisé
+ainsi :
+
+    - ``sheets/<ID classeur>/<nom feuille>.csv`` : feuilles (une ligne
+      du fichier CSV par ligne de la feuille) ;
+    - ``docs/<ID document>.json`` : documents (ressource ``Document``
+      de l'API Google Docs), ou ``docs/<ID document>.txt`` (texte brut,
+      un paragraphe par ligne) ;
+    - ``drive/<ID dossier>/<nom fichier>`` : fichiers des dossiers
+      (ID d'un fichier : ``<ID dossier>/<nom fichier>``).
+
+Chaque requête subit une latence artificielle
+(:attr:`.config.google_emulator_latency`) et peut échouer comme si le
+quota était dépassé (:attr:`.config.google_emulator_error_rate`,
+:attr:`.config.google_emulator_quota`).
+"""
+
+import asyncio
+import collections
+import csv
+import datetime
+import json
+import os
+import random
+import re
+import time
+import types
+
+import gspread
+from googleapiclient.errors import HttpError
+
+from lgrez import config
+
+
+# Plage A1 : colonnes / lignes de début et de fin, toutes facultatives
+_A1_RANGE = re.compile(r"^([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?$")
+
+
+def _column_index(letters):
+    """Indice (à partir de 0) d'une colonne ("A", "AB"...)"""
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord("A") + 1
+    return index - 1
+
+
+def parse_range(a1, n_rows, n_cols):
+    """Convertit une plage A1 en indices de lignes et de colonnes.
+
+    Les bornes absentes (``"A3:C"``, ``"2:2"``...) s'étendent jusqu'au
+    bord de la feuille.
+
+    Args:
+        a1 (str): plage (``"B2:D5"``, ``"C7:C"``...), éventuellement
+            préfixée du nom de la feuille (``"feuille!B2"``).
+        n_rows (int): nombre de lignes de la feuille.
+        n_cols (int): nombre de colonnes de la feuille.
+
+    Returns:
+        tuple[range, range]: Indices (à partir de 0) des lignes et des
+        colonnes de la plage.
+
+    Raises:
+        ValueError: plage incorrecte.
+    """
+    match = _A1_RANGE.match(a1.rpartition("!")[2].upper())
+    if not match or not any(match.groups()):
+        raise ValueError(f"Plage incorrecte : '{a1}'")
+    col1, row1, col2, row2 = match.groups()
+    if match.group(0).find(":") < 0:        # Cellule ou ligne / colonne
+        col2, row2 = col1, row1
+    first_row = int(row1) - 1 if row1 else 0
+    last_row = int(row2) if row2 else n_rows
+    first_col = _column_index(col1) if col1 else 0
+    last_col = _column_index(col2) + 1 if col2 else n_cols
+    return range(first_row, last_row), range(first_col, last_col)
+
+
+def _trim(rows):
+    """Supprime les cellules et lignes vides finales (comme l'API)"""
+    rows = [list(row) for row in rows]
+    for row in rows:
+        while row and row[-1] == "":
+            row.pop()
+    while rows and not rows[-1]:
+        rows.pop()
+    return rows
+
+
+class _Response:
+    """Réponse HTTP minimale, pour les erreurs ``gspread``"""
+    def __init__(self, status, message):
+        self.status_code = status
+        self.text = message
+        self._error = {"code": status, "message": message,
+                       "status": "RESOURCE_EXHAUSTED"}
+
+    def json(self):
+        return {"error": self._error}
+
+
+class Emulator:
+    """Émulateur local des API Google Sheets, Docs et Drive.
+
+    Remplace le client ``gspread_asyncio`` (voir :meth:`open_by_key`)
+    et les services Docs / Drive utilisés par :mod:`.gsheets`.
+
+    Args:
+        root (str): dossier racine de l'émulateur (voir
+            :mod:`.gsheets_emulator`).
+
+    Attributes:
+        root (str): dossier racine de l'émulateur.
+        requests (int): nombre de requêtes reçues.
+        errors (int): nombre de requêtes rejetées (quota dépassé).
+    """
+
+    def __init__(self, root):
+        """Initializes self."""
+        self.root = root
+        self.requests = 0
+        self.errors = 0
+        self._recent = collections.deque()      # Moments des requêtes
+
+    def __repr__(self):
+        """Return repr(self)."""
+        return f"<gsheets_emulator.Emulator '{self.root}'>"
+
+    def path(self, *parts):
+        """Chemin d'un fichier de l'émulateur.
+
+        Args:
+            \\*parts (str): composantes du chemin, relatives à
+                :attr:`root`.
+
+        Returns:
+            :class:`str`
+        """
+        return os.path.join(self.root, *parts)
+
+    def _check_quota(self):
+        """Compte une requête, lève l'erreur de quota le cas échéant"""
+        self.requests += 1
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] > 60:
+            self._recent.popleft()
+        quota = config.google_emulator_quota
+        if ((quota and len(self._recent) >= quota)
+                or random.random() < config.google_emulator_error_rate):
+            self.errors += 1
+            return False
+        self._recent.append(now)
+        return True
+
+    async def tick(self):
+        """Simule une requête à l'API Sheets (latence et quota).
+
+        Raises:
+            gspread.exceptions.APIError: quota dépassé (code 429).
+        """
+        await asyncio.sleep(config.google_emulator_latency)
+        if not self._check_quota():
+            raise gspread.exceptions.APIError(
+                _Response(429, "Quota exceeded (emulator)")
+            )
+
+    def tick_blocking(self):
+        """Simule une requête à l'API Docs / Drive (latence et quota).
+
+        Raises:
+            googleapiclient.errors.HttpError: quota dépassé (code 429).
+        """
+        time.sleep(config.google_emulator_latency)
+        if not self._check_quota():
+            raise HttpError(
+                types.SimpleNamespace(status=429,
+                                      reason="Quota exceeded (emulator)"),
+                b'{"error": {"message": "Quota exceeded (emulator)"}}',
+            )
+
+    # ---- Sheets
+
+    async def open_by_key(self, key):
+        """Ouvre un classeur (dossier ``sheets/<key>``).
+
+        Args:
+            key (str): ID du classeur.
+
+        Returns:
+            :class:`EmulatedSpreadsheet`
+
+        Raises:
+            gspread.exceptions.SpreadsheetNotFound: dossier inexistant.
+        """
+        await self.tick()
+        if not os.path.isdir(self.path("sheets", key)):
+            raise gspread.exceptions.SpreadsheetNotFound(key)
+        return EmulatedSpreadsheet(self, key)
+
+    # ---- Docs
+
+    def get_document(self, doc_id, fields=None):
+        """Renvoie un document (ressource ``Document`` de l'API Docs).
+
+        Le numéro de révision (``revisionId``) du document est la date
+        de dernière modification du fichier.
+
+        Args:
+            doc_id (str): ID du document.
+            fields (str): si ``"revisionId"``, ne renvoie que le
+                numéro de révision (autres valeurs ignorées).
+
+        Returns:
+            :class:`dict`
+
+        Raises:
+            googleapiclient.errors.HttpError: document inexistant
+                (code 404) ou quota dépassé.
+        """
+        self.tick_blocking()
+        for ext in ("json", "txt"):
+            path = self.path("docs", f"{doc_id}.{ext}")
+            if os.path.isfile(path):
+                break
+        else:
+            raise _not_found(f"Document '{doc_id}'")
+
+        revision = str(os.stat(path).st_mtime_ns)
+        if fields == "revisionId":
+            return {"revisionId": revision}
+
+        with open(path, encoding="utf-8") as fh:
+            if ext == "json":
+                document = json.load(fh)
+            else:
+                document = {"body": {"content": [
+                    {"paragraph": {"elements": [
+                        {"textRun": {"content": line, "textStyle": {}}}
+                    ]}} for line in fh.read().splitlines(keepends=True)
+                ]}}
+        document.setdefault("revisionId", revision)
+        return document
+
+    # ---- Drive
+
+    def list_files(self, folder_id):
+        """Liste les fichiers d'un dossier (comme ``files().list``).
+
+        Args:
+            folder_id (str): ID du dossier.
+
+        Returns:
+            :class:`dict` -- ``{"files": [{"id", "name",
+            "fileExtension", "modifiedTime"}, ...]}``
+
+        Raises:
+            googleapiclient.errors.HttpError: dossier inexistant
+                (code 404) ou quota dépassé.
+        """
+        self.tick_blocking()
+        path = self.path("drive", folder_id)
+        if not os.path.isdir(path):
+            raise _not_found(f"Folder '{folder_id}'")
+        return {"files": [
+            self._file_resource(f"{folder_id}/{name}")
+            for name in sorted(os.listdir(path))
+            if os.path.isfile(os.path.join(path, name))
+        ]}
+
+    def _file_resource(self, file_id):
+        """Ressource ``File`` de l'API Drive d'un fichier existant"""
+        name = file_id.rpartition("/")[2]
+        mtime = os.stat(self.path("drive", *file_id.split("/"))).st_mtime
+        modified = datetime.datetime.fromtimestamp(mtime,
+                                                   datetime.timezone.utc)
+        return {"id": file_id, "name": name,
+                "fileExtension": os.path.splitext(name)[1].lstrip("."),
+                "modifiedTime": modified.isoformat()}
+
+    def get_file(self, file_id):
+        """Renvoie les métadonnées d'un fichier (comme ``files().get``).
+
+        Args:
+            file_id (str): ID du fichier (``<ID dossier>/<nom>``).
+
+        Returns:
+            :class:`dict` -- ``{"id", "name", "fileExtension",
+            "modifiedTime"}``
+
+        Raises:
+            googleapiclient.errors.HttpError: fichier inexistant
+                (code 404) ou quota dépassé.
+        """
+        self.tick_blocking()
+        if not os.path.isfile(self.path("drive", *file_id.split("/"))):
+            raise _not_found(f"File '{file_id}'")
+        return self._file_resource(file_id)
+
+    def get_media(self, file_id):
+        """Renvoie le contenu d'un fichier (comme ``files().get_media``).
+
+        Args:
+            file_id (str): ID du fichier (``<ID dossier>/<nom>``).
+
+        Returns:
+            :class:`bytes`
+
+        Raises:
+            googleapiclient.errors.HttpError: fichier inexistant
+                (code 404) ou quota dépassé.
+        """
+        self.tick_blocking()
+        path = self.path("drive", *file_id.split("/"))
+        if not os.path.isfile(path):
+            raise _not_found(f"File '{file_id}'")
+        with open(path, "rb") as fh:
+            return fh.read()
+
+
+def _not_found(what):
+    """Erreur 404 des API Docs / Drive"""
+    return HttpError(types.SimpleNamespace(status=404, reason="Not Found"),
+                     f'{{"error": {{"message": "{what} not found"}}}}'
+                     .encode())
+
+
+class EmulatedSpreadsheet:
+    """Classeur émulé (dossier ``sheets/<ID classeur>``).
+
+    Remplace :class:`gspread_asyncio.AsyncioGspreadSpreadsheet`.
+
+    Attributes:
+        emulator (.Emulator): l'émulateur.
+        id (str): ID du classeur.
+    """
+
+    def __init__(self, emulator, key):
+        """Initializes self."""
+        self.emulator = emulator
+        self.id = key
+
+    def __repr__(self):
+        """Return repr(self)."""
+        return f"<EmulatedSpreadsheet '{self.id}'>"
+
+    async def worksheet(self, name):
+        """Ouvre une feuille du classeur (fichier ``<name>.csv``).
+
+        Args:
+            name (str): nom de la feuille.
+
+        Returns:
+            :class:`EmulatedWorksheet`
+
+        Raises:
+            gspread.exceptions.WorksheetNotFound: fichier inexistant.
+        """
+        await self.emulator.tick()
+        path = self.emulator.path("sheets", self.id, f"{name}.csv")
+        if not os.path.isfile(path):
+            raise gspread.exceptions.WorksheetNotFound(name)
+        return EmulatedWorksheet(self.emulator, path, name)
+
+
+class EmulatedWorksheet:
+    """Feuille émulée (fichier CSV, relu et réécrit à chaque requête).
+
+    Remplace :class:`gspread_asyncio.AsyncioGspreadWorksheet` pour les
+    méthodes utilisées par le bot. Les valeurs sont stockées telles
+    qu'envoyées, converties en :class:`str` (pas de formules).
+
+    Attributes:
+        emulator (.Emulator): l'émulateur.
+        path (str): chemin du fichier CSV.
+        title (str): nom de la feuille.
+    """
+
+    def __init__(self, emulator, path, title):
+        """Initializes self."""
+        self.emulator = emulator
+        self.path = path
+        self.title = title
+
+    def __repr__(self):
+        """Return repr(self)."""
+        return f"<EmulatedWorksheet '{self.title}'>"
+
+    def _read(self):
+        """Lignes de la feuille (listes de str)"""
+        with open(self.path, encoding="utf-8", newline="") as fh:
+            return list(csv.reader(fh))
+
+    def _write(self, rows):
+        """Remplace le contenu de la feuille (écriture atomique)"""
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8", newline="") as fh:
+            csv.writer(fh).writerows(_trim(rows))
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def _value(value):
+        return "" if value is None else str(value)
+
+    async def get_all_values(self):
+        """Renvoie toutes les valeurs de la feuille.
+
+        Returns:
+            list[list[str]]: Les lignes de la feuille, de même longueur.
+        """
+        await self.emulator.tick()
+        rows = self._read()
+        width = max((len(row) for row in rows), default=0)
+        return [row + [""] * (width - len(row)) for row in rows]
+
+    async def batch_get(self, ranges):
+        """Renvoie les valeurs de plusieurs plages, en une requête.
+
+        Args:
+            ranges (list[str]): plages A1.
+
+        Returns:
+            list[list[list[str]]]: Pour chaque plage, ses lignes
+            (cellules et lignes vides finales omises, comme l'API).
+        """
+        await self.emulator.tick()
+        rows = self._read()
+        width = max((len(row) for row in rows), default=0)
+        result = []
+        for a1 in ranges:
+            row_range, col_range = parse_range(a1, len(rows), width)
+            result.append(_trim(
+                [(rows[i] + [""] * width)[col_range.start:col_range.stop]
+                 for i in row_range if i < len(rows)]
+            ))
+        return result
+
+    async def batch_update(self, data, value_input_option="RAW"):
+        """Modifie plusieurs plages, en une requête.
+
+        Args:
+            data (list[dict]): plages (``"range"``) et valeurs
+                (``"values"``, liste de lignes) à écrire.
+            value_input_option (str): ignoré.
+        """
+        await self.emulator.tick()
+        rows = self._read()
+        for item in data:
+            row_range, col_range = parse_range(item["range"], 0, 0)
+            for i, values in enumerate(item["values"]):
+                row = row_range.start + i
+                rows.extend([] for _ in range(row + 1 - len(rows)))
+                col = col_range.start
+                rows[row].extend(
+                    "" for _ in range(col + len(values) - len(rows[row]))
+                )
+                rows[row][col:col + len(values)] = [self._value(val)
+                                                    for val in values]
+        self._write(rows)
+
+    async def append_rows(self, values, value_input_option="RAW"):
+        """Ajoute des lignes après la dernière ligne non vide.
+
+        Args:
+            values (list[list]): lignes à ajouter.
+            value_input_option (str): ignoré.
+        """
+        await self.emulator.tick()
+        rows = _trim(self._read())
+        rows.extend([self._value(val) for val in row] for row in values)
+        self._write(rows)
+
+    async def append_row(self, values, value_input_option="RAW"):
+        """Ajoute une ligne après la dernière ligne non vide.
+
+        Args:
+            values (list): valeurs de la ligne.
+            value_input_option (str): ignoré.
+        """
+        await self.append_rows([values], value_input_option)
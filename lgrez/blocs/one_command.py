@@ -9,7 +9,7 @@ import asyncio
 
 from discord.ext import commands
 
-from lgrez import config
+from lgrez import config, bdd
 
 
 #: list[~discord.ext.command.Command]: Commands exempted from
@@ -62,12 +62,11 @@ async def not_in_command(ctx):
     return True
 
 
-# @bot.before_invoke
 async def add_to_in_command(ctx):
     """Ajoute le channel à la liste des channels dans une commande.
 
     Fonction à appeller avant chaque appel de fonction
-    (enregistrer avec :meth:`~discord.ext.commands.Bot.before_invoke`)
+    (appellée par :func:`before_invoke`)
 
     Elle est appellée seulement si les checks sont OK, donc pas si le
     salon est déjà dans :attr:`config.bot.in_command <.LGBot.in_command>`.
@@ -80,12 +79,11 @@ async def add_to_in_command(ctx):
         config.bot.in_command.append(ctx.channel.id)
 
 
-# @bot.after_invoke
 async def remove_from_in_command(ctx):
     """Retire le channel de la liste des channels dans une commande.
 
     Fonction à appeller après chaque appel de fonction.
-    (enregistrer avec :meth:`~discord.ext.commands.Bot.after_invoke`)
+    (appellée par :func:`after_invoke`)
 
     Elle attend 0.1 secondes avant d'enlever le joueur afin d'éviter
     que le bot réagisse « nativement » (IA) à un message déjà traité
@@ -103,6 +101,48 @@ async def remove_from_in_command(ctx):
         config.bot.in_command.remove(ctx.channel.id)
 
 
+# @bot.before_invoke
+async def before_invoke(ctx):
+    """Prépare l'exécution d'une commande.
+
+    Fonction à appeller avant chaque appel de fonction
+    (enregistrer avec :meth:`~discord.ext.commands.Bot.before_invoke`) :
+    ouvre la session de base de données de la commande le cas échéant
+    (:func:`.bdd.base.open_command_session`), commence la mesure des
+    requêtes SQL exécutées par la commande
+    (:func:`.bdd.query_stats.start`), puis appelle
+    :func:`add_to_in_command`.
+
+    Args:
+        ctx (discord.ext.commands.Context): contexte d'invocation de
+            la commande.
+    """
+    bdd.base.open_command_session(ctx)
+    bdd.query_stats.start(ctx)
+    await add_to_in_command(ctx)
+
+
+# @bot.after_invoke
+async def after_invoke(ctx):
+    """Termine l'exécution d'une commande.
+
+    Fonction à appeller après chaque appel de fonction
+    (enregistrer avec :meth:`~discord.ext.commands.Bot.after_invoke`) :
+    ferme la session de base de données de la commande le cas échéant
+    (:func:`.bdd.base.close_command_session`), termine la mesure des
+    requêtes SQL exécutées par la commande
+    (:func:`.bdd.query_stats.finish`), puis appelle
+    :func:`remove_from_in_command`.
+
+    Args:
+        ctx (discord.ext.commands.Context): contexte d'invocation de
+            la commande.
+    """
+    bdd.base.close_command_session(ctx)
+    bdd.query_stats.finish(ctx)
+    await remove_from_in_command(ctx)
+
+
 class _Bypasser():
     def __init__(self, ctx):
         self.ctx = ctx
@@ -231,7 +231,8 @@ def private(callback):
             await ctx.message.delete()
             await one_command.remove_from_in_command(ctx)
             # chan dans le contexte d'appel = chan privé
-            ctx.channel = Joueur.from_member(ctx.author).private_chan
+            joueur = await Joueur.from_member_async(ctx.author)
+            ctx.channel = joueur.private_chan
             await ctx.send(
                 f"{quote(ctx.message.content)}\n"
                 f"{ctx.author.mention} :warning: Cette commande est "
@@ -415,7 +416,7 @@ async def boucle_query(ctx, table, col=None, cible=None, filtre=None,
         # Sinon, recherche au plus proche
         nearest = table.find_nearest(rep, col=col, sensi=sensi, filtre=filtre,
                                      solo_si_parfait=False,
-                                     match_first_word=True)
+                                     match_first_word=True, limit=10)
 
         if not nearest:
             await ctx.send("Aucune entrée trouvée, merci de réessayer : "
@@ -14,7 +14,8 @@ import discord
 from discord.ext import commands
 
 from lgrez import __version__, config, bdd
-from lgrez.blocs import env, tools, one_command, ready_check, console
+from lgrez.blocs import (env, tools, gsheets, one_command, ready_check,
+                         console)
 from lgrez.features import *        # Tous les sous-modules
 
 
@@ -173,6 +174,17 @@ async def _on_ready(bot):
         await tools.log(f"{len(taches)} tâches planifiées récupérées "
                         "en base et reprogrammées.")
 
+    # Lignes en attente d'ajout aux GSheets (non envoyées avant l'arrêt)
+    ecritures = bdd.EcritureGSheet.query.count()
+    if ecritures:
+        gsheets.schedule_flush(0)
+        await tools.log(f"{ecritures} lignes en attente d'ajout aux "
+                        "GSheets récupérées en base.")
+
+    # Résumé périodique des requêtes SQL
+    if config.sql_stats_log_period:
+        bot.loop.call_later(config.sql_stats_log_period, bot.log_sql_stats)
+
     config.is_ready = True
     print("      Initialization complete.")
     print("\nListening for events.")
@@ -487,8 +499,8 @@ class LGBot(commands.Bot):
         # Système de limitation à une commande à la fois
         self.in_command = []
         self.add_check(one_command.not_in_command)
-        self.before_invoke(one_command.add_to_in_command)
-        self.after_invoke(one_command.remove_from_in_command)
+        self.before_invoke(one_command.before_invoke)
+        self.after_invoke(one_command.after_invoke)
 
         # Commandes joueur : information, actions privés et publiques
         self.add_cog(informations.Informations(self))
@@ -519,7 +531,8 @@ class LGBot(commands.Bot):
 
         Si :attr:`config.output_liveness` vaut ``True``, lance
         :attr:`bot.i_am_alive <.LGBot.i_am_alive>`
-        (écriture chaque minute sur un fichier disque)
+        (écriture chaque minute sur un fichier disque) ; planifie
+        :meth:`log_sql_stats` (résumé périodique des requêtes SQL)
 
         Voir :func:`discord.on_ready` pour plus d'informations.
         """
@@ -699,6 +712,25 @@ class LGBot(commands.Bot):
             f.write(str(time.time()))
         self.loop.call_later(60, self.i_am_alive, filename)
 
+    # Résumé des requêtes SQL
+    def log_sql_stats(self):
+        """Résume dans #logs les requêtes SQL exécutées récemment.
+
+        Poste (si des requêtes ont été exécutées) les cumuls par
+        commande depuis le résumé précédent (voir
+        :func:`.bdd.query_stats.take_period`), puis planifie un nouvel
+        appel dans :attr:`config.sql_stats_log_period` secondes. Ce
+        processus est lancé par :meth:`on_ready` (sauf si
+        :attr:`config.sql_stats_log_period` vaut ``0``).
+        """
+        period = bdd.query_stats.take_period()
+        if period:
+            self.loop.create_task(tools.log(
+                bdd.query_stats.format_totals(period), code=True,
+                prefixe="Requêtes SQL depuis le dernier résumé :"
+            ))
+        self.loop.call_later(config.sql_stats_log_period, self.log_sql_stats)
+
     # Lancement du bot
     def run(self, **kwargs):
         """Prépare puis lance le bot (bloquant).
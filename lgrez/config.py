@@ -154,6 +154,66 @@ db_voteloups_sheet = "voteloups_brut"
 #: les actions effectuées.
 db_actions_sheet = "actions_brut"
 
+#: int: Délai maximal (en secondes) avant l'envoi des lignes ajoutées
+#: en différé aux GSheets (votes et actions, voir
+#: :func:`.gsheets.append_later`).
+gsheets_append_delay = 5
+
+#: int: Nombre de lignes en attente à partir duquel les lignes ajoutées
+#: en différé aux GSheets sont envoyées immédiatement.
+gsheets_append_batch = 20
+
+#: int: Délai (en secondes) avant un nouvel essai d'envoi des lignes
+#: ajoutées en différé aux GSheets, en cas d'erreur.
+gsheets_append_retry = 60
+
+#: int: Quota de requêtes aux API Google (Sheets, Docs, Drive) par
+#: minute, commun à tout le bot (voir :func:`.gsheets.request`).
+#: À adapter au quota du projet Google Cloud.
+google_api_quota = 60
+
+#: int: Nombre maximal de requêtes aux API Google envoyées d'affilée,
+#: avant de devoir attendre le quota (taille du seau de jetons).
+google_api_burst = 10
+
+#: int: Nombre maximal de nouvels essais d'une requête aux API Google
+#: en cas d'erreur temporaire (quota dépassé, erreur serveur...).
+google_api_max_retries = 5
+
+#: float: Délai (en secondes) de base de l'attente avant un nouvel
+#: essai, doublé à chaque essai (attente aléatoire entre 0 et ce délai).
+google_api_backoff = 1
+
+#: float: Délai (en secondes) maximal de l'attente avant un nouvel essai.
+google_api_backoff_max = 32
+
+#: float: Latence artificielle (en secondes) de chaque requête à
+#: l'émulateur local des API Google (voir :mod:`.gsheets_emulator`).
+google_emulator_latency = 0.1
+
+#: float: Probabilité (entre 0 et 1) qu'une requête à l'émulateur local
+#: des API Google échoue comme si le quota était dépassé (code 429).
+google_emulator_error_rate = 0
+
+#: int: Quota de requêtes par minute de l'émulateur local des API
+#: Google, au-delà duquel les requêtes échouent (code 429).
+#: ``0`` : pas de quota.
+google_emulator_quota = 0
+
+#: str: Dossier du cache local des fichiers téléchargés depuis Google
+#: Drive (emojis et icône du serveur, voir
+#: :func:`.gsheets.download_files`), relatif au dossier de lancement du
+#: bot. ``None`` : pas de cache.
+drive_cache_dir = "drive_cache"
+
+#: int: Nombre maximal de fichiers téléchargés en même temps depuis
+#: Google Drive (voir :func:`.gsheets.download_files`).
+drive_download_concurrency = 4
+
+#: int: Nombre maximal de joueurs modifiés en même temps par ``!sync``
+#: (voir :func:`.sync.modif_joueurs`).
+sync_concurrency = 8
+
 
 #: list[str]: Mots-clés (en minuscule) utilisables (quelque soit la casse)
 #: pour arrêter une commande en cours d'exécution.
@@ -173,6 +233,91 @@ refills_one = ["forgeron", "rebouteux", "divin"]
 refills_divins = ["divin"]
 
 
+#: bool: Si ``True`` et que la base de données est PostgreSQL,
+#: :meth:`.bdd.base.TableMeta.find_nearest` présélectionne les entrées
+#: candidates en SQL (extension ``pg_trgm``, index trigrammes créés à
+#: la connexion sur les clés primaires textuelles et les colonnes
+#: déclarées avec ``info={"fuzzy_index": True}``) au lieu de parcourir
+#: toute la table. Sans effet avec un autre moteur, sur une colonne
+#: non indexée, ou si les extensions ne peuvent être installées
+#: (recherche sur toute la table).
+fuzzy_sql_prefilter = False
+
+#: int: Nombre maximal d'entrées candidates présélectionnées en SQL
+#: (si :attr:`fuzzy_sql_prefilter`), évaluées ensuite comme d'habitude.
+fuzzy_sql_candidates = 50
+
+#: .bdd.fuzzy.Scorer: Calcul des scores utilisé par défaut par
+#: :meth:`.bdd.base.TableMeta.find_nearest`. Si ``None`` (défaut),
+#: ratio de :class:`difflib.SequenceMatcher`. Par exemple,
+#: ``lgrez.bdd.fuzzy.LCSScorer(compat=True)`` donne les mêmes résultats
+#: en écartant les entrées trop différentes par un calcul vectorisé.
+fuzzy_scorer = None
+
+#: bool: Si ``True``, les requêtes asynchrones
+#: (:attr:`.bdd.base.TableMeta.aquery`) sont exécutées dans un thread
+#: dédié à la base de données, sans bloquer la boucle asyncio du bot.
+#: Si ``False`` (défaut), elles sont exécutées directement dans
+#: :attr:`.config.session`. Pris en compte par :func:`.bdd.connect`
+#: (sans effet avec une base SQLite en mémoire).
+async_db = False
+
+#: int: Nombre de connexions à la base de données conservées ouvertes
+#: (``pool_size`` de :func:`sqlalchemy.create_engine`). Pris en compte
+#: par :func:`.bdd.connect` (sans effet avec SQLite).
+db_pool_size = 5
+
+#: int: Nombre de connexions supplémentaires pouvant être ouvertes
+#: temporairement au-delà de :attr:`db_pool_size` (``max_overflow``,
+#: sans effet avec SQLite).
+db_max_overflow = 10
+
+#: int: Durée (en secondes) après laquelle une connexion est renouvelée
+#: (``pool_recycle``), ``-1`` pour jamais. Utile si le serveur ferme
+#: les connexions inactives.
+db_pool_recycle = -1
+
+#: bool: Si ``True`` (défaut), vérifie que chaque connexion est toujours
+#: valide avant de l'utiliser (``pool_pre_ping`` : une requête de plus
+#: par utilisation, mais pas d'erreur après une coupure du serveur).
+db_pool_pre_ping = True
+
+#: bool: Si ``True``, chaque commande utilise sa propre session
+#: (:obj:`.config.session` désigne alors, pendant l'exécution d'une
+#: commande, une session ouverte et fermée pour cette commande : voir
+#: :func:`.bdd.base.open_command_session`). Sinon (défaut), une seule
+#: session pour tout le bot. Pris en compte par :func:`.bdd.connect`.
+db_session_per_command = False
+
+#: int: Nombre maximal d'entrées conservées par table dans le cache de
+#: :meth:`.bdd.base.TableMeta.get_cached` (recherches par clé primaire :
+#: :meth:`.bdd.Joueur.from_member`, :meth:`.bdd.Role.default`...).
+#: ``0`` pour désactiver le cache. Pris en compte par :func:`.bdd.connect`.
+entity_cache_size = 500
+
+#: float: Durée (en secondes) pendant laquelle une entrée lue est
+#: servie par le cache de :meth:`.bdd.base.TableMeta.get_cached`.
+#: Les modifications faites par le bot sont répercutées immédiatement,
+#: celles faites par un autre moyen (SQL brut, autre processus...) au
+#: plus tard après ce délai. ``0`` pour désactiver le cache.
+entity_cache_ttl = 300
+
+#: int: Nombre d'exécutions d'une même forme de requête SQL au cours
+#: d'une commande à partir duquel elle est signalée comme suspecte
+#: (requête répétée pour chaque élément d'une liste, problème « N+1 » :
+#: voir :meth:`.bdd.query_stats.CommandStats.n_plus_one`).
+sql_stats_n_plus_one = 5
+
+#: int: Nombre de requêtes les plus lentes conservées pour chaque
+#: exécution de commande (voir :mod:`.bdd.query_stats`).
+sql_stats_slowest = 3
+
+#: float: Intervalle (en secondes) entre deux résumés des requêtes SQL
+#: exécutées par les commandes, postés dans :attr:`.config.Channel.logs`
+#: (voir :meth:`.LGBot.log_sql_stats`). ``0`` pour désactiver.
+sql_stats_log_period = 6 * 3600
+
+
 #: bool: Indique si le bot est prêt (:meth:`.LGBot.on_ready` appelé)
 #: N'est pas concu pour être changé manuellement.
 is_ready = False
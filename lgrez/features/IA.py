@@ -377,7 +377,7 @@ class GestionIA(commands.Cog):
             mess = await tools.wait_for_message_here(ctx)
             trigger = mess.content
 
-        trigs = Trigger.find_nearest(trigger, col=Trigger.trigger)
+        trigs = Trigger.find_nearest(trigger, col=Trigger.trigger, limit=1)
         if not trigs:
             await ctx.send("Rien trouvé.")
             return
@@ -504,7 +504,8 @@ async def trigger_roles(message, sensi=0.8):
         - ``False`` -- sinon
     """
     roles = Role.find_nearest(message.content, col=Role.nom,
-                              filtre=(Role.actif.is_(True)), sensi=sensi)
+                              filtre=(Role.actif.is_(True)), sensi=sensi,
+                              limit=1)
 
     if roles:       # Au moins un trigger trouvé à cette sensi
         await message.channel.send(embed=roles[0][0].embed)
@@ -513,7 +514,8 @@ async def trigger_roles(message, sensi=0.8):
     return False
 
 
-async def trigger_reactions(message, chain=None, sensi=0.7, debug=False):
+async def trigger_reactions(message, chain=None, sensi=0.7, debug=False,
+                            trigger=None):
     """Règle d'IA : réaction à partir de la table :class:`.bdd.Reaction`.
 
     Args:
@@ -524,6 +526,8 @@ async def trigger_reactions(message, chain=None, sensi=0.7, debug=False):
             :meth:`.bdd.base.TableMeta.find_nearest`).
         debug (bool): si ``True``, affiche les erreurs lors de
             l'évaluation des messages (voir :func:`.tools.eval_accols`).
+        trigger (.bdd.Trigger): déclencheur déjà trouvé (si précisé,
+            ``chain`` n'est pas recherché).
 
     Trouve l'entrée la plus proche de ``chain`` dans la table
     :class:`.bdd.Reaction` ; si il contient des accolades, évalue le
@@ -534,9 +538,13 @@ async def trigger_reactions(message, chain=None, sensi=0.7, debug=False):
           ``> sensi``) et qu'une réponse a été envoyée
         - ``False`` -- sinon
     """
-    if not chain:                   # Si pas précisé,
-        chain = message.content         # contenu de message
-    trigs = Trigger.find_nearest(chain, col=Trigger.trigger, sensi=sensi)
+    if trigger:                     # Déclencheur déjà trouvé
+        trigs = [(trigger, 1)]
+    else:
+        if not chain:                   # Si pas précisé,
+            chain = message.content         # contenu de message
+        trigs = Trigger.find_nearest(chain, col=Trigger.trigger,
+                                      sensi=sensi, limit=1)
 
     if trigs:       # Au moins un trigger trouvé à cette sensi
         trig = trigs[0][0]                  # Meilleur trigger (score max)
@@ -574,7 +582,10 @@ async def trigger_sub_reactions(message, sensi=0.9, debug=False):
     Appelle :func:`trigger_reactions(bot, message, mot, sensi, debug)
     <.trigger_reactions>` pour tous les mots ``mot`` composant
     ``message.content`` (mots de plus de 4 lettres, testés des plus
-    longs aux plus courts).
+    longs aux plus courts) pour lesquels un déclencheur existe (tous
+    les mots sont recherchés en une fois, voir
+    :meth:`.bdd.base.TableMeta.find_nearest_many`, et le déclencheur
+    trouvé est transmis tel quel).
 
     Args:
         message (~discord.Message`): message auquel réagir.
@@ -590,13 +601,20 @@ async def trigger_sub_reactions(message, sensi=0.9, debug=False):
     """
     mots = message.content.split(" ")
     if len(mots) > 1:       # Si le message fait plus d'un mot
-        for mot in sorted(mots, key=lambda m: -len(m)):
-            # On parcourt les mots du plus long au plus court
-            if len(mot) > 4:        # on élimine les mots de liaison
-                if await trigger_reactions(message, chain=mot,
-                                           sensi=sensi, debug=debug):
-                    # Si on trouve une sous-rect (à 0.9)
-                    return True
+        # On parcourt les mots du plus long au plus court,
+        # en éliminant les mots de liaison
+        mots = [mot for mot in sorted(mots, key=lambda m: -len(m))
+                if len(mot) > 4]
+        # Recherche groupée : tous les mots en une passe
+        nearests = Trigger.find_nearest_many(mots, col=Trigger.trigger,
+                                             sensi=sensi, limit=1)
+        for mot, nearest in zip(mots, nearests):
+            if nearest and await trigger_reactions(
+                message, chain=mot, sensi=sensi, debug=debug,
+                trigger=nearest[0][0],
+            ):
+                # Si on trouve une sous-rect (à 0.9)
+                return True
 
     return False
 
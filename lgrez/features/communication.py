@@ -21,16 +21,68 @@ from lgrez.features import gestion_actions
 from lgrez.features.sync import transtype
 
 
-def _joueur_repl(mtch):
-    """Remplace @... par la mention d'un joueur, si possible"""
-    nearest = Joueur.find_nearest(mtch.group(1),
-                                  col=Joueur.nom, sensi=0.8)
-    if nearest:
-        joueur = nearest[0][0]
+#: Motif des mentions de joueurs (``@Prénom Nom``, jusqu'à 4 mots)
+_JOUEUR_MENTION = re.compile(r"@([\w-]+(?: [\w-]+){0,3})")
+
+#: Motif des mentions de rôles (``@nom_du_role``)
+_ROLE_MENTION = re.compile(r"@(\w+)")
+
+#: Motif des emojis (``:nom:``)
+_EMOJI = re.compile(r":(\w+):")
+
+#: Découpage d'un fragment de texte (espaces au début, texte, espaces
+#: à la fin)
+_STRIP = re.compile(r"(\s*)(.*?)(\s*)")
+
+
+def _mention_candidates(nom):
+    """Noms pouvant être mentionnés par @nom, du plus long au plus court
+
+    ``"Prénom Nom bla"`` -> ``["Prénom Nom bla", "Prénom Nom", "Prénom"]``
+    """
+    mots = nom.split(" ")
+    return [" ".join(mots[:n]) for n in range(len(mots), 0, -1)]
+
+
+def _nearest_joueurs(texts):
+    """Recherche groupée des joueurs mentionnés dans des textes
+
+    Renvoie ``{nom mentionné: joueur le plus proche ou None}``, pour
+    tous les noms pouvant être mentionnés (voir
+    :func:`_mention_candidates`), en une seule recherche (voir
+    :meth:`.bdd.base.TableMeta.find_nearest_many`)
+    """
+    noms = list({candidat for text in texts
+                 for mtch in _JOUEUR_MENTION.finditer(text)
+                 for candidat in _mention_candidates(mtch.group(1))})
+    nearests = Joueur.find_nearest_many(noms, col=Joueur.nom, sensi=0.8,
+                                        limit=1)
+    return {nom: nearest[0][0] if nearest else None
+            for nom, nearest in zip(noms, nearests)}
+
+
+def _joueur_repl(mtch, joueurs=None):
+    """Remplace @... par la mention d'un joueur, si possible
+
+    Le nom mentionné le plus long correspondant à un joueur est
+    remplacé (``@Prénom Nom bla`` -> ``<@id> bla``).
+    ``joueurs`` : résultats éventuels de :func:`_nearest_joueurs`
+    """
+    nom = mtch.group(1)
+    for candidat in _mention_candidates(nom):
+        if joueurs is not None and candidat in joueurs:
+            joueur = joueurs[candidat]
+        else:
+            nearest = Joueur.find_nearest(candidat, col=Joueur.nom,
+                                          sensi=0.8, limit=1)
+            joueur = nearest[0][0] if nearest else None
+        if not joueur:
+            continue
         try:
-            return joueur.member.mention
+            mention = joueur.member.mention
         except ValueError:
-            pass
+            continue
+        return mention + nom[len(candidat):]
     return mtch.group(0)
 
 def _role_repl(mtch):
@@ -50,6 +102,54 @@ def _emoji_repl(mtch):
     return mtch.group()
 
 
+def _render_lore(content):
+    """Convertit le contenu d'un document (voir
+    :func:`.gsheets.get_doc_content`) en texte formaté pour Discord"""
+    # Joueurs mentionnés : recherchés en une fois
+    joueurs = _nearest_joueurs(_text for (_text, _) in content)
+    joueur_repl = functools.partial(_joueur_repl, joueurs=joueurs)
+
+    formatted_text = ""
+    for (_text, style) in content:
+        _text = _text.replace("\v", "\n").replace("\f", "\n")
+
+        # Espaces/newlines au début/fin de _text ==> à part
+        pref, text, suff = _STRIP.fullmatch(_text).group(1, 2, 3)
+
+        if not text:    # espaces/newlines uniquement
+            formatted_text += pref + suff
+            continue
+
+        # Remplacement des mentions
+        if "@" in text:
+            text = _JOUEUR_MENTION.sub(joueur_repl, text)
+            text = _ROLE_MENTION.sub(_role_repl, text)
+        if ":" in text:
+            text = _EMOJI.sub(_emoji_repl, text)
+
+        if style.get("bold"):
+            text = tools.bold(text)
+        if style.get("italic"):
+            text = tools.ital(text)
+        if style.get("strikethrough"):
+            text = tools.strike(text)
+        if style.get("smallCaps"):
+            text = text.upper()
+        if (wff := style.get("weightedFontFamily")):
+            if wff["fontFamily"] in ["Consolas", "Courier New"] :
+                text = tools.code(text)
+        if (link := style.get("link")):
+            if (url := link.get("url")):
+                if "://" not in text:
+                    text = text + f" (<{url}>)"
+        elif style.get("underline"):    # ne pas souligner si lien
+            text = tools.soul(text)
+
+        formatted_text += pref + text + suff
+
+    return formatted_text
+
+
 async def _create_annoncemort_embed(ctx, victime=None):
     joueur = await tools.boucle_query_joueur(ctx, victime,
                                              "Qui est la victime ?")
@@ -438,6 +538,9 @@ class Communication(commands.Cog):
 
         Si ``quoi == "cond"``, déclenche aussi les actions liées au mot
         des MJs (:attr:`.bdd.ActionTrigger.mot_mjs`).
+
+        Les votes en attente d'ajout aux GSheets (voir
+        :func:`.gsheets.append_later`) sont envoyés au préalable.
         """
         # Différences plot cond / maire
         if quoi == "cond":
@@ -470,6 +573,16 @@ class Communication(commands.Cog):
         if ts > datetime.datetime.now():        # hier
             ts -= datetime.timedelta(days=1)
 
+        # Votes en attente d'ajout aux GSheets (données brutes)
+        try:
+            await gsheets.flush_appends()
+        except Exception as exc:
+            await ctx.send(
+                "Attention : votes / actions en attente non ajoutés aux "
+                f"GSheets (`{type(exc).__name__}: {exc}`), nouvel essai "
+                f"dans {config.gsheets_append_retry} secondes."
+            )
+
         log = f"!plot {quoi} (> {ts}) :"
         query = Utilisation.query.filter(
             Utilisation.etat == UtilEtat.validee,
@@ -788,46 +901,9 @@ class Communication(commands.Cog):
 
         await ctx.send("Récupération du document...")
         async with ctx.typing():
-            content = gsheets.get_doc_content(doc_id)
-
-        formatted_text = ""
-        for (_text, style) in content:
-            _text = _text.replace("\v", "\n").replace("\f", "\n")
-
-            # Espaces/newlines au début/fin de _text ==> à part
-            motif = re.fullmatch(r"(\s*)(.*?)(\s*)", _text)
-            pref, text, suff = motif.group(1, 2, 3)
-
-            if not text:    # espaces/newlines uniquement
-                formatted_text += pref + suff
-                continue
-
-            # Remplacement des mentions
-            for i in (3, 2, 1, 0):
-                text = re.sub(rf"@([\w-]+( [\w-]+){{{i}}})",
-                              _joueur_repl, text)
-            text = re.sub(r"@(\w+)", _role_repl, text)
-            text = re.sub(r":(\w+):", _emoji_repl, text)
-
-            if style.get("bold"):
-                text = tools.bold(text)
-            if style.get("italic"):
-                text = tools.ital(text)
-            if style.get("strikethrough"):
-                text = tools.strike(text)
-            if style.get("smallCaps"):
-                text = text.upper()
-            if (wff := style.get("weightedFontFamily")):
-                if wff["fontFamily"] in ["Consolas", "Courier New"] :
-                    text = tools.code(text)
-            if (link := style.get("link")):
-                if (url := link.get("url")):
-                    if "://" not in text:
-                        text = text + f" (<{url}>)"
-            elif style.get("underline"):    # ne pas souligner si lien
-                text = tools.soul(text)
-
-            formatted_text += pref + text + suff
+            content = await gsheets.fetch_doc_content(doc_id)
+
+        formatted_text = _render_lore(content)
 
         await ctx.send("————————————————————")
         await tools.send_blocs(ctx, formatted_text)
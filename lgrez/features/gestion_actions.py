@@ -32,6 +32,7 @@ def add_action(joueur, base, cooldown=0, charges=None, active=True):
         action = Action(joueur=joueur, base=base, cooldown=cooldown,
                         charges=charges, active=active)
         action.add()
+        config.session.flush()      # Identifiant (si unité de travail)
 
     # Ajout tâche ouverture
     if action.base.trigger_debut == ActionTrigger.temporel:
@@ -97,7 +98,7 @@ async def open_action(action):
     # Vérification cooldown
     if action.cooldown > 0:                 # Action en cooldown
         action.cooldown = action.cooldown - 1
-        config.session.commit()
+        action.update()
         await tools.log(
             f"{action} : en cooldown, exit "
             "(reprogrammation si temporel)."
@@ -223,7 +224,7 @@ async def open_action(action):
 
     await message.add_reaction(config.Emoji.action)
 
-    config.session.commit()
+    action.update()
 
 
 async def close_action(action):
@@ -290,7 +291,7 @@ async def close_action(action):
                   commande=f"!open {action.id}",
                   action=action).add()
 
-    config.session.commit()
+    action.update()
 
 
 def get_actions(quoi, trigger, heure=None):
@@ -331,4 +332,4 @@ def get_actions(quoi, trigger, heure=None):
         else:       # close / remind
             criteres &= Action.base.has(heure_fin=heure)
 
-    return Action.query.filter(criteres).all()
+    return Action.query.with_profile("actions").filter(criteres).all()
@@ -42,7 +42,7 @@ class Informations(commands.Cog):
         if not role:
             roles = Role.query.filter_by(actif=True).order_by(Role.nom).all()
         else:
-            roles = Role.find_nearest(role, col=Role.nom)
+            roles = Role.find_nearest(role, col=Role.nom, limit=1)
             if not roles:
                 await ctx.send(f"Rôle \"{role}\" non trouvé.")
                 return
@@ -75,7 +75,7 @@ class Informations(commands.Cog):
         if not camp:
             camps = Camp.query.filter_by(public=True).order_by(Camp.nom).all()
         else:
-            camps = Camp.find_nearest(camp, col=Camp.nom)
+            camps = Camp.find_nearest(camp, col=Camp.nom, limit=1)
             if not camps:
                 await ctx.send(f"Camp \"{camp}\" non trouvé.")
                 return
@@ -121,11 +121,11 @@ class Informations(commands.Cog):
             nomrole: le rôle qu'on cherche (doit être un slug ou un nom
                 de rôle valide)
         """
-        roles = Role.find_nearest(nomrole)
+        roles = Role.find_nearest(nomrole, limit=1)
         if roles:
             role = roles[0][0]
         else:
-            roles = Role.find_nearest(nomrole, col=Role.nom)
+            roles = Role.find_nearest(nomrole, col=Role.nom, limit=1)
             if roles:
                 role = roles[0][0]
             else:
@@ -151,7 +151,7 @@ class Informations(commands.Cog):
         Messenger, vu que tout est accessible par commandes.
         """
         member = ctx.author
-        joueur = Joueur.from_member(member)
+        joueur = Joueur.from_member(member, profile="actions")
 
         reacts = []
         r = "––– MENU –––\n\n"
@@ -211,7 +211,7 @@ class Informations(commands.Cog):
         l'instant (plus de charges, déclenchées automatiquement...)
         """
         member = ctx.author
-        joueur = Joueur.from_member(member)
+        joueur = Joueur.from_member(member, profile="actions")
         r = ""
 
         r += f"Ton rôle actuel : {tools.bold(joueur.role.nom_complet)}\n"
@@ -4,11 +4,10 @@
 
 """
 
-import asyncio
-
 from lgrez import config
 from lgrez.blocs import tools, env, gsheets
 from lgrez.bdd import Joueur, Role, Camp, Statut
+from lgrez.features import sync
 
 
 async def new_channel(member):
@@ -41,6 +40,10 @@ async def register_on_tdb(joueur):
 
     Peut être personnalisé à un autre système de gestion des joueurs.
 
+    Seuls les en-têtes et la colonne ID sont lus (voir
+    :func:`.sync.load_tdb`) : le joueur est ajouté sur la ligne
+    suivant le dernier joueur inscrit.
+
     Args:
         joueur (.bdd.Joueur): le joueur à enregistrer.
 
@@ -48,86 +51,23 @@ async def register_on_tdb(joueur):
         Fonction asynchrone depuis la version 2.2.2.
     """
     SHEET_ID = env.load("LGREZ_TDB_SHEET_ID")
-    workbook = await gsheets.connect(SHEET_ID)
-    sheet = await workbook.worksheet(config.tdb_main_sheet)
-    values = await sheet.get_all_values()           # Liste de listes
-
-    head = values[config.tdb_header_row - 1]
-    # Ligne d'en-têtes (noms des colonnes), - 1 car indexé à 0
-
-    id_index = gsheets.a_to_index(config.tdb_id_column)
-    pk = head[id_index]
-    if pk != Joueur.primary_col.key:
-        raise ValueError(
-            "Tableau de bord : la cellule "
-            "`config.tdb_id_column` / `config.tdb_header_row` = "
-            f"`{config.tdb_id_column}{config.tdb_header_row}` "
-            f"vaut `{pk}` au lieu de la clé primaire de la table "
-            f"`Joueur`, `{Joueur.primary_col.key}` !"
-        )
-
-    mstart, mstop = config.tdb_main_columns
-    main_indexes = range(gsheets.a_to_index(mstart),
-                         gsheets.a_to_index(mstop) + 1)
-    # Indices des colonnes à remplir
-    cols = {}
-    for index in main_indexes:
-        col = head[index]
-        if col in Joueur.attrs:
-            cols[col] = Joueur.attrs[col]
-        else:
-            raise ValueError(
-                f"Tableau de bord : l'index de la zone principale "
-                f"`{col}` n'est pas une colonne de la table `Joueur` !"
-                " (voir `lgrez.config.main_indexes` / "
-                "`lgrez.config.tdb_header_row`)"
-            )
-
-    tstart, tstop = config.tdb_tampon_columns
-    tampon_indexes = range(gsheets.a_to_index(tstart),
-                           gsheets.a_to_index(tstop) + 1)
-
-    TDB_tampon_index = {}
-    for index in tampon_indexes:
-        col = head[index].partition("_")[2]
-        if col in cols:
-            TDB_tampon_index[col] = index
-        else:
-            raise ValueError(
-                f"Tableau de bord : l'index de zone tampon `{head[index]}` "
-                f"réfère à la colonne `{col}` (partie suivant le premier "
-                f"underscore), qui n'est pas une colonne de la zone "
-                "principale ! (voir `lgrez.config.tampon_indexes` / "
-                "`lgrez.config.main_indexes`)"
-            )
-
-    plv = config.tdb_header_row         # Première Ligne Vide
-    # (si tableau vide, suit directement le header, - 1 pour l'indexage)
-    for i_row, row in enumerate(values):
-        # On parcourt les lignes du TDB
-        if i_row < config.tdb_header_row:
-            # Ligne avant le header / le header (car décalage de 1)
-            continue
-
-        if row[id_index].isdigit():
-            # Si il y a un vrai ID dans la colonne ID
-            plv = i_row + 1
-
-    modifs = [gsheets.Modif(plv, id_index, joueur.discord_id)]
-    for index in main_indexes:
-        val = getattr(joueur, head[index])
-        modifs.append(gsheets.Modif(plv, index, val))
-    for index in tampon_indexes:
-        val = getattr(joueur, head[index].partition("_")[2])
+    sheet = await gsheets.get_worksheet(SHEET_ID, config.tdb_main_sheet)
+    # Disposition compilée et colonne ID seulement (pas les joueurs)
+    layout, *_ = await sync.load_tdb(sheet, SHEET_ID, rows=False,
+                                     priority=gsheets.Priority.inscription)
+
+    plv = layout.last_row + 1           # Première Ligne Vide
+    modifs = [gsheets.Modif(plv, layout.id_index, joueur.discord_id)]
+    for index, col in zip(layout.main_indexes, layout.main_cols):
+        modifs.append(gsheets.Modif(plv, index, getattr(joueur, col)))
+    for index, col in zip(layout.tampon_indexes, layout.tampon_cols):
         # Colonnes "tampon_<col>" ==> <col>
-        modifs.append(gsheets.Modif(plv, index, val))
+        modifs.append(gsheets.Modif(plv, index, getattr(joueur, col)))
 
-    try:
-        await gsheets.update(sheet, *modifs)
-    except gsheets.ConnectionError:
-        await joueur.private_chan.send("Petit problème, on réessaie...")
-        await asyncio.sleep(10)
-        await gsheets.update(sheet, *modifs)
+    # Erreurs temporaires (quota, réseau) : voir gsheets.request
+    await gsheets.update(sheet, *modifs,
+                         priority=gsheets.Priority.inscription)
+    layout.last_row = plv
 
 
 # Routine d'inscription (fonction appellée par la commande !co)
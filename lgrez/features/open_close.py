@@ -9,11 +9,11 @@ import datetime
 from discord.ext import commands
 
 from lgrez import config
-from lgrez.blocs import tools
+from lgrez.blocs import tools, gsheets
 from lgrez.features import gestion_actions
 from lgrez.bdd import (Joueur, Action, BaseAction, Tache, CandidHaro,
                        Utilisation, CandidHaroType, ActionTrigger,
-                       UtilEtat, Vote)
+                       UtilEtat, Vote, unit_of_work)
 
 
 async def recup_joueurs(quoi, qui, heure=None):
@@ -57,7 +57,8 @@ async def recup_joueurs(quoi, qui, heure=None):
             else:
                 critere &= Joueur.votant_village.is_(True)
 
-        return Joueur.query.filter(critere).all()
+        return await Joueur.aquery.with_profile("actions").filter(
+            critere).all()
         # Liste des joueurs répondant aux critères
 
     elif qui == "action":
@@ -87,7 +88,7 @@ async def recup_joueurs(quoi, qui, heure=None):
         # [Joueur.query.get(action.player_id) for action in actions]}
 
     elif qui.isdigit():
-        action = Action.query.get(int(qui))
+        action = await Action.aquery.get(int(qui))
         if not action:
             raise commands.BadArgument(f"Pas d'action d'ID = {qui}")
         if not action.active:
@@ -214,18 +215,29 @@ class OpenClose(commands.Cog):
             + str_joueurs
         )
 
-        # Création utilisations & envoi messages
-        for joueur in joueurs:
-            chan = joueur.private_chan
-
-            if isinstance(qui, Vote):
+        # Création utilisations : tous les votes ouverts en un commit
+        # (actions et utilisations chargées d'avance, voir recup_joueurs)
+        if isinstance(qui, Vote):
+            chans = {}
+            utils = []
+            ts_open = datetime.datetime.now()
+            for joueur in joueurs:
                 action = joueur.action_vote(qui)
                 if action.is_open:      # Sécurité : action ouverte depuis
                     continue
-                util = Utilisation(action=action)
-                util.add()
-                util.open()
+                utils.append(Utilisation(action=action,
+                                         etat=UtilEtat.ouverte,
+                                         ts_open=ts_open))
+                chans[joueur] = joueur.private_chan
+            if utils:
+                with unit_of_work():
+                    Utilisation.add(*utils)
+        else:
+            chans = {joueur: joueur.private_chan for joueur in joueurs}
 
+        # Envoi messages (actions : chacune enregistrée à son ouverture,
+        # pour ne pas annuler des actions déjà annoncées en cas d'erreur)
+        for joueur, chan in chans.items():
             if qui == Vote.cond:
                 message = await chan.send(
                     f"{tools.montre()}  Le vote pour le condamné du "
@@ -267,25 +279,27 @@ class OpenClose(commands.Cog):
                 for action in joueurs[joueur]:
                     await gestion_actions.open_action(action)
 
-        config.session.commit()
-
         # Actions déclenchées par ouverture
         if isinstance(qui, Vote):
-            for action in Action.query.filter(Action.base.has(
-                    BaseAction.trigger_debut == ActionTrigger.open(qui))):
+            actions = await Action.aquery.filter(Action.base.has(
+                BaseAction.trigger_debut == ActionTrigger.open(qui)
+            )).all()
+            for action in actions:
                 await gestion_actions.open_action(action)
 
-            for action in Action.query.filter(Action.base.has(
-                    BaseAction.trigger_fin == ActionTrigger.open(qui))):
+            actions = await Action.aquery.filter(Action.base.has(
+                BaseAction.trigger_fin == ActionTrigger.open(qui)
+            )).all()
+            for action in actions:
                 await gestion_actions.close_action(action)
 
         # Réinitialise haros/candids
         items = []
         if qui == Vote.cond:
-            items = CandidHaro.query.filter_by(
+            items = await CandidHaro.aquery.filter_by(
                 type=CandidHaroType.haro).all()
         elif qui == Vote.maire:
-            items = CandidHaro.query.filter_by(
+            items = await CandidHaro.aquery.filter_by(
                 type=CandidHaroType.candidature).all()
         if items:
             CandidHaro.delete(*items)
@@ -349,6 +363,10 @@ class OpenClose(commands.Cog):
         Une sécurité empêche de fermer un vote ou une action
         qui n'est pas en cours.
 
+        Les votes et actions en attente d'ajout aux GSheets (voir
+        :func:`.gsheets.append_later`) sont envoyés à la fin de la
+        commande.
+
         Cette commande a pour vocation première d'être exécutée
         automatiquement par des tâches planifiées.
         Elle peut être utilisée à la main, mais attention à ne pas
@@ -379,18 +397,27 @@ class OpenClose(commands.Cog):
             + str_joueurs
         )
 
-        # Fermeture utilisations et envoi messages
-        for joueur in joueurs:
-            chan = joueur.private_chan
+        # Fermeture utilisations : tous les votes fermés en un commit
+        # (empêche de voter), avant l'envoi des messages
+        if isinstance(qui, Vote):
+            nom_cibles = {}
+            with unit_of_work():
+                for joueur in joueurs:
+                    action = joueur.action_vote(qui)
+                    if not action.is_open:  # Sécurité : fermée depuis
+                        continue
+                    util = action.utilisation_ouverte
+                    nom_cibles[joueur] = (util.cible.nom if util.cible
+                                          else "*non défini*")
+                    util.close()
+            chans = {joueur: joueur.private_chan for joueur in nom_cibles}
+        else:
+            chans = {joueur: joueur.private_chan for joueur in joueurs}
 
+        # Envoi messages (actions : chacune enregistrée à sa fermeture)
+        for joueur, chan in chans.items():
             if isinstance(qui, Vote):
-                action = joueur.action_vote(qui)
-                if not action.is_open:      # Sécurité : action fermée depuis
-                    continue
-                util = joueur.action_vote(qui).utilisation_ouverte
-                nom_cible = util.cible.nom if util.cible else "*non défini*"
-
-                util.close()        # update direct pour empêcher de voter
+                nom_cible = nom_cibles[joueur]
 
             if qui == Vote.cond:
                 await chan.send(
@@ -420,16 +447,18 @@ class OpenClose(commands.Cog):
                     )
                     await gestion_actions.close_action(action)
 
-        config.session.commit()
-
         # Actions déclenchées par fermeture
         if isinstance(qui, Vote):
-            for action in Action.query.filter(Action.base.has(
-                  BaseAction.trigger_debut == ActionTrigger.close(qui))):
+            actions = await Action.aquery.filter(Action.base.has(
+                BaseAction.trigger_debut == ActionTrigger.close(qui)
+            )).all()
+            for action in actions:
                 await gestion_actions.open_action(action)
 
-            for action in Action.query.filter(Action.base.has(
-                  BaseAction.trigger_fin == ActionTrigger.close(qui))):
+            actions = await Action.aquery.filter(Action.base.has(
+                BaseAction.trigger_fin == ActionTrigger.close(qui)
+            )).all()
+            for action in actions:
                 await gestion_actions.close_action(action)
 
         # Programme prochaine ouverture
@@ -442,6 +471,16 @@ class OpenClose(commands.Cog):
             else:
                 Tache(timestamp=ts, commande=f"!open {qui.name}").add()
 
+        # Votes / actions en attente d'ajout aux GSheets (données brutes)
+        try:
+            await gsheets.flush_appends()
+        except Exception as exc:
+            await ctx.send(
+                "Attention : votes / actions en attente non ajoutés aux "
+                f"GSheets (`{type(exc).__name__}: {exc}`), nouvel essai "
+                f"dans {config.gsheets_append_retry} secondes."
+            )
+
 
     @commands.command()
     @tools.mjs_only
@@ -698,14 +737,15 @@ class OpenClose(commands.Cog):
         await tools.log(r, code=True)
 
         # Drop (éventuel) et (re-)création actions de vote
-        Action.query.filter_by(base=None).delete()
-        actions = []
-        for joueur in Joueur.query.all():
-            for vote in Vote:
-                actions.append(Action(joueur=joueur, vote=vote))
-
-        Tache.add(*taches)      # On enregistre et programme le tout !
-        Action.add(*actions)
+        with unit_of_work():        # Un seul commit pour le tout
+            Action.query.filter_by(base=None).delete()
+            actions = []
+            for joueur in Joueur.query.all():
+                for vote in Vote:
+                    actions.append(Action(joueur=joueur, vote=vote))
+
+            Tache.add(*taches)      # On enregistre et programme le tout !
+            Action.add(*actions)
 
         await ctx.send(
             f"C'est tout bon ! (détails dans {config.Channel.logs.mention})"
@@ -195,6 +195,83 @@ class Special(commands.Cog):
             await config.bot.process_commands(ctx.message)
 
 
+    @commands.command()
+    @tools.mjs_only
+    async def indexes(self, ctx):
+        """Utilisation des index de la base de données (COMMANDE MJ)
+
+        Liste les index existants (avec leur nombre d'utilisations et
+        leur taille si la base est PostgreSQL) et les index qui
+        pourraient manquer (voir :func:`.bdd.base.index_usage`).
+        """
+        usage, candidates = bdd.base.index_usage()
+
+        r = "Index existants :\n"
+        for index in usage:
+            r += (f" - {index.table}.{index.name} "
+                  f"({', '.join(index.columns)})")
+            if index.scans is not None:
+                r += f" : {index.scans} parcours, {index.size // 1024} ko"
+            r += "\n"
+
+        r += "\nIndex candidats :\n"
+        for table, columns, raison in candidates:
+            cols = f" ({', '.join(columns)})" if columns else ""
+            r += f" - {table}{cols} : {raison}\n"
+        if not candidates:
+            r += " (aucun)\n"
+
+        await tools.send_code_blocs(ctx, r)
+
+
+    @commands.command()
+    @tools.mjs_only
+    async def sqlstats(self, ctx, *, commande=None):
+        """Requêtes SQL exécutées par les commandes (COMMANDE MJ)
+
+        Args:
+            commande: commande dont afficher les dernières exécutions
+                en détail (requêtes les plus lentes, requêtes répétées
+                suspectes), ou ``reset`` pour remettre à zéro les
+                statistiques.
+
+        Sans argument, affiche pour chaque commande le nombre
+        d'exécutions et de requêtes et leur durée depuis le démarrage
+        du bot, ainsi que le détail des dernières exécutions ayant
+        répété une même requête (problème « N+1 », voir
+        :mod:`.bdd.query_stats`).
+        """
+        query_stats = bdd.query_stats
+        if commande == "reset":
+            query_stats.reset()
+            await ctx.send("Statistiques des requêtes remises à zéro.")
+            return
+
+        if commande:
+            commande = commande.lstrip(config.bot.command_prefix)
+            executions = [stats for stats in query_stats.recent
+                          if stats.name == commande]
+            if not executions:
+                await ctx.send(f"Aucune exécution récente de `!{commande}`.")
+                return
+            r = f"Dernières exécutions de !{commande} :\n"
+        else:
+            totals = query_stats.totals()
+            if not totals:
+                await ctx.send("Aucune requête mesurée.")
+                return
+            r = query_stats.format_totals(totals) + "\n"
+            executions = [stats for stats in query_stats.recent
+                          if stats.n_plus_one()]
+            r += "\nDernières exécutions avec requêtes répétées :\n"
+            if not executions:
+                r += " (aucune)\n"
+
+        for stats in executions:
+            r += query_stats.format_stats(stats)
+        await tools.send_code_blocs(ctx, r)
+
+
     @one_command.do_not_limit
     @commands.command()
     @tools.private
@@ -461,14 +538,14 @@ class Special(commands.Cog):
         n_emojis = 0
         if structure["emojis"]["drive"]:
             folder_id = structure["emojis"]["folder_path_or_id"]
-            for file in gsheets.get_files_in_folder(folder_id):
-                if file["extension"] != "png":
-                    continue
-                name = file["name"].removesuffix(".png")
-                if tools.emoji(name, must_be_found=False):
-                    continue
-                data = gsheets.download_file(file["file_id"])
-                await _create_emoji(name, data)
+            files = await gsheets.get_files_in_folder_async(folder_id)
+            files = [file for file in files if file["extension"] == "png"
+                     and not tools.emoji(file["name"].removesuffix(".png"),
+                                         must_be_found=False)]
+            # Téléchargements en parallèle (fichiers en cache réutilisés)
+            datas = await gsheets.download_files(files)
+            for file, data in zip(files, datas):
+                await _create_emoji(file["name"].removesuffix(".png"), data)
                 n_emojis += 1
         else:
             root = structure["emojis"]["folder_path_or_id"]
@@ -490,7 +567,7 @@ class Special(commands.Cog):
             icon_data = None
         elif structure["icon"]["drive"]:
             file_id = structure["icon"]["png_path_or_id"]
-            icon_data = gsheets.download_file(file_id)
+            icon_data, = await gsheets.download_files([{"file_id": file_id}])
         else:
             with open(structure["icon"]["png_path_or_id"], "rb") as fh:
                 icon_data = fh.read()
@@ -7,6 +7,8 @@ modifications décidées via le Tableau de bord et rôles
 
 import asyncio
 import datetime
+import functools
+import itertools
 import time
 import traceback
 
@@ -180,6 +182,10 @@ def _compare_items(existants, new, table, cols, primary_key, bc_cols=None):
     return res
 
 
+# Valeurs brutes interprétées comme nulles
+_NULL_VALUES = (None, '', 'None', 'none', 'Null', 'null')
+
+
 def transtype(value, cst):
     """Utilitaire : caste une donnée brute d'un GSheet selon sa colonne.
 
@@ -214,63 +220,93 @@ def transtype(value, cst):
             évaluée ``None`` et la colonne n'est pas *nullable*)
         TypeError: type de colonne non pris en charge.
     """
+    return _converter(cst)(value)
+
+
+def compile_converter(cst, preload=False):
+    """Compile la conversion des données brutes d'un GSheet d'une colonne.
+
+    Renvoie une fonction équivalente à ``transtype(value, cst)`` (mêmes
+    valeurs et erreurs, voir :func:`transtype`), dont le type de
+    conversion est déterminé une fois pour toutes : à utiliser pour
+    convertir de nombreuses cellules d'une même colonne.
+
+    Args:
+        cst (:class:`sqlalchemy.schema.Column` | :class:`.bdd.base.TableMeta`\
+            | :class:`sqlalchemy.orm.RelationshipProperty`): colonne, table ou
+            relationship (many-to-one) associée.
+        preload (bool): dans le cas d'une table ou d'une relation, si
+            ``True``, toutes les entrées de la table (liée) sont chargées
+            maintenant (une requête), et les valeurs sont converties
+            sans accès à la base ; sinon, chaque valeur est recherchée
+            par :meth:`~.bdd.base.TableMeta.get_cached`. La fonction
+            renvoyée ne tient alors pas compte des entrées ajoutées ou
+            supprimées ensuite : à recompiler à chaque utilisation.
+
+    Returns:
+        Callable[[Any], Any]: La fonction de conversion.
+
+    Raises:
+        TypeError: type de colonne non pris en charge (lors de la
+            conversion, comme :func:`transtype`).
+    """
     if isinstance(cst, sqlalchemy.orm.RelationshipProperty):
         # Relationship
         table = cst.entity.entity   # SQLAlchemy black magic
-        if not isinstance(value, table.primary_col.type.python_type):
+        where = f"la colonne '{cst.key}'"
+        type_error = (f" (one-to-many avec '{table.__name__}', de clé "
+                      f"primaire '{table.primary_col.name}', type "
+                      f"'{table.primary_col.type}')")
+        not_found = (f"instance de '{table.__name__}' correspondante "
+                     "non trouvée.")
+    elif isinstance(cst, bdd.base.TableMeta):
+        # Table
+        table = cst
+        where = f"la table '{table.__name__}'"
+        type_error = (f", de clé primaire '{table.primary_col.name}', type "
+                      f"'{table.primary_col.type}')")
+        not_found = "instance correspondante non trouvée."
+    else:
+        return _compile_column_converter(cst)
+
+    python_type = table.primary_col.type.python_type
+    if preload:
+        lookup = {item.primary_key: item for item in table.query.all()}.get
+    else:
+        lookup = table.get_cached
+
+    def convert(value):
+        if not isinstance(value, python_type):
             raise ValueError(
-                f"Valeur '{value}' incorrecte pour la colonne '{cst.key}' "
-                f"(one-to-many avec '{table.__name__}', de clé primaire "
-                f"'{table.primary_col.name}', type '{table.primary_col.type}')"
-            ) from None
-
-        inst = table.query.get(value)
+                f"Valeur '{value}' incorrecte pour {where}{type_error}"
+            )
+        inst = lookup(value)
         if inst is None:
             raise ValueError(
-                f"Valeur '{value}' incorrecte pour la colonne '{cst.key}': "
-                f"instance de '{table.__name__}' correspondante non trouvée."
+                f"Valeur '{value}' incorrecte pour {where}: {not_found}"
             )
-
         return inst
 
-    elif isinstance(cst, bdd.base.TableMeta):
-        # Table
-        if not isinstance(value, cst.primary_col.type.python_type):
-            raise ValueError(
-                f"Valeur '{value}' incorrecte pour la table '{cst.__name__}', "
-                f"de clé primaire '{cst.primary_col.name}', type "
-                f"'{cst.primary_col.type}')"
-            ) from None
+    return convert
 
-        inst = cst.query.get(value)
-        if inst is None:
-            raise ValueError(
-                f"Valeur '{value}' incorrecte pour la table '{cst.__name__}': "
-                f"instance correspondante non trouvée."
-            )
 
-        return inst
+def _compile_column_converter(cst):
+    """Fonction de conversion d'une colonne propre (voir
+    :func:`compile_converter`)"""
+    if isinstance(cst.type, sqlalchemy.Enum):
+        members = cst.type.python_type.__members__
 
-    # Colonne propre
-    try:
-        if value in (None, '', 'None', 'none', 'Null', 'null'):
-            if not cst.nullable:
-                if cst.default is None:
-                    raise ValueError
-                else:
-                    return cst.default.arg
-            return None
-        if isinstance(cst.type, sqlalchemy.Enum):
-            enum = cst.type.python_type
+        def cast(value):
             try:
-                return enum[value]
-            except KeyError:
+                return members[value]
+            except (KeyError, TypeError):
                 raise ValueError
-        if isinstance(cst.type, sqlalchemy.String):
-            return str(value)
-        if isinstance(cst.type, sqlalchemy.Integer):
-            return int(value)
-        if isinstance(cst.type, sqlalchemy.Boolean):
+    elif isinstance(cst.type, sqlalchemy.String):
+        cast = str
+    elif isinstance(cst.type, sqlalchemy.Integer):
+        cast = int
+    elif isinstance(cst.type, sqlalchemy.Boolean):
+        def cast(value):
             if (value in {True, 1}
                 or (isinstance(value, str)
                     and value.lower() in {'true', 'vrai', '1'})):
@@ -281,23 +317,327 @@ def transtype(value, cst):
                 return False
             else:
                 raise ValueError
-        if isinstance(cst.type, sqlalchemy.Time):       # hh:mm
+    elif isinstance(cst.type, sqlalchemy.Time):       # hh:mm
+        def cast(value):
             try:
                 h, m, _ = value.split(':')
             except ValueError:
                 h, m = value.split(':')
             return datetime.time(hour=int(h), minute=int(m))
+    else:
+        def cast(value):
+            raise TypeError(
+                f"Unhandled type for column '{cst.key}': '{cst.type}'"
+            )
+
+    # Valeur nulle : None si nullable, sinon valeur par défaut éventuelle
+    null_ok = cst.nullable or cst.default is not None
+    null = None if cst.nullable or not null_ok else cst.default.arg
+    error = (f"incorrecte pour la colonne '{cst.key}' (type '{cst.type}'/"
+             f"{'NOT NULL' if not cst.nullable else ''})")
+
+    def convert(value):
+        try:
+            if value in _NULL_VALUES:
+                if not null_ok:
+                    raise ValueError
+                return null
+            return cast(value)
+        except (ValueError, TypeError):
+            raise ValueError(f"Valeur '{value}' {error}") from None
+
+    return convert
+
+
+# Fonctions de conversion de transtype (sans préchargement)
+_converter = functools.lru_cache(maxsize=128)(compile_converter)
+
+
+class TDBLayout:
+    """Disposition compilée de la feuille principale du Tableau de bord.
+
+    Index des colonnes, colonnes de :class:`.bdd.Joueur` associées et
+    fonctions de conversion, déduits des en-têtes et de la
+    configuration (:attr:`.config.tdb_header_row`,
+    :attr:`.config.tdb_id_column`, :attr:`.config.tdb_main_columns`,
+    :attr:`.config.tdb_tampon_columns`).
+
+    Compilée une seule fois par révision des en-têtes : utiliser
+    :func:`get_tdb_layout` plutôt que d'instancier directement.
+
+    Args:
+        key (tuple): révision (feuille, configuration et en-têtes),
+            voir :func:`get_tdb_layout`.
+        id_head (str): en-tête de la colonne ID.
+        main_head (list[str]): en-têtes de la zone principale.
+        tampon_head (list[str]): en-têtes de la zone tampon.
+
+    Attributes:
+        key (tuple): révision compilée.
+        id_index (int): index de la colonne ID (0 = colonne A).
+        main_indexes (range): index des colonnes de la zone principale.
+        main_cols (list[str]): colonnes de :class:`.bdd.Joueur`
+            correspondantes, dans l'ordre.
+        tampon_indexes (range): index des colonnes de la zone tampon.
+        tampon_cols (list[str]): colonnes de :class:`.bdd.Joueur`
+            correspondantes (en-têtes ``tampon_<col>``), dans l'ordre.
+        tampon_index (dict[str, int]): colonne -> index de sa colonne
+            dans la zone tampon.
+        columns (dict[str, Any]): colonne -> colonne ou relation de
+            :class:`.bdd.Joueur` correspondante.
+        converters (dict[str, Callable[[str], Any]]): colonne ->
+            fonction de conversion d'une cellule (voir
+            :func:`compile_converter` ; relations non préchargées, voir
+            :meth:`compile_row_converter`).
+        last_row (int): dernière ligne occupée par un joueur, indexée
+            à 0 (ligne d'en-têtes si aucun joueur), lors de la dernière
+            lecture de la colonne ID.
+
+    Raises:
+        ValueError: en-têtes ne correspondant pas à la table
+            :class:`.bdd.Joueur`.
+    """
+
+    def __init__(self, key, id_head, main_head, tampon_head):
+        """Initializes self."""
+        self.key = key
+        if id_head != Joueur.primary_col.key:
+            raise ValueError(
+                "Tableau de bord : la cellule "
+                "`config.tdb_id_column` / `config.tdb_header_row` = "
+                f"`{config.tdb_id_column}{config.tdb_header_row}` "
+                f"vaut `{id_head}` au lieu de la clé primaire de la table "
+                f"`Joueur`, `{Joueur.primary_col.key}` !"
+            )
+        self.id_index = gsheets.a_to_index(config.tdb_id_column)
+
+        mstart, mstop = config.tdb_main_columns
+        self.main_indexes = range(gsheets.a_to_index(mstart),
+                                  gsheets.a_to_index(mstop) + 1)
+        self.main_cols = list(main_head)
+        self.columns = {}
+        self.converters = {}
+        for col in self.main_cols:
+            if col in Joueur.attrs:
+                self.columns[col] = Joueur.attrs[col]
+                self.converters[col] = compile_converter(Joueur.attrs[col])
+            else:
+                raise ValueError(
+                    f"Tableau de bord : l'index de la zone principale "
+                    f"`{col}` n'est pas une colonne de la table `Joueur` !"
+                    " (voir `lgrez.config.main_indexes` / "
+                    "`lgrez.config.tdb_header_row`)"
+                )
+
+        tstart, tstop = config.tdb_tampon_columns
+        self.tampon_indexes = range(gsheets.a_to_index(tstart),
+                                    gsheets.a_to_index(tstop) + 1)
+        self.tampon_cols = []
+        self.tampon_index = {}
+        for index, head in zip(self.tampon_indexes, tampon_head):
+            col = head.partition("_")[2]
+            if col in self.columns:
+                self.tampon_cols.append(col)
+                self.tampon_index[col] = index
+            else:
+                raise ValueError(
+                    f"Tableau de bord : l'index de zone tampon `{head}` "
+                    f"réfère à la colonne `{col}` (partie suivant le "
+                    "premier underscore), qui n'est pas une colonne de la "
+                    "zone principale ! (voir `lgrez.config.tampon_indexes`"
+                    " / `lgrez.config.main_indexes`)"
+                )
+
+        self.last_row = config.tdb_header_row - 1
+
+    def compile_row_converter(self):
+        """Compile la conversion des lignes de la zone principale.
+
+        Les colonnes propres sont converties par :attr:`converters` ;
+        pour les relations (rôle, camp...), les entrées de la table liée
+        sont chargées maintenant (une requête par table, voir
+        :func:`compile_converter`) : à appeler à chaque synchronisation.
+
+        Returns:
+            Callable[[list], list]: Fonction convertissant une ligne de
+            la zone principale (valeurs dans l'ordre de
+            :attr:`main_cols`).
+        """
+        converters = [
+            compile_converter(self.columns[col], preload=True)
+            if isinstance(self.columns[col],
+                          sqlalchemy.orm.RelationshipProperty)
+            else self.converters[col]
+            for col in self.main_cols
+        ]
+
+        def convert_row(row):
+            return [convert(value)
+                    for convert, value in zip(converters, row)]
+
+        return convert_row
+
+    def __repr__(self):
+        return (f"<TDBLayout: {len(self.main_cols)} colonnes, "
+                f"dernière ligne {self.last_row + 1}>")
+
+
+# Disposition du Tableau de bord compilée (TDBLayout) la plus récente
+_tdb_layout = {"layout": None}
+
+
+def get_tdb_layout(sheet_key, id_head, main_head, tampon_head):
+    """Renvoie la disposition compilée du Tableau de bord.
+
+    La disposition n'est compilée (voir :class:`TDBLayout`) que si
+    les en-têtes, la feuille ou la configuration des colonnes ont
+    changé depuis la dernière compilation.
+
+    Args:
+        sheet_key (str): ID du classeur (``LGREZ_TDB_SHEET_ID``).
+        id_head (str): en-tête de la colonne ID.
+        main_head (list[str]): en-têtes de la zone principale.
+        tampon_head (list[str]): en-têtes de la zone tampon.
+
+    Returns:
+        :class:`.TDBLayout`
+
+    Raises:
+        ValueError: en-têtes ne correspondant pas à la table
+            :class:`.bdd.Joueur`.
+    """
+    key = (sheet_key, config.tdb_main_sheet, config.tdb_header_row,
+           config.tdb_id_column, tuple(config.tdb_main_columns),
+           tuple(config.tdb_tampon_columns), id_head, tuple(main_head),
+           tuple(tampon_head))
+    layout = _tdb_layout["layout"]
+    if layout is None or layout.key != key:
+        layout = TDBLayout(key, id_head, main_head, tampon_head)
+        _tdb_layout["layout"] = layout
+    return layout
+
+
+def invalidate_tdb_layout():
+    """Oublie la disposition compilée du Tableau de bord.
+
+    Elle sera recompilée à la prochaine lecture (voir
+    :func:`load_tdb`) ; inutile en cas de modification des en-têtes,
+    détectée automatiquement.
+    """
+    _tdb_layout["layout"] = None
+
+
+def _pad(rows, n_rows, width):
+    """Complète une plage renvoyée par l'API (cellules vides omises)"""
+    rows = list(rows) + [[]] * (n_rows - len(rows))
+    return [list(row) + [""] * (width - len(row)) for row in rows]
+
+
+async def load_tdb(sheet, sheet_key, rows=True,
+                   priority=gsheets.Priority.sync):
+    """Lit les colonnes utiles de la feuille principale du TDB.
+
+    Récupère en une requête la colonne ID, ainsi que les zones
+    principale et tampon (ou seulement leurs en-têtes), à partir de la
+    ligne d'en-têtes, et met à jour :attr:`TDBLayout.last_row`.
+
+    Args:
+        sheet (gspread_asyncio.AsyncioGspreadWorksheet): la feuille
+            principale du Tableau de bord.
+        sheet_key (str): ID du classeur (``LGREZ_TDB_SHEET_ID``).
+        rows (bool): si ``False``, ne récupère que les en-têtes des
+            zones principale et tampon.
+        priority (.gsheets.Priority): priorité de la requête (voir
+            :func:`.gsheets.request`).
+
+    Returns:
+        tuple[.TDBLayout, list[list[str]], list[list[str]],
+        list[list[str]]]: La disposition compilée (voir
+        :func:`get_tdb_layout`) et les valeurs de la colonne ID et des
+        zones principale et tampon (complétées par des chaînes vides),
+        la première ligne étant celle des en-têtes.
+
+    Raises:
+        ValueError: en-têtes ne correspondant pas à la table
+            :class:`.bdd.Joueur`.
+    """
+    header_row = config.tdb_header_row
+    mstart, mstop = config.tdb_main_columns
+    tstart, tstop = config.tdb_tampon_columns
+    last = "" if rows else header_row
+    id_values, main_values, tampon_values = await gsheets.request(
+        sheet.batch_get, [
+            f"{config.tdb_id_column}{header_row}:{config.tdb_id_column}",
+            f"{mstart}{header_row}:{mstop}{last}",
+            f"{tstart}{header_row}:{tstop}{last}",
+        ], priority=priority
+    )
+    n_rows = max(len(id_values), len(main_values), len(tampon_values), 1)
+    main_width = gsheets.a_to_index(mstop) + 1 - gsheets.a_to_index(mstart)
+    tampon_width = gsheets.a_to_index(tstop) + 1 - gsheets.a_to_index(tstart)
+    id_values = _pad(id_values, n_rows, 1)
+    main_values = _pad(main_values, n_rows if rows else 1, main_width)
+    tampon_values = _pad(tampon_values, n_rows if rows else 1, tampon_width)
+
+    layout = get_tdb_layout(sheet_key, id_values[0][0], main_values[0],
+                            tampon_values[0])
+    layout.last_row = header_row - 1
+    for offset, (id_cell,) in enumerate(id_values[1:], start=1):
+        if id_cell.isdigit():
+            layout.last_row = header_row - 1 + offset
+
+    return layout, id_values, main_values, tampon_values
+
+
+# Empreintes des lignes du Tableau de bord synchronisées : disposition
+# compilée (TDBLayout) lors de la dernière synchronisation, et
+# ID joueur -> (ligne, empreinte des zones principale et tampon)
+_tdb_fingerprints = {"layout": None, "rows": {}}
+
+
+def invalidate_tdb_fingerprints(discord_id=None):
+    """Oublie les empreintes des lignes du Tableau de bord.
+
+    La prochaine synchronisation (:func:`get_sync`) comparera à
+    nouveau la ligne du joueur concerné (ou toutes les lignes) avec
+    la base de données.
+
+    Appelée automatiquement à chaque modification d'un joueur en base
+    (sauf modification SQL directe ou par un autre processus).
+
+    Args:
+        discord_id (int): ID Discord du joueur dont oublier la ligne
+            (défaut : toutes les lignes).
+    """
+    if discord_id is None:
+        _tdb_fingerprints["rows"].clear()
+    else:
+        _tdb_fingerprints["rows"].pop(discord_id, None)
+
+
+@sqlalchemy.event.listens_for(sqlalchemy.orm.Session, "after_flush")
+def _forget_modified_joueurs(session, flush_context):
+    """Joueurs modifiés en base : lignes du TDB à comparer à nouveau"""
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        if not isinstance(obj, Joueur):
+            continue
+        state = sqlalchemy.inspect(obj)
+        if state.attrs.discord_id.history.deleted:
+            # Clé primaire modifiée : on repart de zéro
+            invalidate_tdb_fingerprints()
+            return
+        invalidate_tdb_fingerprints(state.dict.get("discord_id"))
 
-        raise TypeError(f"Unhandled type for column '{cst.key}': '{cst.type}'")
 
-    except (ValueError, TypeError):
-        raise ValueError(
-            f"Valeur '{value}' incorrecte pour la colonne '{cst.key}' "
-            f"(type '{cst.type}'/{'NOT NULL' if not cst.nullable else ''})"
-        ) from None
+@sqlalchemy.event.listens_for(sqlalchemy.orm.Session, "after_bulk_update")
+@sqlalchemy.event.listens_for(sqlalchemy.orm.Session, "after_bulk_delete")
+def _forget_bulk_joueurs(context):
+    """Modification en masse : joueurs concernés inconnus"""
+    if context.mapper.class_ is Joueur:
+        invalidate_tdb_fingerprints()
 
 
-async def get_sync():
+async def get_sync(full=False):
     """Récupère les modifications en attente sur le TDB.
 
     Charge les données du Tableau de bord (variable d'environment
@@ -307,6 +647,19 @@ async def get_sync():
     Supprime les joueurs en base absents du Tableau de bord, lève une
     erreur dans le cas inverse, n'applique aucune autre modification.
 
+    Seules les colonnes utiles (ID, zones principale et tampon) sont
+    récupérées, en une requête. Les lignes dont le contenu n'a pas
+    changé depuis une synchronisation où elles correspondaient à la
+    base (même empreinte) sont ignorées sans être converties ni
+    comparées, sauf si le joueur a été modifié en base entre-temps
+    (voir :func:`invalidate_tdb_fingerprints`). Toutes les lignes sont
+    comparées si les en-têtes ou la configuration des colonnes ont
+    changé.
+
+    Args:
+        full (bool): si ``True``, compare toutes les lignes (oublie
+            les empreintes enregistrées).
+
     Returns:
         list[.TDBModif]: La liste des modifications à apporter
 
@@ -316,116 +669,83 @@ async def get_sync():
     # RÉCUPÉRATION INFOS GSHEET ET VÉRIFICATIONS
 
     SHEET_ID = env.load("LGREZ_TDB_SHEET_ID")
-    workbook = await gsheets.connect(SHEET_ID)
-    sheet = await workbook.worksheet(config.tdb_main_sheet)
-    values = await sheet.get_all_values()         # Liste de listes
-
-    head = values[config.tdb_header_row - 1]
-    # Ligne d'en-têtes (noms des colonnes), - 1 car indexé à 0
-
-    id_index = gsheets.a_to_index(config.tdb_id_column)
-    pk = head[id_index]
-    if pk != Joueur.primary_col.key:
-        raise ValueError(
-            "Tableau de bord : la cellule "
-            "`config.tdb_id_column` / `config.tdb_header_row` = "
-            f"`{config.tdb_id_column}{config.tdb_header_row}` "
-            f"vaut `{pk}` au lieu de la clé primaire de la table "
-            f"`Joueur`, `{Joueur.primary_col.key}` !"
-        )
+    sheet = await gsheets.get_worksheet(SHEET_ID, config.tdb_main_sheet)
+    layout, id_values, main_values, tampon_values = await load_tdb(
+        sheet, SHEET_ID
+    )
+    header_row = config.tdb_header_row
+    n_rows = len(id_values)
 
-    mstart, mstop = config.tdb_main_columns
-    main_indexes = range(gsheets.a_to_index(mstart),
-                         gsheets.a_to_index(mstop) + 1)
-    # Indices des colonnes à remplir
-    cols = {}
-    for index in main_indexes:
-        col = head[index]
-        if col in Joueur.attrs:
-            cols[col] = Joueur.attrs[col]
-        else:
-            raise ValueError(
-                f"Tableau de bord : l'index de la zone principale "
-                f"`{col}` n'est pas une colonne de la table `Joueur` !"
-                " (voir `lgrez.config.main_indexes` / "
-                "`lgrez.config.tdb_header_row`)"
-            )
-
-    tstart, tstop = config.tdb_tampon_columns
-    tampon_indexes = range(gsheets.a_to_index(tstart),
-                           gsheets.a_to_index(tstop) + 1)
-
-    TDB_tampon_index = {}
-    for index in tampon_indexes:
-        col = head[index].partition("_")[2]
-        if col in cols:
-            TDB_tampon_index[col] = index
-        else:
-            raise ValueError(
-                f"Tableau de bord : l'index de zone tampon `{head[index]}` "
-                f"réfère à la colonne `{col}` (partie suivant le premier "
-                f"underscore), qui n'est pas une colonne de la zone "
-                "principale ! (voir `lgrez.config.tampon_indexes` / "
-                "`lgrez.config.main_indexes`)"
-            )
+    # Nouvelle disposition : toutes les lignes sont à comparer
+    if full or layout is not _tdb_fingerprints["layout"]:
+        invalidate_tdb_fingerprints()
+        _tdb_fingerprints["layout"] = layout
+    fingerprints = _tdb_fingerprints["rows"]
 
-    # CONVERSION INFOS GSHEET EN PSEUDO-UTILISATEURS
+    # LIGNES DU TDB À COMPARER
 
-    joueurs_TDB = []    # Joueurs tels qu'actuellement dans le TDB
-    ids_TDB = []        # discord_ids des différents joueurs du TDB
     rows_TDB = {}       # Lignes ou sont les différents joueurs du TDB
+    to_check = {}       # ID -> (ligne, valeurs, empreinte) à comparer
 
-    for i_row, row in enumerate(values):
-        # On parcourt les lignes du TDB
-        if i_row < config.tdb_header_row:
-            # Ligne avant le header / le header (car décalage de 1)
-            continue
-
-        id_cell = row[id_index]
+    for offset in range(1, n_rows):
+        # On parcourt les lignes du TDB après le header
+        id_cell = id_values[offset][0]
         if not id_cell.isdigit():
             # La cellule ne contient pas un ID ==> skip
             continue
 
         id = int(id_cell)
-        # Construction dictionnaire correspondant à l'utilisateur
-        joueur_TDB = {head[index]: transtype(row[index], cols[head[index]])
-                      for index in main_indexes}
-        joueur_TDB[pk] = id
-        joueurs_TDB.append(joueur_TDB)
-        ids_TDB.append(id)
+        i_row = header_row - 1 + offset     # Indexé à 0
+        row = main_values[offset]
+        fingerprint = hash((tuple(row), tuple(tampon_values[offset])))
         rows_TDB[id] = i_row
+        if fingerprints.get(id) != (i_row, fingerprint):
+            to_check[id] = (i_row, row, fingerprint)
+
+    # COMPARAISON AVEC LES JOUEURS EN BASE
+
+    ids_BDD = {id for (id,) in Joueur.query.with_entities(Joueur.discord_id)}
+    for id in ids_BDD - rows_TDB.keys():
+        # Joueur en base supprimé du TDB
+        Joueur.query.get(id).delete()
+        invalidate_tdb_fingerprints(id)
+
+    for id in rows_TDB:
+        if id not in ids_BDD:   # Joueur du TDB pas en base
+            row = main_values[rows_TDB[id] - header_row + 1]
+            if "nom" in layout.columns:
+                nom = row[layout.main_cols.index("nom")]
+            else:
+                nom = id
+            raise ValueError(f"Joueur `{nom}` hors base : "
+                             "vérifier processus d'inscription")
 
-    # RÉCUPÉRATION UTILISATEURS BDD
-
-    joueurs_BDD = {joueur.discord_id: joueur for joueur in Joueur.query.all()}
-
-    # COMPARAISON
+    if not to_check:
+        return []
 
-    for id, joueur in list(joueurs_BDD.items()):
-        if id not in ids_TDB:
-            # Joueur en base supprimé du TDB
-            del joueurs_BDD[id]
-            joueur.delete()
+    joueurs_BDD = {joueur.discord_id: joueur for joueur in
+                   Joueur.query.filter(Joueur.discord_id.in_(to_check))}
 
+    convert_row = layout.compile_row_converter()
     modifs = []         # modifs à porter au TDB (liste de TDBModifs)
-    for joueur_TDB in joueurs_TDB:              # Différences
-        id = joueur_TDB[pk]
-
-        try:
-            joueur = joueurs_BDD[id]
-        except KeyError:        # Joueur en base pas dans le TDB
-            raise ValueError(f"Joueur `{joueur_TDB['nom']}` hors base : "
-                             "vérifier processus d'inscription") from None
-
-        for col in cols:
-            if getattr(joueur, col) != joueur_TDB[col]:
-                # Si <col> diffère entre TDB et cache,
+    for id, (i_row, row, fingerprint) in to_check.items():
+        joueur = joueurs_BDD[id]
+        joueur_modifs = []
+        for col, value in zip(layout.main_cols, convert_row(row)):
+            if getattr(joueur, col) != value:
+                # Si <col> diffère entre TDB et base,
                 # on ajoute la modif (avec update du tampon)
-                modifs.append(TDBModif(
-                    id=id, col=col, val=joueur_TDB[col],
-                    row=rows_TDB[id], column=TDB_tampon_index[col]
+                joueur_modifs.append(TDBModif(
+                    id=id, col=col, val=value,
+                    row=i_row, column=layout.tampon_index[col]
                 ))
 
+        if joueur_modifs:
+            modifs.extend(joueur_modifs)
+        else:
+            # Ligne synchronisée : ignorée tant qu'elle ne change pas
+            fingerprints[id] = (i_row, fingerprint)
+
     return modifs
 
 
@@ -442,41 +762,72 @@ async def validate_sync(modifs):
     Note:
         Fonction asynchrone depuis la version 2.2.2.
     """
-    SHEET_ID = env.load("LGREZ_TDB_SHEET_ID")
-    workbook = await gsheets.connect(SHEET_ID)    # Tableau de bord
-    sheet = await workbook.worksheet(config.tdb_main_sheet)
+    SHEET_ID = env.load("LGREZ_TDB_SHEET_ID")     # Tableau de bord
+    sheet = await gsheets.get_worksheet(SHEET_ID, config.tdb_main_sheet)
+    # Erreurs temporaires (quota, réseau) : voir gsheets.request
+    await gsheets.update(sheet, *modifs, priority=gsheets.Priority.sync)
 
-    try:
-        await gsheets.update(sheet, *modifs)
-    except gsheets.ConnectionError:
-        await asyncio.sleep(10)
-        await gsheets.update(sheet, *modifs)
 
+def _modif_bdd(joueur_id, modifs):
+    """Enregistre en base les modifications demandées pour un joueur.
 
-async def modif_joueur(joueur_id, modifs, silent=False):
-    """Attribue les modifications demandées au joueur
+    Les modifications (et la mise à jour des actions de rôle) sont
+    enregistrées en un seul commit, ou pas du tout si une erreur
+    survient. Aucun appel à Discord (voir :func:`.bdd.unit_of_work`).
 
     Args:
         joueur_id (int): id Discord du joueur concerné.
         modifs (list[.TDBModif]): liste des modifications à apporter.
-        silent (bool): si ``True``, ne notifie pas le joueur des
-            modifications.
 
     Returns:
-        (list[.TDBModif], str): La liste des modifications appliquées
-        et le changelog textuel associé (pour log global).
+        .bdd.Joueur: Le joueur modifié.
 
     Raises:
         ValueError: pas de joueur d'ID ``joueur_id`` en base
-
-    Pour chaque modification dans ``modifs``, applique les conséquences
-    adéquates (rôles, nouvelles actions, tâches planifiées...) et
-    informe le joueur si ``silent`` vaut ``False``.
     """
-    joueur = Joueur.query.get(joueur_id)
+    joueur = Joueur.get_cached(joueur_id)
     if not joueur:
         raise ValueError(f"!sync : joueur d'ID {joueur_id} introuvable")
 
+    with bdd.unit_of_work():        # Un seul commit
+        for modif in modifs:
+            if modif.col == "role":                     # Modification rôle
+                for action in joueur.actions_actives:
+                    if action.base in joueur.role.base_actions:
+                        # Suppression anciennes actions de rôle
+                        gestion_actions.delete_action(action)
+
+                for base in modif.val.base_actions:
+                    # Ajout et création des tâches si trigger temporel
+                    gestion_actions.add_action(
+                        joueur=joueur,
+                        base=base,
+                        cooldown=0,
+                        charges=base.base_charges,
+                    )
+
+            setattr(joueur, modif.col, modif.val)
+            # Après, pour pouvoir accéder à l'ancien rôle plus haut
+
+    return joueur
+
+
+async def _modif_discord(joueur, modifs, silent):
+    """Applique dans Discord les modifications d'un joueur.
+
+    Les modifications doivent déjà être enregistrées en base (voir
+    :func:`_modif_bdd`).
+
+    Args:
+        joueur (.bdd.Joueur): le joueur concerné.
+        modifs (list[.TDBModif]): liste des modifications apportées.
+        silent (bool): si ``True``, ne notifie pas le joueur des
+            modifications.
+
+    Returns:
+        (list[.TDBModif], str): La liste des modifications appliquées
+        et le changelog textuel associé (pour log global).
+    """
     member = joueur.member
     chan = joueur.private_chan
 
@@ -537,22 +888,8 @@ async def modif_joueur(joueur_id, modifs, silent=False):
 
         elif modif.col == "role":                       # Modification rôle
             new_role = modif.val
-            for action in joueur.actions_actives:
-                if action.base in joueur.role.base_actions:
-                    # Suppression anciennes actions de rôle
-                    gestion_actions.delete_action(action)
-
-            for base in new_role.base_actions:
-                # Ajout et création des tâches si trigger temporel
-                gestion_actions.add_action(
-                    joueur=joueur,
-                    base=base,
-                    cooldown=0,
-                    charges=base.base_charges,
-                )
-
             # Modification topic chan privé
-            await joueur.private_chan.edit(topic=new_role.nom_complet)
+            await chan.edit(topic=new_role.nom_complet)
 
             if not silent:
                 notif += (
@@ -589,9 +926,6 @@ async def modif_joueur(joueur_id, modifs, silent=False):
                 notif += (f"{af} Tu ne peux maintenant plus utiliser "
                           "aucun pouvoir.\n")
 
-        setattr(joueur, modif.col, modif.val)
-        # Dans tous les cas, on modifie en base
-        # (après, pour pouvoir accéder aux vieux attribus plus haut)
         done.append(modif)
 
     if not silent:
@@ -605,6 +939,124 @@ async def modif_joueur(joueur_id, modifs, silent=False):
     return done, changelog
 
 
+async def modif_joueur(joueur_id, modifs, silent=False):
+    """Attribue les modifications demandées au joueur
+
+    Args:
+        joueur_id (int): id Discord du joueur concerné.
+        modifs (list[.TDBModif]): liste des modifications à apporter.
+        silent (bool): si ``True``, ne notifie pas le joueur des
+            modifications.
+
+    Returns:
+        (list[.TDBModif], str): La liste des modifications appliquées
+        et le changelog textuel associé (pour log global).
+
+    Raises:
+        ValueError: pas de joueur d'ID ``joueur_id`` en base
+
+    Enregistre en base les modifications dans ``modifs`` et leurs
+    conséquences (nouvelles actions, tâches planifiées...) en un seul
+    commit, puis les applique dans Discord (rôles, conséquences de la
+    mort...) et informe le joueur si ``silent`` vaut ``False``.
+    """
+    joueur = _modif_bdd(joueur_id, modifs)
+    return await _modif_discord(joueur, modifs, silent)
+
+
+async def modif_joueurs(modifs_by_joueur, silent=False, on_saved=None):
+    """Attribue les modifications demandées à plusieurs joueurs.
+
+    Les modifications sont d'abord enregistrées en base joueur par
+    joueur, sans appel à Discord (un commit par joueur, voir
+    :func:`.bdd.unit_of_work`) : une erreur pour un joueur n'annule
+    que ses modifications. Elles sont ensuite appliquées dans Discord
+    (comme par :func:`modif_joueur`, dans l'ordre pour chaque joueur),
+    les joueurs étant traités en parallèle, au plus
+    :attr:`.config.sync_concurrency` à la fois. Les limites de débit
+    de l'API Discord sont respectées par ``discord.py``, qui met en
+    attente les requêtes de chaque route (modification des membres, de
+    chaque salon...) le temps nécessaire.
+
+    Args:
+        modifs_by_joueur (dict[int, list[.TDBModif]]): modifications à
+            apporter, par ID Discord de joueur.
+        silent (bool): si ``True``, ne notifie pas les joueurs des
+            modifications.
+        on_saved (Callable[[list[.TDBModif]], Coroutine]): coroutine
+            appelée avec les modifications enregistrées en base
+            (validation sur le Tableau de bord par exemple), pendant
+            leur application dans Discord. Si elle lève une exception,
+            les joueurs continuent d'être traités.
+
+    Returns:
+        (list[.TDBModif], str, dict[int, bool], str | None): Les
+        modifications enregistrées en base, le changelog textuel
+        associé (dans l'ordre de ``modifs_by_joueur``, quel que soit
+        l'ordre de traitement), les IDs des joueurs pour lesquels une
+        erreur est survenue (leur traceback est incluse au changelog),
+        associés à ``True`` si leurs modifications ont été enregistrées
+        en base (erreur dans Discord) et ``False`` sinon, et la
+        traceback de l'erreur levée par ``on_saved`` le cas échéant
+        (incluse à la fin du changelog).
+    """
+    results = {}        # ID joueur -> (modifs, changelog) ou traceback
+    joueurs = {}        # ID joueur -> joueur modifié en base
+    for joueur_id, modifs in modifs_by_joueur.items():
+        try:
+            joueurs[joueur_id] = _modif_bdd(int(joueur_id), modifs)
+        except Exception:
+            # Erreur lors d'une des modifs : aucune enregistrée
+            results[joueur_id] = traceback.format_exc()
+
+    done = [modif for joueur_id in joueurs
+            for modif in modifs_by_joueur[joueur_id]]
+    semaphore = asyncio.Semaphore(config.sync_concurrency)
+
+    async def apply(joueur_id, joueur):
+        async with semaphore:
+            try:
+                result = await _modif_discord(
+                    joueur, modifs_by_joueur[joueur_id], silent
+                )
+            except Exception:
+                # Erreur Discord, modifs enregistrées en base
+                return joueur_id, traceback.format_exc()
+            return joueur_id, result
+
+    # Tâches créées (et donc lancées) dans l'ordre des joueurs
+    tasks = asyncio.gather(*(apply(joueur_id, joueur)
+                             for joueur_id, joueur in joueurs.items()))
+    saved_error = None
+    if on_saved and done:
+        try:
+            await on_saved(done)
+        except Exception:
+            # Modifications déjà enregistrées : on attend les joueurs
+            saved_error = traceback.format_exc()
+
+    results.update(await tasks)
+
+    changelog = ""
+    errors = {}
+    for joueur_id in modifs_by_joueur:
+        result = results[joueur_id]
+        if isinstance(result, str):         # Erreur
+            changelog += result
+            errors[joueur_id] = joueur_id in joueurs
+        else:
+            changelog += result[1]
+
+    if saved_error:
+        changelog += saved_error
+
+    return done, changelog, errors, saved_error
+
+
+# Verrou des conséquences des morts (voir process_mort)
+_mort_lock = {"lock": None}
+
+
 async def process_mort(joueur: Joueur) -> None:
     """Applique les conséquences de la mort d'un joueur.
 
@@ -612,8 +1064,22 @@ async def process_mort(joueur: Joueur) -> None:
         * Archivage des boudoirs devenus inutiles.
 
     Args:
-        joueur (.bdd.Joueur): le joueur qui vient de mourir.
+        joueur (.bdd.Joueur): le joueur qui vient de mourir (statut
+            déjà enregistré en base).
+
+    Les morts sont traitées une à une (même si plusieurs joueurs sont
+    modifiés en parallèle, voir :func:`modif_joueurs`) : plusieurs
+    joueurs d'un même boudoir peuvent mourir en même temps, et
+    l'ouverture des actions enregistre en base.
     """
+    if _mort_lock["lock"] is None:
+        _mort_lock["lock"] = asyncio.Lock()
+    async with _mort_lock["lock"]:
+        await _process_mort(joueur)
+
+
+async def _process_mort(joueur):
+    """Conséquences de la mort d'un joueur (voir :func:`process_mort`)"""
     # Actions à la mort
     for action in joueur.actions_actives:
         if action.base.trigger_debut == ActionTrigger.mort:
@@ -622,9 +1088,7 @@ async def process_mort(joueur: Joueur) -> None:
     # Boudoirs au cimetière
     for boudoir in joueur.boudoirs:
         vivants = [jr for jr in boudoir.joueurs if jr.est_vivant]
-        if len(vivants) <= 2:
-            # <= car le joueur actuel est encore vivant, le changement
-            # d'attribut est fait après
+        if len(vivants) < 2:
             if tools.in_multicateg(boudoir.chan.category,
                                    config.old_boudoirs_category_name):
                 # Boudoir déjà au cimetière
@@ -699,30 +1163,31 @@ class Sync(commands.Cog):
             await ctx.send("Mission aborted.")
             return
 
-        # Go sync
-        done = []
+        # Go sync (joueurs en parallèle dans Discord, validation
+        # des modifications enregistrées en base pendant ce temps)
         async with ctx.typing():
-            for joueur_id, modifs in dic.items():
-                # Joueur dont au moins un attribut a été modifié
-                try:
-                    dn, cgl = await modif_joueur(int(joueur_id),
-                                                 modifs, silent)
-                except Exception:
-                    # Erreur lors d'une des modifs
-                    changelog += traceback.format_exc()
+            _, cgl, errors, valid_error = await modif_joueurs(
+                dic, silent, on_saved=validate_sync
+            )
+            changelog += cgl
+            for joueur_id, saved in errors.items():
+                if saved:
                     await ctx.send(
-                        f"Erreur joueur {joueur_id}, passage au suivant "
-                        "(voir logs pour les détails)"
+                        f"Erreur joueur {joueur_id}, modifications "
+                        "enregistrées mais pas toutes appliquées dans "
+                        "Discord (voir logs pour les détails)"
                     )
                 else:
-                    # Pas d'erreur pour ce joueur, on enregistre
-                    done.extend(dn)
-                    changelog += cgl
-
-            if done:
-                # Au moins une modification a été appliquée
-                config.session.commit()
-                await validate_sync(done)
+                    await ctx.send(
+                        f"Erreur joueur {joueur_id}, modifications non "
+                        "appliquées (voir logs pour les détails)"
+                    )
+            if valid_error:
+                await ctx.send(
+                    "Erreur lors de la validation sur le Tableau de bord, "
+                    "modifications enregistrées (voir logs pour les "
+                    "détails)"
+                )
 
             await tools.log(changelog, code=True)
 
@@ -748,8 +1213,7 @@ class Sync(commands.Cog):
         supprime celles obsolètes.
         """
         # ==== Mise à jour tables ===
-        SHEET_ID = env.load("LGREZ_ROLES_SHEET_ID")
-        workbook = await gsheets.connect(SHEET_ID)    # Rôles et actions
+        SHEET_ID = env.load("LGREZ_ROLES_SHEET_ID")   # Rôles et actions
 
         for table in [Camp, Role, BaseAction]:
             await ctx.send(
@@ -758,7 +1222,9 @@ class Sync(commands.Cog):
             # --- 1 : Récupération des valeurs
             async with ctx.typing():
                 try:
-                    sheet = await workbook.worksheet(table.__tablename__)
+                    sheet = await gsheets.get_worksheet(
+                        SHEET_ID, table.__tablename__
+                    )
                 except gsheets.WorksheetNotFound:
                     raise ValueError(
                         f"!fillroles : feuille '{table.__tablename__}' non "
@@ -766,7 +1232,7 @@ class Sync(commands.Cog):
                         "(`LGREZ_ROLES_SHEET_ID`)"
                     ) from None
 
-                values = await sheet.get_all_values()
+                values = await gsheets.request(sheet.get_all_values)
                 # Liste de liste des valeurs des cellules
 
             # --- 2 : Détermination colonnes à récupérer
@@ -814,10 +1280,17 @@ class Sync(commands.Cog):
 
             # --- 4 : Constrution dictionnaires de comparaison
             existants = {item.primary_key: item for item in table.query.all()}
+            # Conversions compilées (tables liées chargées une fois)
+            converters = {key: compile_converter(col, preload=True)
+                          for key, col in cols.items()}
+            if table == BaseAction:
+                role_converter = compile_converter(Role, preload=True)
+                bc_converters = {key: compile_converter(col, preload=True)
+                                 for key, col in bc_cols.items()}
             new = {}
             for row in values[1:]:
-                args = {key: transtype(row[cols_index[key]], col)
-                        for key, col in cols.items()}
+                args = {key: convert(row[cols_index[key]])
+                        for key, convert in converters.items()}
 
                 if table == BaseAction:
                     # Many-to-many BaseAction <-> Rôle
@@ -825,26 +1298,27 @@ class Sync(commands.Cog):
                     if roles.startswith("#"):
                         args["roles"] = []
                     else:
-                        args["roles"] = [transtype(slug.strip(), Role)
+                        args["roles"] = [role_converter(slug.strip())
                                          for slug in roles.split(",")
                                          if slug]
                     # BaseCiblages
                     new_bcs = []
                     for idx in ciblages_idx:
                         if row[idx["slug"]]:        # ciblage défini
-                            bc_args = {key: transtype(row[idx[key]], col)
-                                       for key, col in bc_cols.items()}
+                            bc_args = {key: convert(row[idx[key]])
+                                       for key, convert
+                                       in bc_converters.items()}
                             new_bcs.append(bc_args)
                     args["base_ciblages"] = new_bcs
 
                 new[args[primary_key]] = args
 
-            # --- 5 : Comparaison et MAJ
-            res = _compare_items(
-                existants, new, table, cols, primary_key,
-                bc_cols=bc_cols if table == BaseAction else None
-            )
-            config.session.commit()
+            # --- 5 : Comparaison et MAJ (un seul commit)
+            with bdd.unit_of_work():
+                res = _compare_items(
+                    existants, new, table, cols, primary_key,
+                    bc_cols=bc_cols if table == BaseAction else None
+                )
 
             await ctx.send(f"> Table {tools.code(table.__name__)} remplie ! "
                            + res.bilan)
@@ -7,6 +7,7 @@ Planification, liste, annulation, exécution de tâches planifiées
 import datetime
 
 from discord.ext import commands
+import sqlalchemy
 
 from lgrez import config
 from lgrez.blocs import env, gsheets, tools
@@ -18,8 +19,9 @@ from lgrez.features import gestion_actions
 async def export_vote(vote, utilisation):
     """Enregistre un vote/les actions résolues dans le GSheet ad hoc.
 
-    Écrit dans le GSheet ``LGREZ_DATA_SHEET_ID``. Peut être écrasé
-    pour une autre implémentation.
+    Écrit dans le GSheet ``LGREZ_DATA_SHEET_ID``, en différé (voir
+    :func:`.gsheets.append_later`) : n'attend pas l'API Google. Peut
+    être écrasé pour une autre implémentation.
 
     Args:
         vote (.bdd.Vote): le vote concerné, ou ``None`` pour une action.
@@ -59,11 +61,9 @@ async def export_vote(vote, utilisation):
         data = [joueur.nom, joueur.role.slug, joueur.camp.slug, recap]
 
     LGREZ_DATA_SHEET_ID = env.load("LGREZ_DATA_SHEET_ID")
-    workbook = await gsheets.connect(LGREZ_DATA_SHEET_ID)
-    sheet = await workbook.worksheet(sheet_name)
     timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    await sheet.append_row([timestamp, *data],
-                           value_input_option="USER_ENTERED")
+    gsheets.append_later(LGREZ_DATA_SHEET_ID, sheet_name,
+                         [timestamp, *data])
 
 
 async def get_cible(ctx, action, base_ciblage, first=None):
@@ -192,7 +192,8 @@ class VoterAgir(commands.Cog):
         La commande peut être utilisée autant que voulu pour changer
         de cible tant que le vote est en cours.
         """
-        joueur = Joueur.from_member(ctx.author)
+        joueur = await Joueur.from_member_async(ctx.author,
+                                                profile="actions")
         try:
             vaction = joueur.action_vote(Vote.cond)
         except RuntimeError:
@@ -210,7 +211,9 @@ class VoterAgir(commands.Cog):
         util = vaction.derniere_utilisation
 
         # Choix de la cible
-        haros = CandidHaro.query.filter_by(type=CandidHaroType.haro).all()
+        haros = await CandidHaro.aquery.filter_by(
+            type=CandidHaroType.haro
+        ).options(sqlalchemy.orm.joinedload(CandidHaro.joueur)).all()
         harotes = [haro.joueur.nom for haro in haros]
         pseudo_bc = _BaseCiblageForVote(
             "Contre qui veux-tu voter ? (vote actuel : "
@@ -220,8 +223,9 @@ class VoterAgir(commands.Cog):
         cible = await get_cible(ctx, vaction, pseudo_bc, cible)
 
         # Test si la cible est sous le coup d'un haro
-        cible_ds_haro = CandidHaro.query.filter_by(
-            joueur=cible, type=CandidHaroType.haro).all()
+        cible_ds_haro = await CandidHaro.aquery.filter_by(
+            _joueur_id=cible.discord_id,
+            type=CandidHaroType.haro).all()
         if not cible_ds_haro:
             mess = await ctx.send(
                 f"{cible.nom} n'a pas (encore) subi ou posté de haro ! "
@@ -246,9 +250,8 @@ class VoterAgir(commands.Cog):
         util.etat = UtilEtat.remplie
         util.update()
 
-        async with ctx.typing():
-            # Écriture dans sheet Données brutes
-            await export_vote(Vote.cond, util)
+        # Écriture dans sheet Données brutes (en différé)
+        await export_vote(Vote.cond, util)
 
         await ctx.send(
             f"Vote contre {tools.bold(cible.nom)} bien pris en compte.\n"
@@ -274,7 +277,8 @@ class VoterAgir(commands.Cog):
         La commande peut être utilisée autant que voulu pour changer de
         cible tant que le vote est en cours.
         """
-        joueur = Joueur.from_member(ctx.author)
+        joueur = await Joueur.from_member_async(ctx.author,
+                                                profile="actions")
         try:
             vaction = joueur.action_vote(Vote.maire)
         except RuntimeError:
@@ -292,8 +296,9 @@ class VoterAgir(commands.Cog):
         util = vaction.derniere_utilisation
 
         # Choix de la cible
-        candids = CandidHaro.query.filter_by(
-            type=CandidHaroType.candidature).all()
+        candids = await CandidHaro.aquery.filter_by(
+            type=CandidHaroType.candidature
+        ).options(sqlalchemy.orm.joinedload(CandidHaro.joueur)).all()
         candidats = [candid.joueur.nom for candid in candids]
         pseudo_bc = _BaseCiblageForVote(
             "Pour qui veux-tu voter ? (vote actuel : "
@@ -303,8 +308,9 @@ class VoterAgir(commands.Cog):
         cible = await get_cible(ctx, vaction, pseudo_bc, cible)
 
         # Test si la cible s'est présentée
-        cible_ds_candid = CandidHaro.query.filter_by(
-            joueur=cible, type=CandidHaroType.candidature).all()
+        cible_ds_candid = await CandidHaro.aquery.filter_by(
+            _joueur_id=cible.discord_id,
+            type=CandidHaroType.candidature).all()
         if not cible_ds_candid:
             mess = await ctx.send(
                 f"{cible.nom} ne s'est pas (encore) présenté(e) ! "
@@ -329,9 +335,8 @@ class VoterAgir(commands.Cog):
         util.etat = UtilEtat.remplie
         util.update()
 
-        async with ctx.typing():
-            # Écriture dans sheet Données brutes
-            await export_vote(Vote.maire, util)
+        # Écriture dans sheet Données brutes (en différé)
+        await export_vote(Vote.maire, util)
 
         await ctx.send(
             f"Vote pour {tools.bold(cible.nom)} bien pris en compte.\n"
@@ -357,7 +362,8 @@ class VoterAgir(commands.Cog):
         La commande peut être utilisée autant que voulu pour changer
         de cible tant que le vote est en cours.
         """
-        joueur = Joueur.from_member(ctx.author)
+        joueur = await Joueur.from_member_async(ctx.author,
+                                                profile="actions")
         try:
             vaction = joueur.action_vote(Vote.loups)
         except RuntimeError:
@@ -395,9 +401,8 @@ class VoterAgir(commands.Cog):
         util.etat = UtilEtat.remplie
         util.update()
 
-        async with ctx.typing():
-            # Écriture dans sheet Données brutes
-            await export_vote(Vote.loups, util)
+        # Écriture dans sheet Données brutes (en différé)
+        await export_vote(Vote.loups, util)
 
         await ctx.send(
             f"Vote contre {tools.bold(cible.nom)} bien pris en compte."
@@ -428,7 +433,8 @@ class VoterAgir(commands.Cog):
         immédiate (Barbier, Licorne...). Le bot mettra dans ce cas un
         message d'avertissement.
         """
-        joueur = Joueur.from_member(ctx.author)
+        joueur = await Joueur.from_member_async(ctx.author,
+                                                profile="actions")
 
         # Vérification rôle actif
         if not joueur.role_actif:
@@ -508,9 +514,8 @@ class VoterAgir(commands.Cog):
             util.etat = UtilEtat.ignoree
         util.update()
 
-        async with ctx.typing():
-            # Écriture dans sheet Données brutes
-            await export_vote(None, util)
+        # Écriture dans sheet Données brutes (en différé)
+        await export_vote(None, util)
 
         # Conséquences si action instantanée
         if action.base.instant:
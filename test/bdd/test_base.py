@@ -1,9 +1,16 @@
+import asyncio
+import contextvars
+import difflib
+import functools
+import tempfile
+import threading
 import unittest
 from unittest import mock
 
 import sqlalchemy
+from sqlalchemy.dialects import postgresql
 
-from lgrez import config
+from lgrez import config, bdd
 from lgrez.bdd import base
 from test import mock_discord, mock_bdd, mock_env
 
@@ -85,22 +92,233 @@ class TestBaseFunctions(unittest.IsolatedAsyncioTestCase):
         self.assertIs(rsp, rsp_patch.return_value)
 
 
-    @mock_env.patch_env(LGREZ_DATABASE_URI="oh!<3")
+    @mock_env.patch_env(LGREZ_DATABASE_URI="postgresql://u:p@oh/db")
     @mock.patch("sqlalchemy.create_engine")
     @mock.patch("sqlalchemy.orm.sessionmaker")
     @mock.patch("lgrez.bdd.base.TableBase")
-    def test_connect(self, tb_patch, sm_patch, ce_patch):
+    @mock.patch("lgrez.bdd.base.migrate")
+    @mock.patch("lgrez.bdd.Action.check_consistency")
+    @mock.patch("lgrez.bdd.query_stats.install")
+    def test_connect(self, qi_patch, cc_patch, mg_patch, tb_patch, sm_patch,
+                     ce_patch):
         """Unit tests for base.connect function."""
         # def connect()
         connect = base.connect
         del config.session, config.engine
         connect()
-        ce_patch.assert_called_once_with("oh!<3", pool_pre_ping=True)
+        ce_patch.assert_called_once_with(
+            "postgresql://u:p@oh/db", pool_pre_ping=True, pool_recycle=-1,
+            pool_size=5, max_overflow=10,
+        )
         self.assertEqual(config.engine, ce_patch.return_value)
+        qi_patch.assert_called_once_with(config.engine)
         tb_patch.metadata.create_all.assert_called_once_with(config.engine)
-        sm_patch.assert_called_once_with(bind=config.engine)
+        mg_patch.assert_called_once_with()
+        cc_patch.assert_called_once_with()
+        sm_patch.assert_called_once_with(bind=config.engine,
+                                         query_cls=base.Query)
         self.assertEqual(config.session, sm_patch.return_value.return_value)
 
+        # pool options, session per command
+        ce_patch.reset_mock()
+        with mock.patch.multiple(config, db_pool_size=2, db_max_overflow=0,
+                                 db_pool_recycle=300, db_pool_pre_ping=False,
+                                 db_session_per_command=True):
+            connect()
+        ce_patch.assert_called_once_with(
+            "postgresql://u:p@oh/db", pool_pre_ping=False, pool_recycle=300,
+            pool_size=2, max_overflow=0,
+        )
+        self.assertIsInstance(config.session, sqlalchemy.orm.scoped_session)
+
+        # SQLite: no pool size
+        ce_patch.reset_mock()
+        with mock_env.patch_env(LGREZ_DATABASE_URI="sqlite://"):
+            connect()
+        ce_patch.assert_called_once_with("sqlite://", pool_pre_ping=True,
+                                         pool_recycle=-1)
+
+    def test_add_missing_columns(self):
+        """Unit tests for base._add_missing_columns function."""
+        # def _add_missing_columns()
+        with mock_bdd.patch_db():
+            # up-to-date tables
+            self.assertEqual(base._add_missing_columns(), [])
+            # column added to the model since table creation
+            with config.engine.begin() as conn:
+                conn.execute(sqlalchemy.text("DROP TABLE camps"))
+                conn.execute(sqlalchemy.text(
+                    "CREATE TABLE camps (slug VARCHAR(32) PRIMARY KEY, "
+                    "nom VARCHAR(32) NOT NULL, "
+                    "description VARCHAR(1000) NOT NULL)"
+                ))
+            with self.assertWarns(UserWarning):     # NOT NULL: not added
+                added = base._add_missing_columns()
+            self.assertEqual(added, [bdd.Camp.__table__.c.emoji])
+            columns = sqlalchemy.inspect(config.engine).get_columns("camps")
+            self.assertIn("emoji", {col["name"] for col in columns})
+
+        # foreign keys of added columns
+        col = bdd.Action.__table__.c._derniere_utilisation_id
+        self.assertEqual(
+            base._column_references(col, postgresql.dialect()),
+            " CONSTRAINT fk_actions_derniere_utilisation REFERENCES "
+            "utilisations (id) ON DELETE SET NULL"
+        )
+        self.assertEqual(base._column_references(
+            bdd.Camp.__table__.c.emoji, postgresql.dialect()), "")
+
+    def test_migrate(self):
+        """Unit tests for base.migrate function."""
+        # def migrate()
+        with mock_bdd.patch_db():
+            # up-to-date database
+            self.assertEqual(base.migrate(), [])
+            # index and column added to the model since table creation
+            with config.engine.begin() as conn:
+                conn.execute(sqlalchemy.text("DROP INDEX ix_taches_timestamp"))
+                conn.execute(sqlalchemy.text(
+                    "ALTER TABLE actions RENAME TO old_actions"
+                ))
+                conn.execute(sqlalchemy.text(
+                    "CREATE TABLE actions (id INTEGER PRIMARY KEY, "
+                    "_joueur_id BIGINT NOT NULL, _base_slug VARCHAR(32), "
+                    "vote VARCHAR(5), active BOOLEAN NOT NULL, "
+                    "cooldown INTEGER NOT NULL, charges INTEGER)"
+                ))
+                conn.execute(sqlalchemy.text("DROP TABLE old_actions"))
+            self.assertEqual(base.migrate(), [
+                "Colonne ajoutée : actions._derniere_utilisation_id",
+                "Index créé : ix_actions__base_slug (actions)",
+                "Index créé : ix_actions__joueur_id (actions)",
+                "Index créé : ix_actions_active (actions)",
+                "Index créé : ix_actions_vote (actions)",
+                "Index créé : ix_taches_timestamp (taches)",
+            ])
+            self.assertEqual(base.migrate(), [])
+            # added column with its foreign key, as in a new database
+            with config.engine.connect() as conn:
+                fks = conn.execute(sqlalchemy.text(
+                    "PRAGMA foreign_key_list(actions)"
+                )).all()
+                sql = conn.execute(sqlalchemy.text(
+                    "SELECT sql FROM sqlite_master WHERE name = 'actions'"
+                )).scalar()
+            self.assertEqual(
+                [fk[2:7] for fk in fks if fk[3] == "_derniere_utilisation_id"],
+                [("utilisations", "_derniere_utilisation_id", "id",
+                  "NO ACTION", "SET NULL")]
+            )
+            self.assertIn("CONSTRAINT fk_actions_derniere_utilisation", sql)
+
+    def test_index_usage(self):
+        """Unit tests for base.index_usage function."""
+        # def index_usage()
+        with mock_bdd.patch_db():
+            usage, candidates = base.index_usage()
+            self.assertIn(
+                base.IndexUsage("utilisations", "ix_utilisations_action_etat",
+                                ("_action_id", "etat"), None, None),
+                usage
+            )
+            # foreign keys not indexed
+            self.assertIn(("ciblages", ("_utilisation_id",),
+                           "clé étrangère non indexée"), candidates)
+            self.assertNotIn("utilisations",
+                             [table for table, _, _ in candidates])
+            # declared index missing
+            with config.engine.begin() as conn:
+                conn.execute(sqlalchemy.text("DROP INDEX ix_joueurs_statut"))
+            usage, candidates = base.index_usage()
+            self.assertIn(("joueurs", ("statut",),
+                           "index déclaré absent de la base"), candidates)
+            self.assertNotIn("ix_joueurs_statut",
+                             [index.name for index in usage])
+
+    async def test_unit_of_work(self):
+        """Unit tests for base.unit_of_work / on_commit functions."""
+        # def unit_of_work()
+        # def on_commit(callback)
+        with mock_bdd.patch_db():
+            commits = []
+            sqlalchemy.event.listen(config.session, "after_commit",
+                                    lambda session: commits.append(1))
+            camps = [bdd.Camp(slug=f"c{i}", nom=f"C{i}") for i in range(3)]
+            callback = mock.Mock(side_effect=lambda: self.assertEqual(
+                [camp.nom for camp in camps], ["C0", "C1", "C2"]
+            ))
+            # outside unit of work: called immediately
+            base.on_commit(callback)
+            callback.assert_called_once_with()
+            callback.reset_mock()
+
+            # one commit, callbacks after it
+            with base.unit_of_work():
+                for camp in camps:
+                    camp.add()
+                    base.on_commit(callback)
+                with base.unit_of_work():           # nested: no effect
+                    bdd.Camp.update()
+                self.assertEqual(commits, [])
+                callback.assert_not_called()
+            self.assertEqual(commits, [1])
+            self.assertEqual(callback.call_count, 3)
+            self.assertIn("nom",
+                          sqlalchemy.inspect(camps[0]).expired_attributes)
+            self.assertEqual(len(bdd.Camp.query.all()), 3)
+
+            # other contexts (commands) not affected
+            other_context = contextvars.copy_context()
+            callback.reset_mock()
+            with base.unit_of_work():
+                bdd.Camp(slug="c3", nom="C3").add()
+                base.on_commit(callback)
+                other_context.run(bdd.Camp.delete, camps[1])
+                self.assertEqual(len(commits), 2)
+            # rolled back on exception
+            with self.assertRaises(RuntimeError):
+                with base.unit_of_work():
+                    bdd.Camp(slug="c4", nom="C4").add()
+                    base.on_commit(callback)
+                    raise RuntimeError
+            callback.assert_called_once_with()
+            slugs = sorted(camp.slug for camp in bdd.Camp.query.all())
+            self.assertEqual(slugs, ["c0", "c2", "c3"])
+
+    async def test_command_session(self):
+        """Unit tests for base.open/close_command_session functions."""
+        # def open_command_session(ctx)
+        # def close_command_session(ctx)
+        async def get_session():
+            return config.session()
+
+        # no session per command
+        with mock_bdd.patch_db():
+            ctx = mock.Mock()
+            self.assertFalse(base.open_command_session(ctx))
+            base.close_command_session(ctx)
+
+        with mock.patch.object(config, "db_session_per_command", True), \
+                mock_bdd.patch_db():
+            shared = config.session()
+            ctx = mock.Mock()
+            self.assertTrue(base.open_command_session(ctx))
+            session = config.session()
+            self.assertIsNot(session, shared)
+            # nested command: same session
+            self.assertFalse(base.open_command_session(mock.Mock()))
+            self.assertIs(config.session(), session)
+            # tasks launched by the command
+            self.assertIs(await asyncio.create_task(get_session()), session)
+
+            config.session.add(bdd.Camp(slug="c", nom="C"))
+            base.close_command_session(ctx)
+            self.assertIs(config.session(), shared)
+            self.assertEqual(bdd.Camp.query.all(), [])      # rolled back
+            self.assertIs(await asyncio.create_task(get_session()), shared)
+            base.close_command_session(ctx)                 # no effect
+            self.assertIs(config.session(), shared)
+
 
 
 class TestTableMeta(unittest.IsolatedAsyncioTestCase):
@@ -168,6 +386,137 @@ class TestTableMeta(unittest.IsolatedAsyncioTestCase):
         self.assertIsNone(query.fset)       # read-only
         self.assertIsNone(query.fdel)
 
+    async def test_aquery(self):
+        """Unit tests for TableMeta.aquery property (no DB thread)."""
+        # @property def aquery(cls)
+        aquery = base.TableMeta.aquery
+        cls = mock.MagicMock(base.TableMeta)
+        query = config.session.query.return_value
+        aq = aquery.fget(cls)
+        self.assertIsInstance(aq, base.AsyncQuery)
+        config.session.query.assert_not_called()        # lazy
+        res = await aq.filter_by(a=1).order_by("b").all()
+        config.session.query.assert_called_once_with(cls)
+        query.filter_by.assert_called_once_with(a=1)
+        query.filter_by.return_value.order_by.assert_called_once_with("b")
+        self.assertEqual(res, query.filter_by.return_value
+                                   .order_by.return_value.all.return_value)
+        self.assertEqual(await aq.get(12), query.get.return_value)
+        query.get.assert_called_once_with(12)
+        self.assertIsNone(aquery.fset)       # read-only
+        self.assertIsNone(aquery.fdel)
+
+    async def test_aquery_db_thread(self):
+        """Unit tests for TableMeta.aquery with config.async_db."""
+        old_session, old_engine = config.session, config.engine
+        tmpdir = tempfile.TemporaryDirectory()
+        uri = f"sqlite:///{tmpdir.name}/test.db"
+        try:
+            # SQLite in memory: no DB thread
+            with mock.patch.object(config, "async_db", True):
+                with self.assertWarns(UserWarning):
+                    with mock_bdd.patch_db():
+                        self.assertFalse(base._db_thread)
+
+                with mock_env.patch_env(LGREZ_DATABASE_URI=uri):
+                    bdd.connect()
+            self.assertTrue(base._db_thread)
+            camps, _ = mock_bdd.add_campsroles(3, 0)
+            config.session.commit()
+
+            # executed in DB thread, results merged in session
+            self.assertTrue((await base.run_in_db_thread(
+                lambda session: threading.current_thread().name
+            )).startswith("lgrez-db"))
+            res = await bdd.Camp.aquery.order_by(bdd.Camp.nom).all()
+            expected = sorted(camps, key=lambda camp: camp.nom)
+            self.assertEqual(res, expected)
+            for camp, exp in zip(res, expected):
+                self.assertIs(camp, exp)        # merged in session
+            self.assertEqual(await bdd.Camp.aquery.filter(
+                bdd.Camp.nom.like("Camp%")).count(), 2)
+            camp = await bdd.Camp.aquery.filter_by(nom="Camp2").one()
+            self.assertIs(camp, camps[2])
+            self.assertEqual(camp.emoji, "emoji2")
+
+            # queries attributed to the current command
+            stats = bdd.query_stats.CommandStats("cmd")
+            token = bdd.query_stats._current.set(stats)
+            try:
+                await bdd.Camp.aquery.filter_by(nom="Camp1").all()
+            finally:
+                bdd.query_stats._current.reset(token)
+            self.assertEqual(stats.queries, 1)
+
+            # get: loaded instance, no query
+            with mock.patch("lgrez.bdd.base.run_in_db_thread") as rdt_patch:
+                self.assertIs(await bdd.Camp.aquery.get("camp1"), camps[1])
+            rdt_patch.assert_not_called()
+
+            # pending changes: executed in session
+            camps[1].nom = "Camp-1"
+            with mock.patch("lgrez.bdd.base.run_in_db_thread") as rdt_patch:
+                self.assertEqual(await bdd.Camp.aquery.filter_by(
+                    nom="Camp-1").all(), [camps[1]])
+            rdt_patch.assert_not_called()
+            config.session.commit()
+            self.assertEqual(await bdd.Camp.aquery.filter_by(
+                nom="Camp-1").all(), [camps[1]])
+
+            # loading profile: loaded relationships merged too
+            joueur = bdd.Joueur(discord_id=1, chan_id_=1, nom="J1")
+            action = bdd.Action(id=1, joueur=joueur, vote=bdd.Vote.cond)
+            util = bdd.Utilisation(id=1, action=action)
+            bdd.Joueur.add(joueur, action, util)
+            config.session.expire_all()
+            res = await bdd.Joueur.aquery.with_profile("actions").all()
+            self.assertEqual(res, [joueur])
+            self.assertIn("_derniere_utilisation",
+                          sqlalchemy.inspect(action).dict)
+            self.assertIs(action.derniere_utilisation, util)
+
+            # instance criteria: primary key read here, no refresh
+            config.session.expire_all()
+            res = await bdd.Action.aquery.filter_by(joueur=joueur,
+                                                    vote=bdd.Vote.cond).all()
+            self.assertEqual(res, [action])
+            self.assertTrue(sqlalchemy.inspect(joueur).expired)
+            with self.assertRaises(ValueError):
+                bdd.Joueur.aquery.filter_by(actions=action)
+            with self.assertRaises(ValueError):
+                bdd.Action.aquery.filter_by(joueur=bdd.Joueur(nom="J2"))
+        finally:
+            base._stop_db_thread()
+            config.session.close()
+            config.engine.dispose()
+            tmpdir.cleanup()
+            config.session, config.engine = old_session, old_engine
+
+    def test_load_options(self):
+        """Unit tests for TableMeta.load_options method."""
+        # def load_options(cls, profile)
+        load_options = base.TableMeta.load_options
+        # unknown profile
+        with self.assertRaises(ValueError):
+            load_options(bdd.Joueur, "bzzt")
+        with self.assertRaises(ValueError):
+            load_options(bdd.Camp, "actions")
+        # selectinload / joinedload depending on relationship
+        cls = mock.Mock(_load_profiles={"pf": ["actions.base", "role"]},
+                        __mapper__=bdd.Joueur.__mapper__,
+                        actions=bdd.Joueur.actions, role=bdd.Joueur.role)
+        with mock.patch("sqlalchemy.orm.selectinload") as sl_patch, \
+                mock.patch("sqlalchemy.orm.joinedload") as jl_patch:
+            options = load_options(cls, "pf")
+        sl_patch.assert_called_once_with(bdd.Joueur.actions)
+        sl_patch.return_value.joinedload.assert_called_once_with(
+            bdd.Action.base)
+        jl_patch.assert_called_once_with(bdd.Joueur.role)
+        self.assertEqual(options, [
+            sl_patch.return_value.joinedload.return_value,
+            jl_patch.return_value,
+        ])
+
     def test_columns(self):
         """Unit tests for TableMeta.columns property."""
         # @property def columns(cls)
@@ -211,265 +560,543 @@ class TestTableMeta(unittest.IsolatedAsyncioTestCase):
         self.assertIsNone(primary_col.fdel)
 
 
-    @mock.patch("difflib.SequenceMatcher")
-    def test_find_nearest(self, sm_patch):
+    def test_find_nearest(self):
         """Unit tests for TableMeta.find_nearest method."""
         # def find_nearest(cls, chaine, col=None, sensi=0.25, filtre=None,
         #                  solo_si_parfait=True, parfaits_only=True,
         #                  match_first_word=False)
         find_nearest = base.TableMeta.find_nearest
         cls = mock.MagicMock(base.TableMeta, __table__=mock.Mock())
-        matcher = sm_patch.return_value
+        cls._slug_caches = {}
+        cls._slug_cache = functools.partial(base.TableMeta._slug_cache, cls)
+        cls.find_nearest_many = functools.partial(
+            base.TableMeta.find_nearest_many, cls
+        )
+        config.session.autoflush = True
+        load = config.session.query.return_value.all
+        ret = []
+
+        def set_values(key, values):
+            # entries: primary key = position in values
+            ret[:] = [mock.Mock(**{key: value}) for value in values]
+            load.return_value = list(enumerate(values))
+            cls._slug_caches.clear()
+
+        cls._get_by_keys.side_effect = lambda keys: {k: ret[k] for k in keys}
+
+        def ratio(a, b):
+            return difflib.SequenceMatcher(a=a, b=b).ratio()
 
         # bad col name
         cls.columns = {"b": 1, "c": 2}
         with self.assertRaises(ValueError) as cm:
             find_nearest(cls, "qwa", col="a")
         self.assertIn("Colonne 'a' invalide", cm.exception.args[0])
-        sm_patch.assert_not_called()
-        cls.query.assert_not_called()
+        config.session.query.assert_not_called()
 
         # bad col type
         with self.assertRaises(ValueError) as cm:
             find_nearest(cls, "qwa", col=mock.Mock(sqlalchemy.Column,
                                                    type=sqlalchemy.Integer()))
         self.assertIn("pas de type textuel", cm.exception.args[0])
-        sm_patch.assert_not_called()
-        cls.query.assert_not_called()
+        config.session.query.assert_not_called()
 
         # no results
-        col = mock.Mock(sqlalchemy.Column, type=sqlalchemy.String())
-        cls.query.all.return_value = []
+        col = mock.Mock(sqlalchemy.Column, key="ab", type=sqlalchemy.String())
+        set_values("ab", [])
         results = find_nearest(cls, "qwa", col=col)
-        sm_patch.assert_called_once()
-        sm_patch.reset_mock()
+        config.session.flush.assert_called_once()
+        config.session.query.assert_called_once_with(cls.primary_col, col)
+        load.assert_called_once()
         cls.query.filter.assert_not_called()
-        cls.query.all.assert_called_once()
-        cls.reset_mock()
+        config.session.reset_mock()
         self.assertEqual(results, [])
 
         # no results, filtre
-        cls.query.filter.return_value.all.return_value = []
+        cls.query.filter.return_value.with_entities.return_value = []
         filtre = mock.Mock()
         results = find_nearest(cls, "qwa", col=col, filtre=filtre)
-        sm_patch.assert_called_once()
-        sm_patch.reset_mock()
         cls.query.filter.assert_called_once_with(filtre)
-        cls.query.all.assert_not_called()
-        cls.query.filter.return_value.all.assert_called_once()
+        cls.query.filter.return_value.with_entities.assert_called_once_with(
+            cls.primary_col
+        )
+        load.assert_not_called()        # cache loaded
         cls.reset_mock()
         self.assertEqual(results, [])
 
         # one result, exact
-        col = mock.Mock(sqlalchemy.Column, key="ab", type=sqlalchemy.String())
-        ret = [mock.Mock(ab="Qwà")]
-        cls.query.all.return_value = ret
-        matcher.ratio.return_value = 1
-        results = find_nearest(cls, "Qwà", col=col)
-        sm_patch.assert_called_once()
-        matcher.set_seq1.assert_called_once_with("qwa")
-        matcher.set_seq2.assert_called_once_with("qwa")
-        sm_patch.reset_mock()
+        set_values("ab", ["Qwà"])
+        results = find_nearest(cls, "QWA", col=col)
         cls.query.filter.assert_not_called()
         self.assertEqual(results, [(ret[0], 1)])
 
         # one result, approx
-        matcher.ratio.return_value = 0.337
-        results = find_nearest(cls, "qwà", col=col)
-        sm_patch.assert_called_once()
-        matcher.set_seq1.assert_called_once_with("qwa")
-        matcher.set_seq2.assert_called_once_with("qwa")
-        sm_patch.reset_mock()
-        cls.query.filter.assert_not_called()
-        self.assertEqual(results, [(ret[0], 0.337)])
+        results = find_nearest(cls, "qwè", col=col)
+        self.assertEqual(results, [(ret[0], ratio("qwe", "qwa"))])
 
         # one result, under sensi
-        matcher.ratio.return_value = 0.337
-        results = find_nearest(cls, "qwà", col=col, sensi=0.5)
-        sm_patch.assert_called_once()
-        matcher.set_seq1.assert_called_once_with("qwa")
-        matcher.set_seq2.assert_called_once_with("qwa")
-        sm_patch.reset_mock()
-        cls.query.filter.assert_not_called()
+        results = find_nearest(cls, "qwè", col=col, sensi=0.7)
         self.assertEqual(results, [])
 
-        # no results, col = default
+        # one result, filtered out
+        cls.query.filter.return_value.with_entities.return_value = []
+        results = find_nearest(cls, "qwa", col=col, filtre=filtre)
+        self.assertEqual(results, [])
+
+        # one result, filtered in
+        cls.query.filter.return_value.with_entities.return_value = [(0,)]
+        results = find_nearest(cls, "qwa", col=col, filtre=filtre)
+        self.assertEqual(results, [(ret[0], 1)])
+
+        # one result, col = default
         cls.primary_col = mock.Mock(sqlalchemy.Column, key="gzzt",
                                     type=sqlalchemy.String())
-        matcher.ratio.return_value = 0.6
-        ret = [mock.Mock(gzzt="Qwà")]
-        cls.query.all.return_value = ret
+        set_values("gzzt", ["Qwà"])
         results = find_nearest(cls, "qwà")
-        sm_patch.assert_called_once()
-        sm_patch.reset_mock()
-        cls.reset_mock()
-        self.assertEqual(results, [(ret[0], 0.6)])
+        self.assertEqual(results, [(ret[0], 1)])
 
         # several results, none exact
-        scores = [
-            ("qwa", 0.6),
-            ("st2", 0.2),
-            ("st3", 0.9),
-        ]
-        ret = [mock.Mock(ab=key) for key, _ in scores]
-        cls.query.all.return_value = ret
-        matcher.ratio.side_effect = [score for _, score in scores]
+        set_values("ab", ["qwaz", "st2", "qwzzzz", "qwa0"])
         results = find_nearest(cls, "qwà", col=col)
-        sm_patch.assert_called_once()
-        matcher.set_seq1.assert_called_once_with("qwa")
-        self.assertEqual(matcher.set_seq2.call_count, 3)
-        matcher.set_seq2.assert_has_calls([mock.call(k) for k, _ in scores])
-        sm_patch.reset_mock()
-        cls.query.filter.assert_not_called()
-        self.assertEqual(results, [(ret[2], 0.9), (ret[0], 0.6)])
+        self.assertEqual(results, [(ret[0], ratio("qwa", "qwaz")),
+                                   (ret[3], ratio("qwa", "qwa0")),
+                                   (ret[2], ratio("qwa", "qwzzzz"))])
 
         # several results, one exact / solo_si_parfait
-        scores = [
-            ("qwa", 0.6),
-            ("st2", 0.2),
-            ("st3", 1),
-            ("st4", 0.7),
-        ]
-        ret = [mock.Mock(ab=key) for key, _ in scores]
-        cls.query.all.return_value = ret
-        matcher.ratio.side_effect = [score for _, score in scores]
-        results = find_nearest(cls, "qwà", col=col)
-        sm_patch.assert_called_once()
-        matcher.set_seq1.assert_called_once_with("qwa")
-        self.assertEqual(matcher.set_seq2.call_count, 3)
-        matcher.set_seq2.assert_has_calls([mock.call(k)
-                                           for k, _ in scores[:3]])
-        sm_patch.reset_mock()
-        cls.query.filter.assert_not_called()
-        self.assertEqual(results, [(ret[2], 1)])
-
-        # several results, one exact / not solo_si_parfait
-        matcher.ratio.side_effect = [score for _, score in scores]
-        results = find_nearest(cls, "qwà", col=col, solo_si_parfait=False)
-        sm_patch.assert_called_once()
-        matcher.set_seq1.assert_called_once_with("qwa")
-        self.assertEqual(matcher.set_seq2.call_count, 4)
-        matcher.set_seq2.assert_has_calls([mock.call(k) for k, _ in scores])
-        sm_patch.reset_mock()
-        cls.query.filter.assert_not_called()
-        self.assertEqual(results, [(ret[2], 1)])
-
-        # several results, one exact / not solo_si_parfait nor parfaits_only
-        matcher.ratio.side_effect = [score for _, score in scores]
-        results = find_nearest(cls, "qwà", col=col, solo_si_parfait=False,
-                               parfaits_only=False)
-        sm_patch.assert_called_once()
-        matcher.set_seq1.assert_called_once_with("qwa")
-        self.assertEqual(matcher.set_seq2.call_count, 4)
-        matcher.set_seq2.assert_has_calls([mock.call(k) for k, _ in scores])
-        sm_patch.reset_mock()
-        cls.query.filter.assert_not_called()
-        self.assertEqual(results, [(ret[2], 1), (ret[3], 0.7), (ret[0], 0.6)])
-
-        # several results, two exacts / solo_si_parfait
-        scores = [
-            ("qwa", 0.6),
-            ("st2", 0.2),
-            ("st3", 1),
-            ("st4", 0.7),
-            ("st5", 1),
-            ("st6", 0.1),
-        ]
-        ret = [mock.Mock(ab=key) for key, _ in scores]
-        cls.query.all.return_value = ret
-        matcher.ratio.side_effect = [score for _, score in scores]
+        set_values("ab", ["qwaz", "st2", "qwa", "qwa0", "qwà"])
         results = find_nearest(cls, "qwà", col=col)
-        sm_patch.assert_called_once()
-        matcher.set_seq1.assert_called_once_with("qwa")
-        self.assertEqual(matcher.set_seq2.call_count, 3)
-        matcher.set_seq2.assert_has_calls([mock.call(k)
-                                          for k, _ in scores[:3]])
-        sm_patch.reset_mock()
-        cls.query.filter.assert_not_called()
         self.assertEqual(results, [(ret[2], 1)])
 
         # several results, two exacts / not solo_si_parfait
-        matcher.ratio.side_effect = [score for _, score in scores]
         results = find_nearest(cls, "qwà", col=col, solo_si_parfait=False)
-        sm_patch.assert_called_once()
-        matcher.set_seq1.assert_called_once_with("qwa")
-        self.assertEqual(matcher.set_seq2.call_count, 6)
-        matcher.set_seq2.assert_has_calls([mock.call(k) for k, _ in scores])
-        sm_patch.reset_mock()
-        cls.query.filter.assert_not_called()
         self.assertEqual(results, [(ret[2], 1), (ret[4], 1)])
 
         # several results, two exacts / not solo_si_parfait nor parfaits_only
-        matcher.ratio.side_effect = [score for _, score in scores]
         results = find_nearest(cls, "qwà", col=col, solo_si_parfait=False,
                                parfaits_only=False)
-        sm_patch.assert_called_once()
-        matcher.set_seq1.assert_called_once_with("qwa")
-        self.assertEqual(matcher.set_seq2.call_count, 6)
-        matcher.set_seq2.assert_has_calls([mock.call(k) for k, _ in scores])
-        sm_patch.reset_mock()
-        cls.query.filter.assert_not_called()
         self.assertEqual(results, [(ret[2], 1), (ret[4], 1),
-                                   (ret[3], 0.7), (ret[0], 0.6)])
-
+                                   (ret[0], ratio("qwa", "qwaz")),
+                                   (ret[3], ratio("qwa", "qwa0"))])
 
         # several results, match_first_word
-        scores = [
-            ("qwa", 0.6, 0.6),
-            ("st2 wiii", 0.2, 1),
-            ("st3", 1, 1),
-            ("st4 ola", 0.7, 0.9),
-            ("st5 ak", 1, 0.7),
-            ("st6 hpp", 0.1, 0.6),
-            ("st7 hpp", 0.2, 0.1),
-            ("st8 hpp", 0.8, 0.1),
-        ]
-        ret = [mock.Mock(ab=key) for key, *_ in scores]
-        cls.query.all.return_value = ret
-        matcher.ratio.side_effect = [sc for _, *scs in scores for sc in scs]
+        set_values("ab", ["qwaz", "st2 qwa", "qwa zz", "qwab ola", "qwa",
+                          "qwo"])
         results = find_nearest(cls, "qwà", col=col, match_first_word=True)
-        sm_patch.assert_called_once()
-        matcher.set_seq1.assert_called_once_with("qwa")
-        self.assertEqual(matcher.set_seq2.call_count, 4)
-        matcher.set_seq2.assert_has_calls([mock.call(k)
-                                           for k, *_ in scores[:2]])
-        sm_patch.reset_mock()
-        cls.query.filter.assert_not_called()
-        self.assertEqual(results, [(ret[1], 1)])
+        self.assertEqual(results, [(ret[2], 1)])
 
-        # several results, match_first_word / two exacts / not solo_si_parfait
-        matcher.ratio.side_effect = [sc for _, *scs in scores for sc in scs]
+        # several results, match_first_word / not solo_si_parfait
         results = find_nearest(cls, "qwà", col=col, match_first_word=True,
                                solo_si_parfait=False)
-        sm_patch.assert_called_once()
-        matcher.set_seq1.assert_called_once_with("qwa")
-        self.assertEqual(matcher.set_seq2.call_count, 16)
-        matcher.set_seq2.assert_has_calls([
-            mock.call(sc) for key, *_ in scores
-            for sc in [key, key.split(maxsplit=1)[0]]
-        ])
-        sm_patch.reset_mock()
-        cls.query.filter.assert_not_called()
-        self.assertEqual(results, [(ret[1], 1), (ret[2], 1), (ret[4], 1)])
+        self.assertEqual(results, [(ret[2], 1), (ret[4], 1)])
 
-        # several results, match_first_word / two exacts /
+        # several results, match_first_word /
         #                  not solo_si_parfait nor parfaits_only
-        matcher.ratio.side_effect = [sc for _, *scs in scores for sc in scs]
         results = find_nearest(cls, "qwà", col=col, match_first_word=True,
-                               solo_si_parfait=False, parfaits_only=False)
-        sm_patch.assert_called_once()
-        matcher.set_seq1.assert_called_once_with("qwa")
-        self.assertEqual(matcher.set_seq2.call_count, 16)
-        matcher.set_seq2.assert_has_calls([
-            mock.call(sc) for key, *_ in scores
-            for sc in [key, key.split(maxsplit=1)[0]]
+                               solo_si_parfait=False, parfaits_only=False,
+                               sensi=0.6)
+        self.assertEqual(results, [(ret[2], 1), (ret[4], 1),
+                                   (ret[0], ratio("qwa", "qwaz")),
+                                   (ret[3], ratio("qwa", "qwab")),
+                                   (ret[5], ratio("qwa", "qwo")),
+                                   (ret[1], ratio("qwa", "st2 qwa"))])
+
+    def test_find_nearest_many(self):
+        """Unit tests for TableMeta.find_nearest_many method."""
+        # def find_nearest_many(cls, chaines, col=None, sensi=0.25,
+        #                       filtre=None, solo_si_parfait=True,
+        #                       parfaits_only=True, match_first_word=False)
+        find_nearest_many = base.TableMeta.find_nearest_many
+        cls = mock.MagicMock(base.TableMeta, __table__=mock.Mock())
+        cls._slug_caches = {}
+        cls._slug_cache = functools.partial(base.TableMeta._slug_cache, cls)
+        config.session.autoflush = True
+        load = config.session.query.return_value.all
+        col = mock.Mock(sqlalchemy.Column, key="ab", type=sqlalchemy.String())
+        values = ["qwaz", "st2", "qwzzzz", "qwa0", "qwà"]
+        ret = [mock.Mock(ab=value) for value in values]
+        load.return_value = list(enumerate(values))
+        cls._get_by_keys.side_effect = lambda keys: {k: ret[k] for k in keys}
+
+        def ratio(a, b):
+            return difflib.SequenceMatcher(a=a, b=b).ratio()
+
+        # bad col name
+        cls.columns = {"b": 1, "c": 2}
+        with self.assertRaises(ValueError) as cm:
+            find_nearest_many(cls, ["qwa"], col="a")
+        self.assertIn("Colonne 'a' invalide", cm.exception.args[0])
+
+        # no chaines
+        self.assertEqual(find_nearest_many(cls, [], col=col), [])
+        config.session.query.assert_not_called()
+
+        # several chaines: loaded once, one query for all entries
+        results = find_nearest_many(cls, ["QWA", "st2", "zzzzzzzzzz", "qwa0",
+                                          "qwa"], col=col, sensi=0.6)
+        load.assert_called_once()
+        cls._get_by_keys.assert_called_once_with({4, 1, 3})
+        self.assertEqual(results, [
+            [(ret[4], 1)],
+            [(ret[1], 1)],
+            [],
+            [(ret[3], 1)],
+            [(ret[4], 1)],
         ])
-        sm_patch.reset_mock()
-        cls.query.filter.assert_not_called()
-        self.assertEqual(results, [(ret[1], 1), (ret[2], 1), (ret[4], 1),
-                                   (ret[3], 0.9), (ret[7], 0.8),
-                                   (ret[0], 0.6), (ret[5], 0.6)])
 
+        # same results as find_nearest
+        cls.find_nearest_many = functools.partial(find_nearest_many, cls)
+        chaines = ["qwè", "st", "qwzz"]
+        results = find_nearest_many(cls, chaines, col=col,
+                                    solo_si_parfait=False)
+        load.assert_called_once()       # cache hit
+        self.assertEqual(results, [
+            base.TableMeta.find_nearest(cls, chaine, col=col,
+                                        solo_si_parfait=False)
+            for chaine in chaines
+        ])
+        self.assertEqual(results[1], [(ret[1], ratio("st", "st2"))])
+
+        # limit
+        kwargs = {"col": col, "solo_si_parfait": False,
+                  "parfaits_only": False}
+        results = find_nearest_many(cls, ["qwa", "st2"], **kwargs)
+        self.assertEqual(find_nearest_many(cls, ["qwa", "st2"], limit=2,
+                                           **kwargs),
+                         [results[0][:2], results[1][:2]])
+        self.assertEqual(base.TableMeta.find_nearest(cls, "qwa", limit=1,
+                                                     **kwargs),
+                         results[0][:1])
+
+        # scorer
+        scorer = mock.Mock(base.fuzzy.Scorer)
+        scorer.scores.side_effect = lambda slug, targets, sensi: [
+            0.5 if target == "st2" else 0 for target in targets
+        ]
+        results = find_nearest_many(cls, ["qwa"], scorer=scorer, **kwargs)
+        self.assertEqual(results, [[(ret[1], 0.5)]])
+        scorer.scores.assert_called_once()
+        scorer.reset_mock()
+        with mock.patch.object(config, "fuzzy_scorer", scorer):
+            results = find_nearest_many(cls, ["qwa"], **kwargs)
+        self.assertEqual(results, [[(ret[1], 0.5)]])
+        scorer.scores.assert_called_once()
+
+    @mock_bdd.patch_db      # Empty database for this method
+    def test_find_nearest_cache(self):
+        """Unit tests for TableMeta.find_nearest cache maintenance."""
+        reac = bdd.Reaction(reponse="r")
+        trigs = [bdd.Trigger(trigger=trig, reaction=reac)
+                 for trig in ["alpha", "beta", "gamma"]]
+        bdd.Reaction.add(reac, *trigs)
+        col = bdd.Trigger.trigger
+
+        # first call: cache loaded
+        self.assertEqual(bdd.Trigger.find_nearest("beta", col=col),
+                         [(trigs[1], 1)])
+        self.assertEqual(bdd.Trigger.slug_cache_info("trigger"),
+                         (0, 1, 3, 3))
+
+        # cache hit, no new normalization
+        self.assertEqual(bdd.Trigger.find_nearest("gamma", col=col),
+                         [(trigs[2], 1)])
+        self.assertEqual(bdd.Trigger.slug_cache_info(col), (1, 1, 3, 3))
+
+        # modification: only this value normalized
+        trigs[2].trigger = "delta"
+        trigs[1].reaction = reac        # unchanged value
+        config.session.commit()
+        self.assertEqual(bdd.Trigger.find_nearest("delta", col=col),
+                         [(trigs[2], 1)])
+        self.assertEqual(bdd.Trigger.slug_cache_info(col), (2, 1, 4, 3))
+
+        # pending addition: flushed before search
+        new = bdd.Trigger(trigger="epsilon", reaction=reac)
+        config.session.add(new)
+        self.assertEqual(bdd.Trigger.find_nearest("epsilon", col=col),
+                         [(new, 1)])
+        self.assertEqual(bdd.Trigger.slug_cache_info(col), (3, 1, 5, 4))
+
+        # rollback: cache invalidated
+        config.session.rollback()
+        self.assertEqual(bdd.Trigger.find_nearest("epsilon", col=col,
+                                                  sensi=0.9), [])
+        self.assertEqual(bdd.Trigger.slug_cache_info(col), (3, 2, 8, 3))
+
+        # deletion
+        trigs[0].delete()
+        self.assertEqual(bdd.Trigger.find_nearest("alpha", col=col,
+                                                  sensi=0.9), [])
+        self.assertEqual(bdd.Trigger.slug_cache_info(col), (4, 2, 8, 2))
+
+        # bulk update: cache invalidated
+        bdd.Trigger.query.filter_by(trigger="beta").update(
+            {"trigger": "zeta"}
+        )
+        config.session.commit()
+        self.assertEqual(bdd.Trigger.find_nearest("zeta", col=col),
+                         [(trigs[1], 1)])
+        self.assertEqual(bdd.Trigger.slug_cache_info(col), (4, 3, 10, 2))
+
+        # manual invalidation
+        bdd.Trigger.invalidate_slug_cache()
+        bdd.Trigger.find_nearest("zeta", col=col)
+        self.assertEqual(bdd.Trigger.slug_cache_info(col), (4, 4, 12, 2))
+
+        # other column: no cache
+        self.assertEqual(bdd.Trigger.slug_cache_info(), (0, 0, 0, 0))
+
+    @mock_bdd.patch_db      # Empty database for this method
+    def test_get_cached(self):
+        """Unit tests for TableMeta.get_cached method."""
+        # def get_cached(cls, key)
+        statements = []
+        sqlalchemy.event.listen(config.engine, "before_cursor_execute",
+                                lambda *args: statements.append(args[2]))
+        mock_bdd.add_campsroles(3, 0)
+        config.session.commit()
+        bdd.Camp.invalidate_entity_cache()      # Camp.default() cached
+        size = config.entity_cache_size
+
+        # first call: loaded and stored
+        statements.clear()
+        camp = bdd.Camp.get_cached("camp1")
+        self.assertEqual(camp.nom, "Camp1")
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(bdd.Camp.entity_cache_info(), (0, 1, size, 1))
+
+        # loaded in session: cache not used
+        self.assertIs(bdd.Camp.get_cached("camp1"), camp)
+        self.assertEqual(bdd.Camp.entity_cache_info(), (0, 1, size, 1))
+
+        # expired (after commit): restored from cache
+        config.session.commit()
+        statements.clear()
+        self.assertIs(bdd.Camp.get_cached("camp1"), camp)
+        self.assertEqual(camp.nom, "Camp1")
+        self.assertEqual(statements, [])
+        self.assertEqual(bdd.Camp.entity_cache_info(), (1, 1, size, 1))
+
+        # not in session: rebuilt from cache
+        config.session.expunge_all()
+        camp = bdd.Camp.get_cached("camp1")
+        self.assertEqual((camp.slug, camp.nom, camp.emoji),
+                         ("camp1", "Camp1", "emoji1"))
+        self.assertIn(camp, config.session)
+        self.assertEqual(statements, [])
+        self.assertEqual(bdd.Camp.entity_cache_info(), (2, 1, size, 1))
+
+        # modification: cache updated at commit, not at flush
+        camp.nom = "Nouveau"
+        config.session.flush()
+        self.assertEqual(bdd.Camp._entity_cache._entries["camp1"][1]["nom"],
+                         "Camp1")
+        config.session.commit()
+        config.session.expunge_all()
+        statements.clear()
+        camp = bdd.Camp.get_cached("camp1")
+        self.assertEqual(camp.nom, "Nouveau")
+        self.assertEqual(statements, [])
+
+        # rollback: cache invalidated
+        camp.nom = "Annulé"
+        config.session.flush()
+        config.session.rollback()
+        self.assertEqual(bdd.Camp.entity_cache_info().currsize, 0)
+        config.session.expunge_all()
+        camp = bdd.Camp.get_cached("camp1")
+        self.assertEqual(camp.nom, "Nouveau")
+        self.assertEqual(bdd.Camp.entity_cache_info(), (3, 2, size, 1))
+
+        # deletion
+        camp.delete()
+        self.assertIsNone(bdd.Camp.get_cached("camp1"))
+        self.assertEqual(bdd.Camp.entity_cache_info(), (3, 3, size, 0))
+
+        # bulk update: cache invalidated
+        bdd.Camp.get_cached("camp2")
+        bdd.Camp.query.filter_by(slug="camp2").update({"nom": "Zeta"})
+        config.session.commit()
+        self.assertEqual(bdd.Camp.entity_cache_info(), (0, 0, 0, 0))
+        self.assertEqual(bdd.Camp.get_cached("camp2").nom, "Zeta")
+
+        # disabled
+        bdd.Camp.invalidate_entity_cache()
+        config.session.commit()
+        with mock.patch.object(config, "entity_cache_size", 0):
+            statements.clear()
+            self.assertEqual(bdd.Camp.get_cached("camp2").nom, "Zeta")
+            self.assertEqual(len(statements), 1)
+        self.assertEqual(bdd.Camp.entity_cache_info(), (0, 0, 0, 0))
+
+
+    def test__sql_candidates(self):
+        """Unit tests for TableMeta._sql_candidates method."""
+        # def _sql_candidates(cls, col, slug, filtre, match_first_word)
+        _sql_candidates = base.TableMeta._sql_candidates
+        query = config.session.query.return_value
+        query.filter.return_value = query
+        query.order_by.return_value = query
+        query.limit.return_value = query
+        query.all.return_value = [(3, "Gâmma"), (1, "alpha"), (2, None)]
+        dialect = postgresql.psycopg2.dialect()
+
+        # simple
+        index = _sql_candidates(bdd.Trigger, bdd.Trigger.trigger, "alph",
+                                None, False)
+        config.session.query.assert_called_once_with(bdd.Trigger.id,
+                                                     bdd.Trigger.trigger)
+        cond, = query.filter.call_args.args
+        self.assertEqual(
+            str(cond.compile(dialect=dialect)),
+            "lgrez_slug(triggers.trigger) %% %(lgrez_slug_1)s"
+        )
+        order, _ = query.order_by.call_args.args
+        self.assertIn("similarity(lgrez_slug(triggers.trigger)",
+                      str(order.compile(dialect=dialect)))
+        query.limit.assert_called_once_with(config.fuzzy_sql_candidates)
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.search("gamma"), [(3, 1)])
+        self.assertEqual(index.search("zzzz", sensi=0.9), [])
+        config.session.reset_mock()
+
+        # filtre and match_first_word
+        filtre = bdd.Trigger._reac_id == 2
+        _sql_candidates(bdd.Trigger, bdd.Trigger.trigger, "alph",
+                        filtre, True)
+        self.assertEqual(len(query.filter.call_args_list), 2)
+        cond, = query.filter.call_args_list[0].args
+        self.assertIn("<%% lgrez_slug(triggers.trigger)",
+                      str(cond.compile(dialect=dialect)))
+        query.filter.assert_called_with(filtre)
+
+    def test__pg_trgm_ready(self):
+        """Unit tests for base._setup_pg_trgm and _pg_trgm_ready."""
+        # def _setup_pg_trgm()
+        # def _pg_trgm_ready(table, col)
+        config.engine = mock.MagicMock()
+        conn = config.engine.begin.return_value.__enter__.return_value
+        config.engine.dialect = postgresql.dialect()
+        table, col = bdd.Trigger, bdd.Trigger.trigger
+
+        with mock.patch.dict(base._pg_trgm, clear=True), \
+                mock.patch.object(config, "fuzzy_sql_prefilter", True):
+            # not set up
+            self.assertFalse(base._pg_trgm_ready(table, col))
+            conn.execute.assert_not_called()
+
+            # setup failed
+            conn.execute.side_effect = sqlalchemy.exc.SQLAlchemyError("oh")
+            with self.assertWarns(UserWarning):
+                base._setup_pg_trgm()
+            self.assertFalse(base._pg_trgm_ready(table, col))
+            conn.execute.reset_mock(side_effect=True)
+
+            # setup ok, one index creation failed
+            conn.execute.side_effect = (
+                [None] + [sqlalchemy.exc.OperationalError("", {}, Exception())]
+                + [None] * 20
+            )
+            with self.assertWarns(UserWarning):
+                base._setup_pg_trgm()
+            queries = [str(call.args[0])
+                       for call in conn.execute.call_args_list]
+            self.assertIn("pg_trgm", queries[0])
+            self.assertIn('ix_trgm_triggers_trigger ON triggers USING gin '
+                          '(lgrez_slug(trigger) gin_trgm_ops)',
+                          "".join(queries))
+            self.assertIn("ix_trgm_roles_nom", "".join(queries))
+            self.assertNotIn("ix_trgm_roles_description",
+                             "".join(queries))
+            failed = queries[1].split()[5]
+            conn.execute.reset_mock(side_effect=True)
+
+            # pure check afterwards
+            self.assertTrue(base._pg_trgm_ready(table, col))
+            self.assertTrue(base._pg_trgm_ready(bdd.Role, bdd.Role.slug))
+            self.assertFalse(base._pg_trgm_ready(
+                bdd.Role, bdd.Role.description_longue
+            ))
+            self.assertNotIn(failed, base._pg_trgm["indexes"])
+            conn.execute.assert_not_called()
+
+            # disabled
+            with mock.patch.object(config, "fuzzy_sql_prefilter", False):
+                self.assertFalse(base._pg_trgm_ready(table, col))
+
+    @mock_bdd.patch_db      # Empty database for this method
+    def test_find_nearest_sql_fallback(self):
+        """Unit tests for TableMeta.find_nearest SQL prefilter fallback."""
+        reac = bdd.Reaction(reponse="r")
+        trig = bdd.Trigger(trigger="alpha", reaction=reac)
+        bdd.Reaction.add(reac, trig)
+        with mock.patch.object(config, "fuzzy_sql_prefilter", True), \
+                mock.patch("lgrez.bdd.base.TableMeta._sql_candidates") \
+                as sc_patch:
+            # SQLite: no prefilter
+            self.assertEqual(bdd.Trigger.find_nearest(
+                "alpha", col=bdd.Trigger.trigger
+            ), [(trig, 1)])
+            sc_patch.assert_not_called()
+
+            # prefilter ready
+            sc_patch.return_value = base.fuzzy.SlugIndex()
+            sc_patch.return_value.add(trig.id, "alpha")
+            with mock.patch("lgrez.bdd.base._pg_trgm_ready",
+                            return_value=True):
+                self.assertEqual(bdd.Trigger.find_nearest_many(
+                    ["alpha", "alphi"], col=bdd.Trigger.trigger, sensi=0.9
+                ), [[(trig, 1)], []])
+            self.assertEqual(sc_patch.call_args_list, [
+                mock.call(bdd.Trigger.trigger, "alpha", None, False),
+                mock.call(bdd.Trigger.trigger, "alphi", None, False),
+            ])
+
+
+
+class TestQuery(unittest.IsolatedAsyncioTestCase):
+    """Unit tests for lgrez.bdd.base.Query methods."""
+
+    def setUp(self):
+        mock_discord.mock_config()
+
+    def tearDown(self):
+        mock_discord.unmock_config()
+
+    @mock_bdd.patch_db      # Empty database for this method
+    def test_with_profile(self):
+        """Unit tests for Query.with_profile method."""
+        # def with_profile(self, *profiles)
+        statements = []
+        sqlalchemy.event.listen(config.engine, "before_cursor_execute",
+                                lambda *args: statements.append(args[2]))
+        mock_bdd.add_campsroles()
+        bap = bdd.BaseAction(slug="bap", trigger_debut=bdd.ActionTrigger.perma,
+                             trigger_fin=bdd.ActionTrigger.perma)
+        for i in range(10):
+            joueur = bdd.Joueur(discord_id=i, chan_id_=i, nom=f"J{i}")
+            action = bdd.Action(id=i, joueur=joueur, base=bap)
+            config.session.add(bdd.Utilisation(id=i, action=action))
+        config.session.commit()
+
+        # without profile: one query per player / action
+        config.session.expire_all()
+        statements.clear()
+        joueurs = bdd.Joueur.query.all()
+        self.assertTrue(all(ac.is_open for jr in joueurs
+                            for ac in jr.actions))
+        self.assertEqual(len(statements), 21)
+
+        # with profile: relationships loaded by the query
+        config.session.expire_all()
+        statements.clear()
+        joueurs = bdd.Joueur.query.with_profile("actions").all()
+        self.assertTrue(all(ac.is_open and ac.base is bap
+                            for jr in joueurs for ac in jr.actions))
+        self.assertEqual(len(statements), 2)
+
+        # unknown profile
+        with self.assertRaises(ValueError):
+            bdd.Joueur.query.with_profile("actions", "bzzt")
 
 
 class TestTableBase(unittest.IsolatedAsyncioTestCase):
@@ -499,6 +1126,14 @@ class TestTableBase(unittest.IsolatedAsyncioTestCase):
         update = base.TableBase.update
         update()
         config.session.commit.assert_called_once()
+        # in unit of work: no commit
+        config.session.reset_mock()
+        token = base._unit_of_work.set([])
+        try:
+            update()
+        finally:
+            base._unit_of_work.reset(token)
+        config.session.commit.assert_not_called()
 
     def test_add(self):
         """Unit tests for TableBase.add method."""
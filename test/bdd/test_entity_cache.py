@@ -0,0 +1,55 @@
+import unittest
+from unittest import mock
+
+from lgrez.bdd import entity_cache
+
+
+
+class TestEntityCache(unittest.TestCase):
+    """Unit tests for lgrez.bdd.entity_cache.EntityCache class."""
+
+    def test_get_put(self):
+        """Unit tests for EntityCache.get / put methods."""
+        clock = mock.Mock(return_value=0)
+        cache = entity_cache.EntityCache(2, 10, clock=clock)
+        # not in cache
+        self.assertIsNone(cache.get(1))
+        # stored
+        cache.put(1, {"a": 1})
+        self.assertEqual(cache.get(1), {"a": 1})
+        self.assertEqual(cache.info(), (1, 1, 2, 1))
+        # least recently used dropped
+        cache.put(2, {"a": 2})
+        cache.get(1)
+        cache.put(3, {"a": 3})
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(cache.get(1), {"a": 1})
+        self.assertEqual(cache.get(3), {"a": 3})
+        # expired
+        clock.return_value = 10
+        self.assertIsNone(cache.get(1))
+        self.assertEqual(cache.info(), (4, 3, 2, 1))
+
+    def test_update_remove_invalidate(self):
+        """Unit tests for EntityCache.update / remove / invalidate."""
+        clock = mock.Mock(return_value=0)
+        cache = entity_cache.EntityCache(5, 10, clock=clock)
+        # update: only if present, validity not extended
+        cache.update(1, {"a": 1})
+        self.assertIsNone(cache.get(1))
+        cache.put(1, {"a": 1, "b": 1})
+        clock.return_value = 5
+        cache.update(1, {"b": 2})
+        self.assertEqual(cache.get(1), {"a": 1, "b": 2})
+        clock.return_value = 10
+        self.assertIsNone(cache.get(1))
+        # remove
+        cache.put(1, {"a": 1})
+        cache.put(2, {"a": 2})
+        cache.remove(1)
+        cache.remove(4)
+        self.assertIsNone(cache.get(1))
+        self.assertEqual(cache.get(2), {"a": 2})
+        # invalidate
+        cache.invalidate()
+        self.assertEqual(cache.info().currsize, 0)
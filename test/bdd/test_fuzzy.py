@@ -0,0 +1,350 @@
+import collections
+import difflib
+import random
+import unittest
+from unittest import mock
+
+from lgrez.bdd import fuzzy
+
+
+def _reference_search(chaine, slugs, sensi=0.25, solo_si_parfait=True,
+                      parfaits_only=True, match_first_word=False):
+    """Full-scan implementation (find_nearest before indexing)."""
+    SM = difflib.SequenceMatcher()
+    SM.set_seq1(chaine)
+    scores = []
+    for key, slug in enumerate(slugs):
+        SM.set_seq2(slug)
+        score = SM.ratio()
+        if match_first_word:
+            SM.set_seq2((slug.split(maxsplit=1) or [slug])[0])
+            score = max(score, SM.ratio())
+        if score == 1:
+            if solo_si_parfait:
+                return [(key, score)]
+            elif parfaits_only:
+                sensi = 1
+        scores.append((key, score))
+    bests = [(key, score) for (key, score) in scores if score >= sensi]
+    return sorted(bests, key=lambda x: x[1], reverse=True)
+
+
+def _reference_lcs(a, b):
+    """Dynamic programming LCS length."""
+    prev = [0] * (len(b) + 1)
+    for char_a in a:
+        cur = [0]
+        for j, char_b in enumerate(b):
+            cur.append(prev[j] + 1 if char_a == char_b
+                       else max(prev[j + 1], cur[-1]))
+        prev = cur
+    return prev[-1]
+
+
+class TestFuzzyFunctions(unittest.TestCase):
+    """Unit tests for lgrez.bdd.fuzzy functions."""
+
+    def test_trigrams(self):
+        """Unit tests for fuzzy.trigrams function."""
+        # def trigrams(slug)
+        trigrams = fuzzy.trigrams
+        self.assertEqual(trigrams(""), {"   "})
+        self.assertEqual(trigrams("a"), {"  a", " a "})
+        self.assertEqual(trigrams("abc"), {"  a", " ab", "abc", "bc "})
+
+    def test_bounds(self):
+        """Unit tests for fuzzy.length_bound and counts_bound functions."""
+        # def length_bound(la, lb)
+        # def counts_bound(counts_a, la, counts_b, lb)
+        rng = random.Random(0)
+        for _ in range(500):
+            a = "".join(rng.choice("abcd ") for _ in range(rng.randrange(8)))
+            b = "".join(rng.choice("abcd ") for _ in range(rng.randrange(8)))
+            SM = difflib.SequenceMatcher(a=a, b=b)
+            self.assertEqual(fuzzy.length_bound(len(a), len(b)),
+                             SM.real_quick_ratio())
+            self.assertEqual(
+                fuzzy.counts_bound(collections.Counter(a), len(a),
+                                   collections.Counter(b), len(b)),
+                SM.quick_ratio()
+            )
+
+    def test_lcs_lengths(self):
+        """Unit tests for fuzzy.lcs_lengths function."""
+        # def lcs_lengths(slug, targets)
+        lcs_lengths = fuzzy.lcs_lengths
+        self.assertEqual(lcs_lengths("abc", []).tolist(), [])
+        self.assertEqual(lcs_lengths("", ["abc", ""]).tolist(), [0, 0])
+        self.assertEqual(lcs_lengths("abc", ["", "abc", "xaxbx", "cba"])
+                         .tolist(), [0, 3, 2, 1])
+        rng = random.Random(1)
+        for _ in range(300):
+            alphabet = rng.choice(["ab", "abcd ", "abcdéèf😀 "])
+            # several 64-bits words for long slugs
+            slug = "".join(rng.choice(alphabet)
+                           for _ in range(rng.choice([3, 40, 64, 65, 150])))
+            targets = ["".join(rng.choice(alphabet)
+                               for _ in range(rng.randrange(100)))
+                       for _ in range(rng.randrange(1, 8))]
+            self.assertEqual(lcs_lengths(slug, targets).tolist(),
+                             [_reference_lcs(slug, tg) for tg in targets])
+
+
+class TestScorers(unittest.TestCase):
+    """Unit tests for lgrez.bdd.fuzzy scorers."""
+
+    def test_scorers(self):
+        """Unit tests for SequenceMatcherScorer and LCSScorer.scores."""
+        rng = random.Random(2)
+        sm_scorer = fuzzy.SequenceMatcherScorer()
+        lcs_scorer = fuzzy.LCSScorer()
+        compat_scorer = fuzzy.LCSScorer(compat=True)
+        self.assertEqual(lcs_scorer.scores("abc", [], 0), [])
+        self.assertEqual(lcs_scorer.scores("", ["", "a"], 0), [1, 0])
+        for _ in range(200):
+            slug = "".join(rng.choice("abcd ")
+                           for _ in range(rng.randrange(12)))
+            targets = ["".join(rng.choice("abcd ")
+                               for _ in range(rng.randrange(12)))
+                       for _ in range(5)]
+            sensi = rng.choice([0, 0.5, 0.8])
+            ratios = [difflib.SequenceMatcher(a=slug, b=tg).ratio()
+                      for tg in targets]
+            self.assertEqual(sm_scorer.scores(slug, targets, sensi), ratios)
+            scores = lcs_scorer.scores(slug, targets, sensi)
+            for target, score, ratio in zip(targets, scores, ratios):
+                self.assertEqual(score, 2 * _reference_lcs(slug, target)
+                                 / (len(slug) + len(target) or 1)
+                                 if slug or target else 1)
+                self.assertGreaterEqual(score, ratio)       # upper bound
+            # compat: same scores above sensi
+            scores = compat_scorer.scores(slug, targets, sensi)
+            for score, ratio in zip(scores, ratios):
+                self.assertEqual(score if ratio >= sensi else 0,
+                                 ratio if ratio >= sensi else 0)
+
+
+class TestSlugIndex(unittest.TestCase):
+    """Unit tests for lgrez.bdd.fuzzy.SlugIndex methods."""
+
+    def test_add_remove(self):
+        """Unit tests for SlugIndex.add and remove methods."""
+        index = fuzzy.SlugIndex()
+        index.add("a", "alpha")
+        index.add("b", "beta gamma")
+        self.assertEqual(len(index), 2)
+        self.assertIn("a", index)
+        self.assertEqual(index.search("beta", match_first_word=True),
+                         [("b", 1)])
+        # replace
+        index.add("b", "delta")
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.search("beta", match_first_word=True,
+                                      sensi=0.9), [])
+        self.assertEqual(index.search("delta"), [("b", 1)])
+        # remove
+        index.remove("a")
+        index.remove("zzz")     # no effect
+        self.assertEqual(len(index), 1)
+        self.assertNotIn("a", index)
+        self.assertEqual(index.search("alpha", sensi=0.9), [])
+        index.remove("b")
+        self.assertEqual(len(index), 0)
+        self.assertEqual(dict(index._postings), {})
+
+    def test_search_keys(self):
+        """Unit tests for SlugIndex.search keys argument."""
+        index = fuzzy.SlugIndex()
+        for key, slug in enumerate(["alpha", "alpha", "alphb"]):
+            index.add(key, slug)
+        self.assertEqual(index.search("alpha"), [(0, 1)])
+        self.assertEqual(index.search("alpha", keys={1, 2}), [(1, 1)])
+        self.assertEqual(index.search("alpha", keys={2}),
+                         [(2, difflib.SequenceMatcher(a="alpha",
+                                                      b="alphb").ratio())])
+        self.assertEqual(index.search("alpha", keys=set()), [])
+
+    def test_search(self):
+        """Unit tests for SlugIndex.search method (vs. full scan)."""
+        rng = random.Random(42)
+        alphabet = "abcdef ghij"
+
+        def word(n):
+            return "".join(rng.choice(alphabet) for _ in range(n))
+
+        for _ in range(300):
+            slugs = [word(rng.randrange(12)) for _ in range(rng.randrange(20))]
+            if slugs:
+                slugs.append(rng.choice(slugs))     # duplicates
+            index = fuzzy.SlugIndex()
+            for key, slug in enumerate(slugs):
+                index.add(key, slug)
+            chaine = rng.choice(slugs + [word(rng.randrange(10))])
+            for kwargs in [{}, {"solo_si_parfait": False},
+                           {"solo_si_parfait": False, "parfaits_only": False}]:
+                for match_first_word in [False, True]:
+                    for sensi in [0, 0.25, 0.5, 0.7, 0.8, 0.9, 1]:
+                        self.assertEqual(
+                            index.search(chaine, sensi=sensi,
+                                         match_first_word=match_first_word,
+                                         **kwargs),
+                            _reference_search(
+                                chaine, slugs, sensi=sensi,
+                                match_first_word=match_first_word, **kwargs
+                            ),
+                        )
+
+    def test_search_many(self):
+        """Unit tests for SlugIndex.search_many method (vs. search)."""
+        rng = random.Random(7)
+        alphabet = "abcdef ghij"
+
+        def word(n):
+            return "".join(rng.choice(alphabet) for _ in range(n))
+
+        for _ in range(100):
+            slugs = [word(rng.randrange(12)) for _ in range(rng.randrange(20))]
+            index = fuzzy.SlugIndex()
+            for key, slug in enumerate(slugs):
+                index.add(key, slug)
+            chaines = [rng.choice(slugs + [word(rng.randrange(10))])
+                       for _ in range(rng.randrange(6))]
+            chaines += chaines[:2]      # duplicates
+            for kwargs in [{}, {"solo_si_parfait": False},
+                           {"solo_si_parfait": False, "parfaits_only": False},
+                           {"match_first_word": True, "sensi": 0.5},
+                           {"keys": set(range(0, 20, 2)), "sensi": 0}]:
+                self.assertEqual(
+                    index.search_many(chaines, **kwargs),
+                    [index.search(chaine, **kwargs) for chaine in chaines],
+                )
+
+    def test_search_limit(self):
+        """Unit tests for SlugIndex.search limit argument (vs. full)."""
+        rng = random.Random(3)
+        alphabet = "abcdef ghij"
+
+        def word(n):
+            return "".join(rng.choice(alphabet) for _ in range(n))
+
+        for _ in range(200):
+            slugs = [word(rng.randrange(12)) for _ in range(rng.randrange(30))]
+            if slugs:
+                slugs += rng.choices(slugs, k=3)    # duplicates, ties
+            index = fuzzy.SlugIndex()
+            for key, slug in enumerate(slugs):
+                index.add(key, slug)
+            chaines = [rng.choice(slugs + [word(rng.randrange(10))])
+                       for _ in range(3)]
+            for kwargs in [{}, {"solo_si_parfait": False},
+                           {"solo_si_parfait": False, "parfaits_only": False},
+                           {"match_first_word": True, "sensi": 0.5,
+                            "solo_si_parfait": False},
+                           {"keys": set(range(0, 30, 2)), "sensi": 0}]:
+                full = index.search_many(chaines, **kwargs)
+                for limit in [0, 1, 2, 5, 10]:
+                    self.assertEqual(
+                        index.search_many(chaines, limit=limit, **kwargs),
+                        [res[:limit] for res in full],
+                    )
+
+        # pruning: entries that cannot enter the top-k are not scored
+        index = fuzzy.SlugIndex()
+        for key, slug in enumerate(["abcdef", "abcdeg", "zzzzzz", "abzzzz",
+                                    "azzzzz", "zzzzzf"]):
+            index.add(key, slug)
+        with mock.patch("difflib.SequenceMatcher.ratio", autospec=True,
+                        side_effect=difflib.SequenceMatcher.ratio) as ratio:
+            self.assertEqual(index.search("abcdef", solo_si_parfait=False,
+                                          parfaits_only=False, sensi=0,
+                                          limit=2),
+                             [(0, 1), (1, 5/6)])
+        self.assertLess(ratio.call_count, 6)
+
+    def test_search_scorer(self):
+        """Unit tests for SlugIndex.search scorer argument."""
+        rng = random.Random(5)
+        alphabet = "abcdef ghij"
+
+        def word(n):
+            return "".join(rng.choice(alphabet) for _ in range(n))
+
+        scorers = [fuzzy.SequenceMatcherScorer(),
+                   fuzzy.LCSScorer(compat=True)]
+        for _ in range(100):
+            slugs = [word(rng.randrange(12)) for _ in range(rng.randrange(20))]
+            index = fuzzy.SlugIndex()
+            for key, slug in enumerate(slugs):
+                index.add(key, slug)
+            chaines = [rng.choice(slugs + [word(rng.randrange(10))])
+                       for _ in range(3)]
+            for kwargs in [{"solo_si_parfait": False, "parfaits_only": False},
+                           {"match_first_word": True, "sensi": 0.5,
+                            "limit": 3},
+                           {"keys": set(range(0, 20, 2)), "sensi": 0.7}]:
+                # same results as SequenceMatcher
+                expected = index.search_many(chaines, **kwargs)
+                for scorer in scorers:
+                    self.assertEqual(
+                        index.search_many(chaines, scorer=scorer, **kwargs),
+                        expected,
+                    )
+                # LCS scores: at least the same entries
+                results = index.search_many(chaines, scorer=fuzzy.LCSScorer(),
+                                            **kwargs)
+                if "limit" not in kwargs:
+                    for res, exp in zip(results, expected):
+                        self.assertLessEqual({key for key, _ in exp},
+                                             {key for key, _ in res})
+
+
+class TestSlugCache(unittest.TestCase):
+    """Unit tests for lgrez.bdd.fuzzy.SlugCache methods."""
+
+    def test_slug_cache(self):
+        """Unit tests for SlugCache methods."""
+        cache = fuzzy.SlugCache(str.lower)
+        self.assertFalse(cache.loaded)
+        self.assertEqual(cache.info(), (0, 0, 0, 0))
+        # not loaded: no effect
+        cache.update(1, "Alpha")
+        cache.remove(1)
+        self.assertFalse(cache.loaded)
+
+        # get_index: loaded once
+        loader = mock.Mock(return_value=[(1, "Alpha"), (2, "Beta"),
+                                                  (3, None)])
+        index = cache.get_index(loader)
+        loader.assert_called_once()
+        self.assertTrue(cache.loaded)
+        self.assertEqual(index.search("alpha"), [(1, 1)])
+        self.assertNotIn(3, index)
+        self.assertEqual(cache.info(), (0, 1, 2, 3))
+        self.assertIs(cache.get_index(loader), index)
+        loader.assert_called_once()
+        self.assertEqual(cache.info(), (1, 1, 2, 3))
+
+        # update: normalized only if changed
+        cache.update(1, "Alpha")
+        self.assertEqual(cache.info(), (1, 1, 2, 3))
+        cache.update(1, "Gamma")
+        cache.update(4, "Delta")
+        self.assertEqual(cache.info(), (1, 1, 4, 4))
+        self.assertEqual(index.search("gamma"), [(1, 1)])
+        self.assertEqual(index.search("delta"), [(4, 1)])
+        cache.update(4, None)
+        self.assertNotIn(4, index)
+
+        # remove
+        cache.remove(2)
+        cache.remove(12)        # no effect
+        self.assertNotIn(2, index)
+        self.assertEqual(cache.info().currsize, 3)
+
+        # invalidate
+        cache.invalidate()
+        self.assertFalse(cache.loaded)
+        self.assertEqual(cache.info(), (1, 1, 4, 0))
+        cache.get_index(loader)
+        self.assertEqual(loader.call_count, 2)
+        self.assertEqual(cache.info(), (1, 2, 6, 3))
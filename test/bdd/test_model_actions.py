@@ -3,17 +3,24 @@ import unittest
 from unittest import mock
 
 import freezegun
+import sqlalchemy
 
-from lgrez import config
+from lgrez import config, bdd
 from lgrez.bdd import model_actions
 from lgrez.blocs import webhook
-from test import mock_discord, mock_env
+from test import mock_discord, mock_env, mock_bdd
 
 
 
 class TestAction(unittest.IsolatedAsyncioTestCase):
     """Unit tests for lgrez.bdd.model_actions.Action methods."""
 
+    def setUp(self):
+        mock_discord.mock_config()
+
+    def tearDown(self):
+        mock_discord.unmock_config()
+
     def test___repr__(self):
         """Unit tests for Action.__repr__ method."""
         # def __repr__(self)
@@ -22,6 +29,105 @@ class TestAction(unittest.IsolatedAsyncioTestCase):
         rpr = __repr__(slf)
         self.assertEqual(rpr, "<Action #11 (bazz/j0r)>")
 
+    @mock_bdd.patch_db      # Empty database for this method
+    def test_derniere_utilisation(self):
+        """Unit tests for Action.derniere_utilisation property."""
+        # @property def derniere_utilisation(self)
+        statements = []
+        sqlalchemy.event.listen(config.engine, "before_cursor_execute",
+                                lambda *args: statements.append(args[2]))
+        mock_bdd.add_campsroles()
+        joueur = bdd.Joueur(discord_id=1, chan_id_=1, nom="J1")
+        action = bdd.Action(id=1, joueur=joueur, vote=bdd.Vote.cond)
+        self.assertIsNone(action.derniere_utilisation)
+        self.assertFalse(action.is_open)
+        # newest utilisation (by id) referenced, whatever creation order
+        utils = [bdd.Utilisation(id=i, action=action,
+                                 etat=bdd.UtilEtat.validee,
+                                 ts_close=datetime.datetime(2020, 1, i))
+                 for i in (2, 1)]
+        bdd.Joueur.add(joueur, action, *utils)
+        self.assertIs(action.derniere_utilisation, utils[0])
+
+        # loaded by profile: no queries
+        config.session.expire_all()
+        bdd.Action.query.with_profile("actions").all()
+        statements.clear()
+        self.assertIs(action.derniere_utilisation, utils[0])
+        self.assertFalse(action.is_open)
+        self.assertFalse(action.is_waiting)
+        self.assertIsNone(action.utilisation_ouverte)
+        self.assertEqual(statements, [])
+
+        # new utilisation, even pending
+        util = bdd.Utilisation(id=3, action=action)
+        self.assertIs(action.derniere_utilisation, util)
+        self.assertTrue(action.is_open)
+        self.assertTrue(action.is_waiting)
+        self.assertIs(action.utilisation_ouverte, util)
+        self.assertEqual(statements, [])
+        util.etat = bdd.UtilEtat.remplie
+        self.assertTrue(action.is_open)
+        self.assertFalse(action.is_waiting)
+        # closed: still the last one
+        util.close()
+        self.assertIs(action.derniere_utilisation, util)
+        self.assertFalse(action.is_open)
+        self.assertIsNone(action.utilisation_ouverte)
+        # reopened
+        utils[1].open()
+        self.assertIs(action.derniere_utilisation, utils[1])
+        self.assertIs(action.utilisation_ouverte, utils[1])
+        config.session.expire_all()
+        self.assertIs(action.derniere_utilisation, utils[1])
+
+        # class expressions: same definition
+        util.etat = bdd.UtilEtat.ouverte        # older one, still open
+        config.session.commit()
+        self.assertEqual(bdd.Action.query.filter(bdd.Action.is_open).all(),
+                         [action])
+        self.assertEqual(
+            bdd.Joueur.query.filter(bdd.Joueur.actions.any(
+                bdd.Action.is_waiting)).all(),
+            [joueur]
+        )
+        utils[1].close()
+        config.session.commit()
+        self.assertFalse(action.is_open)
+        self.assertEqual(bdd.Action.query.filter(bdd.Action.is_open).all(),
+                         [])
+        self.assertEqual(
+            bdd.Action.query.filter(bdd.Action.is_waiting).all(), []
+        )
+
+    @mock_bdd.patch_db      # Empty database for this method
+    def test_check_consistency(self):
+        """Unit tests for Action.check_consistency method."""
+        # def check_consistency(cls, fix=True)
+        mock_bdd.add_campsroles()
+        joueur = bdd.Joueur(discord_id=1, chan_id_=1, nom="J1")
+        actions = [bdd.Action(id=i, joueur=joueur, vote=vote)
+                   for i, vote in enumerate(bdd.Vote)]
+        utils = [bdd.Utilisation(id=i, action=actions[0]) for i in (1, 2)]
+        bdd.Joueur.add(joueur, *actions, *utils)
+        self.assertEqual(bdd.Action.check_consistency(), [])
+
+        # references lost (external modification)
+        config.session.execute(sqlalchemy.text(
+            "UPDATE actions SET _derniere_utilisation_id = 1"
+        ))
+        config.session.commit()
+        config.session.expire_all()
+        self.assertEqual(sorted(bdd.Action.check_consistency(fix=False),
+                                key=lambda action: action.id), actions)
+        self.assertIs(actions[0].derniere_utilisation, utils[0])
+        self.assertEqual(sorted(bdd.Action.check_consistency(),
+                                key=lambda action: action.id), actions)
+        config.session.expire_all()
+        self.assertIs(actions[0].derniere_utilisation, utils[1])
+        self.assertIsNone(actions[1].derniere_utilisation)
+        self.assertEqual(bdd.Action.check_consistency(), [])
+
 
 class TestTache(unittest.IsolatedAsyncioTestCase):
     """Unit tests for lgrez.bdd.model_actions.Tache methods."""
@@ -165,7 +271,17 @@ class TestTache(unittest.IsolatedAsyncioTestCase):
         for oth in other:
             oth.register.assert_called_once()
         sa_patch.assert_called_once_with(*other)
-
+        sa_patch.reset_mock()
+        # in unit of work: registered after commit
+        config.session.expire_on_commit = True
+        slf = mock.Mock(model_actions.Tache)
+        with bdd.base.unit_of_work():
+            add(slf)
+            sa_patch.assert_called_once()
+            slf.register.assert_not_called()
+            config.session.commit.assert_not_called()
+        config.session.commit.assert_called_once()
+        slf.register.assert_called_once()
 
     @mock.patch("lgrez.bdd.base.TableBase.delete")
     def test_delete(self, sd_patch):
@@ -186,3 +302,23 @@ class TestTache(unittest.IsolatedAsyncioTestCase):
         for oth in other:
             oth.cancel.assert_called_once()
         sd_patch.assert_called_once_with(*other)
+        sd_patch.reset_mock()
+        # in unit of work: cancelled after commit
+        config.session.expire_on_commit = True
+        slf = mock.Mock(model_actions.Tache)
+        with bdd.base.unit_of_work():
+            delete(slf)
+            sd_patch.assert_called_once()
+            slf.cancel.assert_not_called()
+            config.session.commit.assert_not_called()
+        config.session.commit.assert_called_once()
+        slf.cancel.assert_called_once()
+        # in unit of work, rolled back: not cancelled
+        config.session.commit.reset_mock()
+        slf = mock.Mock(model_actions.Tache)
+        with self.assertRaises(ValueError):
+            with bdd.base.unit_of_work():
+                delete(slf)
+                raise ValueError
+        config.session.rollback.assert_called_once()
+        slf.cancel.assert_not_called()
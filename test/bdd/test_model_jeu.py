@@ -37,32 +37,32 @@ class TestRole(unittest.IsolatedAsyncioTestCase):
         self.assertIsNone(nom_complet.fdel)
 
 
-    def test_default(self):
+    @mock.patch("lgrez.bdd.model_jeu.Role.get_cached")
+    def test_default(self, gc_patch):
         """Unit tests for Role.default classmethod."""
         # @classmethod def default(cls)
         default = model_jeu.Role.default
-        qry_patch = config.session.query.return_value
         # existing
         cls = mock.MagicMock()
         role = default()
-        qry_patch.get.assert_called_once_with(config.default_role_slug)
-        qry_patch.reset_mock()
-        self.assertEqual(role, qry_patch.get.return_value)
+        gc_patch.assert_called_once_with(config.default_role_slug)
+        gc_patch.reset_mock()
+        self.assertEqual(role, gc_patch.return_value)
         # existing - other than default
         cls = mock.MagicMock()
         _drs = config.default_role_slug
         config.default_role_slug = "bzbzbz"
         role = default()
-        qry_patch.get.assert_called_once_with("bzbzbz")
-        qry_patch.reset_mock()
-        self.assertEqual(role, qry_patch.get.return_value)
+        gc_patch.assert_called_once_with("bzbzbz")
+        gc_patch.reset_mock()
+        self.assertEqual(role, gc_patch.return_value)
         config.default_role_slug = _drs
         # not existing
         cls = mock.MagicMock()
-        qry_patch.get.return_value = None
+        gc_patch.return_value = None
         with self.assertRaises(ValueError):
             default()
-        qry_patch.get.assert_called_once_with(config.default_role_slug)
+        gc_patch.assert_called_once_with(config.default_role_slug)
 
 
 class TestCamp(unittest.IsolatedAsyncioTestCase):
@@ -129,32 +129,32 @@ class TestCamp(unittest.IsolatedAsyncioTestCase):
         self.assertIsNone(discord_emoji_or_none.fdel)
 
 
-    def test_default(self):
+    @mock.patch("lgrez.bdd.model_jeu.Camp.get_cached")
+    def test_default(self, gc_patch):
         """Unit tests for Camp.default classmethod."""
         # @classmethod def default(cls)
         default = model_jeu.Camp.default
-        qry_patch = config.session.query.return_value
         # existing
         cls = mock.MagicMock()
         camp = default()
-        qry_patch.get.assert_called_once_with(config.default_camp_slug)
-        qry_patch.reset_mock()
-        self.assertEqual(camp, qry_patch.get.return_value)
+        gc_patch.assert_called_once_with(config.default_camp_slug)
+        gc_patch.reset_mock()
+        self.assertEqual(camp, gc_patch.return_value)
         # existing - other than default
         cls = mock.MagicMock()
         _drs = config.default_camp_slug
         config.default_camp_slug = "bzbzbz"
         camp = default()
-        qry_patch.get.assert_called_once_with("bzbzbz")
-        qry_patch.reset_mock()
-        self.assertEqual(camp, qry_patch.get.return_value)
+        gc_patch.assert_called_once_with("bzbzbz")
+        gc_patch.reset_mock()
+        self.assertEqual(camp, gc_patch.return_value)
         config.default_camp_slug = _drs
         # not existing
         cls = mock.MagicMock()
-        qry_patch.get.return_value = None
+        gc_patch.return_value = None
         with self.assertRaises(ValueError):
             default()
-        qry_patch.get.assert_called_once_with(config.default_camp_slug)
+        gc_patch.assert_called_once_with(config.default_camp_slug)
 
 
 class TestBaseAction(unittest.IsolatedAsyncioTestCase):
@@ -61,23 +61,80 @@ class TestJoueur(unittest.IsolatedAsyncioTestCase):
         config.guild.get_channel.assert_called_once_with(slf.chan_id_)
 
 
-    def test_from_member(self):
+    @mock.patch("lgrez.bdd.model_joueurs.Joueur.get_cached")
+    def test_from_member(self, gc_patch):
         """Unit tests for Joueur.from_member classmethod."""
         # @classmethod def from_member(cls, member)
         from_member = model_joueurs.Joueur.from_member
-        query = config.session.query.return_value
         # existant
         member = mock.MagicMock()
         jr = from_member(member)
+        gc_patch.assert_called_once_with(member.id)
+        self.assertEqual(jr, gc_patch.return_value)
+        gc_patch.reset_mock()
+        # not existant
+        member = mock.MagicMock()
+        gc_patch.return_value = None
+        with self.assertRaises(ValueError):
+            from_member(member)
+        gc_patch.assert_called_once_with(member.id)
+        gc_patch.reset_mock()
+        # with profile
+        query = config.session.query.return_value.with_profile.return_value
+        member = mock.MagicMock()
+        with mock.patch.object(model_joueurs.Joueur,
+                               "_to_entity_cache") as tec_patch:
+            jr = from_member(member, profile="actions")
+        gc_patch.assert_not_called()
+        config.session.query.return_value.with_profile.assert_called_once_with(
+            "actions")
+        query.filter.assert_called_once()
+        self.assertEqual(jr,
+                         query.filter.return_value.one_or_none.return_value)
+        tec_patch.assert_called_once_with(jr)
+
+    @mock.patch("lgrez.bdd.model_joueurs.Joueur._to_entity_cache")
+    @mock.patch("lgrez.bdd.model_joueurs.Joueur._from_entity_cache")
+    async def test_from_member_async(self, fec_patch, tec_patch):
+        """Unit tests for Joueur.from_member_async classmethod."""
+        # @classmethod async def from_member_async(cls, member)
+        from_member_async = model_joueurs.Joueur.from_member_async
+        query = config.session.query.return_value
+        # in cache
+        member = mock.MagicMock()
+        jr = await from_member_async(member)
+        fec_patch.assert_called_once_with(member.id)
+        query.get.assert_not_called()
+        self.assertEqual(jr, fec_patch.return_value)
+        fec_patch.reset_mock()
+        # existant
+        fec_patch.return_value = None
+        member = mock.MagicMock()
+        jr = await from_member_async(member)
         query.get.assert_called_once_with(member.id)
+        tec_patch.assert_called_once_with(query.get.return_value)
         self.assertEqual(jr, query.get.return_value)
         query.reset_mock()
+        tec_patch.reset_mock()
         # not existant
         member = mock.MagicMock()
         query.get.return_value = None
         with self.assertRaises(ValueError):
-            from_member(member)
+            await from_member_async(member)
         query.get.assert_called_once_with(member.id)
+        tec_patch.assert_called_once_with(None)
+        fec_patch.reset_mock()
+        tec_patch.reset_mock()
+        # with profile
+        query = query.with_profile.return_value
+        member = mock.MagicMock()
+        jr = await from_member_async(member, profile="actions")
+        fec_patch.assert_not_called()
+        config.session.query.return_value.with_profile.assert_called_once_with(
+            "actions")
+        self.assertEqual(jr,
+                         query.filter.return_value.one_or_none.return_value)
+        tec_patch.assert_called_once_with(jr)
 
 
 
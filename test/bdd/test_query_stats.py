@@ -0,0 +1,118 @@
+import unittest
+from unittest import mock
+
+import sqlalchemy
+
+from lgrez import config
+from lgrez.bdd import query_stats
+
+
+
+class TestQueryStatsFunctions(unittest.TestCase):
+    """Unit tests for lgrez.bdd.query_stats functions."""
+
+    def setUp(self):
+        query_stats.reset()
+
+    def tearDown(self):
+        query_stats.reset()
+
+    def test_shape(self):
+        """Unit tests for query_stats.shape function."""
+        # def shape(statement)
+        shape = query_stats.shape
+        # literals and parameters
+        self.assertEqual(
+            shape("SELECT * FROM joueurs\n  WHERE nom = 'l''ami' AND id = 12"),
+            "SELECT * FROM joueurs WHERE nom = ? AND id = ?"
+        )
+        self.assertEqual(
+            shape("SELECT joueurs_1.id FROM joueurs AS joueurs_1 "
+                  "WHERE joueurs_1.id = %(pk_1)s AND x::text = :y"),
+            "SELECT joueurs_1.id FROM joueurs AS joueurs_1 "
+            "WHERE joueurs_1.id = ? AND x::text = ?"
+        )
+        # parameter lists
+        self.assertEqual(shape("SELECT a FROM b WHERE c IN (?, ?, ?)"),
+                         shape("SELECT a FROM b WHERE c IN (?)"))
+
+    def test_start_finish(self):
+        """Unit tests for query_stats.start / finish functions."""
+        # def start(ctx) / def finish(ctx)
+        engine = sqlalchemy.create_engine("sqlite://")
+        query_stats.install(engine)
+        query_stats.install(engine)         # registered once
+        ctx = mock.Mock()
+        ctx.command.qualified_name = "cmd"
+
+        # outside a command
+        with engine.connect() as conn:
+            conn.execute(sqlalchemy.text("SELECT 1"))
+        totals = query_stats.totals()
+        self.assertEqual(list(totals), [None])
+        self.assertEqual(totals[None].queries, 1)
+        self.assertEqual(totals[None].invocations, 0)
+
+        # command with repeated queries
+        query_stats.start(ctx)
+        with engine.connect() as conn:
+            for i in range(config.sql_stats_n_plus_one):
+                conn.execute(sqlalchemy.text(f"SELECT {i}"))
+            conn.execute(sqlalchemy.text("SELECT 1, 2"))
+            with self.assertRaises(sqlalchemy.exc.OperationalError):
+                conn.execute(sqlalchemy.text("SELECT * FROM nope"))
+        stats = query_stats.finish(ctx)
+        self.assertEqual(stats.name, "cmd")
+        self.assertEqual(stats.queries, config.sql_stats_n_plus_one + 1)
+        self.assertEqual(len(stats.slowest), config.sql_stats_slowest)
+        self.assertEqual(stats.n_plus_one(),
+                         [("SELECT ?", config.sql_stats_n_plus_one)])
+        self.assertEqual(list(query_stats.recent), [stats])
+        totals = query_stats.totals()
+        self.assertEqual(totals["cmd"].invocations, 1)
+        self.assertEqual(totals["cmd"].max_queries, stats.queries)
+        self.assertEqual(totals["cmd"].n_plus_one, 1)
+        self.assertEqual(totals[None].queries, 1)     # unchanged
+        # not started / already finished
+        self.assertIsNone(query_stats.finish(ctx))
+
+        # nested commands
+        ctx2 = mock.Mock()
+        ctx2.command.qualified_name = "cmd2"
+        query_stats.start(ctx)
+        query_stats.start(ctx2)
+        with engine.connect() as conn:
+            conn.execute(sqlalchemy.text("SELECT 1"))
+        self.assertEqual(query_stats.finish(ctx2).queries, 1)
+        self.assertEqual(query_stats.finish(ctx).queries, 0)
+
+        # period totals
+        period = query_stats.take_period()
+        self.assertEqual(set(period), {None, "cmd", "cmd2"})
+        self.assertEqual(period["cmd"].invocations, 2)
+        self.assertEqual(query_stats.take_period(), {})
+        self.assertEqual(query_stats.totals()["cmd"].invocations, 2)
+
+    def test_format(self):
+        """Unit tests for query_stats.format_* functions."""
+        # def format_totals(totals) / def format_stats(stats)
+        stats = query_stats.CommandStats("cmd")
+        for i in range(config.sql_stats_n_plus_one):
+            stats.record(f"SELECT {i}", 0.002)
+        stats.record("SELECT a FROM b", 0.01)
+        outside = query_stats.CommandTotals()
+        outside.queries = 2
+        outside.duration = 0.001
+        cmd = query_stats.CommandTotals()
+        cmd.add(stats)
+
+        self.assertEqual(
+            query_stats.format_totals({None: outside, "cmd": cmd}),
+            f"!cmd : 1 exécutions, {stats.queries} requêtes "
+            f"(max. {stats.queries}), 20 ms, 1 N+1 suspects\n"
+            "(hors commande) : 2 requêtes, 1 ms"
+        )
+        r = query_stats.format_stats(stats)
+        self.assertIn(f": {stats.queries} requêtes, 20 ms\n", r)
+        self.assertIn("   - 10.0 ms : SELECT a FROM b\n", r)
+        self.assertIn("   N+1 suspect (5 fois) : SELECT ?\n", r)
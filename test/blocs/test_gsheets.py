@@ -1,10 +1,15 @@
+import asyncio
+import collections
+import datetime
 import enum
+import os
+import tempfile
 import unittest
 from unittest import mock
 
-from lgrez import bdd
+from lgrez import config, bdd
 from lgrez.blocs import gsheets
-from test import mock_env
+from test import mock_discord, mock_bdd, mock_env
 
 
 
@@ -76,100 +81,263 @@ class TestModif(unittest.IsolatedAsyncioTestCase):
 class TestGsheetsFunctions(unittest.IsolatedAsyncioTestCase):
     """Unit tests for lgrez.blocs.gsheets functions."""
 
-    @mock_env.patch_env(LGREZ_GCP_CREDENTIALS='{"st": 2, "ls": [], "dc": {}}')
-    @mock.patch("gspread.authorize")
-    @mock.patch("oauth2client.service_account.ServiceAccountCredentials")
-    def test_connect(self, sac_patch, auth_patch):
+    def setUp(self):
+        mock_discord.mock_config()
+        gsheets.invalidate()
+        # No Google API quota waiting / backoff
+        for patcher in (mock.patch("lgrez.blocs.gsheets._acquire"),
+                        mock.patch("lgrez.blocs.gsheets._backoff",
+                                   return_value=0)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        mock_discord.unmock_config()
+        gsheets.invalidate()
+
+    @mock.patch("lgrez.blocs.gsheets._get_manager")
+    async def test_connect(self, gm_patch):
         """Unit tests for gsheets.connect function."""
-        # def connect(key)
+        # async def connect(key)
         connect = gsheets.connect
-        # unique case
-        key = mock.Mock()
-        wb = connect(key)
-        sac_patch.from_json_keyfile_dict.assert_called_once_with(
-            {"st": 2, "ls": [], "dc": {}},
-            ['https://spreadsheets.google.com/feeds']
-        )
-        auth_patch.assert_called_once_with(
-            sac_patch.from_json_keyfile_dict.return_value)
-        client = auth_patch.return_value
-        client.open_by_key.assert_called_once_with(key)
+        client = mock.Mock(open_by_key=mock.AsyncMock())
+        gm_patch.return_value.authorize = mock.AsyncMock(return_value=client)
+        info = gsheets.cache_info()
+
+        # not in cache
+        wb = await connect("key1")
+        client.open_by_key.assert_called_once_with("key1")
         self.assertEqual(wb, client.open_by_key.return_value)
+        self.assertEqual(gsheets.cache_info().misses, info.misses + 1)
+        client.open_by_key.reset_mock()
+
+        # in cache
+        wb2 = await connect("key1")
+        client.open_by_key.assert_not_called()
+        self.assertIs(wb2, wb)
+        self.assertEqual(gsheets.cache_info().hits, info.hits + 1)
+
+        # auth error: invalidated and retried
+        response = mock.Mock(status_code=401)
+        response.json.return_value = {"error": {"code": 401}}
+        client.open_by_key.side_effect = [
+            gsheets.gspread.exceptions.APIError(response), "wb3"
+        ]
+        wb3 = await connect("key2")
+        self.assertEqual(wb3, "wb3")
+        self.assertEqual(client.open_by_key.call_count, 2)
+        self.assertEqual(gsheets.cache_info().invalidations,
+                         info.invalidations + 1)
+        self.assertEqual(gsheets.cache_info().currsize, 1)    # key1 dropped
+
+        # other error: raised
+        client.open_by_key.side_effect = ValueError
+        with self.assertRaises(ValueError):
+            await connect("key3")
+        self.assertEqual(gsheets.cache_info().invalidations,
+                         info.invalidations + 1)
 
 
-    def test_update(self):
+    @mock.patch("lgrez.blocs.gsheets.connect")
+    async def test_get_worksheet(self, connect_patch):
+        """Unit tests for gsheets.get_worksheet function."""
+        # async def get_worksheet(key, name)
+        get_worksheet = gsheets.get_worksheet
+        workbook = mock.Mock(worksheet=mock.AsyncMock())
+        connect_patch.return_value = workbook
+
+        # not in cache
+        sheet = await get_worksheet("key", "feuille")
+        connect_patch.assert_called_once_with("key")
+        workbook.worksheet.assert_called_once_with("feuille")
+        self.assertEqual(sheet, workbook.worksheet.return_value)
+        connect_patch.reset_mock()
+        workbook.worksheet.reset_mock()
+
+        # in cache
+        self.assertIs(await get_worksheet("key", "feuille"), sheet)
+        connect_patch.assert_not_called()
+        workbook.worksheet.assert_not_called()
+
+        # other sheet
+        workbook.worksheet.side_effect = gsheets.WorksheetNotFound
+        with self.assertRaises(gsheets.WorksheetNotFound):
+            await get_worksheet("key", "autre")
+
+        # invalidated
+        gsheets.invalidate()
+        self.assertEqual(gsheets.cache_info().currsize, 0)
+        workbook.worksheet.side_effect = None
+        await get_worksheet("key", "feuille")
+        workbook.worksheet.assert_called_with("feuille")
+
+
+    async def test_update(self):
         """Unit tests for gsheets.update function."""
-        # def update(sheet, *modifs)
+        # async def update(sheet, *modifs)
         update = gsheets.update
 
+        def check(sheet, *data):
+            sheet.range.assert_not_called()
+            sheet.batch_update.assert_called_once_with(
+                [{"range": rng, "values": values} for rng, values in data],
+                value_input_option="RAW"
+            )
+
+        # no modifs
+        sheet = mock.AsyncMock()
+        await update(sheet)
+        sheet.batch_update.assert_not_called()
+
         # 1 modif - str
-        sheet = mock.Mock()
-        cell = mock.Mock(row=4, col=6)
-        sheet.range.return_value = [cell]
-        update(sheet, gsheets.Modif(3, 5, "vàl"))
-        sheet.range.assert_called_once_with(1, 1, 4, 6)
-        self.assertEqual(cell.value, "vàl")
-        sheet.update_cells.assert_called_once_with([cell])
+        sheet = mock.AsyncMock()
+        await update(sheet, gsheets.Modif(3, 5, "vàl"))
+        check(sheet, ("F4:F4", [["vàl"]]))
 
         # 1 modif - None
-        sheet = mock.Mock()
-        cell = mock.Mock(row=4, col=6)
-        sheet.range.return_value = [cell]
-        update(sheet, gsheets.Modif(3, 5, None))
-        sheet.range.assert_called_once_with(1, 1, 4, 6)
-        self.assertEqual(cell.value, "")
-        sheet.update_cells.assert_called_once_with([cell])
+        sheet = mock.AsyncMock()
+        await update(sheet, gsheets.Modif(3, 5, None))
+        check(sheet, ("F4:F4", [[""]]))
 
         # 1 modif - int
-        sheet = mock.Mock()
-        cell = mock.Mock(row=4, col=6)
-        sheet.range.return_value = [cell]
-        update(sheet, gsheets.Modif(3, 5, 5328))
-        sheet.range.assert_called_once_with(1, 1, 4, 6)
-        self.assertEqual(cell.value, 5328)
-        sheet.update_cells.assert_called_once_with([cell])
+        sheet = mock.AsyncMock()
+        await update(sheet, gsheets.Modif(3, 5, 5328))
+        check(sheet, ("F4:F4", [[5328]]))
 
         # 1 modif - large int
-        sheet = mock.Mock()
-        cell = mock.Mock(row=4, col=6)
-        sheet.range.return_value = [cell]
-        update(sheet, gsheets.Modif(3, 5, 452136988741234))
-        sheet.range.assert_called_once_with(1, 1, 4, 6)
-        self.assertEqual(cell.value, "452136988741234")
-        sheet.update_cells.assert_called_once_with([cell])
+        sheet = mock.AsyncMock()
+        await update(sheet, gsheets.Modif(3, 5, 452136988741234))
+        check(sheet, ("F4:F4", [["452136988741234"]]))
 
         # 1 modif - enum
         class MonEnum(enum.Enum):
             akk = "voui"
-        sheet = mock.Mock()
-        cell = mock.Mock(row=4, col=6)
-        sheet.range.return_value = [cell]
-        update(sheet, gsheets.Modif(3, 5, MonEnum.akk))
-        sheet.range.assert_called_once_with(1, 1, 4, 6)
-        self.assertEqual(cell.value, "akk")
-        sheet.update_cells.assert_called_once_with([cell])
-
-        # 1 modif - entrée de BDD
-        entree = mock.Mock(bdd.Joueur, primary_key="flebl")
-        sheet = mock.Mock()
-        cell = mock.Mock(row=4, col=6)
-        sheet.range.return_value = [cell]
-        update(sheet, gsheets.Modif(3, 5, entree))
-        sheet.range.assert_called_once_with(1, 1, 4, 6)
-        self.assertEqual(cell.value, "flebl")
-        sheet.update_cells.assert_called_once_with([cell])
-
-        # several modifs
-        sheet = mock.Mock()
-        cells = [mock.Mock(row=4, col=6), mock.Mock(row=4, col=7),
-                 mock.Mock(row=1, col=3), mock.Mock(row=8, col=2),]
-        sheet.range.return_value = cells
-        update(sheet, gsheets.Modif(3, 5, "azz"), gsheets.Modif(3, 6, "bzz"),
-               gsheets.Modif(0, 2, "czz"), gsheets.Modif(7, 1, "dzz"))
-        sheet.range.assert_called_once_with(1, 1, 8, 7)
-        self.assertEqual([cell.value for cell in cells],
-                         ["azz", "bzz", "czz", "dzz"])
-        sheet.update_cells.assert_called_once_with(cells)
+        sheet = mock.AsyncMock()
+        await update(sheet, gsheets.Modif(3, 5, MonEnum.akk))
+        check(sheet, ("F4:F4", [["akk"]]))
+
+        # 1 modif - table instance
+        inst = mock.Mock(bdd.base.TableBase, primary_key="pk")
+        sheet = mock.AsyncMock()
+        await update(sheet, gsheets.Modif(3, 5, inst))
+        check(sheet, ("F4:F4", [["pk"]]))
+
+        # rectangle, row segment, isolated cell, same cell twice
+        sheet = mock.AsyncMock()
+        await update(sheet,
+                     gsheets.Modif(1, 1, "b2"), gsheets.Modif(2, 2, "c3"),
+                     gsheets.Modif(1, 2, "c2"), gsheets.Modif(2, 1, "b3"),
+                     gsheets.Modif(5, 0, "a6"), gsheets.Modif(5, 1, "b6"),
+                     gsheets.Modif(9, 27, "x"), gsheets.Modif(1, 1, "B2"))
+        check(sheet, ("B2:C3", [["B2", "c2"], ["b3", "c3"]]),
+              ("A6:B6", [["a6", "b6"]]), ("AB10:AB10", [["x"]]))
+
+        # auth error: cache invalidated
+        sheet = mock.AsyncMock()
+        sheet.batch_update.side_effect = gsheets.RefreshError
+        with mock.patch("lgrez.blocs.gsheets.invalidate") as inv_patch:
+            with self.assertRaises(gsheets.RefreshError):
+                await update(sheet, gsheets.Modif(3, 5, "vàl"))
+        inv_patch.assert_called_once_with()
+
+    def test__rectangles(self):
+        """Unit tests for gsheets._rectangles function."""
+        # def _rectangles(cells)
+        _rectangles = gsheets._rectangles
+        # same columns on consecutive rows, then different widths
+        cells = {(0, 0): 1, (0, 1): 2, (1, 0): 3, (1, 1): 4, (2, 0): 5,
+                 (4, 0): 6, (4, 1): 7}
+        self.assertEqual(_rectangles(cells), [
+            (0, 0, [[1, 2], [3, 4]]),
+            (2, 0, [[5]]),
+            (4, 0, [[6, 7]]),
+        ])
+        # every cell covered exactly once
+        cells = {(row, col): (row, col) for row in range(10)
+                 for col in range(8) if (row * col) % 3}
+        covered = {}
+        for row, col, values in _rectangles(cells):
+            for i, line in enumerate(values):
+                for j, val in enumerate(line):
+                    self.assertNotIn((row + i, col + j), covered)
+                    covered[row + i, col + j] = val
+        self.assertEqual(covered, cells)
+
+
+    @mock_bdd.patch_db      # Empty database for this method
+    def test_append_later(self):
+        """Unit tests for gsheets.append_later function."""
+        # def append_later(key, name, values)
+        append_later = gsheets.append_later
+
+        class _Enum(enum.Enum):
+            a = 1
+
+        loop = mock.Mock(**{"time.return_value": 100})
+        handle = loop.call_later.return_value
+        handle.when.return_value = 105
+        with mock.patch.dict(gsheets._appends,
+                             {"pending": 0, "handle": None}), \
+             mock.patch("lgrez.config.loop", loop), \
+             mock.patch("lgrez.config.gsheets_append_batch", 3):
+            # stored, flush scheduled
+            append_later("kéy", "fe", ["a", _Enum.a, None, 10**15])
+            ecriture, = bdd.EcritureGSheet.query.all()
+            self.assertEqual((ecriture.classeur, ecriture.feuille),
+                             ("kéy", "fe"))
+            self.assertEqual(ecriture.valeurs, ["a", "a", "", str(10**15)])
+            loop.call_later.assert_called_once_with(5, gsheets._start_flush)
+            loop.call_later.reset_mock()
+            # already scheduled
+            append_later("kéy", "fe", ["b"])
+            loop.call_later.assert_not_called()
+            # batch size reached: flush now
+            append_later("kéy", "fi", ["c"])
+            handle.cancel.assert_called_once()
+            loop.call_later.assert_called_once_with(0, gsheets._start_flush)
+            self.assertEqual(len(bdd.EcritureGSheet.query.all()), 3)
+
+    @mock_bdd.patch_db      # Empty database for this method
+    @mock.patch("lgrez.blocs.gsheets.schedule_flush")
+    @mock.patch("lgrez.blocs.gsheets.get_worksheet")
+    async def test_flush_appends(self, gws_patch, sf_patch):
+        """Unit tests for gsheets.flush_appends function."""
+        # async def flush_appends()
+        flush_appends = gsheets.flush_appends
+        sheets = {name: mock.Mock(append_rows=mock.AsyncMock())
+                  for name in ("fe", "fi")}
+        gws_patch.side_effect = lambda key, name: sheets[name]
+
+        def add(name, *values):
+            bdd.EcritureGSheet(timestamp=datetime.datetime.now(),
+                               classeur="kéy", feuille=name,
+                               valeurs=list(values)).add()
+
+        # nothing to send
+        self.assertEqual(await flush_appends(), 0)
+        gws_patch.assert_not_called()
+
+        # one request per sheet, in order
+        add("fe", "a", 1)
+        add("fi", "b")
+        add("fe", "c", 3)
+        self.assertEqual(await flush_appends(), 3)
+        sheets["fe"].append_rows.assert_called_once_with(
+            [["a", 1], ["c", 3]], value_input_option="USER_ENTERED"
+        )
+        sheets["fi"].append_rows.assert_called_once_with(
+            [["b"]], value_input_option="USER_ENTERED"
+        )
+        self.assertEqual(bdd.EcritureGSheet.query.all(), [])
+        sf_patch.assert_not_called()
+
+        # error: rows kept, retry scheduled
+        add("fe", "d")
+        sheets["fe"].append_rows.side_effect = gsheets.ConnectionError
+        with self.assertRaises(gsheets.ConnectionError):
+            await flush_appends()
+        self.assertEqual(len(bdd.EcritureGSheet.query.all()), 1)
+        sf_patch.assert_called_once_with(config.gsheets_append_retry)
 
 
     @mock.patch("gspread.utils.a1_to_rowcol")
@@ -182,3 +350,259 @@ class TestGsheetsFunctions(unittest.IsolatedAsyncioTestCase):
         col = a_to_index("TEST")
         gsu_patch.assert_called_once_with("TEST1")
         self.assertEqual(col, 253)
+
+    @mock.patch("lgrez.blocs.gsheets._get_document")
+    async def test_fetch_doc_content(self, gd_patch):
+        """Unit tests for gsheets.fetch_doc_content function."""
+        # async def fetch_doc_content(doc_id)
+        fetch_doc_content = gsheets.fetch_doc_content
+        gsheets._documents.clear()
+        self.addCleanup(gsheets._documents.clear)
+
+        def document(revision, text):
+            return {"revisionId": revision, "body": {"content": [
+                {"paragraph": {"elements": [
+                    {"textRun": {"content": text, "textStyle": {}}}
+                ]}},
+                {"sectionBreak": {}},
+            ]}}
+
+        # first fetch: whole document
+        gd_patch.return_value = document("r1", "Hello")
+        content = await fetch_doc_content("doc")
+        self.assertEqual(content, [("Hello", {})])
+        gd_patch.assert_called_once_with("doc", None)
+        gd_patch.reset_mock()
+
+        # same revision: only revision asked
+        gd_patch.return_value = {"revisionId": "r1"}
+        content = await fetch_doc_content("doc")
+        self.assertEqual(content, [("Hello", {})])
+        gd_patch.assert_called_once_with("doc", "revisionId")
+        gd_patch.reset_mock()
+
+        # new revision: document fetched again
+        gd_patch.side_effect = [{"revisionId": "r2"},
+                                document("r2", "Bye")]
+        content = await fetch_doc_content("doc")
+        self.assertEqual(content, [("Bye", {})])
+        self.assertEqual(gd_patch.call_args_list,
+                         [mock.call("doc", "revisionId"),
+                          mock.call("doc", None)])
+        gd_patch.side_effect = None
+        gd_patch.reset_mock()
+
+        # cache size limited
+        gd_patch.return_value = document("r", "Other")
+        with mock.patch("lgrez.blocs.gsheets.DOCS_CACHE_SIZE", 2):
+            await fetch_doc_content("doc2")
+            await fetch_doc_content("doc3")
+        self.assertEqual(list(gsheets._documents), ["doc2", "doc3"])
+
+    def test_DriveCache(self):
+        """Unit tests for gsheets.DriveCache class."""
+        # class DriveCache(root)
+        with tempfile.TemporaryDirectory() as root:
+            cache = gsheets.DriveCache(root)
+            self.assertIsNone(cache.get("f1", "t1"))
+            cache.put("f1", "t1", b"data")
+            cache.put("f2", "t1", b"data")
+            self.assertEqual(cache.get("f1", "t1"), b"data")
+            self.assertEqual(cache.get("f2", "t1"), b"data")
+            self.assertIsNone(cache.get("f1", "t2"))
+            # content stored once
+            self.assertEqual(len(os.listdir(os.path.join(root, "objects"))),
+                             1)
+            # corrupted content ignored
+            path = os.path.join(root, "objects",
+                                os.listdir(os.path.join(root, "objects"))[0])
+            with open(path, "wb") as fh:
+                fh.write(b"dat")
+            self.assertIsNone(cache.get("f1", "t1"))
+
+    @mock.patch("lgrez.blocs.gsheets._get_modified_time")
+    @mock.patch("lgrez.blocs.gsheets._get_media")
+    async def test_download_files(self, gm_patch, gmt_patch):
+        """Unit tests for gsheets.download_files function."""
+        # async def download_files(files)
+        download_files = gsheets.download_files
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        gm_patch.side_effect = lambda file_id: f"<{file_id}>".encode()
+        gmt_patch.return_value = "t0"
+        files = [{"file_id": f"f{i}", "modified": "t1"} for i in range(5)]
+
+        # no cache
+        with mock.patch.object(config, "drive_cache_dir", None):
+            datas = await download_files(files)
+        self.assertEqual(datas, [f"<f{i}>".encode() for i in range(5)])
+        self.assertEqual(gm_patch.call_count, 5)
+        gm_patch.reset_mock()
+
+        with mock.patch.object(config, "drive_cache_dir", tmp.name):
+            # partial failure: other files cached
+            gm_patch.side_effect = lambda file_id: (
+                b"" if file_id == "f2" else f"<{file_id}>".encode()
+            )
+            with self.assertRaises(RuntimeError):
+                await download_files(files)
+            self.assertEqual(gm_patch.call_count, 5)
+            gm_patch.reset_mock()
+
+            # second run: only missing file downloaded
+            gm_patch.side_effect = lambda file_id: f"<{file_id}>".encode()
+            datas = await download_files(files)
+            self.assertEqual(datas, [f"<f{i}>".encode() for i in range(5)])
+            gm_patch.assert_called_once_with("f2")
+            gm_patch.reset_mock()
+
+            # modification time unknown: asked
+            datas = await download_files([{"file_id": "f9"}])
+            self.assertEqual(datas, [b"<f9>"])
+            gmt_patch.assert_called_once_with("f9")
+            datas = await download_files([{"file_id": "f9"}])
+            gm_patch.assert_called_once_with("f9")
+
+
+
+def api_error(status):
+    """gspread.exceptions.APIError with HTTP status ``status``."""
+    response = mock.Mock(status_code=status, **{"json.return_value": {
+        "error": {"code": status, "message": "oh", "status": "NOPE"}
+    }})
+    return gsheets.gspread.exceptions.APIError(response)
+
+
+class TestGoogleAPIScheduler(unittest.IsolatedAsyncioTestCase):
+    """Unit tests for lgrez.blocs.gsheets Google API scheduler."""
+
+    def setUp(self):
+        window = gsheets.API_STATS_WINDOW
+        for patcher in (
+            mock.patch.dict(gsheets._bucket, {"tokens": None,
+                                              "updated": None,
+                                              "handle": None}),
+            mock.patch.object(gsheets, "_waiting", []),
+            mock.patch.object(gsheets, "_api_counts", collections.Counter()),
+            mock.patch.object(gsheets, "_waits",
+                              collections.deque(maxlen=window)),
+            mock.patch.object(gsheets, "_latencies",
+                              collections.deque(maxlen=window)),
+            mock.patch.object(config, "google_api_quota", 600),
+            mock.patch.object(config, "google_api_burst", 2),
+            mock.patch.object(config, "google_api_backoff", 0),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def test_request(self):
+        """Unit tests for gsheets.request function."""
+        # async def request(func, *args, priority=Priority.sync, **kwargs)
+        request = gsheets.request
+        Priority = gsheets.Priority
+        calls = []
+
+        async def func(label, value=None):
+            calls.append(label)
+            return value
+
+        # burst, then by priority / arrival order
+        self.assertEqual(await request(func, "a", value=12), 12)
+        await request(func, "b", priority=Priority.lore)
+        tasks = [
+            asyncio.create_task(request(func, label, priority=priority))
+            for label, priority in [
+                ("lore", Priority.lore), ("export1", Priority.export),
+                ("sync", Priority.sync), ("export2", Priority.export),
+                ("inscription", Priority.inscription),
+            ]
+        ]
+        await asyncio.sleep(0)
+        self.assertEqual(gsheets.api_stats().queued, {
+            Priority.sync: 1, Priority.inscription: 1, Priority.export: 2,
+            Priority.lore: 1,
+        })
+        await asyncio.gather(*tasks)
+        self.assertEqual(calls, ["a", "b", "sync", "inscription",
+                                 "export1", "export2", "lore"])
+        stats = gsheets.api_stats()
+        self.assertEqual(sum(stats.queued.values()), 0)
+        self.assertEqual(stats.requests, 7)
+        self.assertGreater(stats.mean_wait, 0)
+
+        # temporary errors: retried
+        func = mock.AsyncMock(side_effect=[api_error(429), api_error(503),
+                                           gsheets.ConnectionError, "ok"])
+        self.assertEqual(await request(func, 1, b=2), "ok")
+        self.assertEqual(func.call_count, 4)
+        func.assert_called_with(1, b=2)
+        self.assertEqual(gsheets.api_stats().retries, 3)
+
+        # other errors: raised
+        func = mock.AsyncMock(side_effect=api_error(400))
+        with self.assertRaises(gsheets.gspread.exceptions.APIError):
+            await request(func)
+        func.assert_called_once()
+        func = mock.AsyncMock(side_effect=KeyError)
+        with self.assertRaises(KeyError):
+            await request(func)
+        func.assert_called_once()
+
+        # too many retries
+        func = mock.AsyncMock(side_effect=api_error(500))
+        with mock.patch.object(config, "google_api_max_retries", 2):
+            with self.assertRaises(gsheets.gspread.exceptions.APIError):
+                await request(func)
+        self.assertEqual(func.call_count, 3)
+        self.assertEqual(gsheets.api_stats().failures, 3)
+
+    async def test__ClientManager(self):
+        """Unit tests for gsheets._ClientManager class."""
+        # class _ClientManager(gspread_asyncio.AsyncioGspreadClientManager)
+        manager = gsheets._get_manager()
+        self.assertIsInstance(manager, gsheets._ClientManager)
+        self.assertIs(gsheets._get_manager(), manager)
+        # errors raised by the manager, retried by request only
+        method = mock.Mock(__name__="method", side_effect=[
+            api_error(429), api_error(503),
+            gsheets.requests.exceptions.ReadTimeout(), "ok",
+        ])
+        with mock.patch("asyncio.sleep") as sleep_patch:
+            self.assertEqual(await gsheets.request(manager._call, method,
+                                                   12), "ok")
+        # no gspread_delay sleep, only request backoff (0 here)
+        self.assertEqual(sleep_patch.call_args_list, [mock.call(0)] * 3)
+        self.assertEqual(method.call_count, 4)
+        method.assert_called_with(12)
+        self.assertEqual(gsheets.api_stats().retries, 3)
+        # retries limit
+        method = mock.Mock(__name__="method", side_effect=api_error(429))
+        with mock.patch.object(config, "google_api_max_retries", 1):
+            with self.assertRaises(gsheets.gspread.exceptions.APIError):
+                await gsheets.request(manager._call, method)
+        self.assertEqual(method.call_count, 2)
+        self.assertEqual(gsheets.api_stats().failures, 1)
+        gsheets.invalidate()
+
+    def test_request_blocking(self):
+        """Unit tests for gsheets.request_blocking function."""
+        # def request_blocking(func, *args, priority=Priority.lore, **kw)
+        request_blocking = gsheets.request_blocking
+        # no waiting, tokens owed
+        func = mock.Mock(return_value="ok")
+        for _ in range(4):
+            self.assertEqual(request_blocking(func, 1, b=2), "ok")
+        func.assert_called_with(1, b=2)
+        self.assertLess(gsheets.api_stats().tokens, 0)
+        # temporary errors: retried
+        error = gsheets.HttpError(mock.Mock(status=429), b"")
+        func = mock.Mock(side_effect=[error, "ok"])
+        self.assertEqual(request_blocking(func), "ok")
+        self.assertEqual(func.call_count, 2)
+        # other errors: raised
+        error = gsheets.HttpError(mock.Mock(status=404), b"")
+        func = mock.Mock(side_effect=error)
+        with self.assertRaises(gsheets.HttpError):
+            request_blocking(func)
+        func.assert_called_once()
+        self.assertEqual(gsheets.api_stats().requests, 7)
@@ -0,0 +1,205 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import gspread
+from googleapiclient.errors import HttpError
+
+from lgrez import config
+from lgrez.blocs import gsheets, gsheets_emulator
+
+
+
+class TestGsheetsEmulatorFunctions(unittest.TestCase):
+    """Unit tests for lgrez.blocs.gsheets_emulator functions."""
+
+    def test_parse_range(self):
+        """Unit tests for gsheets_emulator.parse_range function."""
+        # def parse_range(a1, n_rows, n_cols)
+        parse_range = gsheets_emulator.parse_range
+        samples = {
+            "B2:D5": (range(1, 5), range(1, 4)),
+            "B2": (range(1, 2), range(1, 2)),
+            "C7:C": (range(6, 10), range(2, 3)),
+            "O7:V7": (range(6, 7), range(14, 22)),
+            "2:3": (range(1, 3), range(0, 6)),
+            "feuille!A1:B": (range(0, 10), range(0, 2)),
+            "AA1": (range(0, 1), range(26, 27)),
+        }
+        for a1, result in samples.items():
+            with self.subTest(a1=a1):
+                self.assertEqual(parse_range(a1, 10, 6), result)
+
+        for a1 in ["", "1A", "A1:B2:C3"]:
+            with self.subTest(a1=a1):
+                with self.assertRaises(ValueError):
+                    parse_range(a1, 10, 6)
+
+
+class TestEmulator(unittest.IsolatedAsyncioTestCase):
+    """Unit tests for lgrez.blocs.gsheets_emulator.Emulator class."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        os.makedirs(os.path.join(root, "sheets", "key"))
+        with open(os.path.join(root, "sheets", "key", "TDB.csv"), "w",
+                  newline="") as fh:
+            fh.write("A,B,C\r\n1,2\r\n\r\n4,5,6\r\n")
+        os.makedirs(os.path.join(root, "docs"))
+        with open(os.path.join(root, "docs", "doc.txt"), "w") as fh:
+            fh.write("Ligne 1\nLigne 2\n")
+        with open(os.path.join(root, "docs", "doc2.json"), "w") as fh:
+            json.dump({"body": {"content": []}}, fh)
+        os.makedirs(os.path.join(root, "drive", "folder"))
+        with open(os.path.join(root, "drive", "folder", "a.png"),
+                  "wb") as fh:
+            fh.write(b"\x89PNG")
+        self.emulator = gsheets_emulator.Emulator(root)
+        self.patches = [
+            mock.patch.object(config, "google_emulator_latency", 0),
+            mock.patch.object(config, "google_emulator_error_rate", 0),
+            mock.patch.object(config, "google_emulator_quota", 0),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        self.tmp.cleanup()
+
+    async def test_sheets(self):
+        """Unit tests for emulated spreadsheets and worksheets."""
+        emulator = self.emulator
+
+        # missing spreadsheet / worksheet
+        with self.assertRaises(gspread.exceptions.SpreadsheetNotFound):
+            await emulator.open_by_key("nope")
+        workbook = await emulator.open_by_key("key")
+        with self.assertRaises(gspread.exceptions.WorksheetNotFound):
+            await workbook.worksheet("nope")
+
+        # read
+        sheet = await workbook.worksheet("TDB")
+        values = await sheet.get_all_values()
+        self.assertEqual(values, [["A", "B", "C"], ["1", "2", ""],
+                                  ["", "", ""], ["4", "5", "6"]])
+        res = await sheet.batch_get(["A1:B", "C2:C", "B3", "E1:F2"])
+        self.assertEqual(res, [[["A", "B"], ["1", "2"], [], ["4", "5"]],
+                               [[], [], ["6"]], [], []])
+
+        # write
+        await sheet.batch_update([
+            {"range": "C2:D3", "values": [[7, None], ["x", 8]]},
+            {"range": "F6", "values": [[True]]},
+        ])
+        values = await sheet.get_all_values()
+        self.assertEqual(values, [
+            ["A", "B", "C", "", "", ""], ["1", "2", "7", "", "", ""],
+            ["", "", "x", "8", "", ""], ["4", "5", "6", "", "", ""],
+            ["", "", "", "", "", ""], ["", "", "", "", "", "True"],
+        ])
+
+        # append
+        await sheet.append_rows([["y", 9], ["z"]])
+        await sheet.append_row(["w"])
+        values = await sheet.get_all_values()
+        self.assertEqual([row[:2] for row in values[-4:]],
+                         [["", ""], ["y", "9"], ["z", ""], ["w", ""]])
+        self.assertEqual(emulator.requests, 11)
+
+    def test_docs_drive(self):
+        """Unit tests for emulated Docs and Drive resources."""
+        emulator = self.emulator
+
+        document = emulator.get_document("doc")
+        self.assertEqual(document["body"]["content"][1], {
+            "paragraph": {"elements": [
+                {"textRun": {"content": "Ligne 2\n", "textStyle": {}}}
+            ]}
+        })
+        revision = document["revisionId"]
+        self.assertEqual(emulator.get_document("doc", fields="revisionId"),
+                         {"revisionId": revision})
+        self.assertEqual(emulator.get_document("doc2")["body"],
+                         {"content": []})
+        with self.assertRaises(HttpError) as cm:
+            emulator.get_document("nope")
+        self.assertEqual(cm.exception.resp.status, 404)
+
+        files = emulator.list_files("folder")["files"]
+        self.assertEqual(len(files), 1)
+        modified = files[0].pop("modifiedTime")
+        self.assertEqual(files, [
+            {"id": "folder/a.png", "name": "a.png", "fileExtension": "png"}
+        ])
+        self.assertEqual(emulator.get_file("folder/a.png"),
+                         {"id": "folder/a.png", "name": "a.png",
+                          "fileExtension": "png", "modifiedTime": modified})
+        self.assertEqual(emulator.get_media("folder/a.png"), b"\x89PNG")
+        with self.assertRaises(HttpError):
+            emulator.list_files("nope")
+        with self.assertRaises(HttpError):
+            emulator.get_media("folder/nope")
+        with self.assertRaises(HttpError):
+            emulator.get_file("folder/nope")
+
+    async def test_quota(self):
+        """Unit tests for emulated quota errors."""
+        emulator = self.emulator
+
+        # quota per minute
+        config.google_emulator_quota = 2
+        await emulator.tick()
+        emulator.tick_blocking()
+        with self.assertRaises(gspread.exceptions.APIError) as cm:
+            await emulator.tick()
+        self.assertEqual(cm.exception.response.status_code, 429)
+        with self.assertRaises(HttpError) as cm:
+            emulator.tick_blocking()
+        self.assertEqual(cm.exception.resp.status, 429)
+        self.assertEqual((emulator.requests, emulator.errors), (4, 2))
+
+        # random errors
+        config.google_emulator_quota = 0
+        config.google_emulator_error_rate = 1
+        with self.assertRaises(gspread.exceptions.APIError):
+            await emulator.tick()
+
+    async def test_gsheets_backend(self):
+        """Unit tests for gsheets functions with the emulator enabled."""
+        env = {gsheets.EMULATOR_ENV_VAR: self.tmp.name}
+        with mock.patch.dict(os.environ, env), \
+             mock.patch("lgrez.blocs.gsheets._acquire"):
+            gsheets.invalidate()
+            emulator = gsheets.get_emulator()
+            self.assertIsInstance(emulator, gsheets_emulator.Emulator)
+            self.assertIs(gsheets.get_emulator(), emulator)
+
+            sheet = await gsheets.get_worksheet("key", "TDB")
+            await gsheets.update(sheet, gsheets.Modif(1, 2, 12),
+                                 gsheets.Modif(4, 0, "new"))
+            values = await sheet.get_all_values()
+            self.assertEqual(values[1][2], "12")
+            self.assertEqual(values[4][0], "new")
+
+            content = gsheets.get_doc_content("doc")
+            self.assertEqual(content, [("Ligne 1\n", {}),
+                                       ("Ligne 2\n", {})])
+            files = gsheets.get_files_in_folder("folder")
+            self.assertEqual(len(files), 1)
+            self.assertTrue(files[0].pop("modified"))
+            self.assertEqual(files, [{"file_id": "folder/a.png",
+                                      "name": "a.png", "extension": "png"}])
+            afiles = await gsheets.get_files_in_folder_async("folder")
+            self.assertTrue(afiles[0].pop("modified"))
+            self.assertEqual(afiles, files)
+            data = gsheets.download_file("folder/a.png")
+            self.assertEqual(data, b"\x89PNG")
+            gsheets.invalidate()
+
+        with mock.patch.dict(os.environ, clear=True):
+            self.assertIsNone(gsheets.get_emulator())
@@ -176,6 +176,34 @@ class TestOneCommandFunctions(unittest.IsolatedAsyncioTestCase):
         self.assertNotIn(14, config.bot.in_command)     # removed
 
 
+    @mock.patch("lgrez.blocs.one_command.add_to_in_command")
+    @mock.patch("lgrez.bdd.query_stats.start")
+    @mock.patch("lgrez.bdd.base.open_command_session")
+    async def test_before_invoke(self, ocs_patch, qs_patch, atic_patch):
+        """Unit tests for one_command.before_invoke function."""
+        # async def before_invoke(ctx)
+        before_invoke = one_command.before_invoke
+        ctx = mock.Mock()
+        await before_invoke(ctx)
+        ocs_patch.assert_called_once_with(ctx)
+        qs_patch.assert_called_once_with(ctx)
+        atic_patch.assert_called_once_with(ctx)
+
+
+    @mock.patch("lgrez.blocs.one_command.remove_from_in_command")
+    @mock.patch("lgrez.bdd.query_stats.finish")
+    @mock.patch("lgrez.bdd.base.close_command_session")
+    async def test_after_invoke(self, ccs_patch, qs_patch, rfic_patch):
+        """Unit tests for one_command.after_invoke function."""
+        # async def after_invoke(ctx)
+        after_invoke = one_command.after_invoke
+        ctx = mock.Mock()
+        await after_invoke(ctx)
+        ccs_patch.assert_called_once_with(ctx)
+        qs_patch.assert_called_once_with(ctx)
+        rfic_patch.assert_called_once_with(ctx)
+
+
     async def test_do_not_limit(self):
         """Unit tests for one_command.do_not_limit function."""
         # def do_not_limit(command)
@@ -290,7 +290,7 @@ class TestToolsDecorators(unittest.IsolatedAsyncioTestCase):
             await vivants_only.predicate(ctx)
 
 
-    @mock.patch("lgrez.bdd.Joueur.from_member")
+    @mock.patch("lgrez.bdd.Joueur.from_member_async")
     async def test_private(self, fm_patch):
         """Unit tests for tools.private decorator."""
         # def private(callback)
@@ -539,7 +539,7 @@ class TestToolsPlayerInteractors(unittest.IsolatedAsyncioTestCase):
         fm_patch.assert_called_once_with(mb_patch.return_value)
         find_patch.assert_called_once_with(
             "gloozz", col=bdd.Joueur.nom, sensi=0.5,
-            solo_si_parfait=False, match_first_word=True)
+            solo_si_parfait=False, match_first_word=True, limit=10)
         self.assertEqual(jr, expjr)
         find_patch.reset_mock()
         mb_patch.reset_mock()
@@ -556,7 +556,7 @@ class TestToolsPlayerInteractors(unittest.IsolatedAsyncioTestCase):
         fm_patch.assert_called_once_with(mb_patch.return_value)
         find_patch.assert_called_once_with(
             cible, col=bdd.Joueur.nom, sensi=0.3,
-            solo_si_parfait=False, match_first_word=True)
+            solo_si_parfait=False, match_first_word=True, limit=10)
         self.assertEqual(jr, expjr)
         find_patch.reset_mock()
         mb_patch.reset_mock()
@@ -574,7 +574,7 @@ class TestToolsPlayerInteractors(unittest.IsolatedAsyncioTestCase):
         mb_patch.assert_called_once_with("gloozz", must_be_found=False)
         find_patch.assert_called_once_with(
             "gloozz", col=bdd.Joueur.nom, sensi=0.5,
-            solo_si_parfait=False, match_first_word=True)
+            solo_si_parfait=False, match_first_word=True, limit=10)
         self.assertEqual(jr, expjr)
         fm_patch.assert_not_called()
         find_patch.reset_mock()
@@ -592,7 +592,7 @@ class TestToolsPlayerInteractors(unittest.IsolatedAsyncioTestCase):
         mb_patch.assert_called_once_with(cible, must_be_found=False)
         find_patch.assert_called_once_with(
             cible, col=bdd.Joueur.nom, sensi=0.5,
-            solo_si_parfait=False, match_first_word=True)
+            solo_si_parfait=False, match_first_word=True, limit=10)
         self.assertEqual(jr, expjr)
         fm_patch.assert_not_called()
         find_patch.reset_mock()
@@ -614,7 +614,7 @@ class TestToolsPlayerInteractors(unittest.IsolatedAsyncioTestCase):
         mb_patch.assert_called_once_with("gloozz", must_be_found=False)
         find_patch.assert_called_once_with(
             "gloozz", col=bdd.Joueur.nom, sensi=0.5,
-            solo_si_parfait=False, match_first_word=True)
+            solo_si_parfait=False, match_first_word=True, limit=10)
         self.assertEqual(jr, expjrs[2])
         int.patchs["choice"].assert_called_with(config.bot, mock.ANY, 4)
         fm_patch.assert_not_called()
@@ -635,7 +635,7 @@ class TestToolsPlayerInteractors(unittest.IsolatedAsyncioTestCase):
         mb_patch.assert_called_once_with(cible, must_be_found=False)
         find_patch.assert_called_once_with(
             cible, col=bdd.Joueur.nom, sensi=0.5,
-            solo_si_parfait=False, match_first_word=True)
+            solo_si_parfait=False, match_first_word=True, limit=10)
         self.assertEqual(jr, expjrs[4])
         int.patchs["choice"].assert_called_with(config.bot, mock.ANY, 10)
         fm_patch.assert_not_called()
@@ -662,7 +662,7 @@ class TestToolsPlayerInteractors(unittest.IsolatedAsyncioTestCase):
             mock.call("othy", must_be_found=False)])
         find_patch.assert_called_once_with(
             "gloozz", col=bdd.Joueur.nom, sensi=0.5,
-            solo_si_parfait=False, match_first_word=True)
+            solo_si_parfait=False, match_first_word=True, limit=10)
         fm_patch.assert_called_once_with(j2)
         self.assertEqual(jr, fm_patch.return_value)
         fm_patch.reset_mock()
@@ -687,7 +687,7 @@ class TestToolsPlayerInteractors(unittest.IsolatedAsyncioTestCase):
             mock.call("othy", must_be_found=False)])
         find_patch.assert_called_once_with(
             cible, col=bdd.Joueur.nom, sensi=0.5,
-            solo_si_parfait=False, match_first_word=True)
+            solo_si_parfait=False, match_first_word=True, limit=10)
         fm_patch.assert_called_once_with(j2)
         self.assertEqual(jr, fm_patch.return_value)
         fm_patch.reset_mock()
@@ -712,7 +712,7 @@ class TestToolsPlayerInteractors(unittest.IsolatedAsyncioTestCase):
             mock.call("othy", must_be_found=False)])
         find_patch.assert_called_once_with(
             "gloozz", col=bdd.Joueur.nom, sensi=0.5,
-            solo_si_parfait=False, match_first_word=True)
+            solo_si_parfait=False, match_first_word=True, limit=10)
         fm_patch.assert_called_once_with(j2)
         self.assertEqual(jr, fm_patch.return_value)
         fm_patch.reset_mock()
@@ -735,7 +735,7 @@ class TestToolsPlayerInteractors(unittest.IsolatedAsyncioTestCase):
             mock.call("othy", must_be_found=False)])
         find_patch.assert_called_once_with(
             cible, col=bdd.Joueur.nom, sensi=0.5,
-            solo_si_parfait=False, match_first_word=True)
+            solo_si_parfait=False, match_first_word=True, limit=10)
         fm_patch.assert_called_once_with(j2)
         self.assertEqual(jr, fm_patch.return_value)
         fm_patch.reset_mock()
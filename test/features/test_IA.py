@@ -202,7 +202,7 @@ class TestIAFunctions(unittest.IsolatedAsyncioTestCase):
     async def test_trigger_reactions(self):
         """Unit tests for IA.trigger_reactions function."""
         # async def trigger_reactions(message, chain=None, sensi=0.7,
-        #                             debug=False)
+        #                             debug=False, trigger=None)
         trigger_reactions = IA.trigger_reactions
 
         # no reactions
@@ -228,6 +228,17 @@ class TestIAFunctions(unittest.IsolatedAsyncioTestCase):
         self.assertIs(rep, True)
         ctx.assert_sent("non")
 
+        # trigger already found -> no search
+        ctx = mock_discord.get_ctx(None)
+        message = mock_discord.message(ctx, "ooo")
+        trigger = bdd.Trigger.query.one()
+        with mock.patch("lgrez.bdd.Trigger.find_nearest") as fn_patch:
+            rep = await trigger_reactions(message, chain="ooo",
+                                          trigger=trigger)
+        self.assertIs(rep, True)
+        fn_patch.assert_not_called()
+        ctx.assert_sent("non")
+
         # command
         reac.reponse = f"{IA.MARK_CMD}commandz"
         reac.update()
@@ -300,11 +311,15 @@ class TestIAFunctions(unittest.IsolatedAsyncioTestCase):
         self.assertGreater(nb, 400)
 
 
+    @mock.patch("lgrez.bdd.Trigger.find_nearest_many")
     @mock.patch("lgrez.features.IA.trigger_reactions")
-    async def test_trigger_sub_reactions(self, tr_patch):
+    async def test_trigger_sub_reactions(self, tr_patch, fnm_patch):
         """Unit tests for IA.trigger_sub_reactions function."""
         # async def trigger_sub_reactions(message, sensi=0.9, debug=False)
         trigger_sub_reactions = IA.trigger_sub_reactions
+        # every word has a trigger
+        fnm_patch.side_effect = lambda mots, **kwargs: [[(f"T_{mot}", 1)]
+                                                        for mot in mots]
 
         # empty message
         ctx = mock_discord.get_ctx(None)
@@ -329,6 +344,9 @@ class TestIAFunctions(unittest.IsolatedAsyncioTestCase):
         self.assertIs(rep, False)
         tr_patch.assert_not_called()
         ctx.assert_sent()
+        fnm_patch.assert_called_once_with([], col=bdd.Trigger.trigger,
+                                          sensi=0.9, limit=1)
+        fnm_patch.reset_mock()
 
         # one > 4-length word, return False
         ctx = mock_discord.get_ctx(None)
@@ -337,7 +355,8 @@ class TestIAFunctions(unittest.IsolatedAsyncioTestCase):
         rep = await trigger_sub_reactions(message)
         self.assertIs(rep, False)
         tr_patch.assert_called_once_with(message, chain="baazA",
-                                         sensi=0.9, debug=False)
+                                         sensi=0.9, debug=False,
+                                         trigger="T_baazA")
         ctx.assert_sent()
         tr_patch.reset_mock()
 
@@ -348,7 +367,8 @@ class TestIAFunctions(unittest.IsolatedAsyncioTestCase):
         rep = await trigger_sub_reactions(message, debug=True)
         self.assertIs(rep, True)
         tr_patch.assert_called_once_with(message, chain="baazA",
-                                         sensi=0.9, debug=True)
+                                         sensi=0.9, debug=True,
+                                         trigger="T_baazA")
         ctx.assert_sent()
         tr_patch.reset_mock()
 
@@ -359,11 +379,18 @@ class TestIAFunctions(unittest.IsolatedAsyncioTestCase):
         tr_patch.side_effect = [False, False, False]
         rep = await trigger_sub_reactions(message)
         self.assertIs(rep, False)
+        fnm_patch.assert_called_with(
+            ["frooookpoozpzpzpzppa", "book@!", "baazA"],
+            col=bdd.Trigger.trigger, sensi=0.9, limit=1
+        )
+        fnm_patch.reset_mock()
         self.assertEqual(tr_patch.call_args_list, [
             mock.call(message, chain="frooookpoozpzpzpzppa", sensi=0.9,
-                      debug=False),
-            mock.call(message, chain="book@!", sensi=0.9, debug=False),
-            mock.call(message, chain="baazA", sensi=0.9, debug=False),
+                      debug=False, trigger="T_frooookpoozpzpzpzppa"),
+            mock.call(message, chain="book@!", sensi=0.9, debug=False,
+                      trigger="T_book@!"),
+            mock.call(message, chain="baazA", sensi=0.9, debug=False,
+                      trigger="T_baazA"),
         ])
         ctx.assert_sent()
         tr_patch.reset_mock()
@@ -377,12 +404,32 @@ class TestIAFunctions(unittest.IsolatedAsyncioTestCase):
         self.assertIs(rep, True)
         self.assertEqual(tr_patch.call_args_list, [
             mock.call(message, chain="frooookpoozpzpzpzppa", sensi=0.9,
-                      debug=False),
-            mock.call(message, chain="book@!", sensi=0.9, debug=False),
+                      debug=False, trigger="T_frooookpoozpzpzpzppa"),
+            mock.call(message, chain="book@!", sensi=0.9, debug=False,
+                      trigger="T_book@!"),
         ])
         ctx.assert_sent()
         tr_patch.reset_mock()
 
+        # several > 4-length words, only one with a trigger
+        ctx = mock_discord.get_ctx(None)
+        message = mock_discord.message(ctx, "book@! a baazA tok pa "
+                                            "frooookpoozpzpzpzppa")
+        fnm_patch.reset_mock(side_effect=True)
+        fnm_patch.return_value = [[], [("T_book@!", 0.8)], []]
+        tr_patch.side_effect = None
+        tr_patch.return_value = True
+        rep = await trigger_sub_reactions(message, sensi=0.7)
+        self.assertIs(rep, True)
+        tr_patch.assert_called_once_with(message, chain="book@!",
+                                         sensi=0.7, debug=False,
+                                         trigger="T_book@!")
+        fnm_patch.assert_called_once_with(
+            ["frooookpoozpzpzpzppa", "book@!", "baazA"],
+            col=bdd.Trigger.trigger, sensi=0.7, limit=1
+        )
+        ctx.assert_sent()
+
 
     async def test_trigger_di(self):
         """Unit tests for IA.trigger_di function."""
@@ -8,6 +8,46 @@ from lgrez.features import communication
 from test import mock_discord, mock_bdd
 
 
+class TestCommunicationFunctions(unittest.TestCase):
+    """Unit tests for lgrez.features.communication utility functions."""
+
+    @mock.patch("lgrez.blocs.tools.emoji")
+    @mock.patch("lgrez.bdd.Joueur.find_nearest_many")
+    def test__render_lore(self, fnm_patch, emoji_patch):
+        """Unit tests for communication._render_lore function."""
+        # def _render_lore(content)
+        _render_lore = communication._render_lore
+        joueurs = {
+            "Jean Dupont": mock.Mock(**{"member.mention": "<@1>"}),
+            "Marie": mock.Mock(**{"member.mention": "<@2>"}),
+        }
+        fnm_patch.side_effect = lambda noms, **kwargs: [
+            [(joueurs[nom], 1)] if nom in joueurs else [] for nom in noms
+        ]
+        emoji_patch.side_effect = lambda nom, **kwargs: (
+            "<:loup:42>" if nom == "loup" else None
+        )
+
+        content = [
+            ("Salut @Jean Dupont et toi\v", {}),
+            ("  @Marie :loup: :nope:  ", {"bold": True}),
+            ("\n", {}),
+            ("lien", {"link": {"url": "https://a.b"}, "underline": True}),
+            ("@Inconnu", {"underline": True}),
+        ]
+        text = _render_lore(content)
+        self.assertEqual(text, "Salut <@1> et toi\n  **<@2> <:loup:42> "
+                               ":nope:**  \nlien (<https://a.b>)"
+                               "__@Inconnu__")
+        # one-shot players search, all mention candidates
+        fnm_patch.assert_called_once()
+        self.assertEqual(
+            set(fnm_patch.call_args.args[0]),
+            {"Jean Dupont et toi", "Jean Dupont et", "Jean Dupont", "Jean",
+             "Marie", "Inconnu"}
+        )
+
+
 class TestCommunication(unittest.IsolatedAsyncioTestCase):
     """Unit tests for lgrez.features.communication commands."""
 
@@ -6,9 +6,10 @@ import discord
 import freezegun
 
 from lgrez import config, bdd
-from lgrez.features import inscription
+from lgrez.features import inscription, sync
 from lgrez.blocs import gsheets
 from test import mock_discord, mock_bdd, mock_env
+from test.features.test_sync import tdb_sheet
 
 
 class TestInscriptionFunctions(unittest.IsolatedAsyncioTestCase):
@@ -16,6 +17,10 @@ class TestInscriptionFunctions(unittest.IsolatedAsyncioTestCase):
 
     def setUp(self):
         mock_discord.mock_config()
+        # No Google API quota waiting
+        patcher = mock.patch("lgrez.blocs.gsheets._acquire")
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
     def tearDown(self):
         mock_discord.unmock_config()
@@ -138,11 +143,11 @@ class TestInscriptionFunctions(unittest.IsolatedAsyncioTestCase):
 
 
     @mock_env.patch_env(LGREZ_TDB_SHEET_ID="bzoulip!")
-    @mock.patch("lgrez.blocs.gsheets.connect")
+    @mock.patch("lgrez.blocs.gsheets.get_worksheet")
     @mock.patch("lgrez.blocs.gsheets.update")
-    async def test_register_on_tdb(self, gupdate_patch, gconnect_patch):
+    async def test_register_on_tdb(self, gupdate_patch, gws_patch):
         """Unit tests for inscription.register_on_tdb function."""
-        # def register_on_tdb(joueur)
+        # async def register_on_tdb(joueur)
         register_on_tdb = inscription.register_on_tdb
         config.tdb_main_sheet = "uéué"
         config.tdb_header_row = 7
@@ -153,53 +158,66 @@ class TestInscriptionFunctions(unittest.IsolatedAsyncioTestCase):
         jr = mock.Mock()
 
         # mauvaise colonne primaire
-        values = [0]*6 + [[0, 0, "bizzp"]]
-        sheet = mock.Mock(**{"get_all_values.return_value": values})
-        workbook = mock.Mock(**{"worksheet.return_value": sheet})
-        gconnect_patch.return_value = workbook
+        values = [[0]]*6 + [[0, 0, "bizzp"]]
+        gws_patch.return_value = tdb_sheet(values)
         with self.assertRaises(ValueError) as cm:
-            register_on_tdb(jr)
-        gconnect_patch.assert_called_once_with("bzoulip!")
-        workbook.worksheet.assert_called_once_with("uéué")
-        gconnect_patch.reset_mock()
+            await register_on_tdb(jr)
+        gws_patch.assert_called_once_with("bzoulip!", "uéué")
+        gws_patch.reset_mock()
         self.assertIn("`C7` vaut `bizzp`", cm.exception.args[0])
         self.assertIn(bdd.Joueur.primary_col.key, cm.exception.args[0])
         gupdate_patch.assert_not_called()
 
         # mauvaise colonne
-        values = [0]*6 + [[0, 0, bdd.Joueur.primary_col.key, "d", "e", "f",
-                           "g", "h", "i", "j", "k", "l", "m", "n", "koko"]]
-        sheet = mock.Mock(**{"get_all_values.return_value": values})
-        workbook = mock.Mock(**{"worksheet.return_value": sheet})
-        gconnect_patch.return_value = workbook
+        values = [[0]]*6 + [[0, 0, bdd.Joueur.primary_col.key, "d", "e",
+                             "f", "g", "h", "i", "j", "k", "l", "m", "n",
+                             "koko"]]
+        gws_patch.return_value = tdb_sheet(values)
         with self.assertRaises(ValueError) as cm:
-            register_on_tdb(jr)
-        gconnect_patch.assert_called_once_with("bzoulip!")
-        workbook.worksheet.assert_called_once_with("uéué")
-        gconnect_patch.reset_mock()
+            await register_on_tdb(jr)
+        gws_patch.assert_called_once_with("bzoulip!", "uéué")
+        gws_patch.reset_mock()
         self.assertIn("`koko` n'est pas une colonne", cm.exception.args[0])
         gupdate_patch.assert_not_called()
 
         # mauvais tampon
-        values = [0]*6 + [[0, 0, bdd.Joueur.primary_col.key, "d", "koko",
-                           "f", "g", "h", "i", "j", "k", "l", "m", "n", "nom",
-                           "chambre", "statut", "role", "camp",
-                           "votant_village", "votant_loups", "role_actif",
-                            "koko"]]
-        sheet = mock.Mock(**{"get_all_values.return_value": values})
-        workbook = mock.Mock(**{"worksheet.return_value": sheet})
-        gconnect_patch.return_value = workbook
+        values = [[0]]*6 + [[0, 0, bdd.Joueur.primary_col.key, "d", "koko",
+                             "f", "g", "h", "i", "j", "k", "l", "m", "n",
+                             "nom", "chambre", "statut", "role", "camp",
+                             "votant_village", "votant_loups", "role_actif",
+                             "koko"]]
+        gws_patch.return_value = tdb_sheet(values)
         with self.assertRaises(ValueError) as cm:
-            register_on_tdb(jr)
-        gconnect_patch.assert_called_once_with("bzoulip!")
-        workbook.worksheet.assert_called_once_with("uéué")
-        gconnect_patch.reset_mock()
+            await register_on_tdb(jr)
+        gws_patch.assert_called_once_with("bzoulip!", "uéué")
+        gws_patch.reset_mock()
         self.assertIn("koko", cm.exception.args[0])
         self.assertIn("n'est pas une colonne", cm.exception.args[0])
         gupdate_patch.assert_not_called()
 
+        def expected_mods(row):
+            return {
+                gsheets.Modif(row, 2, jr.discord_id),
+                gsheets.Modif(row, 4, jr.nom),
+                gsheets.Modif(row, 14, jr.nom),
+                gsheets.Modif(row, 5, jr.chambre),
+                gsheets.Modif(row, 15, jr.chambre),
+                gsheets.Modif(row, 6, jr.statut),
+                gsheets.Modif(row, 16, jr.statut),
+                gsheets.Modif(row, 7, jr.role),
+                gsheets.Modif(row, 17, jr.role),
+                gsheets.Modif(row, 8, jr.camp),
+                gsheets.Modif(row, 18, jr.camp),
+                gsheets.Modif(row, 9, jr.votant_village),
+                gsheets.Modif(row, 19, jr.votant_village),
+                gsheets.Modif(row, 10, jr.votant_loups),
+                gsheets.Modif(row, 20, jr.votant_loups),
+                gsheets.Modif(row, 11, jr.role_actif),
+                gsheets.Modif(row, 21, jr.role_actif),
+            }
+
         # aucun joueur inscrit sur le TDB
-        values = [0]*6 + [
+        base = [[0]]*6 + [
             [0, 0, bdd.Joueur.primary_col.key, "d", "tampon_nom",
                 "tampon_chambre", "tampon_statut", "tampon_role",
                 "tampon_camp", "tampon_votant_village", "tampon_votant_loups",
@@ -207,32 +225,18 @@ class TestInscriptionFunctions(unittest.IsolatedAsyncioTestCase):
                 "role", "camp", "votant_village", "votant_loups", "role_actif",
                 "koko"],
         ]
-        base = values
-        sheet = mock.Mock(**{"get_all_values.return_value": values})
-        workbook = mock.Mock(**{"worksheet.return_value": sheet})
-        gconnect_patch.return_value = workbook
-        register_on_tdb(jr)
-        gconnect_patch.assert_called_once_with("bzoulip!")
-        workbook.worksheet.assert_called_once_with("uéué")
-        gconnect_patch.reset_mock()
+        sheet = tdb_sheet(base)
+        gws_patch.return_value = sheet
+        await register_on_tdb(jr)
+        # en-têtes et colonne ID seulement
+        sheet.batch_get.assert_called_once_with(["C7:C", "O7:V7", "E7:L7"])
+        sheet.get_all_values.assert_not_called()
+        gws_patch.assert_called_once_with("bzoulip!", "uéué")
+        gws_patch.reset_mock()
         gupdate_patch.assert_called_once()
         usheet, *modifs = gupdate_patch.call_args.args
         self.assertEqual(usheet, sheet)
-        mods = {
-            gsheets.Modif(7, 2, jr.discord_id),
-            gsheets.Modif(7, 4, jr.nom), gsheets.Modif(7, 14, jr.nom),
-            gsheets.Modif(7, 5, jr.chambre), gsheets.Modif(7, 15, jr.chambre),
-            gsheets.Modif(7, 6, jr.statut), gsheets.Modif(7, 16, jr.statut),
-            gsheets.Modif(7, 7, jr.role), gsheets.Modif(7, 17, jr.role),
-            gsheets.Modif(7, 8, jr.camp), gsheets.Modif(7, 18, jr.camp),
-            gsheets.Modif(7, 9, jr.votant_village),
-            gsheets.Modif(7, 19, jr.votant_village),
-            gsheets.Modif(7, 10, jr.votant_loups),
-            gsheets.Modif(7, 20, jr.votant_loups),
-            gsheets.Modif(7, 11, jr.role_actif),
-            gsheets.Modif(7, 21, jr.role_actif),
-        }
-        self.assertEqual(mods, set(modifs))
+        self.assertEqual(expected_mods(7), set(modifs))
         gupdate_patch.reset_mock()
 
         # junk en dessous du header
@@ -240,31 +244,15 @@ class TestInscriptionFunctions(unittest.IsolatedAsyncioTestCase):
             [0, 0, "brzzz"],
             [0, 0, "brozozoz"],
         ]
-        sheet = mock.Mock(**{"get_all_values.return_value": values})
-        workbook = mock.Mock(**{"worksheet.return_value": sheet})
-        gconnect_patch.return_value = workbook
-        register_on_tdb(jr)
-        gconnect_patch.assert_called_once_with("bzoulip!")
-        workbook.worksheet.assert_called_once_with("uéué")
-        gconnect_patch.reset_mock()
+        sheet = tdb_sheet(values)
+        gws_patch.return_value = sheet
+        await register_on_tdb(jr)
+        gws_patch.assert_called_once_with("bzoulip!", "uéué")
+        gws_patch.reset_mock()
         gupdate_patch.assert_called_once()
         usheet, *modifs = gupdate_patch.call_args.args
         self.assertEqual(usheet, sheet)
-        mods = {
-            gsheets.Modif(7, 2, jr.discord_id),
-            gsheets.Modif(7, 4, jr.nom), gsheets.Modif(7, 14, jr.nom),
-            gsheets.Modif(7, 5, jr.chambre), gsheets.Modif(7, 15, jr.chambre),
-            gsheets.Modif(7, 6, jr.statut), gsheets.Modif(7, 16, jr.statut),
-            gsheets.Modif(7, 7, jr.role), gsheets.Modif(7, 17, jr.role),
-            gsheets.Modif(7, 8, jr.camp), gsheets.Modif(7, 18, jr.camp),
-            gsheets.Modif(7, 9, jr.votant_village),
-            gsheets.Modif(7, 19, jr.votant_village),
-            gsheets.Modif(7, 10, jr.votant_loups),
-            gsheets.Modif(7, 20, jr.votant_loups),
-            gsheets.Modif(7, 11, jr.role_actif),
-            gsheets.Modif(7, 21, jr.role_actif),
-        }
-        self.assertEqual(mods, set(modifs))
+        self.assertEqual(expected_mods(7), set(modifs))
         gupdate_patch.reset_mock()
 
         # 3 joueurs inscrits
@@ -274,32 +262,22 @@ class TestInscriptionFunctions(unittest.IsolatedAsyncioTestCase):
             [0, 0, "1101"],
             [0, 0, "junk"],
         ]
-        sheet = mock.Mock(**{"get_all_values.return_value": values})
-        workbook = mock.Mock(**{"worksheet.return_value": sheet})
-        gconnect_patch.return_value = workbook
-        register_on_tdb(jr)
-        gconnect_patch.assert_called_once_with("bzoulip!")
-        workbook.worksheet.assert_called_once_with("uéué")
-        gconnect_patch.reset_mock()
+        sheet = tdb_sheet(values)
+        gws_patch.return_value = sheet
+        with mock.patch("lgrez.features.sync.TDBLayout",
+                        wraps=sync.TDBLayout) as layout_patch:
+            await register_on_tdb(jr)
+        layout_patch.assert_not_called()        # en-têtes inchangés
+        gws_patch.assert_called_once_with("bzoulip!", "uéué")
+        gws_patch.reset_mock()
         gupdate_patch.assert_called_once()
         usheet, *modifs = gupdate_patch.call_args.args
         self.assertEqual(usheet, sheet)
-        mods = {
-            gsheets.Modif(10, 2, jr.discord_id),
-            gsheets.Modif(10, 4, jr.nom), gsheets.Modif(10, 14, jr.nom),
-            gsheets.Modif(10, 5, jr.chambre),
-            gsheets.Modif(10, 15, jr.chambre),
-            gsheets.Modif(10, 6, jr.statut), gsheets.Modif(10, 16, jr.statut),
-            gsheets.Modif(10, 7, jr.role), gsheets.Modif(10, 17, jr.role),
-            gsheets.Modif(10, 8, jr.camp), gsheets.Modif(10, 18, jr.camp),
-            gsheets.Modif(10, 9, jr.votant_village),
-            gsheets.Modif(10, 19, jr.votant_village),
-            gsheets.Modif(10, 10, jr.votant_loups),
-            gsheets.Modif(10, 20, jr.votant_loups),
-            gsheets.Modif(10, 11, jr.role_actif),
-            gsheets.Modif(10, 21, jr.role_actif),
-        }
-        self.assertEqual(mods, set(modifs))
+        self.assertEqual(expected_mods(10), set(modifs))
+        gupdate_patch.reset_mock()
+        # ligne du joueur inscrit désormais occupée
+        layout = sync._tdb_layout["layout"]
+        self.assertEqual(layout.last_row, 10)
 
 
     @mock_bdd.patch_db      # Empty database for this method
@@ -188,6 +188,83 @@ class TestSpecial(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(ctx.message.content, "krkrkrk")
 
 
+    @mock.patch("lgrez.bdd.base.index_usage")
+    async def test_indexes(self, iu_patch):
+        """Unit tests for !indexes command."""
+        # async def indexes(self, ctx)
+        indexes = self.cog.indexes
+        usage = [
+            bdd.base.IndexUsage("joueurs", "ix_joueurs_statut", ("statut",),
+                                None, None),
+            bdd.base.IndexUsage("utilisations", "ix_utilisations_action_etat",
+                                ("_action_id", "etat"), 12, 16384),
+        ]
+
+        # no candidates
+        iu_patch.return_value = (usage, [])
+        ctx = mock_discord.get_ctx(indexes)
+        await ctx.invoke()
+        ctx.assert_sent(["joueurs.ix_joueurs_statut (statut)\n",
+                         "(_action_id, etat) : 12 parcours, 16 ko",
+                         "Index candidats :\n (aucun)"])
+
+        # candidates
+        iu_patch.return_value = (usage, [
+            ("ciblages", ("_joueur_id",), "clé étrangère non indexée"),
+            ("utilisations", (), "10 parcours séquentiels"),
+        ])
+        ctx = mock_discord.get_ctx(indexes)
+        await ctx.invoke()
+        ctx.assert_sent([" - ciblages (_joueur_id) : clé étrangère non",
+                         " - utilisations : 10 parcours séquentiels"])
+
+
+    async def test_sqlstats(self):
+        """Unit tests for !sqlstats command."""
+        # async def sqlstats(self, ctx, *, commande=None)
+        sqlstats = self.cog.sqlstats
+        query_stats = bdd.query_stats
+        query_stats.reset()
+        config.bot.command_prefix = "!"
+
+        # nothing measured
+        ctx = mock_discord.get_ctx(sqlstats)
+        await ctx.invoke()
+        ctx.assert_sent("Aucune requête mesurée")
+
+        # some commands
+        stats1 = query_stats.CommandStats("vote")
+        stats1.record("SELECT 1", 0.001)
+        stats2 = query_stats.CommandStats("open")
+        for i in range(config.sql_stats_n_plus_one):
+            stats2.record(f"SELECT * FROM actions WHERE id = {i}", 0.001)
+        for stats in (stats1, stats2):
+            query_stats._totals.setdefault(
+                stats.name, query_stats.CommandTotals()).add(stats)
+            query_stats.recent.append(stats)
+        ctx = mock_discord.get_ctx(sqlstats)
+        await ctx.invoke()
+        ctx.assert_sent(["!open : 1 exécutions", "!vote : 1 exécutions",
+                         "requêtes répétées :\n!open",
+                         "N+1 suspect (5 fois) : SELECT * FROM actions"])
+
+        # one command
+        ctx = mock_discord.get_ctx(sqlstats, commande="!vote")
+        await ctx.invoke()
+        ctx.assert_sent(["Dernières exécutions de !vote :\n!vote",
+                         "1.0 ms : SELECT ?"])
+        ctx = mock_discord.get_ctx(sqlstats, commande="haro")
+        await ctx.invoke()
+        ctx.assert_sent("Aucune exécution récente de `!haro`")
+
+        # reset
+        ctx = mock_discord.get_ctx(sqlstats, commande="reset")
+        await ctx.invoke()
+        ctx.assert_sent("remises à zéro")
+        self.assertEqual(query_stats.totals(), {})
+        self.assertEqual(list(query_stats.recent), [])
+
+
     async def test_stop(self):
         """Unit tests for !stop command."""
         # async def stop(self, ctx)
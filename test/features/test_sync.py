@@ -1,3 +1,5 @@
+import asyncio
+import contextlib
 import datetime
 import enum
 import unittest
@@ -32,11 +34,54 @@ def base_joueurs():
     ]
 
 
+
+def tdb_sheet(values):
+    """Mock TDB worksheet, serving ``values`` (list of rows) ranges."""
+    def batch_get(ranges):
+        res = []
+        for rng in ranges:
+            first, _, last = rng.partition(":")
+            row, start = gsheets.gspread.utils.a1_to_rowcol(first)
+            if last[-1].isdigit():
+                last_row, stop = gsheets.gspread.utils.a1_to_rowcol(last)
+            else:
+                last_row, stop = None, gsheets.a_to_index(last) + 1
+            res.append([[str(val) for val in line[start - 1:stop]]
+                        for line in values[row - 1:last_row]])
+        return res
+    return mock.Mock(batch_get=mock.AsyncMock(side_effect=batch_get))
+
+
+@contextlib.contextmanager
+def count_conversions():
+    """Count cell conversions made by the TDB layout row converters."""
+    count = 0
+    compile_row_converter = sync.TDBLayout.compile_row_converter
+
+    def counting(layout):
+        convert_row = compile_row_converter(layout)
+
+        def convert(row):
+            nonlocal count
+            count += len(row)
+            return convert_row(row)
+
+        return convert
+
+    with mock.patch.object(sync.TDBLayout, "compile_row_converter",
+                           counting):
+        yield lambda: count
+
+
 class TestSyncFunctions(unittest.IsolatedAsyncioTestCase):
     """Unit tests for lgrez.features.sync utility functions."""
 
     def setUp(self):
         mock_discord.mock_config()
+        # No Google API quota waiting
+        patcher = mock.patch("lgrez.blocs.gsheets._acquire")
+        patcher.start()
+        self.addCleanup(patcher.stop)
         config.tdb_main_sheet = "uéué"
         config.tdb_header_row = 7
         config.tdb_id_column = "C"
@@ -122,55 +167,91 @@ class TestSyncFunctions(unittest.IsolatedAsyncioTestCase):
         strangecol = sqlalchemy.Column("bzzt", sqlalchemy.PickleType)
         self.assertRaises(ValueError, transtype, "bz", boolcol)
 
+    @mock_bdd.patch_db      # Empty database for this method
+    def test_compile_converter(self):
+        """Unit tests for sync.compile_converter function."""
+        # def compile_converter(cst, preload=False)
+        compile_converter = sync.compile_converter
+        mock_bdd.add_campsroles(2, 2)
+        # Relationship, preloaded: no query per value
+        rel = bdd.Joueur.attrs["role"]
+        convert = compile_converter(rel, preload=True)
+        role1 = bdd.Role.query.get("role1")
+        with mock.patch("lgrez.bdd.Role.get_cached") as gc_patch, \
+             mock.patch.object(config.session, "execute") as ex_patch:
+            self.assertEqual(convert("role1"), role1)
+            self.assertRaises(ValueError, convert, "role3")
+            self.assertRaises(ValueError, convert, 13)
+        gc_patch.assert_not_called()
+        ex_patch.assert_not_called()
+        # Relationship, not preloaded: same as transtype
+        convert = compile_converter(rel)
+        self.assertEqual(convert("role1"), role1)
+        self.assertRaises(ValueError, convert, "role3")
+        # Table
+        convert = compile_converter(bdd.Camp, preload=True)
+        self.assertEqual(convert("camp1"), bdd.Camp.query.get("camp1"))
+        self.assertRaises(ValueError, convert, None)
+        # Columns: same as transtype
+        intcol = sqlalchemy.Column("bzzt", sqlalchemy.Integer, nullable=False,
+                                   default=3)
+        convert = compile_converter(intcol)
+        self.assertEqual(convert("42"), 42)
+        self.assertEqual(convert(""), 3)
+        with self.assertRaises(ValueError) as cm:
+            convert("bz")
+        with self.assertRaises(ValueError) as cm2:
+            sync.transtype("bz", intcol)
+        self.assertEqual(str(cm.exception), str(cm2.exception))
+        strangecol = sqlalchemy.Column("bzzt", sqlalchemy.PickleType)
+        convert = compile_converter(strangecol)
+        self.assertIsNone(convert(None))
+        self.assertRaises(ValueError, convert, "bz")
+
 
     @mock_bdd.patch_db      # Empty database for this method
     @mock_env.patch_env(LGREZ_TDB_SHEET_ID="bzoulip!")
-    @mock.patch("lgrez.blocs.gsheets.connect")
-    def test_get_sync(self, gconnect_patch):
+    @mock.patch("lgrez.blocs.gsheets.get_worksheet")
+    async def test_get_sync(self, gws_patch):
         """Unit tests for sync.get_sync function."""
-        # def get_sync()
+        # async def get_sync(full=False)
         get_sync = sync.get_sync
+        sync.invalidate_tdb_fingerprints()
         mock_bdd.add_campsroles(10, 10)
         bdd.Joueur.add(*base_joueurs())
 
         # mauvaise colonne primaire
         values = [0]*6 + [[0, 0, "bizzp"]]
-        sheet = mock.Mock(**{"get_all_values.return_value": values})
-        workbook = mock.Mock(**{"worksheet.return_value": sheet})
-        gconnect_patch.return_value = workbook
+        sheet = tdb_sheet(values)
+        gws_patch.return_value = sheet
         with self.assertRaises(ValueError) as cm:
-            get_sync()
-        gconnect_patch.assert_called_once_with("bzoulip!")
-        workbook.worksheet.assert_called_once_with("uéué")
-        gconnect_patch.reset_mock()
+            await get_sync()
+        gws_patch.assert_called_once_with("bzoulip!", "uéué")
+        gws_patch.reset_mock()
         self.assertIn("`C7` vaut `bizzp`", cm.exception.args[0])
         self.assertIn(bdd.Joueur.primary_col.key, cm.exception.args[0])
 
         # mauvaise colonne
         values = [0]*6 + [[0, 0, bdd.Joueur.primary_col.key, "d", "e", "f",
                            "g", "h", "i", "j", "k", "koko"]]
-        sheet = mock.Mock(**{"get_all_values.return_value": values})
-        workbook = mock.Mock(**{"worksheet.return_value": sheet})
-        gconnect_patch.return_value = workbook
+        sheet = tdb_sheet(values)
+        gws_patch.return_value = sheet
         with self.assertRaises(ValueError) as cm:
-            get_sync()
-        gconnect_patch.assert_called_once_with("bzoulip!")
-        workbook.worksheet.assert_called_once_with("uéué")
-        gconnect_patch.reset_mock()
+            await get_sync()
+        gws_patch.assert_called_once_with("bzoulip!", "uéué")
+        gws_patch.reset_mock()
         self.assertIn("`koko` n'est pas une colonne", cm.exception.args[0])
 
         # mauvais tampon
         values = [0]*6 + [[0, 0, bdd.Joueur.primary_col.key, "d", "koko",
                            "f", "g", "h", "i", "j", "k", "nom", "chambre",
                            "role", "camp", "statut", "koko"]]
-        sheet = mock.Mock(**{"get_all_values.return_value": values})
-        workbook = mock.Mock(**{"worksheet.return_value": sheet})
-        gconnect_patch.return_value = workbook
+        sheet = tdb_sheet(values)
+        gws_patch.return_value = sheet
         with self.assertRaises(ValueError) as cm:
-            get_sync()
-        gconnect_patch.assert_called_once_with("bzoulip!")
-        workbook.worksheet.assert_called_once_with("uéué")
-        gconnect_patch.reset_mock()
+            await get_sync()
+        gws_patch.assert_called_once_with("bzoulip!", "uéué")
+        gws_patch.reset_mock()
         self.assertIn("koko", cm.exception.args[0])
         self.assertIn("n'est pas une colonne", cm.exception.args[0])
 
@@ -181,15 +262,13 @@ class TestSyncFunctions(unittest.IsolatedAsyncioTestCase):
                 "tampon_statut", "j", "k", "nom", "chambre", "role",
                 "camp", "statut", "koko"],
         ]
-        sheet = mock.Mock(**{"get_all_values.return_value": values})
-        workbook = mock.Mock(**{"worksheet.return_value": sheet})
-        gconnect_patch.return_value = workbook
-        modifs = get_sync()
+        sheet = tdb_sheet(values)
+        gws_patch.return_value = sheet
+        modifs = await get_sync()
         self.assertEqual(modifs, [])        # renvoie une liste vide
         self.assertEqual(bdd.Joueur.query.all(), [])    # tout delete
-        gconnect_patch.assert_called_once_with("bzoulip!")
-        workbook.worksheet.assert_called_once_with("uéué")
-        gconnect_patch.reset_mock()
+        gws_patch.assert_called_once_with("bzoulip!", "uéué")
+        gws_patch.reset_mock()
 
         # joueur hors base ==> delete all others + error
         bdd.Joueur.add(*base_joueurs())
@@ -202,15 +281,13 @@ class TestSyncFunctions(unittest.IsolatedAsyncioTestCase):
             [0, 0, "123", "d", "oui", "214", "role2", "camp2", "mort",
                 "j", "k", "oui", "214", "role2", "camp2", "mort"],
         ]
-        sheet = mock.Mock(**{"get_all_values.return_value": values})
-        workbook = mock.Mock(**{"worksheet.return_value": sheet})
-        gconnect_patch.return_value = workbook
+        sheet = tdb_sheet(values)
+        gws_patch.return_value = sheet
         with self.assertRaises(ValueError) as cm:
-           get_sync()
+           await get_sync()
         self.assertEqual(bdd.Joueur.query.all(), [])    # tout delete
-        gconnect_patch.assert_called_once_with("bzoulip!")
-        workbook.worksheet.assert_called_once_with("uéué")
-        gconnect_patch.reset_mock()
+        gws_patch.assert_called_once_with("bzoulip!", "uéué")
+        gws_patch.reset_mock()
         self.assertIn("Joueur `oui` hors base", cm.exception.args[0])
 
         # 0 modifs
@@ -230,15 +307,13 @@ class TestSyncFunctions(unittest.IsolatedAsyncioTestCase):
             [0, 0, "4", "d", "Joueur4", "Ch4", "role4", "camp4", "immortel",
                 "j", "k", "Joueur4", "Ch4", "role4", "camp4", "immortel"],
         ]
-        sheet = mock.Mock(**{"get_all_values.return_value": values})
-        workbook = mock.Mock(**{"worksheet.return_value": sheet})
-        gconnect_patch.return_value = workbook
-        modifs = get_sync()
+        sheet = tdb_sheet(values)
+        gws_patch.return_value = sheet
+        modifs = await get_sync()
         self.assertEqual(modifs, [])        # renvoie une liste vide
         self.assertEqual(len(bdd.Joueur.query.all()), 4)    # no delete
-        gconnect_patch.assert_called_once_with("bzoulip!")
-        workbook.worksheet.assert_called_once_with("uéué")
-        gconnect_patch.reset_mock()
+        gws_patch.assert_called_once_with("bzoulip!", "uéué")
+        gws_patch.reset_mock()
 
         # 1 modif pour 1 joueur
         values = [0]*6 + [
@@ -256,15 +331,13 @@ class TestSyncFunctions(unittest.IsolatedAsyncioTestCase):
             [0, 0, "4", "d", "Joueur4", "Ch4", "role4", "camp4", "immortel",
                 "j", "k", "Joueur4", "Ch4", "role4", "camp4", "immortel"],
         ]
-        sheet = mock.Mock(**{"get_all_values.return_value": values})
-        workbook = mock.Mock(**{"worksheet.return_value": sheet})
-        gconnect_patch.return_value = workbook
-        modifs = get_sync()
+        sheet = tdb_sheet(values)
+        gws_patch.return_value = sheet
+        modifs = await get_sync()
         self.assertEqual(modifs, [sync.TDBModif(2, "chambre", "Ch2.1", 9, 5)])
         self.assertEqual(len(bdd.Joueur.query.all()), 4)    # no delete
-        gconnect_patch.assert_called_once_with("bzoulip!")
-        workbook.worksheet.assert_called_once_with("uéué")
-        gconnect_patch.reset_mock()
+        gws_patch.assert_called_once_with("bzoulip!", "uéué")
+        gws_patch.reset_mock()
 
         # 5 modifs pour 1 joueur
         values = [0]*6 + [
@@ -282,10 +355,9 @@ class TestSyncFunctions(unittest.IsolatedAsyncioTestCase):
             [0, 0, "4", "d", "Joueur4", "Ch4", "role4", "camp4", "immortel",
                 "j", "k", "Joueur4", "Ch4", "role4", "camp4", "immortel"],
         ]
-        sheet = mock.Mock(**{"get_all_values.return_value": values})
-        workbook = mock.Mock(**{"worksheet.return_value": sheet})
-        gconnect_patch.return_value = workbook
-        modifs = get_sync()
+        sheet = tdb_sheet(values)
+        gws_patch.return_value = sheet
+        modifs = await get_sync()
         self.assertEqual(modifs, [
             sync.TDBModif(2, "nom", "Joueur2.9", 9, 4),
             sync.TDBModif(2, "chambre", "Ch2.1", 9, 5),
@@ -294,9 +366,8 @@ class TestSyncFunctions(unittest.IsolatedAsyncioTestCase):
             sync.TDBModif(2, "statut", bdd.Statut.MV, 9, 8),
         ])
         self.assertEqual(len(bdd.Joueur.query.all()), 4)    # no delete
-        gconnect_patch.assert_called_once_with("bzoulip!")
-        workbook.worksheet.assert_called_once_with("uéué")
-        gconnect_patch.reset_mock()
+        gws_patch.assert_called_once_with("bzoulip!", "uéué")
+        gws_patch.reset_mock()
 
         # 5 modifs pour 3 joueurs
         values = [0]*6 + [
@@ -314,10 +385,9 @@ class TestSyncFunctions(unittest.IsolatedAsyncioTestCase):
             [0, 0, "4", "d", "Joueur4", "Ch4", "role4", "camp4", "immortel",
                 "j", "k", "Joueur475", "Ch4", "role4", "camp4", "immortel"],
         ]
-        sheet = mock.Mock(**{"get_all_values.return_value": values})
-        workbook = mock.Mock(**{"worksheet.return_value": sheet})
-        gconnect_patch.return_value = workbook
-        modifs = get_sync()
+        sheet = tdb_sheet(values)
+        gws_patch.return_value = sheet
+        modifs = await get_sync()
         self.assertEqual(modifs, [
             sync.TDBModif(1, "chambre", "Ch11", 8, 5),
             sync.TDBModif(2, "chambre", "Ch2.1", 9, 5),
@@ -326,26 +396,65 @@ class TestSyncFunctions(unittest.IsolatedAsyncioTestCase):
             sync.TDBModif(4, "nom", "Joueur475", 11, 4),
         ])
         self.assertEqual(len(bdd.Joueur.query.all()), 4)    # no delete
-        gconnect_patch.assert_called_once_with("bzoulip!")
-        workbook.worksheet.assert_called_once_with("uéué")
-        gconnect_patch.reset_mock()
+        gws_patch.assert_called_once_with("bzoulip!", "uéué")
+        gws_patch.reset_mock()
+
+        # incremental: unchanged rows skipped before transtyping
+        with count_conversions() as conversions:
+            modifs2 = await get_sync()
+        self.assertEqual(modifs2, modifs)
+        self.assertEqual(conversions(), 15)     # only rows 1, 2, 4
+        gws_patch.reset_mock()
+
+        # incremental: player modified in database -> compared again
+        joueur3 = bdd.Joueur.query.get(3)
+        joueur3.chambre = "Ch3.5"
+        joueur3.update()
+        with count_conversions() as conversions:
+            modifs2 = await get_sync()
+        self.assertEqual(conversions(), 20)
+        self.assertIn(sync.TDBModif(3, "chambre", "Ch3", 10, 5), modifs2)
+        joueur3.chambre = "Ch3"
+        joueur3.update()
+
+        # full resync / header change: every row compared
+        await get_sync()
+        with count_conversions() as conversions:
+            await get_sync(full=True)
+        self.assertEqual(conversions(), 20)
+        await get_sync()
+        layout = sync._tdb_layout["layout"]
+        values[6][3] = "e"
+        with count_conversions() as conversions:
+            await get_sync()
+        self.assertEqual(conversions(), 15)     # header not in layout
+        self.assertIs(sync._tdb_layout["layout"], layout)
+        values[6][4] = "ex_nom"
+        with count_conversions() as conversions:
+            await get_sync()                    # layout compiled again
+        self.assertIsNot(sync._tdb_layout["layout"], layout)
+        self.assertEqual(conversions(), 20)
+        self.assertEqual(sync._tdb_layout["layout"].last_row, 11)
+        values[6][12] = "chambre "
+        with self.assertRaises(ValueError):
+            await get_sync()
 
 
     @mock_env.patch_env(LGREZ_TDB_SHEET_ID="bzoulip!")
-    @mock.patch("lgrez.blocs.gsheets.connect")
+    @mock.patch("lgrez.blocs.gsheets.get_worksheet")
     @mock.patch("lgrez.blocs.gsheets.update")
-    def test_validate_sync(self, gupdate_patch, gconnect_patch):
+    async def test_validate_sync(self, gupdate_patch, gws_patch):
         """Unit tests for sync.validate_sync function."""
-        # def validate_sync(modifs)
+        # async def validate_sync(modifs)
         validate_sync = sync.validate_sync
         # cas unique
         sheet = mock.Mock()
-        workbook = mock.Mock(**{"worksheet.return_value": sheet})
-        gconnect_patch.return_value = workbook
-        validate_sync([123, "456", {"a": 2}])
-        gconnect_patch.assert_called_once_with("bzoulip!")
-        workbook.worksheet.assert_called_once_with("uéué")
-        gupdate_patch.assert_called_once_with(sheet, 123, "456", {"a": 2})
+        gws_patch.return_value = sheet
+        await validate_sync([123, "456", {"a": 2}])
+        gws_patch.assert_called_once_with("bzoulip!", "uéué")
+        gupdate_patch.assert_called_once_with(
+            sheet, 123, "456", {"a": 2}, priority=gsheets.Priority.sync
+        )
 
 
     @mock_bdd.patch_db      # Empty database for this method
@@ -779,12 +888,93 @@ class TestSyncFunctions(unittest.IsolatedAsyncioTestCase):
         # --- test plusieurs modifs sur J3 ---
         # ==> well, it should work
 
+    @mock.patch("lgrez.features.sync._modif_discord")
+    @mock.patch("lgrez.features.sync._modif_bdd")
+    async def test_modif_joueurs(self, bdd_patch, discord_patch):
+        """Unit tests for sync.modif_joueurs function."""
+        # async def modif_joueurs(modifs_by_joueur, silent=False,
+        #                         on_saved=None)
+        modif_joueurs = sync.modif_joueurs
+        running = 0
+        max_running = 0
+        started = []
+
+        def modif_bdd(joueur_id, modifs):
+            # Pas de traitement Discord avant la fin des enregistrements
+            self.assertEqual(started, [])
+            if joueur_id == 4:
+                raise ValueError("Base")
+            return f"<joueur{joueur_id}>"
+
+        async def modif_discord(joueur, modifs, silent):
+            nonlocal running, max_running
+            joueur_id = modifs[0].id
+            self.assertEqual(joueur, f"<joueur{joueur_id}>")
+            started.append(joueur_id)
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.001 * (10 - joueur_id))   # last first
+            running -= 1
+            if joueur_id == 5:
+                raise ValueError("Pitre")
+            return modifs, f"<cgl{joueur_id}>"
+
+        bdd_patch.side_effect = modif_bdd
+        discord_patch.side_effect = modif_discord
+        modifs = {i: [sync.TDBModif(i, "chambre", f"ch{i}", i, 0)]
+                  for i in range(1, 9)}
+        saved = []
+
+        async def on_saved(done):
+            await asyncio.sleep(0)
+            self.assertEqual(started, [1, 2, 3])    # pendant Discord
+            saved.append(done)
+
+        with mock.patch.object(config, "sync_concurrency", 3):
+            done, changelog, errors, saved_error = await modif_joueurs(
+                modifs, silent=True, on_saved=on_saved
+            )
+
+        self.assertEqual(bdd_patch.call_count, 8)
+        self.assertEqual(started, [1, 2, 3, 5, 6, 7, 8])
+        self.assertEqual(max_running, 3)
+        discord_patch.assert_any_call("<joueur1>", modifs[1], True)
+        # deterministic results
+        self.assertEqual(done, [modifs[i][0] for i in range(1, 9) if i != 4])
+        self.assertEqual(errors, {4: False, 5: True})
+        self.assertTrue(changelog.startswith("<cgl1><cgl2><cgl3>"))
+        self.assertIn("Base", changelog)
+        self.assertIn("Pitre", changelog)
+        self.assertTrue(changelog.endswith("<cgl6><cgl7><cgl8>"))
+        # saved modifications validated once
+        self.assertEqual(saved, [done])
+        self.assertIsNone(saved_error)
+
+        # validation error: players still processed
+        started.clear()
+        on_saved = mock.AsyncMock(side_effect=ValueError("Valid"))
+        with mock.patch.object(config, "sync_concurrency", 3):
+            done, changelog, errors, saved_error = await modif_joueurs(
+                modifs, silent=True, on_saved=on_saved
+            )
+        on_saved.assert_awaited_once_with(done)
+        self.assertEqual(started, [1, 2, 3, 5, 6, 7, 8])
+        self.assertEqual(errors, {4: False, 5: True})
+        self.assertIn("Valid", saved_error)
+        self.assertTrue(changelog.startswith("<cgl1><cgl2><cgl3>"))
+        self.assertIn("<cgl6><cgl7><cgl8>", changelog)
+        self.assertTrue(changelog.endswith(saved_error))
+
 
 class TestSync(unittest.IsolatedAsyncioTestCase):
     """Unit tests for lgrez.features.sync commands."""
 
     def setUp(self):
         mock_discord.mock_config()
+        # No Google API quota waiting
+        patcher = mock.patch("lgrez.blocs.gsheets._acquire")
+        patcher.start()
+        self.addCleanup(patcher.stop)
         self.cog = sync.Sync(config.bot)
 
     def tearDown(self):
@@ -793,8 +983,10 @@ class TestSync(unittest.IsolatedAsyncioTestCase):
     @mock_bdd.patch_db      # Empty database for this method
     @mock.patch("lgrez.features.sync.get_sync")         # tested before
     @mock.patch("lgrez.features.sync.validate_sync")    # tested before
-    @mock.patch("lgrez.features.sync.modif_joueur")     # tested before
-    async def test_sync(self, modif_patch, valid_patch, get_patch):
+    @mock.patch("lgrez.features.sync._modif_discord")   # tested before
+    @mock.patch("lgrez.features.sync._modif_bdd")       # tested before
+    async def test_sync(self, bdd_patch, modif_patch, valid_patch,
+                        get_patch):
         """Unit tests for !sync command."""
         # async def sync(self, ctx, silent=False)
         sync_cmd = self.cog.sync
@@ -809,6 +1001,7 @@ class TestSync(unittest.IsolatedAsyncioTestCase):
                         "Pas de nouvelles modificatons")
         get_patch.assert_called_once()
         get_patch.reset_mock(return_value=True)
+        bdd_patch.assert_not_called()
         modif_patch.assert_not_called()
         valid_patch.assert_not_called()
 
@@ -823,10 +1016,32 @@ class TestSync(unittest.IsolatedAsyncioTestCase):
                         "Mission aborted")
         get_patch.assert_called_once()
         get_patch.reset_mock(return_value=True)
+        bdd_patch.assert_not_called()
         modif_patch.assert_not_called()
         valid_patch.assert_not_called()
 
-        # 1 modif pour 1 joueur, error
+        # 1 modif pour 1 joueur, error base
+        modif = sync.TDBModif(4, "role", 42, 17, "role34")
+        get_patch.return_value = [modif]
+        bdd_patch.side_effect = ValueError("Pitre")
+        ctx = mock_discord.get_ctx(sync_cmd)
+        with mock_discord.interact(("yes_no", True)):
+            with mock.patch("lgrez.blocs.tools.log") as log_patch:
+                await ctx.invoke()
+        ctx.assert_sent("Récupération des modifications",
+                        "1 modification(s) trouvée(s) pour 1 joueur",
+                        "Erreur joueur 4, modifications non appliquées",
+                        "Fait")
+        log_patch.assert_called_once()
+        self.assertIn("Pitre", log_patch.call_args.args[0])
+        get_patch.assert_called_once()
+        get_patch.reset_mock(return_value=True)
+        bdd_patch.assert_called_once_with(4, [modif])
+        bdd_patch.reset_mock(side_effect=True)
+        modif_patch.assert_not_called()
+        valid_patch.assert_not_called()
+
+        # 1 modif pour 1 joueur, error Discord
         modif = sync.TDBModif(4, "role", 42, 17, "role34")
         get_patch.return_value = [modif]
         modif_patch.side_effect = ValueError("Pitre")
@@ -836,15 +1051,19 @@ class TestSync(unittest.IsolatedAsyncioTestCase):
                 await ctx.invoke()
         ctx.assert_sent("Récupération des modifications",
                         "1 modification(s) trouvée(s) pour 1 joueur",
-                        "Erreur joueur 4",
+                        "Erreur joueur 4, modifications enregistrées",
                         "Fait")
         log_patch.assert_called_once()
         self.assertIn("Pitre", log_patch.call_args.args[0])
         get_patch.assert_called_once()
         get_patch.reset_mock(return_value=True)
-        modif_patch.assert_called_once_with(4, [modif], False)
+        bdd_patch.assert_called_once_with(4, [modif])
+        modif_patch.assert_called_once_with(bdd_patch.return_value,
+                                            [modif], False)
+        bdd_patch.reset_mock()
         modif_patch.reset_mock(side_effect=True)
-        valid_patch.assert_not_called()
+        valid_patch.assert_called_once_with([modif])
+        valid_patch.reset_mock()
 
         # 1 modif pour 1 joueur, success
         modif = sync.TDBModif(4, "role", 42, 17, "role34")
@@ -861,7 +1080,10 @@ class TestSync(unittest.IsolatedAsyncioTestCase):
         self.assertIn("chglzoo", log_patch.call_args.args[0])
         get_patch.assert_called_once()
         get_patch.reset_mock(return_value=True)
-        modif_patch.assert_called_once_with(4, [modif], False)
+        bdd_patch.assert_called_once_with(4, [modif])
+        modif_patch.assert_called_once_with(bdd_patch.return_value,
+                                            [modif], False)
+        bdd_patch.reset_mock()
         modif_patch.reset_mock(return_value=True)
         valid_patch.assert_called_once_with([modif])
         valid_patch.reset_mock()
@@ -883,12 +1105,15 @@ class TestSync(unittest.IsolatedAsyncioTestCase):
         self.assertIn("chglzto", log_patch.call_args.args[0])
         get_patch.assert_called_once()
         get_patch.reset_mock(return_value=True)
-        modif_patch.assert_called_once_with(4, modifs, False)
+        bdd_patch.assert_called_once_with(4, modifs)
+        modif_patch.assert_called_once_with(bdd_patch.return_value,
+                                            modifs, False)
+        bdd_patch.reset_mock()
         modif_patch.reset_mock(return_value=True)
         valid_patch.assert_called_once_with(modifs)
         valid_patch.reset_mock()
 
-        # 6 modifs pour 3 joueurs, success partiel
+        # 6 modifs pour 3 joueurs, 1 erreur
         modifs4 = [sync.TDBModif(4, "role", 42, 17, "role34"),
                    sync.TDBModif(4, "statut", 42, 19, bdd.Statut.mort),
                    sync.TDBModif(4, "votant_village", 42, 22, False)]
@@ -897,9 +1122,11 @@ class TestSync(unittest.IsolatedAsyncioTestCase):
         modifs2 = [sync.TDBModif(2, "votant_village", 40, 22, False)]
         modifs = modifs4 + modifs3 + modifs2
         get_patch.return_value = modifs
-        modif_patch.side_effect = [(modifs4[:-1], "chglzto"),   # 4 : partiel
-                                   ValueError("Pitre"),         # 3 : error
-                                   (modifs2, "chglzoo")]        # 2 : tous
+        bdd_patch.side_effect = ["<joueur4>",
+                                 ValueError("Pitre"),           # 3 : error
+                                 "<joueur2>"]
+        modif_patch.side_effect = [(modifs4, "chglzto"),
+                                   (modifs2, "chglzoo")]
         ctx = mock_discord.get_ctx(sync_cmd)
         with mock_discord.interact(("yes_no", True)):
             with mock.patch("lgrez.blocs.tools.log") as log_patch:
@@ -914,12 +1141,16 @@ class TestSync(unittest.IsolatedAsyncioTestCase):
         self.assertIn("chglzoo", log_patch.call_args.args[0])
         get_patch.assert_called_once()
         get_patch.reset_mock(return_value=True)
-        self.assertEqual(modif_patch.call_count, 3)
-        modif_patch.assert_has_calls([mock.call(4, modifs4, False),
-                                      mock.call(3, modifs3, False),
-                                      mock.call(2, modifs2, False)])
+        self.assertEqual(bdd_patch.call_count, 3)
+        bdd_patch.assert_has_calls([mock.call(4, modifs4),
+                                    mock.call(3, modifs3),
+                                    mock.call(2, modifs2)])
+        bdd_patch.reset_mock(side_effect=True)
+        self.assertEqual(modif_patch.call_count, 2)
+        modif_patch.assert_has_calls([mock.call("<joueur4>", modifs4, False),
+                                      mock.call("<joueur2>", modifs2, False)])
         modif_patch.reset_mock(side_effect=True)
-        valid_patch.assert_called_once_with(modifs4[:-1] + modifs2)
+        valid_patch.assert_called_once_with(modifs4 + modifs2)
         valid_patch.reset_mock()
 
         # 1 modif pour 1 joueur, silent = "True"
@@ -937,7 +1168,10 @@ class TestSync(unittest.IsolatedAsyncioTestCase):
         self.assertIn("chglzoo", log_patch.call_args.args[0])
         get_patch.assert_called_once()
         get_patch.reset_mock(return_value=True)
-        modif_patch.assert_called_once_with(4, [modif], True)
+        bdd_patch.assert_called_once_with(4, [modif])
+        modif_patch.assert_called_once_with(bdd_patch.return_value,
+                                            [modif], True)
+        bdd_patch.reset_mock()
         modif_patch.reset_mock(return_value=True)
         valid_patch.assert_called_once_with([modif])
         valid_patch.reset_mock()
@@ -957,16 +1191,42 @@ class TestSync(unittest.IsolatedAsyncioTestCase):
         self.assertIn("chglzoo", log_patch.call_args.args[0])
         get_patch.assert_called_once()
         get_patch.reset_mock(return_value=True)
-        modif_patch.assert_called_once_with(4, [modif], True)
+        bdd_patch.assert_called_once_with(4, [modif])
+        modif_patch.assert_called_once_with(bdd_patch.return_value,
+                                            [modif], True)
+        bdd_patch.reset_mock()
         modif_patch.reset_mock(return_value=True)
         valid_patch.assert_called_once_with([modif])
         valid_patch.reset_mock()
 
+        # 1 modif pour 1 joueur, validation error
+        modif = sync.TDBModif(4, "role", 42, 17, "role34")
+        get_patch.return_value = [modif]
+        modif_patch.return_value = ([modif], "chglzoo")
+        valid_patch.side_effect = ValueError("Quota")
+        ctx = mock_discord.get_ctx(sync_cmd)
+        with mock_discord.interact(("yes_no", True)):
+            with mock.patch("lgrez.blocs.tools.log") as log_patch:
+                await ctx.invoke()
+        ctx.assert_sent("Récupération des modifications",
+                        "1 modification(s) trouvée(s) pour 1 joueur",
+                        "Erreur lors de la validation",
+                        "Fait")
+        log_patch.assert_called_once()
+        self.assertIn("chglzoo", log_patch.call_args.args[0])
+        self.assertIn("Quota", log_patch.call_args.args[0])
+        get_patch.reset_mock(return_value=True)
+        bdd_patch.reset_mock()
+        modif_patch.assert_called_once()
+        modif_patch.reset_mock(return_value=True)
+        valid_patch.assert_called_once_with([modif])
+        valid_patch.reset_mock(side_effect=True)
+
 
     @mock_bdd.patch_db      # Empty database for this method
     @mock_env.patch_env(LGREZ_ROLES_SHEET_ID="badapaf?")
-    @mock.patch("lgrez.blocs.gsheets.connect")
-    async def test_fillroles(self, gconnect_patch):
+    @mock.patch("lgrez.blocs.gsheets.get_worksheet")
+    async def test_fillroles(self, gws_patch):
         """Unit tests for !fillroles command."""
         # async def fillroles(self, ctx)
         config.max_ciblages_per_action = 0
@@ -977,9 +1237,7 @@ class TestSync(unittest.IsolatedAsyncioTestCase):
         bdd.BaseAction.add(*baseactions)
 
         # missing sheet
-        workbook = mock.Mock(**{"worksheet.side_effect":
-                                gsheets.WorksheetNotFound})
-        gconnect_patch.return_value = workbook
+        gws_patch.side_effect = gsheets.WorksheetNotFound
         ctx = mock_discord.get_ctx(fillroles)
         with self.assertRaises(ValueError) as cm:
             await ctx.invoke()
@@ -992,8 +1250,7 @@ class TestSync(unittest.IsolatedAsyncioTestCase):
         sheets = {
             "camps": mock.Mock(**{"get_all_values.return_value": c_vals}),
         }
-        workbook = mock.Mock(**{"worksheet.side_effect": lambda n: sheets[n]})
-        gconnect_patch.return_value = workbook
+        gws_patch.side_effect = lambda key, n: sheets[n]
         ctx = mock_discord.get_ctx(fillroles)
         with self.assertRaises(ValueError) as cm:
             await ctx.invoke()
@@ -1040,8 +1297,7 @@ class TestSync(unittest.IsolatedAsyncioTestCase):
             "roles": mock.Mock(**{"get_all_values.return_value": r_vals}),
             "baseactions": mock.Mock(**{"get_all_values.return_value": b_vals}),
         }
-        workbook = mock.Mock(**{"worksheet.side_effect": lambda n: sheets[n]})
-        gconnect_patch.return_value = workbook
+        gws_patch.side_effect = lambda key, n: sheets[n]
         ctx = mock_discord.get_ctx(fillroles)
         await ctx.invoke()
         # fonctions de projection instances BDD -> liste
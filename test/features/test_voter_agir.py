@@ -1,3 +1,4 @@
+import datetime
 import unittest
 from unittest import mock
 
@@ -15,76 +16,76 @@ class TestVoterAgirFunctions(unittest.IsolatedAsyncioTestCase):
     def tearDown(self):
         mock_discord.unmock_config()
 
-    @mock_bdd.patch_db      # Empty database for this method
     @mock_env.patch_env(LGREZ_DATA_SHEET_ID="uiz")
-    @mock.patch("lgrez.blocs.gsheets.connect")
-    async def test_export_vote(self, gconnect_patch):
+    @mock.patch("lgrez.blocs.gsheets.append_later")
+    async def test_export_vote(self, append_patch):
         """Unit tests for voter_agir.export_vote function."""
-        # def export_vote(vote, joueur)
+        # async def export_vote(vote, utilisation)
         export_vote = voter_agir.export_vote
-        mock_bdd.add_campsroles(10, 10)
-        joueur = bdd.Joueur(discord_id=1, chan_id_=11, nom="Joueur1",
-                            _role_slug="role7", _camp_slug="camp8",
-                            vote_condamne_="oh", vote_maire_="ah",
-                            vote_loups_="eh")
-        joueur.add()
-        bdd.BaseAction(slug="ouiZ").add()
-        bdd.BaseAction(slug="nonZ").add()
-        bdd.BaseAction(slug="lalaZ").add()
-        bdd.Action(joueur=joueur, _base_slug="ouiZ", decision_="dZ1").add()
-        bdd.Action(joueur=joueur, _base_slug="nonZ", decision_="dZ2").add()
-        bdd.Action(joueur=joueur, _base_slug="lalaZ", decision_=None).add()
+        util = mock.Mock()
+        joueur = util.action.joueur
+        joueur.nom = "Joueur1"
+        joueur.role.slug = "role7"
+        joueur.camp.slug = "camp8"
+        util.cible.nom = "oh"
+
+        def action(slug, decision, filled=True, date=None):
+            last_util = mock.Mock(decision=decision, is_filled=filled)
+            last_util.ts_decision.date.return_value = (
+                date or datetime.date.today()
+            )
+            return mock.Mock(base=mock.Mock(slug=slug),
+                             derniere_utilisation=last_util)
+
+        joueur.actions_actives = [
+            action("ouiZ", "dZ1"),
+            action("nonZ", "dZ2"),
+            action("lalaZ", "dZ3", filled=False),
+            action("hierZ", "dZ4", date=datetime.date(2020, 1, 1)),
+        ]
 
         # no LGREZ_DATA_SHEET_ID
         with mock_env.patch_env(LGREZ_DATA_SHEET_ID=None):
             with self.assertRaises(RuntimeError):
-                export_vote("cond", joueur)
-        gconnect_patch.assert_not_called()
+                await export_vote("cond", util)
+        append_patch.assert_not_called()
 
         # vote = bad value
-        with self.assertRaises(ValueError):
-            export_vote("bzz", joueur)
-        gconnect_patch.assert_not_called()
+        with self.assertRaises(KeyError):
+            await export_vote("bzz", util)
+        append_patch.assert_not_called()
 
         # vote = "cond"
-        export_vote("cond", joueur)
-        gconnect_patch.assert_called_once_with("uiz")
-        gconnect_patch().worksheet.assert_called_with("votecond_brut")
-        gconnect_patch().worksheet().append_row.assert_called_once()
-        appened = gconnect_patch().worksheet().append_row.call_args.args[0]
+        await export_vote("cond", util)
+        append_patch.assert_called_once()
+        key, sheet_name, appened = append_patch.call_args.args
+        self.assertEqual((key, sheet_name), ("uiz", "votecond_brut"))
         self.assertEqual(["Joueur1", "oh"], appened[1:])
-        gconnect_patch.reset_mock(return_value=True)
+        append_patch.reset_mock()
 
         # vote = "maire"
-        export_vote("maire", joueur)
-        gconnect_patch.assert_called_once_with("uiz")
-        gconnect_patch().worksheet.assert_called_with("votemaire_brut")
-        gconnect_patch().worksheet().append_row.assert_called_once()
-        appened = gconnect_patch().worksheet().append_row.call_args.args[0]
-        self.assertEqual(["Joueur1", "ah"], appened[1:])
-        gconnect_patch.reset_mock(return_value=True)
+        await export_vote(bdd.Vote.maire, util)
+        append_patch.assert_called_once()
+        key, sheet_name, appened = append_patch.call_args.args
+        self.assertEqual((key, sheet_name), ("uiz", "votemaire_brut"))
+        self.assertEqual(["Joueur1", "oh"], appened[1:])
+        append_patch.reset_mock()
 
         # vote = "loups"
-        export_vote("loups", joueur)
-        gconnect_patch.assert_called_once_with("uiz")
-        gconnect_patch().worksheet.assert_called_with("voteloups_brut")
-        gconnect_patch().worksheet().append_row.assert_called_once()
-        appened = gconnect_patch().worksheet().append_row.call_args.args[0]
-        self.assertEqual(["Joueur1", "camp8", "eh"], appened[1:])
-        gconnect_patch.reset_mock(return_value=True)
-
-        # vote = "action"
-        export_vote("action", joueur)
-        gconnect_patch.assert_called_once_with("uiz")
-        gconnect_patch().worksheet.assert_called_with("actions_brut")
-        gconnect_patch().worksheet().append_row.assert_called_once()
-        appened = gconnect_patch().worksheet().append_row.call_args.args[0]
+        await export_vote("loups", util)
+        append_patch.assert_called_once()
+        key, sheet_name, appened = append_patch.call_args.args
+        self.assertEqual((key, sheet_name), ("uiz", "voteloups_brut"))
+        self.assertEqual(["Joueur1", "camp8", "oh"], appened[1:])
+        append_patch.reset_mock()
+
+        # action
+        await export_vote(None, util)
+        append_patch.assert_called_once()
+        key, sheet_name, appened = append_patch.call_args.args
+        self.assertEqual((key, sheet_name), ("uiz", "actions_brut"))
         self.assertEqual(["Joueur1", "role7", "camp8"], appened[1:4])
-        self.assertIn("ouiZ", appened[4])
-        self.assertIn("dZ1", appened[4])
-        self.assertIn("nonZ", appened[4])
-        self.assertIn("dZ2", appened[4])
-        self.assertNotIn("lalaZ", appened[4])
+        self.assertEqual("ouiZ(dZ1)\n+\nnonZ(dZ2)", appened[4])
 
 
 
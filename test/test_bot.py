@@ -910,9 +910,9 @@ class TestLGBot(unittest.IsolatedAsyncioTestCase):
         created.add_check.assert_called_once_with(
             blocs.one_command.not_in_command)
         created.before_invoke.assert_called_once_with(
-            blocs.one_command.add_to_in_command)
+            blocs.one_command.before_invoke)
         created.after_invoke.assert_called_once_with(
-            blocs.one_command.remove_from_in_command)
+            blocs.one_command.after_invoke)
         created.remove_command.assert_called_once_with("help")
         for patch in cog_patches:
             patch.assert_called_once_with(created)
@@ -1019,6 +1019,35 @@ class TestLGBot(unittest.IsolatedAsyncioTestCase):
         bt.loop.call_later.assert_called_once_with(60, bt.i_am_alive, "krkrkr")
 
 
+    @mock.patch("lgrez.blocs.tools.log", new_callable=mock.Mock)
+    @mock.patch("lgrez.bdd.query_stats.take_period")
+    async def test_log_sql_stats(self, tp_patch, log_patch):
+        """Unit tests for bot.log_sql_stats function."""
+        # def log_sql_stats(self)
+        log_sql_stats = bot.LGBot.log_sql_stats
+        bt = mock.Mock()
+
+        # no queries
+        tp_patch.return_value = {}
+        log_sql_stats(bt)
+        log_patch.assert_not_called()
+        bt.loop.create_task.assert_not_called()
+        bt.loop.call_later.assert_called_once_with(
+            config.sql_stats_log_period, bt.log_sql_stats)
+        bt.reset_mock()
+
+        # queries
+        totals = bdd.query_stats.CommandTotals()
+        totals.queries = 3
+        tp_patch.return_value = {None: totals}
+        log_sql_stats(bt)
+        log_patch.assert_called_once_with(
+            "(hors commande) : 3 requêtes, 0 ms", code=True, prefixe=mock.ANY)
+        bt.loop.create_task.assert_called_once_with(log_patch.return_value)
+        bt.loop.call_later.assert_called_once_with(
+            config.sql_stats_log_period, bt.log_sql_stats)
+
+
     @mock_env.patch_env(LGREZ_DISCORD_TOKEN="t@ken",
                         LGREZ_SERVER_ID="12345")
     @mock.patch("lgrez.bdd.connect")